@@ -4,15 +4,7 @@ Add Payment Information Display to InvoiceDetail.tsx
 Gate S5 - Patient & Payment Management
 """
 
-import os
-import re
-
-# File path
-file_path = r"apps\web\src\pages\InvoiceDetail.tsx"
-
-# Read the file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import InsertBefore, Patch, run
 
 # Payment display section to add before closing </Layout>
 payment_section = """
@@ -65,12 +57,17 @@ payment_section = """
       )}
 """
 
-# Insert before closing </Layout> tag
-pattern = r"(      </div>\n    </Layout>)"
-content = re.sub(pattern, payment_section + r"\1", content)
-
-# Write the updated content
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    Patch(
+        name='add-payment-display',
+        target='apps/web/src/pages/InvoiceDetail.tsx',
+        edits=[
+            # Insert before closing </Layout> tag
+            InsertBefore(r"      </div>\n    </Layout>", payment_section),
+        ],
+    ),
+]
 
-print("Payment display section added successfully to InvoiceDetail.tsx")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("Payment display section added successfully to InvoiceDetail.tsx")
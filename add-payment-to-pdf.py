@@ -4,15 +4,7 @@ Add Payment Information to PDF Generator
 Gate S5 - Patient & Payment Management
 """
 
-import os
-import re
-
-# File path
-file_path = r"apps\web\src\lib\pdfGenerator.ts"
-
-# Read the file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Sub, run
 
 # Payment section to add before Notes section
 payment_section = """
@@ -63,12 +55,21 @@ payment_section = """
   }
 """
 
-# Insert before Notes section
-pattern = r"(  doc\.setTextColor\(\.\.\.textColor\);\n\n  // Notes \(if any\))"
-content = re.sub(pattern, r"  doc.setTextColor(...textColor);\n" + payment_section + "\n  // Notes (if any)", content)
-
-# Write the updated content
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Payment information section added successfully to pdfGenerator.ts")
+PATCHES = [
+    Patch(
+        name='add-payment-to-pdf',
+        target='apps/web/src/lib/pdfGenerator.ts',
+        edits=[
+            # Insert before Notes section
+            Sub(
+                r"(  doc\.setTextColor\(\.\.\.textColor\);\n\n  // Notes \(if any\))",
+                r"  doc.setTextColor(...textColor);\n" + payment_section + "\n  // Notes (if any)",
+                done="  // Payment Information (Gate S5)\n",
+            ),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("Payment information section added successfully to pdfGenerator.ts")
@@ -4,12 +4,7 @@ Add post-payment action buttons to InvoiceDetail
 Gate S6.2 - Functional Refinement
 """
 
-import re
-
-file_path = r"apps\web\src\pages\InvoiceDetail.tsx"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import InsertAfter, InsertBefore, Patch, run
 
 # 1. Add duplicate and convert functions before the return statement
 action_functions = r"""
@@ -46,10 +41,10 @@ action_functions = r"""
     if (!invoice) return;
 
     const message = encodeURIComponent(
-      `Hi! Here is your ${invoice.status === 'Quotation' ? 'quotation' : 'invoice'} from Dr. Tebeila Dental Studio.\\n\\n` +
-      `${invoice.status === 'Quotation' ? 'Quotation' : 'Invoice'} #: ${invoice.invoice_number}\\n` +
-      `Date: ${formatDateDisplay(invoice.invoice_date)}\\n` +
-      `Total: ${formatCurrency(invoice.total_amount)}\\n\\n` +
+      `Hi! Here is your ${invoice.status === 'Quotation' ? 'quotation' : 'invoice'} from Dr. Tebeila Dental Studio.\n\n` +
+      `${invoice.status === 'Quotation' ? 'Quotation' : 'Invoice'} #: ${invoice.invoice_number}\n` +
+      `Date: ${formatDateDisplay(invoice.invoice_date)}\n` +
+      `Total: ${formatCurrency(invoice.total_amount)}\n\n` +
       `Thank you for choosing us!`
     );
 
@@ -63,15 +58,9 @@ action_functions = r"""
 
 """
 
-content = re.sub(
-    r"(  if \(authLoading \|\| loading\) \{)",
-    action_functions + r"\1",
-    content
-)
-
-# 2. Add action buttons section after payment information card (before closing </Layout>)
+# 2. Add action buttons section right after the payment information card
 action_buttons = r"""
-      {/* Post-Action Buttons (Gate S6.2) */}
+      {/* Post-Payment Actions (Gate S6.2) */}
       <div className="card mt-6">
         <h3 className="text-lg font-semibold text-gray-900 mb-4">Quick Actions</h3>
 
@@ -149,13 +138,28 @@ action_buttons = r"""
       </div>
 """
 
-content = re.sub(
-    r"(    </Layout>\n  \);\n\})",
-    action_buttons + r"\n\1",
-    content
-)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Post-payment action buttons added to InvoiceDetail")
+# The Payment Information card, through the line that closes its conditional
+PAYMENT_CARD = r"      \{/\* Payment Information \(Gate S5\) \*/\}\n(?:.*\n)*?      \)\}\n"
+
+# Any post-payment actions card (this one or Gate S8's) already covers these
+# handlers and buttons; the handlers are only added together with the card
+ACTIONS_DONE = "{/* Post-Payment Actions"
+
+PATCHES = [
+    Patch(
+        name='add-post-payment-actions',
+        target='apps/web/src/pages/InvoiceDetail.tsx',
+        edits=[
+            InsertBefore(
+                r"  if \(authLoading \|\| loading\) \{",
+                action_functions,
+                done=ACTIONS_DONE,
+            ),
+            InsertAfter(PAYMENT_CARD, action_buttons, done=ACTIONS_DONE),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("Post-payment action buttons added to InvoiceDetail")
@@ -4,12 +4,7 @@ Add QUOTATION watermark and accounting fields to PDF generator
 Gate S6.2 - Functional Refinement
 """
 
-import re
-
-file_path = r"apps\web\src\lib\pdfGenerator.ts"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Sub, run
 
 # 1. Add quotation watermark after header
 watermark_code = r"""
@@ -26,24 +21,29 @@ watermark_code = r"""
   }
 """
 
-# Insert after yPos = 55 line
-content = re.sub(
-    r"(  yPos = 55;)",
-    r"\1" + watermark_code,
-    content
-)
-
 # 2. Update Invoice Number section to show QUOTATION or INVOICE
-old_invoice_num = r"(  doc\.text\(`Invoice: \$\{invoice\.invoice_number \|\| 'DRAFT'\}`, margin, yPos\);)"
 new_invoice_num = r"""  doc.text(
     `${invoice.status === 'Quotation' ? 'Quotation' : 'Invoice'}: ${invoice.invoice_number || 'DRAFT'}`,
     margin,
     yPos
   );"""
 
-content = re.sub(old_invoice_num, new_invoice_num, content)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Quotation watermark and branding added to PDF generator")
+PATCHES = [
+    Patch(
+        name='add-quotation-pdf',
+        target='apps/web/src/lib/pdfGenerator.ts',
+        edits=[
+            # Insert after yPos = 55 line
+            Sub(r"(  yPos = 55;)", r"\1" + watermark_code, done="  // Quotation Watermark (Gate S6.2)\n"),
+            Sub(
+                r"(  doc\.text\(`Invoice: \$\{invoice\.invoice_number \|\| 'DRAFT'\}`, margin, yPos\);)",
+                new_invoice_num,
+                done="`${invoice.status === 'Quotation' ? 'Quotation' : 'Invoice'}: ${invoice.invoice_number || 'DRAFT'}`",
+            ),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("Quotation watermark and branding added to PDF generator")
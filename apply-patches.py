@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Apply a gate's source-rewrite scripts as one batched patch set
+Every target file is read once, patched in memory and written once.
+
+Usage:
+  python apply-patches.py S6.2            # one gate
+  python apply-patches.py S5 S5.1         # several gates, in order
+  python apply-patches.py --all --dry-run # report only, write nothing
+  python apply-patches.py --all --baseline # record the tree as already patched
+  python apply-patches.py --all -j 4      # four worker processes (default: one process)
+
+Applied patches are recorded in .patch-manifest.json and skipped on later
+runs. A patch whose anchor is gone is reported as drift and exits non-zero.
+With -j N > 1, patches on different files run in parallel worker
+processes; patches on the same file run in order within one worker. For
+this tree's few targets the pool's startup costs more than it saves, so it
+is opt-in.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from patchlib import (
+    REPO_ROOT,
+    PatchError,
+    apply_patches,
+    has_drift,
+    load_patches,
+    print_report,
+    record_baseline,
+)
+
+# Scripts per gate, in application order. Scripts touching the same file
+# must stay in the order they were originally run.
+# fix-hooks-complete.py and fix-line58.py repaired one specific broken state
+# of InvoiceNew.tsx and are only run by hand.
+GATES = {
+    'S3': [
+        'apps/web/fix-hooks.py',
+        'apps/web/fix-useeffect.py',
+        'apps/web/fix-fetchdata-order.py',
+        'apps/web/add-timeouts.py',
+        'apps/web/add-warmup-and-increase-timeout.py',
+        'apps/web/fix-auth.py',
+        'apps/web/add-listener-cache.py',
+        'apps/web/persist-profile-cache.py',
+    ],
+    'S5': [
+        'apply-payment-ui.py',
+        'add-payment-display.py',
+        'add-payment-to-pdf.py',
+        'update-types.py',
+    ],
+    'S5.1': [
+        'update-patient-modal.py',
+        'update-customer-types.py',
+        'integrate-patient-modal.py',
+        'update-invoice-detail.py',
+        'update-pdf-generator.py',
+    ],
+    'S6': [
+        'enhance-pdf-branding.py',
+    ],
+    'S6.2': [
+        'enhance-patient-modal-search.py',
+        'add-quotation-support.py',
+        'add-quotation-mode.py',
+        'add-quotation-pdf.py',
+        'fix-pdf-pageheight.py',
+        'add-post-payment-actions.py',
+    ],
+    'S7': [
+        'update-index-html.py',
+    ],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply gate patch sets in a single pass per file')
+    parser.add_argument('gates', nargs='*', help=f"Gates to apply: {', '.join(GATES)}")
+    parser.add_argument('--all', action='store_true', help='Apply every gate in order')
+    parser.add_argument('--dry-run', action='store_true', help='Patch in memory only, write nothing')
+    parser.add_argument('--baseline', action='store_true',
+                        help='Record the selected patches as applied without editing any file')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Worker processes for independent files (default: 1, no pool)')
+    parser.add_argument('--root', type=Path, default=REPO_ROOT,
+                        help='Checkout to patch (targets resolve relative to it)')
+    args = parser.parse_args()
+
+    gates = list(GATES) if args.all else args.gates
+    unknown = [g for g in gates if g not in GATES]
+    if not gates or unknown:
+        parser.error(f"Unknown or missing gate(s): {unknown or gates}. Choose from {', '.join(GATES)}")
+
+    patches = []
+    for gate in gates:
+        for script in GATES[gate]:
+            patches.extend(load_patches(REPO_ROOT / script))
+
+    started = time.perf_counter()
+    try:
+        if args.baseline:
+            record_baseline(patches, root=args.root)
+            print(f"Recorded {len(patches)} patch(es) as applied")
+            return 0
+        results = apply_patches(patches, root=args.root, dry_run=args.dry_run, workers=args.jobs)
+    except PatchError as e:
+        print(f"ERROR: {e} (no files written)")
+        return 1
+    elapsed = time.perf_counter() - started
+
+    targets = {r.target for r in results}
+    print(f"{'Checked' if args.dry_run else 'Applied'} {len(results)} patch(es) across {len(targets)} file(s):")
+    print_report(results)
+    print(f"Total: {elapsed * 1000:.1f} ms wall-clock ({args.jobs} job(s))")
+    return 1 if has_drift(results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,15 +4,7 @@ Apply Payment UI Integration to InvoiceNew.tsx
 Gate S5 - Patient & Payment Management
 """
 
-import os
-import re
-
-# File path
-file_path = r"apps\web\src\pages\InvoiceNew.tsx"
-
-# Read the file
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Sub, run
 
 # Step 1: Add payment state variables after line 33 (after const [notes, setNotes] = useState('');)
 payment_state = """
@@ -24,7 +16,6 @@ payment_state = """
 
 # Find the insertion point
 pattern1 = r"(const \[notes, setNotes\] = useState\(''\);\n)"
-content = re.sub(pattern1, r"\1" + payment_state + "\n", content)
 
 # Step 2: Add useEffect for change calculation after line 86 (after the existing useEffect)
 change_effect = """
@@ -40,14 +31,11 @@ change_effect = """
 """
 
 pattern2 = r"(useEffect\(\(\) => \{\s+fetchData\(\);\s+\}, \[tenantId\]\);)"
-content = re.sub(pattern2, r"\1\n" + change_effect, content)
 
 # Step 3: Update handleSubmit to include payment fields
 old_insert = r"(paid_amount: 0,\s+notes,)"
 new_insert = r"\1\n        // Payment tracking fields (Gate S5)\n        amount_paid: amountPaid,\n        payment_method: paymentMethod,\n        change_due: changeDue,"
 
-content = re.sub(old_insert, new_insert, content)
-
 # Step 4: Add Payment Details section before closing </form> tag
 payment_section = """
         {/* Payment Details Section (Gate S5) */}
@@ -130,15 +118,25 @@ payment_section = """
 
 # Insert before closing </form> tag
 pattern4 = r"(        \}\)\n      \}\)\n      </form>)"
-content = re.sub(pattern4, payment_section + r"\1", content)
-
-# Write the updated content
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
 
-print("✅ Payment UI integration applied successfully to InvoiceNew.tsx")
-print("✅ Changes:")
-print("   - Added payment state variables (amountPaid, paymentMethod, changeDue)")
-print("   - Added useEffect for automatic change calculation")
-print("   - Updated handleSubmit to save payment fields")
-print("   - Added Payment Details section UI")
+PATCHES = [
+    Patch(
+        name='apply-payment-ui',
+        target='apps/web/src/pages/InvoiceNew.tsx',
+        edits=[
+            Sub(pattern1, r"\1" + payment_state + "\n", done="  // Payment tracking state (Gate S5)\n"),
+            Sub(pattern2, r"\1\n" + change_effect, done="// Auto-calculate change due for Cash payments (Gate S5)"),
+            Sub(old_insert, new_insert, done="        // Payment tracking fields (Gate S5)\n"),
+            Sub(pattern4, payment_section + r"\1", done="{/* Payment Details Section (Gate S5) */}"),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("✅ Payment UI integration applied successfully to InvoiceNew.tsx")
+    print("✅ Changes:")
+    print("   - Added payment state variables (amountPaid, paymentMethod, changeDue)")
+    print("   - Added useEffect for automatic change calculation")
+    print("   - Updated handleSubmit to save payment fields")
+    print("   - Added Payment Details section UI")
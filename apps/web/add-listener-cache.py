@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 """Add session cache check to auth listener to prevent slow fetches"""
 
-import re
+import sys
+from pathlib import Path
 
-auth_file = r"f:\Digital Agency\Refodile Health Centre\Dentist\Dr.Tebeila Dental Studio\apps\web\src\contexts\AuthContext.tsx"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-with open(auth_file, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Replace, run  # noqa: E402
 
 old_listener_code = """      if (session?.user) {
         console.info('[AUTH_LISTENER] Processing auth state change:', event);
@@ -71,11 +71,18 @@ new_listener_code = """      if (session?.user) {
         }
       }"""
 
-content = content.replace(old_listener_code, new_listener_code)
+PATCHES = [
+    Patch(
+        name='add-listener-cache',
+        target='apps/web/src/contexts/AuthContext.tsx',
+        edits=[
+            Replace(old_listener_code, new_listener_code),
+        ],
+    ),
+]
 
-with open(auth_file, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("OK Added cache check to auth listener")
-print("  - Listener now checks cache before fetching profile")
-print("  - Should prevent timeout errors on page refresh")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("OK Added cache check to auth listener")
+    print("  - Listener now checks cache before fetching profile")
+    print("  - Should prevent timeout errors on page refresh")
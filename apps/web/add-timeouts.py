@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 """Add timeout wrappers to all async Supabase calls"""
 
-import re
+import sys
+from pathlib import Path
 
-auth_file = r"f:\Digital Agency\Refodile Health Centre\Dentist\Dr.Tebeila Dental Studio\apps\web\src\contexts\AuthContext.tsx"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-with open(auth_file, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Replace, run  # noqa: E402
 
 # 1. Add timeout to signInWithPassword
 old_signin = """      const { data, error } = await supabase.auth.signInWithPassword({
@@ -24,8 +24,6 @@ new_signin = """      // Race against 10s timeout
       );
       const { data, error } = await Promise.race([authPromise, timeoutPromise]);"""
 
-content = content.replace(old_signin, new_signin)
-
 # 2. Add timeout helper function at the top of the component
 helper_function = """
   // ✅ Timeout wrapper for any async operation
@@ -39,7 +37,6 @@ helper_function = """
 
 # Insert helper after the useRef declarations
 insert_after = "  const manualSignInRef = useRef(false); // Flag to prevent auth listener race"
-content = content.replace(insert_after, insert_after + helper_function)
 
 # 3. Update fetchProfile to use timeout wrapper
 old_fetchProfile = """  const fetchProfile = async (userId: string): Promise<UserProfile | null> => {
@@ -93,13 +90,21 @@ new_fetchProfile = """  const fetchProfile = async (userId: string): Promise<Use
     }
   };"""
 
-content = content.replace(old_fetchProfile, new_fetchProfile)
-
-# Write back
-with open(auth_file, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("OK AuthContext updated with timeouts")
-print("  - Added timeout helper function")
-print("  - Added 10s timeout to signInWithPassword")
-print("  - Added 5s timeout to fetchProfile")
+PATCHES = [
+    Patch(
+        name='add-timeouts',
+        target='apps/web/src/contexts/AuthContext.tsx',
+        edits=[
+            Replace(old_signin, new_signin),
+            Replace(insert_after, insert_after + helper_function),
+            Replace(old_fetchProfile, new_fetchProfile),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("OK AuthContext updated with timeouts")
+    print("  - Added timeout helper function")
+    print("  - Added 10s timeout to signInWithPassword")
+    print("  - Added 5s timeout to fetchProfile")
@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 """Add warmup call before signIn and increase timeouts"""
 
-import re
+import sys
+from pathlib import Path
 
-auth_file = r"f:\Digital Agency\Refodile Health Centre\Dentist\Dr.Tebeila Dental Studio\apps\web\src\contexts\AuthContext.tsx"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-with open(auth_file, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Replace, run  # noqa: E402
 
 # 1. Add warmup before authentication
 old_step1 = """    try {
@@ -45,18 +45,24 @@ new_step1 = """    try {
       );
       const { data, error } = await Promise.race([authPromise, timeoutPromise]);"""
 
-content = content.replace(old_step1, new_step1)
+PATCHES = [
+    Patch(
+        name='add-warmup-and-increase-timeout',
+        target='apps/web/src/contexts/AuthContext.tsx',
+        edits=[
+            Replace(old_step1, new_step1),
+            # 2. Increase fetchProfile timeout from 5s to 15s
+            Replace(
+                "5000,\n        'Profile fetch timeout after 5s'",
+                "15000,\n        'Profile fetch timeout after 15s'",
+            ),
+        ],
+    ),
+]
 
-# 2. Increase fetchProfile timeout from 5s to 15s
-content = content.replace(
-    "5000,\n        'Profile fetch timeout after 5s'",
-    "15000,\n        'Profile fetch timeout after 15s'"
-)
-
-with open(auth_file, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("OK Updated AuthContext")
-print("  - Added warmup call before signIn")
-print("  - Increased login timeout: 10s -> 15s")
-print("  - Increased profile fetch timeout: 5s -> 15s")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("OK Updated AuthContext")
+    print("  - Added warmup call before signIn")
+    print("  - Increased login timeout: 10s -> 15s")
+    print("  - Increased profile fetch timeout: 5s -> 15s")
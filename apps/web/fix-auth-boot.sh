@@ -1,7 +1,7 @@
 #!/bin/bash
 # Replace slow session check with fast boot
 
-cd "f:/Digital Agency/Refodile Health Centre/Dentist/Dr.Tebeila Dental Studio/apps/web/src/contexts"
+cd "$(dirname "$0")/src/contexts" || exit 1
 
 # Use sed to delete lines 105-187 (the entire slow session check and profile load)
 # and replace with simple fast boot logic
@@ -1,22 +1,25 @@
 #!/usr/bin/env python3
 """Move line 58 (lineItems useState) to line 35"""
 
-file_path = r"f:\Digital Agency\Refodile Health Centre\Dentist\Dr.Tebeila Dental Studio\apps\web\src\pages\InvoiceNew.tsx"
+import sys
+from pathlib import Path
 
-with open(file_path, 'r', encoding='utf-8') as f:
-    lines = f.readlines()
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-# Line 58 (index 57) has: const [lineItems, setLineItems] = useState<LineItem[]>([]);
-lineItems_hook = lines[57]
+from patchlib import MoveLines, Patch, run  # noqa: E402
 
-# Remove line 58
-del lines[57]
+PATCHES = [
+    Patch(
+        name='fix-line58',
+        target='apps/web/src/pages/InvoiceNew.tsx',
+        edits=[
+            # Line 58 (index 57) has: const [lineItems, setLineItems] = useState<LineItem[]>([]);
+            # Insert at index 35 to put it AFTER line 35
+            MoveLines(57, 58, 35, expect='const [lineItems, setLineItems]'),
+        ],
+    ),
+]
 
-# Insert after line 35 (which is index 34, but becomes 34 after we delete 57)
-# Actually insert at index 35 to put it AFTER line 35
-lines.insert(35, lineItems_hook)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.writelines(lines)
-
-print("OK Moved lineItems useState to before conditional returns")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("OK Moved lineItems useState to before conditional returns")
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 """Add localStorage persistence for profile cache"""
 
-auth_file = r"f:\Digital Agency\Refodile Health Centre\Dentist\Dr.Tebeila Dental Studio\apps\web\src\contexts\AuthContext.tsx"
+import sys
+from pathlib import Path
 
-with open(auth_file, 'r', encoding='utf-8') as f:
-    content = f.read()
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from patchlib import Patch, Replace, run  # noqa: E402
 
 # 1. Update initAuth to check localStorage first
 old_cache_check = """        // ✅ Path B: Session cache short-circuit
@@ -47,8 +49,6 @@ new_cache_check = """        // ✅ Path B: Check localStorage cache first (surv
           console.warn('[CACHE] Failed to restore from localStorage:', err);
         }"""
 
-content = content.replace(old_cache_check, new_cache_check)
-
 # 2. Save profile to localStorage after successful login
 old_signin_complete = """        // Update cache for next time
         if (profile) {
@@ -67,8 +67,6 @@ new_signin_complete = """        // Update cache for next time (both memory and
         }
       }"""
 
-content = content.replace(old_signin_complete, new_signin_complete)
-
 # 3. Update signIn to save to localStorage
 old_signin_cache = """      // Step 4: Update state and cache
       sessionCacheRef.current = { user, profile };"""
@@ -82,8 +80,6 @@ new_signin_cache = """      // Step 4: Update state and cache (memory + localSto
         console.warn('[CACHE] Failed to save to localStorage:', err);
       }"""
 
-content = content.replace(old_signin_cache, new_signin_cache)
-
 # 4. Clear cache on signOut
 old_signout = """      await supabase.auth.signOut({ scope: 'local' });
       console.info('[SIGNOUT_COMPLETE]');"""
@@ -92,12 +88,22 @@ new_signout = """      await supabase.auth.signOut({ scope: 'local' });
       localStorage.removeItem('user_profile_cache');
       console.info('[SIGNOUT_COMPLETE] Cache cleared');"""
 
-content = content.replace(old_signout, new_signout)
-
-with open(auth_file, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("OK Added localStorage persistence for profile cache")
-print("  - Profile saved to localStorage on login")
-print("  - Profile restored from localStorage on refresh")
-print("  - Cache cleared on logout")
+PATCHES = [
+    Patch(
+        name='persist-profile-cache',
+        target='apps/web/src/contexts/AuthContext.tsx',
+        edits=[
+            Replace(old_cache_check, new_cache_check),
+            Replace(old_signin_complete, new_signin_complete),
+            Replace(old_signin_cache, new_signin_cache),
+            Replace(old_signout, new_signout),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("OK Added localStorage persistence for profile cache")
+    print("  - Profile saved to localStorage on login")
+    print("  - Profile restored from localStorage on refresh")
+    print("  - Cache cleared on logout")
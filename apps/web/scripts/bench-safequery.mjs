@@ -0,0 +1,120 @@
+// Micro-benchmark for src/lib/safeQuery.ts, against a simulated transport
+// (no network, no database):
+//   1. Requests sent when InvoiceNew mounts, with and without request
+//      coalescing (the `key` option)
+//   2. Read latency with and without hedging (the `hedgeAfterMs` option)
+//      when a tenth of requests are slow
+//
+// Usage:
+//   npm run bench:safequery
+
+import { readFile } from 'node:fs/promises';
+import ts from 'typescript';
+
+const source = await readFile(new URL('../src/lib/safeQuery.ts', import.meta.url), 'utf8');
+const { outputText } = ts.transpileModule(source, {
+  compilerOptions: { module: ts.ModuleKind.ESNext, target: ts.ScriptTarget.ES2022 },
+});
+const { safeQuery, getSafeQueryStats, resetSafeQueryStats } = await import(
+  `data:text/javascript;base64,${Buffer.from(outputText).toString('base64')}`
+);
+
+const TENANT = '00000000-0000-0000-0000-000000000001';
+const SINCE = new Date(Date.now() - 60_000).toISOString();
+
+let aborted = 0;
+
+// A PostgREST call; each request answers after latency() ms unless its
+// signal aborts
+function simulated(latency) {
+  return (signal) =>
+    new Promise((resolve) => {
+      const timer = setTimeout(() => resolve({ data: [], error: null }), latency());
+      signal.addEventListener('abort', () => {
+        clearTimeout(timer);
+        aborted++;
+      }, { once: true });
+    });
+}
+
+const between = (min, max) => min + Math.random() * (max - min);
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function percentile(values, p) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+// ============================================================================
+// 1. InvoiceNew mount
+// ============================================================================
+
+// Page requests made by one mount of App + InvoiceNew in development, where
+// StrictMode runs every effect twice:
+//   startCacheSync() (App), twice: invoices and customers, then tombstones
+//   revalidateReferenceData(): services and VAT rates, already shared by
+//     useReferenceData and startCacheSync through dataCache's inFlight map
+const MOUNT_REQUESTS = [
+  'invoices', 'customers', 'sync_tombstones',
+  'invoices', 'customers', 'sync_tombstones',
+  'services', 'vat_rates',
+];
+
+async function mount(coalesce) {
+  resetSafeQueryStats();
+  await Promise.all(
+    MOUNT_REQUESTS.map(async (table) => {
+      await sleep(between(0, 15)); // effects run back to back, not at once
+      return safeQuery(simulated(() => between(60, 180)), coalesce ? { key: ['sync', table, TENANT, SINCE, null] } : {});
+    })
+  );
+  return getSafeQueryStats();
+}
+
+const MOUNTS = 50;
+const results = { plain: 0, coalesced: 0 };
+for (let i = 0; i < MOUNTS; i++) {
+  results.plain += (await mount(false)).requests;
+  results.coalesced += (await mount(true)).requests;
+}
+
+console.log(`InvoiceNew mount (${MOUNT_REQUESTS.length} page loads, ${MOUNTS} mounts)`);
+console.log(`  without coalescing: ${(results.plain / MOUNTS).toFixed(1)} requests per mount`);
+console.log(`  with coalescing:    ${(results.coalesced / MOUNTS).toFixed(1)} requests per mount`);
+console.log(`  duplicates removed: ${(100 * (1 - results.coalesced / results.plain)).toFixed(0)}%`);
+
+// ============================================================================
+// 2. Hedged reads
+// ============================================================================
+
+const READS = 400;
+const HEDGE_AFTER_MS = 250;
+
+// 90% of requests take 40-120 ms, 10% stall for 1.5-3 s
+function readLatency() {
+  return Math.random() < 0.1 ? between(1500, 3000) : between(40, 120);
+}
+
+async function reads(hedgeAfterMs) {
+  resetSafeQueryStats();
+  aborted = 0;
+  const latencies = await Promise.all(
+    Array.from({ length: READS }, async () => {
+      const started = performance.now();
+      await safeQuery(simulated(readLatency), { hedgeAfterMs, timeoutMs: 10_000 });
+      return performance.now() - started;
+    })
+  );
+  return { latencies, stats: getSafeQueryStats(), aborted };
+}
+
+console.log(`\nReads with a slow tail (${READS} reads, hedge after ${HEDGE_AFTER_MS} ms)`);
+for (const [label, hedge] of [['without hedging', undefined], ['with hedging', HEDGE_AFTER_MS]]) {
+  const { latencies, stats, aborted: cancelled } = await reads(hedge);
+  console.log(
+    `  ${label.padEnd(16)} p50 ${percentile(latencies, 50).toFixed(0).padStart(5)} ms` +
+    `  p95 ${percentile(latencies, 95).toFixed(0).padStart(5)} ms` +
+    `  p99 ${percentile(latencies, 99).toFixed(0).padStart(5)} ms` +
+    `  requests ${stats.requests} (${cancelled} aborted)`
+  );
+}
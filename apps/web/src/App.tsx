@@ -1,3 +1,4 @@
+import { useEffect } from 'react';
 import { BrowserRouter, Routes, Route, Navigate } from 'react-router-dom';
 import { AuthProvider, useAuth, AuthGuard } from './contexts/AuthContext';
 import { ErrorBoundary } from './components/ErrorBoundary';
@@ -9,12 +10,40 @@ import InvoiceDetail from './pages/InvoiceDetail';
 import CustomersList from './pages/CustomersList';
 import Settings from './pages/Settings';
 import ReportsDashboard from './pages/ReportsDashboard';
+import { startNumberLeaseSync } from './lib/invoiceNumberLease';
+import { startCacheSync } from './lib/dataCache';
+import { startDraftQueue } from './lib/draftQueue';
+import { startPatientIndex } from './lib/patientSearch';
 
 /* ===========================================================
    Internal routing logic with proper redirects
    =========================================================== */
 function AppRoutes() {
-  const { user } = useAuth();
+  const { user, tenantId } = useAuth();
+
+  // Keep a block of offline invoice numbers leased while signed in
+  useEffect(() => {
+    if (!tenantId) return;
+    return startNumberLeaseSync();
+  }, [tenantId]);
+
+  // Delta-sync the offline caches (invoices, patients, services, VAT rates)
+  useEffect(() => {
+    if (!tenantId) return;
+    return startCacheSync(tenantId);
+  }, [tenantId]);
+
+  // Upload drafts saved offline, now and on every reconnect
+  useEffect(() => {
+    if (!tenantId) return;
+    return startDraftQueue();
+  }, [tenantId]);
+
+  // In-browser patient search index over the cached patients
+  useEffect(() => {
+    if (!tenantId) return;
+    return startPatientIndex(tenantId);
+  }, [tenantId]);
 
   // ✅ Routes (loading handled by AuthGuard on protected routes)
   return (
@@ -0,0 +1,108 @@
+import { useMemo, useRef } from 'react';
+import AsyncSelect from 'react-select/async';
+import { useAuth } from '../contexts/AuthContext';
+import { getRecentPatients, PatientOption, searchPatientOptions } from '../lib/patientOptions';
+
+interface AsyncPatientSelectProps {
+  inputId?: string;
+  value: PatientOption | null;
+  onChange: (patient: PatientOption | null) => void;
+}
+
+const SEARCH_DEBOUNCE_MS = 250;
+const MIN_QUERY_LENGTH = 2;
+
+export default function AsyncPatientSelect({ inputId, value, onChange }: AsyncPatientSelectProps) {
+  const { tenantId } = useAuth();
+  const inFlightRef = useRef<AbortController | null>(null);
+
+  // Shown before anything is typed; re-read when the selection changes
+  // (the parent records each chosen patient as recent)
+  const recentPatients = useMemo(
+    () => (tenantId ? getRecentPatients(tenantId) : []),
+    [tenantId, value]
+  );
+
+  // Debounced, server-side type-ahead. Each keystroke cancels the previous
+  // request so only the latest query reaches the database.
+  const loadOptions = async (inputValue: string): Promise<PatientOption[]> => {
+    inFlightRef.current?.abort();
+
+    const query = inputValue.trim();
+    if (query.length < MIN_QUERY_LENGTH) {
+      const needle = query.toLowerCase();
+      return recentPatients.filter((p) => p.name.toLowerCase().includes(needle));
+    }
+
+    const controller = new AbortController();
+    inFlightRef.current = controller;
+
+    await new Promise((resolve) => setTimeout(resolve, SEARCH_DEBOUNCE_MS));
+    if (controller.signal.aborted) return [];
+
+    try {
+      return await searchPatientOptions(query, controller.signal);
+    } catch (error: any) {
+      if (!controller.signal.aborted) {
+        console.error('[PATIENT_SEARCH_ERROR]', error);
+      }
+      return [];
+    }
+  };
+
+  return (
+    <AsyncSelect<PatientOption>
+      inputId={inputId}
+      isClearable
+      cacheOptions
+      defaultOptions={recentPatients}
+      loadOptions={loadOptions}
+      value={value}
+      onChange={(newValue) => onChange(newValue ?? null)}
+      getOptionValue={(patient) => patient.id}
+      getOptionLabel={(patient) => (patient.cell ? `${patient.name} - ${patient.cell}` : patient.name)}
+      placeholder="Type a name, cell or ID number..."
+      noOptionsMessage={({ inputValue }) =>
+        inputValue.trim().length < MIN_QUERY_LENGTH ? 'Type at least 2 characters' : 'No patients found'
+      }
+      loadingMessage={() => 'Searching...'}
+      styles={{
+        control: (base, state) => ({
+          ...base,
+          backgroundColor: '#ffffff',
+          borderColor: state.isFocused ? '#05984B' : '#d1d5db',
+          boxShadow: state.isFocused ? '0 0 0 2px rgba(5, 152, 75, 0.2)' : 'none',
+          '&:hover': {
+            borderColor: state.isFocused ? '#05984B' : '#d1d5db',
+          },
+          minHeight: '42px',
+        }),
+        input: (base) => ({
+          ...base,
+          color: '#111827',
+        }),
+        placeholder: (base) => ({
+          ...base,
+          color: '#6b7280',
+        }),
+        singleValue: (base) => ({
+          ...base,
+          color: '#111827',
+        }),
+        option: (base, state) => ({
+          ...base,
+          backgroundColor: state.isSelected
+            ? '#05984B'
+            : state.isFocused
+            ? '#f3f4f6'
+            : '#ffffff',
+          color: state.isSelected ? '#ffffff' : '#111827',
+          cursor: 'pointer',
+          '&:active': {
+            backgroundColor: '#059847',
+          },
+        }),
+      }}
+    />
+  );
+}
@@ -0,0 +1,33 @@
+import { useEffect, useState } from 'react';
+import { getLastSyncedAt, SyncTableName } from '../lib/deltaSync';
+
+interface CachedDataNoticeProps {
+  tenantId: string | null;
+  source: SyncTableName; // the cache the page is reading
+}
+
+// Shown while a page reads this device's caches instead of Supabase
+// (offline, or the backend circuit open): the data may be out of date
+export default function CachedDataNotice({ tenantId, source }: CachedDataNoticeProps) {
+  const [syncedAt, setSyncedAt] = useState<number | null>(null);
+
+  useEffect(() => {
+    if (!tenantId) return;
+    let cancelled = false;
+    getLastSyncedAt(source, tenantId).then((timestamp) => {
+      if (!cancelled) setSyncedAt(timestamp);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [source, tenantId]);
+
+  return (
+    <div className="bg-orange-50 border border-orange-200 rounded-md p-3">
+      <p className="text-sm text-orange-800">
+        Showing data saved on this device; it may be out of date.
+        {syncedAt && ` Last updated ${new Date(syncedAt).toLocaleString('en-ZA')}.`}
+      </p>
+    </div>
+  );
+}
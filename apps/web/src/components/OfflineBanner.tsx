@@ -1,7 +1,11 @@
 import { useState, useEffect } from 'react';
+import { useDraftQueue, retryDraft, discardDraft } from '../lib/draftQueue';
+import { useBackendHealth, probeBackend } from '../lib/backendHealth';
 
 export default function OfflineBanner() {
   const [isOnline, setIsOnline] = useState(navigator.onLine);
+  const queue = useDraftQueue();
+  const health = useBackendHealth();
 
   useEffect(() => {
     const handleOnline = () => setIsOnline(true);
@@ -16,29 +20,110 @@ export default function OfflineBanner() {
     };
   }, []);
 
-  if (isOnline) return null;
+  if (!isOnline) {
+    return (
+      <div className="bg-yellow-50 border-b border-yellow-200">
+        <div className="max-w-7xl mx-auto py-3 px-4 sm:px-6 lg:px-8">
+          <div className="flex items-center justify-center">
+            <svg
+              className="h-5 w-5 text-yellow-600 mr-2"
+              fill="none"
+              viewBox="0 0 24 24"
+              stroke="currentColor"
+            >
+              <path
+                strokeLinecap="round"
+                strokeLinejoin="round"
+                strokeWidth={2}
+                d="M12 9v2m0 4h.01m-6.938 4h13.856c1.54 0 2.502-1.667 1.732-3L13.732 4c-.77-1.333-2.694-1.333-3.464 0L3.34 16c-.77 1.333.192 3 1.732 3z"
+              />
+            </svg>
+            <p className="text-sm font-medium text-yellow-800">
+              You are currently offline. Changes will be saved locally and synced when you reconnect.
+              {queue.pending > 0 && ` ${queue.pending} draft${queue.pending === 1 ? '' : 's'} waiting to upload.`}
+            </p>
+          </div>
+        </div>
+      </div>
+    );
+  }
+
+  // Connected, but the backend keeps failing: the circuit is open and the
+  // app works from its caches until a probe succeeds
+  if (health.state !== 'closed') {
+    return (
+      <div className="bg-orange-50 border-b border-orange-200">
+        <div className="max-w-7xl mx-auto py-3 px-4 sm:px-6 lg:px-8">
+          <div className="flex items-center justify-center gap-3">
+            <p className="text-sm font-medium text-orange-800">
+              The server is not responding. Showing saved data; new invoices are kept on this device and uploaded when it recovers.
+              {queue.pending > 0 && ` ${queue.pending} draft${queue.pending === 1 ? '' : 's'} waiting to upload.`}
+              {health.state === 'half-open'
+                ? ' Checking...'
+                : health.retryAt && ` Retrying at ${new Date(health.retryAt).toLocaleTimeString('en-ZA')}.`}
+            </p>
+            <button
+              onClick={() => probeBackend()}
+              disabled={health.state === 'half-open'}
+              className="text-sm font-medium text-blue-600 hover:text-blue-800"
+            >
+              Retry now
+            </button>
+          </div>
+        </div>
+      </div>
+    );
+  }
+
+  // Online: report draft uploads, and drafts the server rejected
+  if (queue.pending === 0 && queue.conflicts.length === 0) return null;
 
   return (
-    <div className="bg-yellow-50 border-b border-yellow-200">
+    <div className="bg-blue-50 border-b border-blue-200">
       <div className="max-w-7xl mx-auto py-3 px-4 sm:px-6 lg:px-8">
-        <div className="flex items-center justify-center">
-          <svg
-            className="h-5 w-5 text-yellow-600 mr-2"
-            fill="none"
-            viewBox="0 0 24 24"
-            stroke="currentColor"
-          >
-            <path
-              strokeLinecap="round"
-              strokeLinejoin="round"
-              strokeWidth={2}
-              d="M12 9v2m0 4h.01m-6.938 4h13.856c1.54 0 2.502-1.667 1.732-3L13.732 4c-.77-1.333-2.694-1.333-3.464 0L3.34 16c-.77 1.333.192 3 1.732 3z"
-            />
-          </svg>
-          <p className="text-sm font-medium text-yellow-800">
-            You are currently offline. Changes will be saved locally and synced when you reconnect.
+        {queue.pending > 0 && (
+          <p className="text-sm font-medium text-blue-800 text-center">
+            {queue.uploading
+              ? `Uploading offline drafts... ${queue.uploaded} uploaded, ${queue.pending} remaining.`
+              : `${queue.pending} offline draft${queue.pending === 1 ? '' : 's'} waiting to upload.`}
+            {!queue.uploading && queue.nextRetryAt &&
+              ` Retrying at ${new Date(queue.nextRetryAt).toLocaleTimeString('en-ZA')}.`}
           </p>
-        </div>
+        )}
+
+        {queue.conflicts.length > 0 && (
+          <div className="mt-2">
+            <p className="text-sm font-medium text-red-800 text-center">
+              {queue.conflicts.length} offline draft{queue.conflicts.length === 1 ? '' : 's'} could not be uploaded:
+            </p>
+            <ul className="mt-1 space-y-1">
+              {queue.conflicts.map((conflict) => (
+                <li key={conflict.draft_id} className="flex items-center justify-center gap-3 text-sm text-red-700">
+                  <span>
+                    {conflict.invoice_number || 'Draft'}
+                    {conflict.customer_name && ` (${conflict.customer_name})`}: {conflict.error}
+                  </span>
+                  <button
+                    onClick={() => retryDraft(conflict.draft_id)}
+                    className="font-medium text-blue-600 hover:text-blue-800"
+                  >
+                    Retry
+                  </button>
+                  <button
+                    onClick={() => {
+                      if (confirm('Discard this offline draft? It cannot be recovered.')) {
+                        void discardDraft(conflict.draft_id);
+                      }
+                    }}
+                    className="font-medium text-gray-600 hover:text-gray-800"
+                  >
+                    Discard
+                  </button>
+                </li>
+              ))}
+            </ul>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,5 +1,6 @@
 import { useState, useEffect, FormEvent } from 'react';
 import { supabase } from '../lib/supabase';
+import { cacheCustomer } from '../lib/dataCache';
 import { useAuth } from '../contexts/AuthContext';
 
 interface PatientModalProps {
@@ -47,12 +48,9 @@ export default function PatientModal({ isOpen, onClose, onPatientCreated }: Pati
     const delayDebounce = setTimeout(async () => {
       setIsSearching(true);
       try {
+        // Trigram-indexed, ranked search scoped to the user's tenant (migration 011)
         const { data, error } = await supabase
-          .from('customers')
-          .select('id, first_name, last_name, cell, email, id_number, home_address, notes')
-          .eq('tenant_id', tenantId!)
-          .or(`first_name.ilike.%${searchQuery}%,last_name.ilike.%${searchQuery}%,cell.ilike.%${searchQuery}%`)
-          .limit(10);
+          .rpc('search_patients', { q: searchQuery, result_limit: 10, active_only: false });
 
         if (error) throw error;
         setSearchResults(data || []);
@@ -143,12 +141,13 @@ export default function PatientModal({ isOpen, onClose, onPatientCreated }: Pati
           home_address: formData.home_address.trim() || null,
           notes: formData.notes.trim() || null,
         })
-        .select('id')
+        .select()
         .single();
 
       if (error) throw error;
 
       console.log('[PATIENT_CREATED]', data.id);
+      await cacheCustomer(data); // parents look the new patient up by id
 
       // Notify parent component
       onPatientCreated(data.id);
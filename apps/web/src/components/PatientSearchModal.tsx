@@ -1,5 +1,8 @@
 import { useState, useEffect } from 'react';
 import { supabase, Customer } from '../lib/supabase';
+import { getCustomer } from '../lib/dataCache';
+import { cacheCustomers, isOnline } from '../lib/db';
+import { searchLocalPatients } from '../lib/patientSearch';
 import { useAuth } from '../contexts/AuthContext';
 import PatientModal from './PatientModal';
 
@@ -16,35 +19,64 @@ export default function PatientSearchModal({ isOpen, onClose, onPatientSelected
   const [isSearching, setIsSearching] = useState(false);
   const [isPatientModalOpen, setIsPatientModalOpen] = useState(false);
 
-  // Debounced patient search (300ms)
+  // Local matches on every keystroke, from the in-browser index; the server
+  // (300ms debounce) confirms and extends them when online
   useEffect(() => {
     if (!isOpen || searchQuery.length < 2) {
       setSearchResults([]);
       return;
     }
 
+    let cancelled = false;
+    const controller = new AbortController();
+    let local: Customer[] = [];
+
+    searchLocalPatients(searchQuery, 10).then((patients) => {
+      if (cancelled || !patients) return;
+      local = patients;
+      setSearchResults(patients);
+      if (patients.length > 0) setIsSearching(false);
+    });
+
+    if (!isOnline()) return () => {
+      cancelled = true;
+    };
+
+    setIsSearching(true);
     const delayDebounce = setTimeout(async () => {
-      setIsSearching(true);
       try {
+        // Trigram-indexed, ranked search scoped to the user's tenant (migration 011)
         const { data, error } = await supabase
-          .from('customers')
-          .select('*')
-          .eq('tenant_id', tenantId!)
-          .eq('is_active', true)
-          .or(`first_name.ilike.%${searchQuery}%,last_name.ilike.%${searchQuery}%,cell.ilike.%${searchQuery}%`)
-          .limit(10);
+          .rpc('search_patients', { q: searchQuery, result_limit: 10 })
+          .abortSignal(controller.signal);
 
         if (error) throw error;
-        setSearchResults(data || []);
-      } catch (error) {
+        const remote = (data || []) as Customer[];
+        // Into the cache, and from there into the local index
+        await cacheCustomers(remote);
+        if (cancelled) return;
+
+        // Local ranking first (with the server's copy of each row), then
+        // patients this device had not cached
+        const fresh = new Map(remote.map((patient) => [patient.id, patient]));
+        const merged = local.map((patient) => fresh.get(patient.id) ?? patient);
+        remote.forEach((patient) => {
+          if (!merged.some((p) => p.id === patient.id)) merged.push(patient);
+        });
+        setSearchResults(merged.slice(0, 10));
+      } catch (error: any) {
+        if (cancelled || error?.name === 'AbortError') return;
         console.error('[PATIENT_SEARCH_ERROR]', error);
-        setSearchResults([]);
       } finally {
-        setIsSearching(false);
+        if (!cancelled) setIsSearching(false);
       }
     }, 300); // 300ms debounce
 
-    return () => clearTimeout(delayDebounce);
+    return () => {
+      cancelled = true;
+      clearTimeout(delayDebounce);
+      controller.abort();
+    };
   }, [searchQuery, isOpen, tenantId]);
 
   const handleSelectPatient = (patient: Customer) => {
@@ -53,12 +85,8 @@ export default function PatientSearchModal({ isOpen, onClose, onPatientSelected
   };
 
   const handlePatientCreated = async (patientId: string) => {
-    // Fetch the newly created patient
-    const { data } = await supabase
-      .from('customers')
-      .select('*')
-      .eq('id', patientId)
-      .single();
+    // PatientModal has already cached the new patient
+    const data = await getCustomer(patientId);
 
     if (data) {
       onPatientSelected(data as Customer);
@@ -105,11 +133,11 @@ export default function PatientSearchModal({ isOpen, onClose, onPatientSelected
             </div>
 
             {/* Search Results */}
-            {isSearching && (
+            {isSearching && searchResults.length === 0 && (
               <div className="mt-3 text-center text-sm text-gray-500">Searching...</div>
             )}
 
-            {!isSearching && searchResults.length > 0 && (
+            {searchResults.length > 0 && (
               <div className="mt-3 border border-gray-200 rounded-md max-h-96 overflow-y-auto">
                 {searchResults.map((patient) => (
                   <button
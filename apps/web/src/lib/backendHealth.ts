@@ -0,0 +1,120 @@
+import { useEffect, useState } from 'react';
+
+// Circuit breaker for the Supabase backend.
+// Every Supabase request passes through the global fetch in lib/supabase.ts,
+// which asks allowRequest() first and reports the outcome. After
+// FAILURE_THRESHOLD consecutive failures (timeouts, network errors, 5xx)
+// the circuit opens: requests fail at once instead of each waiting out its
+// timeout, and isOnline() (lib/db.ts) reports false, so screens read from
+// the Dexie caches and new invoices are queued as offline drafts. When the
+// cool-down ends a single probe is let through (half-open); success closes
+// the circuit, failure reopens it for twice as long, up to OPEN_MAX_MS.
+
+export type CircuitState = 'closed' | 'open' | 'half-open';
+
+export interface BackendHealth {
+  state: CircuitState;
+  failures: number; // consecutive
+  retryAt: number | null; // epoch ms when the next probe is allowed
+  lastError: string | null;
+}
+
+const FAILURE_THRESHOLD = 3;
+const OPEN_BASE_MS = 5000;
+const OPEN_MAX_MS = 60 * 1000;
+
+let health: BackendHealth = { state: 'closed', failures: 0, retryAt: null, lastError: null };
+let openFor = OPEN_BASE_MS;
+let probe: (() => Promise<unknown>) | null = null;
+let probeTimer: number | undefined;
+const listeners = new Set<(health: BackendHealth) => void>();
+const recoveredListeners = new Set<() => void>();
+
+function setHealth(update: Partial<BackendHealth>) {
+  const wasClosed = health.state === 'closed';
+  health = { ...health, ...update };
+  listeners.forEach((listener) => listener(health));
+  if (!wasClosed && health.state === 'closed') recoveredListeners.forEach((listener) => listener());
+}
+
+function open(error: string) {
+  const retryAt = Date.now() + openFor;
+  console.warn('[CIRCUIT_OPEN]', `retry in ${openFor}ms`, error);
+  setHealth({ state: 'open', retryAt, lastError: error });
+  openFor = Math.min(openFor * 2, OPEN_MAX_MS);
+
+  // Probe on schedule, so the circuit closes without waiting for a user action
+  window.clearTimeout(probeTimer);
+  probeTimer = window.setTimeout(() => void probeBackend(), retryAt - Date.now());
+}
+
+export function getBackendHealth(): BackendHealth {
+  return health;
+}
+
+// True while requests go through normally
+export function isBackendAvailable(): boolean {
+  return health.state === 'closed';
+}
+
+// 'probe' lets one request through to test a backend that was failing
+export function allowRequest(): 'allow' | 'probe' | 'reject' {
+  if (health.state === 'closed') return 'allow';
+  if (health.state === 'open' && Date.now() >= (health.retryAt ?? 0)) {
+    setHealth({ state: 'half-open' });
+    return 'probe';
+  }
+  return 'reject';
+}
+
+export function recordSuccess(): void {
+  if (health.state !== 'closed') console.info('[CIRCUIT_CLOSED]');
+  openFor = OPEN_BASE_MS;
+  window.clearTimeout(probeTimer);
+  setHealth({ state: 'closed', failures: 0, retryAt: null, lastError: null });
+}
+
+export function recordFailure(error: string): void {
+  const failures = health.failures + 1;
+  if (health.state === 'half-open' || (health.state === 'closed' && failures >= FAILURE_THRESHOLD)) {
+    health = { ...health, failures };
+    open(error);
+  } else {
+    setHealth({ failures, lastError: error });
+  }
+}
+
+// A probe cancelled by its caller proved nothing: let the next request probe
+export function abandonProbe(): void {
+  if (health.state === 'half-open') setHealth({ state: 'open', retryAt: Date.now() });
+}
+
+// The request used to probe the backend (registered by lib/supabase.ts)
+export function setHealthProbe(request: () => Promise<unknown>): void {
+  probe = request;
+}
+
+// Try the backend now, e.g. from a "Retry" button
+export async function probeBackend(): Promise<void> {
+  if (health.state === 'closed' || !probe) return;
+  if (health.state === 'open') setHealth({ retryAt: Date.now() });
+  await probe().catch(() => {});
+}
+
+// Run `listener` each time the circuit closes again
+export function onBackendRecovered(listener: () => void): () => void {
+  recoveredListeners.add(listener);
+  return () => recoveredListeners.delete(listener);
+}
+
+export function useBackendHealth(): BackendHealth {
+  const [current, setCurrent] = useState(health);
+  useEffect(() => {
+    listeners.add(setCurrent);
+    setCurrent(health);
+    return () => {
+      listeners.delete(setCurrent);
+    };
+  }, []);
+  return current;
+}
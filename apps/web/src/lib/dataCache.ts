@@ -0,0 +1,212 @@
+import { useEffect, useState } from 'react';
+import type { Table } from 'dexie';
+import { supabase, Customer, Service, VATRate } from './supabase';
+import { db, getLastSync, isOnline } from './db';
+import { syncTable, syncTombstones } from './deltaSync';
+import { safeQuery } from './safeQuery';
+import { onBackendRecovered } from './backendHealth';
+
+// Stale-while-revalidate cache for tenant reference data.
+// Services and VAT rates are served from IndexedDB as soon as a page mounts
+// and refreshed in the background when older than REFERENCE_MAX_AGE_MS, so
+// opening a form a second time makes no blocking network call. Only the
+// first load on a device (nothing cached yet) waits for the network.
+// Revalidation is a delta sync (lib/deltaSync.ts): only rows changed since
+// the last one are fetched. startCacheSync() also keeps the invoice and
+// patient caches current, so patients looked up by id are usually local.
+
+const REFERENCE_MAX_AGE_MS = 5 * 60 * 1000;
+const CACHE_SYNC_INTERVAL_MS = 60 * 1000;
+
+export interface ReferenceData {
+  services: Service;
+  vat_rates: VATRate;
+}
+
+export type ReferenceResource = keyof ReferenceData;
+
+const REFERENCE_TABLES: Record<ReferenceResource, () => Table<any, string>> = {
+  services: () => db.cachedServices,
+  vat_rates: () => db.cachedVatRates,
+};
+
+const REFERENCE_ORDER: { [R in ReferenceResource]: (a: ReferenceData[R], b: ReferenceData[R]) => number } = {
+  services: (a, b) => a.name.localeCompare(b.name),
+  vat_rates: (a, b) => a.rate - b.rate,
+};
+
+const inFlight = new Map<string, Promise<void>>();
+const listeners = new Map<string, Set<() => void>>();
+
+function cacheKey(resource: ReferenceResource, tenantId: string): string {
+  return `${resource}:${tenantId}`;
+}
+
+function subscribe(key: string, listener: () => void): () => void {
+  if (!listeners.has(key)) listeners.set(key, new Set());
+  listeners.get(key)!.add(listener);
+  return () => listeners.get(key)?.delete(listener);
+}
+
+function notify(key: string) {
+  listeners.get(key)?.forEach((listener) => listener());
+}
+
+export async function readReferenceData<R extends ReferenceResource>(
+  resource: R,
+  tenantId: string
+): Promise<ReferenceData[R][]> {
+  const rows: ReferenceData[R][] = await REFERENCE_TABLES[resource]()
+    .where('tenant_id')
+    .equals(tenantId)
+    .toArray();
+  return rows.sort(REFERENCE_ORDER[resource]);
+}
+
+// Pull the tenant's changed rows; concurrent calls share one request
+export function revalidateReferenceData(resource: ReferenceResource, tenantId: string): Promise<void> {
+  const key = cacheKey(resource, tenantId);
+  const running = inFlight.get(key);
+  if (running) return running;
+
+  const request = (async () => {
+    try {
+      await syncTable(resource, tenantId);
+      await db.lastSync.put({ key, timestamp: Date.now() });
+      notify(key);
+    } catch (error) {
+      console.error('[DATA_CACHE_REVALIDATE_ERROR]', resource, error);
+    }
+  })().finally(() => inFlight.delete(key));
+
+  inFlight.set(key, request);
+  return request;
+}
+
+// Call after writing services or VAT rates: the next read refetches
+export async function invalidateReferenceData(resource: ReferenceResource, tenantId: string): Promise<void> {
+  await db.lastSync.delete(cacheKey(resource, tenantId));
+  await revalidateReferenceData(resource, tenantId);
+}
+
+// Cached rows for the tenant, kept current in the background. `loading` is
+// only true while a device with an empty cache waits for its first fetch;
+// `stale` while the rows are older than REFERENCE_MAX_AGE_MS, i.e. being
+// revalidated or, offline or with the backend circuit open, unable to be.
+export function useReferenceData<R extends ReferenceResource>(resource: R, tenantId: string | null) {
+  const [data, setData] = useState<ReferenceData[R][]>([]);
+  const [loading, setLoading] = useState(true);
+  const [stale, setStale] = useState(false);
+
+  useEffect(() => {
+    if (!tenantId) return;
+    const key = cacheKey(resource, tenantId);
+    let cancelled = false;
+
+    const load = async () => {
+      const rows = await readReferenceData(resource, tenantId);
+      if (cancelled) return;
+      setData(rows);
+      const lastSync = await getLastSync(key);
+      if (!cancelled) setStale(lastSync === null || Date.now() - lastSync > REFERENCE_MAX_AGE_MS);
+    };
+
+    const revalidateIfStale = async () => {
+      if (!isOnline()) return;
+      const lastSync = await getLastSync(key);
+      if (lastSync === null) {
+        await revalidateReferenceData(resource, tenantId);
+      } else if (Date.now() - lastSync > REFERENCE_MAX_AGE_MS) {
+        void revalidateReferenceData(resource, tenantId);
+      }
+    };
+
+    const unsubscribe = subscribe(key, load);
+    load()
+      .then(revalidateIfStale)
+      .catch((error) => console.error('[DATA_CACHE_READ_ERROR]', resource, error))
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+
+    const onOnline = () => void revalidateIfStale();
+    window.addEventListener('online', onOnline);
+    const stopRecovered = onBackendRecovered(onOnline);
+    return () => {
+      cancelled = true;
+      unsubscribe();
+      window.removeEventListener('online', onOnline);
+      stopRecovered();
+    };
+  }, [resource, tenantId]);
+
+  return { data, loading, stale };
+}
+
+// Keep every cache current while signed in: now, every minute while the tab
+// is visible, and on reconnect or backend recovery
+export function startCacheSync(tenantId: string): () => void {
+  let running = false;
+
+  const sync = async () => {
+    if (running || !isOnline() || document.visibilityState === 'hidden') return;
+    running = true;
+    try {
+      await Promise.all([
+        syncTable('invoices', tenantId),
+        syncTable('customers', tenantId),
+        revalidateReferenceData('services', tenantId),
+        revalidateReferenceData('vat_rates', tenantId),
+      ]);
+      if (await syncTombstones(tenantId)) {
+        notify(cacheKey('services', tenantId));
+        notify(cacheKey('vat_rates', tenantId));
+      }
+    } catch (error) {
+      console.error('[CACHE_SYNC_ERROR]', error);
+    } finally {
+      running = false;
+    }
+  };
+
+  void sync();
+  const timer = window.setInterval(sync, CACHE_SYNC_INTERVAL_MS);
+  window.addEventListener('online', sync);
+  document.addEventListener('visibilitychange', sync);
+  const stopRecovered = onBackendRecovered(sync);
+  return () => {
+    window.clearInterval(timer);
+    window.removeEventListener('online', sync);
+    document.removeEventListener('visibilitychange', sync);
+    stopRecovered();
+  };
+}
+
+// Write-through for patients created or edited on this device
+export async function cacheCustomer(customer: Customer): Promise<void> {
+  await db.cachedCustomers.put(customer);
+}
+
+async function fetchCustomer(patientId: string): Promise<Customer | null> {
+  const { data, error } = await safeQuery<Customer>(
+    (signal) => supabase.from('customers').select('*').eq('id', patientId).abortSignal(signal).single(),
+    { key: ['customer', patientId] }
+  );
+
+  if (error) {
+    console.error('[PATIENT_FETCH_ERROR]', error);
+    return null;
+  }
+  await cacheCustomer(data!);
+  return data;
+}
+
+// A patient by id: from the cache if this device has seen it (refreshed in
+// the background), otherwise from the server
+export async function getCustomer(patientId: string): Promise<Customer | null> {
+  const cached = await db.cachedCustomers.get(patientId);
+  if (!cached) return fetchCustomer(patientId);
+
+  if (isOnline()) void fetchCustomer(patientId);
+  return cached;
+}
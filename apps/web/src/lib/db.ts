@@ -1,7 +1,13 @@
 import Dexie, { type Table } from 'dexie';
-import type { Invoice, Customer, Service } from './supabase';
+import type { Invoice, InvoiceItem, InvoiceWithDetails, Customer, Service, VATRate } from './supabase';
+import { isBackendAvailable } from './backendHealth';
 
 // Offline draft invoice types
+
+// Upload state (lib/draftQueue.ts). A string, not a boolean: IndexedDB
+// cannot index booleans, so where('synced').equals(...) never matched.
+export type DraftSyncState = 'pending' | 'uploading' | 'conflict';
+
 export interface DraftInvoice {
   id: string; // UUID v4
   customer_id: string;
@@ -10,9 +16,13 @@ export interface DraftInvoice {
   due_date: string | null;
   notes: string | null;
   terms: string | null;
+  invoice_number?: string | null; // PRO- number issued offline from a lease
   created_at: string;
   updated_at: string;
-  synced: boolean; // false until uploaded to Supabase
+  sync_state: DraftSyncState; // drafts are deleted once uploaded
+  attempts?: number; // failed upload attempts, for backoff
+  next_attempt_at?: number; // epoch ms; not retried before this
+  last_error?: string | null; // server message for a conflict
 }
 
 export interface DraftInvoiceItem {
@@ -27,6 +37,25 @@ export interface DraftInvoiceItem {
   created_at: string;
 }
 
+// Offline invoice-number leases (migration 014, lib/invoiceNumberLease.ts)
+export interface NumberLease {
+  id: string; // lease_id from lease_invoice_numbers()
+  year: number;
+  first_number: number;
+  last_number: number;
+  next_number: number; // next number to issue; > last_number when exhausted
+  expires_at: string;
+  settling: boolean; // true while settle_invoice_number_lease() is in flight
+}
+
+export interface IssuedNumber {
+  invoice_number: string; // PRO-YYYY-NNNNN
+  lease_id: string;
+  number: number;
+  draft_invoice_id: string;
+  issued_at: string;
+}
+
 // Cached data for offline access
 export interface CachedInvoice extends Invoice {
   customer_name?: string;
@@ -42,10 +71,16 @@ export class InvoiceDB extends Dexie {
   cachedInvoices!: Table<CachedInvoice, string>;
   cachedCustomers!: Table<Customer, string>;
   cachedServices!: Table<Service, string>;
+  cachedVatRates!: Table<VATRate, string>;
+  cachedInvoiceItems!: Table<InvoiceItem, string>; // of invoices opened online
 
   // Metadata
   lastSync!: Table<{ key: string; timestamp: number }, string>;
 
+  // Offline invoice numbering
+  numberLeases!: Table<NumberLease, string>;
+  issuedNumbers!: Table<IssuedNumber, string>;
+
   constructor() {
     super('TebelaInvoicingDB');
 
@@ -57,6 +92,41 @@ export class InvoiceDB extends Dexie {
       cachedServices: 'id, code, name',
       lastSync: 'key',
     });
+
+    this.version(2).stores({
+      numberLeases: 'id, expires_at',
+      issuedNumbers: 'invoice_number, lease_id, draft_invoice_id',
+    });
+
+    // Reference data cache (lib/dataCache.ts), scoped by tenant
+    this.version(3).stores({
+      cachedCustomers: 'id, tenant_id, name',
+      cachedServices: 'id, tenant_id, code, name',
+      cachedVatRates: 'id, tenant_id',
+    });
+
+    // Delta sync (lib/deltaSync.ts) clears invoices per tenant
+    this.version(4).stores({
+      cachedInvoices: 'id, tenant_id, customer_id, status, created_at',
+    });
+
+    // Outbound draft queue: indexable sync state instead of a boolean
+    this.version(5)
+      .stores({
+        draftInvoices: 'id, customer_id, created_at, sync_state',
+      })
+      .upgrade((tx) =>
+        tx.table('draftInvoices').toCollection().modify((draft: any) => {
+          draft.sync_state = 'pending';
+          draft.attempts = 0;
+          delete draft.synced;
+        })
+      );
+
+    // Line items of viewed invoices, so InvoiceDetail can open them offline
+    this.version(6).stores({
+      cachedInvoiceItems: 'id, invoice_id',
+    });
   }
 }
 
@@ -88,7 +158,8 @@ export async function createDraftInvoice(
     terms: null,
     created_at: new Date().toISOString(),
     updated_at: new Date().toISOString(),
-    synced: false,
+    sync_state: 'pending',
+    attempts: 0,
   };
 
   await db.draftInvoices.add(draft);
@@ -130,14 +201,14 @@ export async function getDraftInvoiceWithItems(draftId: string) {
   return { ...draft, items };
 }
 
-// Get all unsynced drafts
+// Get all drafts not yet uploaded (pending, or held back by a conflict)
 export async function getUnsyncedDrafts(): Promise<DraftInvoice[]> {
-  return db.draftInvoices.where('synced').equals(0).toArray();
+  return db.draftInvoices.where('sync_state').anyOf('pending', 'uploading', 'conflict').toArray();
 }
 
-// Mark draft as synced
+// Uploaded: the invoice now lives on the server, so the draft goes
 export async function markDraftAsSynced(draftId: string): Promise<void> {
-  await db.draftInvoices.update(draftId, { synced: true });
+  await deleteDraft(draftId);
 }
 
 // Delete draft and its items
@@ -165,6 +236,36 @@ export async function getCachedInvoices(): Promise<CachedInvoice[]> {
   return db.cachedInvoices.orderBy('created_at').reverse().toArray();
 }
 
+// Cache an invoice's line items, replacing those cached before
+export async function cacheInvoiceItems(invoiceId: string, items: InvoiceItem[]): Promise<void> {
+  await db.transaction('rw', db.cachedInvoiceItems, async () => {
+    await db.cachedInvoiceItems.where('invoice_id').equals(invoiceId).delete();
+    await db.cachedInvoiceItems.bulkPut(items);
+  });
+}
+
+// A cached invoice with its patient and line items, for viewing offline.
+// invoice_items is empty if the invoice was never opened online.
+export async function getCachedInvoiceWithDetails(
+  invoiceId: string,
+  tenantId: string
+): Promise<InvoiceWithDetails | null> {
+  const invoice = await db.cachedInvoices.get(invoiceId);
+  if (!invoice || invoice.tenant_id !== tenantId) return null;
+
+  const [customer, items] = await Promise.all([
+    db.cachedCustomers.get(invoice.customer_id),
+    db.cachedInvoiceItems.where('invoice_id').equals(invoiceId).sortBy('line_order'),
+  ]);
+
+  const { customer_name, ...header } = invoice;
+  return {
+    ...header,
+    customer: customer ?? ({ id: invoice.customer_id, name: customer_name ?? '' } as Customer),
+    invoice_items: items,
+  };
+}
+
 // Cache customers
 export async function cacheCustomers(customers: Customer[]): Promise<void> {
   await db.cachedCustomers.bulkPut(customers);
@@ -196,9 +297,10 @@ export async function getLastSync(key: string): Promise<number | null> {
   return record?.timestamp ?? null;
 }
 
-// Check if online
+// Check if online: connected, and the backend is not failing (circuit
+// closed, lib/backendHealth.ts). When false, read the caches and queue writes.
 export function isOnline(): boolean {
-  return navigator.onLine;
+  return navigator.onLine && isBackendAvailable();
 }
 
 // Calculate line totals
@@ -0,0 +1,195 @@
+import type { Table } from 'dexie';
+import { supabase } from './supabase';
+import { db, getLastSync, updateLastSync } from './db';
+import { safeQuery } from './safeQuery';
+
+// Incremental sync of the Dexie caches (migration 017).
+// Each table keeps a watermark: the updated_at of the newest row applied,
+// and, separately, when it last synced successfully.
+// A sync asks only for rows with updated_at at or after the watermark (less
+// SYNC_OVERLAP_MS, to catch rows from transactions that committed late),
+// in (updated_at, id) pages, and applies them with bulkPut. Rows with
+// is_active = false are removed from the cache; hard deletes arrive through
+// sync_tombstones. With nothing changed a sync is one empty response per
+// table.
+// Without a watermark, or when the last successful sync is older than the
+// tombstone retention (deletes since may have been purged), the table is
+// pulled in full and rows the server no longer returns are dropped. A table
+// nobody edits keeps an old watermark and still syncs incrementally.
+
+export type SyncTableName = 'invoices' | 'customers' | 'services' | 'vat_rates';
+
+interface SyncTable {
+  cache: () => Table<any, string>;
+  select: string;
+  softDelete: boolean; // is_active = false means "gone" for the cache
+  toCached?: (row: any) => any;
+}
+
+// Keep in step with the trg_sync_tombstones triggers in migration 017
+const SYNC_TABLES: Record<SyncTableName, SyncTable> = {
+  invoices: {
+    cache: () => db.cachedInvoices,
+    select: '*, customer:customers(name)',
+    softDelete: false,
+    toCached: ({ customer, ...invoice }) => ({ ...invoice, customer_name: customer?.name }),
+  },
+  customers: { cache: () => db.cachedCustomers, select: '*', softDelete: true },
+  services: { cache: () => db.cachedServices, select: '*', softDelete: true },
+  vat_rates: { cache: () => db.cachedVatRates, select: '*', softDelete: true },
+};
+
+export const SYNC_PAGE_SIZE = 500;
+const SYNC_OVERLAP_MS = 30 * 1000;
+const SYNC_HEDGE_AFTER_MS = 2000; // sync reads are idempotent, so a slow page may be hedged
+const TOMBSTONE_RETENTION_DAYS = 90; // purge_sync_tombstones() default, migration 017
+const RETENTION_MS = TOMBSTONE_RETENTION_DAYS * 24 * 60 * 60 * 1000;
+
+interface SyncCursor {
+  updated_at: string;
+  id: string;
+}
+
+function watermarkKey(name: string, tenantId: string): string {
+  return `watermark:${name}:${tenantId}`;
+}
+
+function syncedKey(name: string, tenantId: string): string {
+  return `synced:${name}:${tenantId}`;
+}
+
+// When a table last synced successfully (epoch ms), e.g. for "last updated"
+export function getLastSyncedAt(name: SyncTableName, tenantId: string): Promise<number | null> {
+  return getLastSync(syncedKey(name, tenantId));
+}
+
+// True when tombstones may have been purged since the last successful sync
+async function syncExpired(name: string, tenantId: string): Promise<boolean> {
+  const synced = await getLastSync(syncedKey(name, tenantId));
+  return synced === null || Date.now() - synced > RETENTION_MS;
+}
+
+// Rows after `cursor` in (updated_at, id) order; the first page of an
+// incremental sync starts at `since` instead. Keyed, so two syncs of the same
+// table (a StrictMode double mount, a reconnect during the interval sync)
+// share each page request.
+async function fetchPage(name: SyncTableName, tenantId: string, since: string | null, cursor: SyncCursor | null) {
+  const { data, error } = await safeQuery<any[]>((signal) => {
+    let query = supabase
+      .from(name)
+      .select(SYNC_TABLES[name].select)
+      .eq('tenant_id', tenantId)
+      .order('updated_at')
+      .order('id')
+      .limit(SYNC_PAGE_SIZE)
+      .abortSignal(signal);
+
+    if (cursor) {
+      query = query.or(
+        `updated_at.gt."${cursor.updated_at}",and(updated_at.eq."${cursor.updated_at}",id.gt.${cursor.id})`
+      );
+    } else if (since) {
+      query = query.gte('updated_at', since);
+    }
+    return query;
+  }, { key: ['sync', name, tenantId, since, cursor], hedgeAfterMs: SYNC_HEDGE_AFTER_MS });
+
+  if (error) throw error;
+  return (data || []) as any[];
+}
+
+// Pull one table's changes into its cache; returns the number of rows applied
+export async function syncTable(name: SyncTableName, tenantId: string): Promise<number> {
+  const spec = SYNC_TABLES[name];
+  const cache = spec.cache();
+  const key = watermarkKey(name, tenantId);
+
+  const watermark = await getLastSync(key);
+  const full = watermark === null || (await syncExpired(name, tenantId));
+  const since = full ? null : new Date(watermark - SYNC_OVERLAP_MS).toISOString();
+  const seen = full ? new Set<string>() : null;
+
+  let cursor: SyncCursor | null = null;
+  let applied = 0;
+
+  for (;;) {
+    const rows = await fetchPage(name, tenantId, since, cursor);
+    if (rows.length === 0) break;
+
+    const gone = spec.softDelete ? rows.filter((row) => row.is_active === false) : [];
+    const kept = spec.softDelete ? rows.filter((row) => row.is_active !== false) : rows;
+    const last = rows[rows.length - 1];
+
+    await db.transaction('rw', cache, db.lastSync, async () => {
+      await cache.bulkPut(spec.toCached ? kept.map(spec.toCached) : kept);
+      await cache.bulkDelete(gone.map((row) => row.id));
+      await db.lastSync.put({ key, timestamp: Date.parse(last.updated_at) });
+    });
+
+    kept.forEach((row) => seen?.add(row.id));
+    applied += rows.length;
+    cursor = { updated_at: last.updated_at, id: last.id };
+    if (rows.length < SYNC_PAGE_SIZE) break;
+  }
+
+  // Full pull: anything cached that the server did not return is gone
+  if (seen) {
+    const stale = (await cache.where('tenant_id').equals(tenantId).primaryKeys())
+      .filter((id) => !seen.has(id as string));
+    await cache.bulkDelete(stale as string[]);
+  }
+
+  await updateLastSync(syncedKey(name, tenantId));
+  return applied;
+}
+
+// Replay hard deletes since the tombstone watermark
+export async function syncTombstones(tenantId: string): Promise<number> {
+  const key = watermarkKey('tombstones', tenantId);
+  const watermark = await getLastSync(key);
+
+  // Never synced, or not within the retention: the tables were pulled in
+  // full (same expiry), so no tombstones from before now are needed
+  if (watermark === null || (await syncExpired('tombstones', tenantId))) {
+    await updateLastSync(key);
+    await updateLastSync(syncedKey('tombstones', tenantId));
+    return 0;
+  }
+
+  let since = new Date(watermark - SYNC_OVERLAP_MS).toISOString();
+  let afterId = 0;
+  let applied = 0;
+
+  for (;;) {
+    const { data, error } = await safeQuery<any[]>((signal) => supabase
+      .from('sync_tombstones')
+      .select('id, table_name, row_id, deleted_at')
+      .eq('tenant_id', tenantId)
+      .or(`deleted_at.gt."${since}",and(deleted_at.eq."${since}",id.gt.${afterId})`)
+      .order('deleted_at')
+      .order('id')
+      .limit(SYNC_PAGE_SIZE)
+      .abortSignal(signal),
+    { key: ['sync', 'sync_tombstones', tenantId, since, afterId], hedgeAfterMs: SYNC_HEDGE_AFTER_MS });
+    if (error) throw error;
+
+    const rows = data || [];
+    if (rows.length === 0) break;
+
+    for (const name of Object.keys(SYNC_TABLES) as SyncTableName[]) {
+      const ids = rows.filter((row) => row.table_name === name).map((row) => row.row_id);
+      if (ids.length) await SYNC_TABLES[name].cache().bulkDelete(ids);
+      if (ids.length && name === 'invoices') await db.cachedInvoiceItems.where('invoice_id').anyOf(ids).delete();
+    }
+
+    const last = rows[rows.length - 1];
+    await db.lastSync.put({ key, timestamp: Date.parse(last.deleted_at) });
+    applied += rows.length;
+    since = last.deleted_at;
+    afterId = last.id;
+    if (rows.length < SYNC_PAGE_SIZE) break;
+  }
+
+  await updateLastSync(syncedKey('tombstones', tenantId));
+  return applied;
+}
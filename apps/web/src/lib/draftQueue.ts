@@ -0,0 +1,260 @@
+import { useEffect, useState } from 'react';
+import { supabase } from './supabase';
+import { db, addDraftLineItem, createDraftInvoice, deleteDraft, DraftInvoice, DraftInvoiceItem, isOnline } from './db';
+import { issueOfflineNumber } from './invoiceNumberLease';
+import { onBackendRecovered } from './backendHealth';
+
+// Outbound queue for drafts written offline (migration 018).
+// Pending drafts are uploaded with their items, DRAFT_BATCH_SIZE per
+// upload_draft_invoices() call, whenever the app is online. The draft's
+// own UUID is the idempotency key, so a batch that timed out can simply be
+// sent again. A failed call (network, server) backs the batch off
+// exponentially with jitter; a draft the server rejects (unknown patient,
+// number not leased) is held as a conflict and shown in the OfflineBanner
+// until it is retried or discarded. Uploaded drafts are deleted; the
+// invoice reaches the local cache through delta sync.
+
+const DRAFT_BATCH_SIZE = 10;
+const BACKOFF_BASE_MS = 2000;
+const BACKOFF_MAX_MS = 5 * 60 * 1000;
+
+interface UploadResult {
+  draft_id: string;
+  status: 'created' | 'duplicate' | 'conflict';
+  invoice_id: string | null;
+  invoice_number: string | null;
+  error: string | null;
+}
+
+export interface DraftConflict {
+  draft_id: string;
+  customer_name?: string;
+  invoice_number?: string | null;
+  error: string;
+}
+
+export interface DraftQueueStatus {
+  pending: number; // waiting to upload (including backed-off drafts)
+  uploaded: number; // uploaded in the current drain
+  conflicts: DraftConflict[];
+  uploading: boolean;
+  nextRetryAt: number | null; // epoch ms of the next backed-off attempt
+}
+
+let status: DraftQueueStatus = { pending: 0, uploaded: 0, conflicts: [], uploading: false, nextRetryAt: null };
+const listeners = new Set<(status: DraftQueueStatus) => void>();
+let draining: Promise<void> | null = null;
+let retryTimer: number | undefined;
+
+function setStatus(update: Partial<DraftQueueStatus>) {
+  status = { ...status, ...update };
+  listeners.forEach((listener) => listener(status));
+}
+
+// Full jitter: a random delay up to the exponential cap, so terminals that
+// reconnect together don't retry in lockstep
+function backoffDelay(attempts: number): number {
+  return Math.random() * Math.min(BACKOFF_MAX_MS, BACKOFF_BASE_MS * 2 ** attempts);
+}
+
+async function refreshStatus() {
+  const [pending, conflicts, next] = await Promise.all([
+    db.draftInvoices.where('sync_state').anyOf('pending', 'uploading').count(),
+    db.draftInvoices.where('sync_state').equals('conflict').toArray(),
+    db.draftInvoices.where('sync_state').equals('pending')
+      .filter((draft) => (draft.next_attempt_at ?? 0) > Date.now())
+      .toArray(),
+  ]);
+  const nextRetryAt = next.length ? Math.min(...next.map((draft) => draft.next_attempt_at!)) : null;
+
+  setStatus({
+    pending,
+    nextRetryAt,
+    conflicts: conflicts.map((draft) => ({
+      draft_id: draft.id,
+      customer_name: draft.customer_name,
+      invoice_number: draft.invoice_number,
+      error: draft.last_error || 'Rejected by the server',
+    })),
+  });
+
+  window.clearTimeout(retryTimer);
+  if (nextRetryAt) {
+    retryTimer = window.setTimeout(() => void drainDraftQueue(), Math.max(nextRetryAt - Date.now(), 0));
+  }
+}
+
+// Next batch that is due, marked as uploading
+async function takeBatch(): Promise<DraftInvoice[]> {
+  return db.transaction('rw', db.draftInvoices, async () => {
+    const now = Date.now();
+    const due = await db.draftInvoices
+      .where('sync_state')
+      .equals('pending')
+      .filter((draft) => (draft.next_attempt_at ?? 0) <= now)
+      .limit(DRAFT_BATCH_SIZE)
+      .toArray();
+    await db.draftInvoices.where('id').anyOf(due.map((d) => d.id)).modify({ sync_state: 'uploading' });
+    return due;
+  });
+}
+
+async function uploadBatch(batch: DraftInvoice[]): Promise<UploadResult[]> {
+  const drafts = await Promise.all(
+    batch.map(async (draft) => {
+      const items = await db.draftInvoiceItems.where('draft_invoice_id').equals(draft.id).sortBy('line_order');
+      return {
+        id: draft.id,
+        customer_id: draft.customer_id,
+        invoice_date: draft.invoice_date,
+        due_date: draft.due_date,
+        notes: draft.notes,
+        terms: draft.terms,
+        invoice_number: draft.invoice_number ?? null,
+        items: items.map(({ line_order, service_id, description, quantity, unit_price, vat_rate }) => ({
+          line_order, service_id, description, quantity, unit_price, vat_rate,
+        })),
+      };
+    })
+  );
+
+  const { data, error } = await supabase.rpc('upload_draft_invoices', { drafts });
+  if (error) throw error;
+  return data as UploadResult[];
+}
+
+async function applyResults(results: UploadResult[]) {
+  for (const result of results) {
+    if (result.status === 'conflict') {
+      await db.draftInvoices.update(result.draft_id, { sync_state: 'conflict', last_error: result.error });
+      console.warn('[DRAFT_UPLOAD_CONFLICT]', result.draft_id, result.error);
+    } else {
+      await deleteDraft(result.draft_id);
+      console.log('[DRAFT_UPLOADED]', result.draft_id, result.invoice_number, result.status);
+    }
+  }
+}
+
+async function backOff(batch: DraftInvoice[], error: any) {
+  console.error('[DRAFT_UPLOAD_ERROR]', error);
+  await db.transaction('rw', db.draftInvoices, async () => {
+    for (const draft of batch) {
+      const attempts = (draft.attempts ?? 0) + 1;
+      await db.draftInvoices.update(draft.id, {
+        sync_state: 'pending',
+        attempts,
+        next_attempt_at: Date.now() + backoffDelay(attempts),
+      });
+    }
+  });
+}
+
+// Upload every due draft, batch by batch; concurrent calls share one drain
+export function drainDraftQueue(): Promise<void> {
+  if (draining) return draining;
+
+  draining = (async () => {
+    setStatus({ uploading: true, uploaded: 0 });
+    try {
+      while (isOnline()) {
+        const batch = await takeBatch();
+        if (batch.length === 0) break;
+
+        try {
+          const results = await uploadBatch(batch);
+          await applyResults(results);
+          setStatus({ uploaded: status.uploaded + results.filter((r) => r.status !== 'conflict').length });
+        } catch (error) {
+          await backOff(batch, error);
+        }
+        await refreshStatus();
+      }
+    } finally {
+      setStatus({ uploading: false });
+      await refreshStatus();
+      draining = null;
+    }
+  })();
+  return draining;
+}
+
+// Save an invoice as an offline draft, for upload once the backend can be
+// reached. It gets a PRO- number from this terminal's lease when one is
+// left, otherwise it uploads as an unnumbered Draft.
+export async function queueInvoiceDraft(invoice: {
+  customer_id: string;
+  customer_name?: string;
+  invoice_date: string;
+  due_date: string | null;
+  notes: string | null;
+  items: Omit<DraftInvoiceItem, 'id' | 'draft_invoice_id' | 'created_at'>[];
+}): Promise<{ draftId: string; invoiceNumber: string | null }> {
+  const draft = await createDraftInvoice(invoice.customer_id, invoice.customer_name);
+  await db.draftInvoices.update(draft.id, {
+    invoice_date: invoice.invoice_date,
+    due_date: invoice.due_date,
+    notes: invoice.notes,
+  });
+  for (const item of invoice.items) {
+    await addDraftLineItem(draft.id, item);
+  }
+
+  let invoiceNumber: string | null = null;
+  try {
+    invoiceNumber = await issueOfflineNumber(draft.id);
+  } catch (error) {
+    console.warn('[DRAFT_QUEUE_NO_NUMBER]', error);
+  }
+
+  await refreshStatus();
+  return { draftId: draft.id, invoiceNumber };
+}
+
+// Send a conflicting draft again (e.g. after fixing its patient), or drop it
+export async function retryDraft(draftId: string): Promise<void> {
+  await db.draftInvoices.update(draftId, { sync_state: 'pending', attempts: 0, next_attempt_at: 0, last_error: null });
+  await refreshStatus();
+  void drainDraftQueue();
+}
+
+// A discarded draft's number is dropped with it, so the next settle voids it
+// instead of reporting it as used
+export async function discardDraft(draftId: string): Promise<void> {
+  await db.transaction('rw', db.draftInvoices, db.draftInvoiceItems, db.issuedNumbers, async () => {
+    await db.issuedNumbers.where('draft_invoice_id').equals(draftId).delete();
+    await deleteDraft(draftId);
+  });
+  await refreshStatus();
+}
+
+// Drain now, on every reconnect and when the backend recovers. Drafts left
+// 'uploading' by a closed tab go back to pending: re-sending them is safe.
+export function startDraftQueue(): () => void {
+  const start = async () => {
+    await db.draftInvoices.where('sync_state').equals('uploading').modify({ sync_state: 'pending' });
+    await refreshStatus();
+    if (isOnline()) await drainDraftQueue();
+  };
+  void start();
+
+  const onOnline = () => void drainDraftQueue();
+  window.addEventListener('online', onOnline);
+  const stopRecovered = onBackendRecovered(onOnline);
+  return () => {
+    window.removeEventListener('online', onOnline);
+    stopRecovered();
+    window.clearTimeout(retryTimer);
+  };
+}
+
+export function useDraftQueue(): DraftQueueStatus {
+  const [current, setCurrent] = useState(status);
+  useEffect(() => {
+    listeners.add(setCurrent);
+    setCurrent(status);
+    return () => {
+      listeners.delete(setCurrent);
+    };
+  }, []);
+  return current;
+}
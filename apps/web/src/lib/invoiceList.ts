@@ -0,0 +1,127 @@
+import { supabase, InvoiceStatus } from './supabase';
+import { db, isOnline, CachedInvoice } from './db';
+
+// Keyset-paginated invoice list (migration 015, list_invoices RPC). Offline,
+// or with the backend circuit open, pages come from the delta-synced Dexie
+// invoice cache instead, filtered and ordered the same way.
+
+export const INVOICE_PAGE_SIZE = 50;
+
+// Only the columns InvoicesList renders
+export interface InvoiceListRow {
+  id: string;
+  invoice_number: string | null;
+  invoice_date: string;
+  status: InvoiceStatus;
+  total_amount: number;
+  payment_method: string | null;
+  created_at: string;
+  customer_id: string;
+  customer_name: string;
+}
+
+export interface InvoiceListFilters {
+  status?: InvoiceStatus | '';
+  dateFrom?: string;
+  dateTo?: string;
+  paymentMethod?: string;
+  customerId?: string;
+}
+
+// Position after the last row of a page; null for the first page
+export interface InvoiceListCursor {
+  createdAt: string;
+  id: string;
+}
+
+export interface InvoicePage {
+  rows: InvoiceListRow[];
+  nextCursor: InvoiceListCursor | null; // null when there are no more pages
+  cached: boolean; // read from this device's cache, so possibly out of date
+}
+
+function nextCursorAfter(rows: InvoiceListRow[], pageSize: number): InvoiceListCursor | null {
+  const last = rows[rows.length - 1];
+  return rows.length === pageSize && last ? { createdAt: last.created_at, id: last.id } : null;
+}
+
+export async function fetchInvoicePage(
+  tenantId: string,
+  filters: InvoiceListFilters,
+  cursor: InvoiceListCursor | null,
+  pageSize = INVOICE_PAGE_SIZE
+): Promise<InvoicePage> {
+  if (!isOnline()) return readCachedInvoicePage(tenantId, filters, cursor, pageSize);
+
+  const { data, error } = await supabase.rpc('list_invoices', {
+    p_status: filters.status || null,
+    p_date_from: filters.dateFrom || null,
+    p_date_to: filters.dateTo || null,
+    p_payment_method: filters.paymentMethod || null,
+    p_customer_id: filters.customerId || null,
+    p_after_created_at: cursor?.createdAt ?? null,
+    p_after_id: cursor?.id ?? null,
+    p_limit: pageSize,
+  });
+
+  if (error) {
+    // This failure opened the circuit: serve the page from the cache
+    if (!isOnline()) return readCachedInvoicePage(tenantId, filters, cursor, pageSize);
+    throw error;
+  }
+
+  const rows = (data || []) as InvoiceListRow[];
+  return { rows, nextCursor: nextCursorAfter(rows, pageSize), cached: false };
+}
+
+function matchesFilters(invoice: CachedInvoice, filters: InvoiceListFilters): boolean {
+  return (
+    (!filters.status || invoice.status === filters.status) &&
+    (!filters.dateFrom || invoice.invoice_date >= filters.dateFrom) &&
+    (!filters.dateTo || invoice.invoice_date <= filters.dateTo) &&
+    (!filters.paymentMethod || invoice.payment_method === filters.paymentMethod) &&
+    (!filters.customerId || invoice.customer_id === filters.customerId)
+  );
+}
+
+// (created_at, id) < cursor, as in list_invoices
+function isAfter(invoice: CachedInvoice, cursor: InvoiceListCursor | null): boolean {
+  if (!cursor) return true;
+  return invoice.created_at < cursor.createdAt || (invoice.created_at === cursor.createdAt && invoice.id < cursor.id);
+}
+
+function newestFirst(a: CachedInvoice, b: CachedInvoice): number {
+  if (a.created_at !== b.created_at) return a.created_at < b.created_at ? 1 : -1;
+  return a.id < b.id ? 1 : a.id > b.id ? -1 : 0;
+}
+
+// One page from the invoice cache (lib/deltaSync.ts)
+export async function readCachedInvoicePage(
+  tenantId: string,
+  filters: InvoiceListFilters,
+  cursor: InvoiceListCursor | null,
+  pageSize = INVOICE_PAGE_SIZE
+): Promise<InvoicePage> {
+  const invoices = await db.cachedInvoices
+    .where('tenant_id')
+    .equals(tenantId)
+    .filter((invoice) => matchesFilters(invoice, filters) && isAfter(invoice, cursor))
+    .toArray();
+
+  const rows = invoices
+    .sort(newestFirst)
+    .slice(0, pageSize)
+    .map((invoice): InvoiceListRow => ({
+      id: invoice.id,
+      invoice_number: invoice.invoice_number,
+      invoice_date: invoice.invoice_date,
+      status: invoice.status,
+      total_amount: invoice.total_amount,
+      payment_method: invoice.payment_method ?? null,
+      created_at: invoice.created_at,
+      customer_id: invoice.customer_id,
+      customer_name: invoice.customer_name ?? '',
+    }));
+
+  return { rows, nextCursor: nextCursorAfter(rows, pageSize), cached: true };
+}
@@ -0,0 +1,164 @@
+import { supabase } from './supabase';
+import { db, generateUUID, isOnline, NumberLease } from './db';
+import { onBackendRecovered } from './backendHealth';
+
+// Offline invoice numbering (migration 014).
+// While online, each terminal holds a block of PRO-YYYY-NNNNN numbers leased
+// from invoice_counters. ProformaOffline drafts take the next number from the
+// block in IndexedDB, with no network round trip. On reconnect every lease
+// with issued numbers is settled: used numbers are recorded as issued, unused
+// ones are returned to the counter or voided, so the server-side audit view
+// (vw_invoice_number_audit) can account for every number.
+
+const TERMINAL_ID_KEY = 'invoice_terminal_id';
+const LEASE_BLOCK_SIZE = 20;
+const LEASE_REFILL_BELOW = 5;
+
+// Keep in sync with format_offline_invoice_number() in migration 014
+export function formatOfflineNumber(year: number, n: number): string {
+  return `PRO-${year}-${String(n).padStart(5, '0')}`;
+}
+
+// Stable per-browser identifier, recorded on each lease for the audit trail
+export function getTerminalId(): string {
+  let terminalId = localStorage.getItem(TERMINAL_ID_KEY);
+  if (!terminalId) {
+    terminalId = generateUUID();
+    localStorage.setItem(TERMINAL_ID_KEY, terminalId);
+  }
+  return terminalId;
+}
+
+function isUsable(lease: NumberLease, now = new Date().toISOString()): boolean {
+  return !lease.settling && lease.expires_at > now && lease.next_number <= lease.last_number;
+}
+
+// Numbers this terminal can still issue offline
+export async function remainingOfflineNumbers(): Promise<number> {
+  const leases = await db.numberLeases.toArray();
+  return leases
+    .filter((lease) => isUsable(lease))
+    .reduce((sum, lease) => sum + (lease.last_number - lease.next_number + 1), 0);
+}
+
+// Top up the local block while online
+export async function ensureNumberLease(): Promise<void> {
+  if (!isOnline()) return;
+  if ((await remainingOfflineNumbers()) >= LEASE_REFILL_BELOW) return;
+
+  const { data, error } = await supabase.rpc('lease_invoice_numbers', {
+    p_terminal_id: getTerminalId(),
+    p_count: LEASE_BLOCK_SIZE,
+  });
+
+  if (error || !data) {
+    console.error('[NUMBER_LEASE_ERROR] Could not lease invoice numbers:', error);
+    return;
+  }
+
+  await db.numberLeases.put({
+    id: data.lease_id,
+    year: data.year,
+    first_number: data.first_number,
+    last_number: data.last_number,
+    next_number: data.first_number,
+    expires_at: data.expires_at,
+    settling: false,
+  });
+  console.log('[NUMBER_LEASE] Leased', data.first_number, '-', data.last_number, 'for', data.year);
+}
+
+// Issue the next leased number to an offline draft. Throws when the
+// terminal has no usable lease left.
+export async function issueOfflineNumber(draftId: string): Promise<string> {
+  return db.transaction('rw', db.numberLeases, db.issuedNumbers, db.draftInvoices, async () => {
+    const existing = await db.issuedNumbers.where('draft_invoice_id').equals(draftId).first();
+    if (existing) return existing.invoice_number;
+
+    const now = new Date().toISOString();
+    const leases = await db.numberLeases.orderBy('expires_at').toArray();
+    const lease = leases.find((l) => isUsable(l, now));
+    if (!lease) {
+      throw new Error('No offline invoice numbers left. Reconnect to lease more.');
+    }
+
+    const number = lease.next_number;
+    const invoiceNumber = formatOfflineNumber(lease.year, number);
+
+    await db.numberLeases.update(lease.id, { next_number: number + 1 });
+    await db.issuedNumbers.add({
+      invoice_number: invoiceNumber,
+      lease_id: lease.id,
+      number,
+      draft_invoice_id: draftId,
+      issued_at: now,
+    });
+    await db.draftInvoices.update(draftId, { invoice_number: invoiceNumber, updated_at: now });
+
+    return invoiceNumber;
+  });
+}
+
+// Report used numbers for leases that are spent, expired, or have issued
+// numbers, and drop them locally once the server has settled them.
+export async function settleNumberLeases(): Promise<void> {
+  if (!isOnline()) return;
+
+  const now = new Date().toISOString();
+  const leases = await db.numberLeases.toArray();
+
+  for (const { id } of leases) {
+    // Stop issuing from this lease and read what it issued in one
+    // transaction, so no number is issued between the read and the flag
+    const issued = await db.transaction('rw', db.numberLeases, db.issuedNumbers, async () => {
+      const lease = await db.numberLeases.get(id);
+      if (!lease || lease.settling) return null;
+
+      const issued = await db.issuedNumbers.where('lease_id').equals(id).toArray();
+      const spent = lease.next_number > lease.last_number || lease.expires_at <= now;
+      if (issued.length === 0 && !spent) return null;
+
+      await db.numberLeases.update(id, { settling: true });
+      return issued;
+    });
+    if (!issued) continue;
+
+    const { data, error } = await supabase.rpc('settle_invoice_number_lease', {
+      p_lease_id: id,
+      p_used: issued.map((n) => n.number),
+    });
+
+    if (error) {
+      console.error('[NUMBER_LEASE_SETTLE_ERROR]', id, error);
+      await db.numberLeases.update(id, { settling: false });
+      continue;
+    }
+
+    await db.transaction('rw', db.numberLeases, db.issuedNumbers, async () => {
+      await db.issuedNumbers.where('lease_id').equals(id).delete();
+      await db.numberLeases.delete(id);
+    });
+    console.log('[NUMBER_LEASE_SETTLED]', id, data);
+  }
+}
+
+// Settle and refill now (if online), on every reconnect and when the
+// backend recovers
+export function startNumberLeaseSync(): () => void {
+  const sync = async () => {
+    try {
+      await settleNumberLeases();
+      await ensureNumberLease();
+    } catch (error) {
+      console.error('[NUMBER_LEASE_SYNC_ERROR]', error);
+    }
+  };
+
+  if (isOnline()) void sync();
+  window.addEventListener('online', sync);
+  const stopRecovered = onBackendRecovered(sync);
+  return () => {
+    window.removeEventListener('online', sync);
+    stopRecovered();
+  };
+}
@@ -4,6 +4,10 @@ import { supabase } from './supabase';
  * Generates a unique invoice number in the format: INV-YYYYMMDD-###
  * where ### is a sequential number for that day
  *
+ * @deprecated Invoices are numbered server-side by the create_invoice RPC
+ * (migration 013), which allocates from invoice_counters without racing
+ * other terminals. Kept for callers that still number client-side.
+ *
  * @param tenantId - The tenant ID to scope the invoice numbering
  * @returns Promise<string> - The generated invoice number
  */
@@ -0,0 +1,58 @@
+import { supabase, Customer } from './supabase';
+import { getCustomer } from './dataCache';
+import { isOnline } from './db';
+import { searchLocalPatients } from './patientSearch';
+
+// The type-ahead patient search behind AsyncPatientSelect
+
+// Only what the picker renders
+export type PatientOption = Pick<Customer, 'id' | 'name' | 'cell'>;
+
+export const PATIENT_SEARCH_PAGE_SIZE = 20;
+const RECENT_PATIENTS_MAX = 8;
+
+// One page of ranked matches for what has been typed (search_patients,
+// migration 011), projected to the picker columns. Aborting `signal`
+// cancels the request. Offline, or with the backend circuit open, the
+// cached patients are searched instead (lib/patientSearch.ts).
+export async function searchPatientOptions(q: string, signal?: AbortSignal): Promise<PatientOption[]> {
+  if (!isOnline()) {
+    const patients = await searchLocalPatients(q, PATIENT_SEARCH_PAGE_SIZE);
+    return (patients || []).map(({ id, name, cell }) => ({ id, name, cell: cell ?? null }));
+  }
+
+  let query = supabase
+    .rpc('search_patients', { q, result_limit: PATIENT_SEARCH_PAGE_SIZE })
+    .select('id, name, cell');
+  if (signal) query = query.abortSignal(signal);
+
+  const { data, error } = await query;
+  if (error) throw error;
+  return (data || []) as PatientOption[];
+}
+
+// A single patient, e.g. one just created in PatientModal (cached on this
+// device, so usually no network round trip)
+export async function fetchPatientOption(patientId: string): Promise<PatientOption | null> {
+  const patient = await getCustomer(patientId);
+  return patient ? { id: patient.id, name: patient.name, cell: patient.cell ?? null } : null;
+}
+
+// Recently used patients, per tenant, shown before anything is typed
+function recentPatientsKey(tenantId: string): string {
+  return `recent_patients:${tenantId}`;
+}
+
+export function getRecentPatients(tenantId: string): PatientOption[] {
+  try {
+    return JSON.parse(localStorage.getItem(recentPatientsKey(tenantId)) || '[]');
+  } catch {
+    return [];
+  }
+}
+
+export function rememberRecentPatient(tenantId: string, patient: PatientOption): void {
+  const recent = getRecentPatients(tenantId).filter((p) => p.id !== patient.id);
+  recent.unshift({ id: patient.id, name: patient.name, cell: patient.cell ?? null });
+  localStorage.setItem(recentPatientsKey(tenantId), JSON.stringify(recent.slice(0, RECENT_PATIENTS_MAX)));
+}
@@ -0,0 +1,105 @@
+import type { Customer } from './supabase';
+import { db } from './db';
+
+// Instant patient search over the cached patient directory.
+// The index lives in a Web Worker (patientSearch.worker.ts), built from
+// db.cachedCustomers when startPatientIndex() runs at sign-in. Dexie hooks
+// on that table forward every committed write (delta sync, cacheCustomer)
+// to the worker, so the index follows the cache without rebuilding.
+// Only the newest search's results are delivered; replies to superseded
+// searches are dropped. The server (search_patients) is still asked, to
+// confirm and extend what the device has cached.
+
+export type PatientSearchRequest =
+  | { type: 'load'; tenantId: string }
+  | { type: 'upsert'; patients: Customer[] }
+  | { type: 'remove'; ids: string[] }
+  | { type: 'search'; id: number; query: string; limit: number };
+
+export interface PatientSearchResponse {
+  id: number;
+  patients: Customer[];
+  ms: number; // time spent searching in the worker
+}
+
+let worker: Worker | null = null;
+let lastSearchId = 0;
+const pending = new Map<number, (patients: Customer[] | null) => void>();
+
+// Writes are batched per tick: a delta-sync page becomes one message
+let upserts = new Map<string, Customer>();
+let removals = new Set<string>();
+let flushScheduled = false;
+
+function flush() {
+  flushScheduled = false;
+  if (!worker) return;
+  if (upserts.size) worker.postMessage({ type: 'upsert', patients: [...upserts.values()] } satisfies PatientSearchRequest);
+  if (removals.size) worker.postMessage({ type: 'remove', ids: [...removals] } satisfies PatientSearchRequest);
+  upserts = new Map();
+  removals = new Set();
+}
+
+function queue(change: () => void) {
+  if (!worker) return;
+  change();
+  if (!flushScheduled) {
+    flushScheduled = true;
+    queueMicrotask(flush);
+  }
+}
+
+db.cachedCustomers.hook('creating', function (_key, patient) {
+  this.onsuccess = () => queue(() => {
+    removals.delete(patient.id);
+    upserts.set(patient.id, patient);
+  });
+});
+
+db.cachedCustomers.hook('updating', function (_mods, _key, _patient) {
+  this.onsuccess = (updated: Customer) => queue(() => {
+    removals.delete(updated.id);
+    upserts.set(updated.id, updated);
+  });
+});
+
+db.cachedCustomers.hook('deleting', function (key) {
+  this.onsuccess = () => queue(() => {
+    upserts.delete(key);
+    removals.add(key);
+  });
+});
+
+// Build the index for the signed-in tenant; returns a stop function
+export function startPatientIndex(tenantId: string): () => void {
+  worker = new Worker(new URL('./patientSearch.worker.ts', import.meta.url), { type: 'module' });
+  worker.onmessage = (event: MessageEvent<PatientSearchResponse>) => {
+    const { id, patients, ms } = event.data;
+    if (ms > 16) console.warn('[PATIENT_INDEX_SLOW]', `${ms.toFixed(1)}ms`);
+    pending.get(id)?.(patients);
+    pending.delete(id);
+  };
+  worker.postMessage({ type: 'load', tenantId } satisfies PatientSearchRequest);
+
+  return () => {
+    worker?.terminate();
+    worker = null;
+    pending.forEach((resolve) => resolve(null));
+    pending.clear();
+  };
+}
+
+// Ranked local matches, or null when the index is not running or a newer
+// search has started since (the caller should ignore it)
+export function searchLocalPatients(query: string, limit: number): Promise<Customer[] | null> {
+  if (!worker) return Promise.resolve(null);
+
+  const id = ++lastSearchId;
+  pending.forEach((resolve) => resolve(null));
+  pending.clear();
+
+  return new Promise((resolve) => {
+    pending.set(id, resolve);
+    worker!.postMessage({ type: 'search', id, query, limit } satisfies PatientSearchRequest);
+  });
+}
@@ -0,0 +1,222 @@
+import type { Customer } from './supabase';
+import { db } from './db';
+import type { PatientSearchRequest, PatientSearchResponse } from './patientSearch';
+
+// Patient search index, kept off the main thread (lib/patientSearch.ts).
+// Names and ID numbers go in a prefix trie of words; cell numbers in a
+// trigram index over their digits, so any 3+ digits of a number match, as
+// in search_tenant_patients() (migration 011). Every query word must match
+// for a patient to be returned. Ranking follows the server: ID number
+// prefix first, then whole-word over prefix name matches, then name.
+
+interface TrieNode {
+  children: Map<string, TrieNode>;
+  ids: Set<string>; // patients with a word ending here
+}
+
+interface IndexedPatient {
+  patient: Customer;
+  words: string[];
+  grams: string[];
+}
+
+let tenantId: string | null = null;
+let root: TrieNode = newNode();
+const grams = new Map<string, Set<string>>();
+const patients = new Map<string, IndexedPatient>();
+
+function newNode(): TrieNode {
+  return { children: new Map(), ids: new Set() };
+}
+
+function normalize(text: string): string {
+  return text.toLowerCase().normalize('NFD').replace(/[\u0300-\u036f]/g, '');
+}
+
+function words(text: string): string[] {
+  return normalize(text).split(/[^a-z0-9]+/).filter(Boolean);
+}
+
+// Local (0821234567) and international (27821234567) forms of a cell number
+function cellDigits(cell: string): string[] {
+  const digits = cell.replace(/\D/g, '');
+  if (digits.startsWith('27')) return [digits, `0${digits.slice(2)}`];
+  if (digits.startsWith('0')) return [digits, `27${digits.slice(1)}`];
+  return digits ? [digits] : [];
+}
+
+function trigrams(digits: string): string[] {
+  const out: string[] = [];
+  for (let i = 0; i + 3 <= digits.length; i++) out.push(digits.slice(i, i + 3));
+  return out;
+}
+
+function addWord(word: string, id: string) {
+  let node = root;
+  for (const ch of word) {
+    let next = node.children.get(ch);
+    if (!next) {
+      next = newNode();
+      node.children.set(ch, next);
+    }
+    node = next;
+  }
+  node.ids.add(id);
+}
+
+function removeWord(word: string, id: string) {
+  const path: [TrieNode, string][] = [];
+  let node: TrieNode | undefined = root;
+  for (const ch of word) {
+    path.push([node, ch]);
+    node = node.children.get(ch);
+    if (!node) return;
+  }
+  node.ids.delete(id);
+
+  // Prune branches left empty
+  for (let i = path.length - 1; i >= 0; i--) {
+    const [parent, ch] = path[i];
+    const child = parent.children.get(ch)!;
+    if (child.ids.size > 0 || child.children.size > 0) break;
+    parent.children.delete(ch);
+  }
+}
+
+function findNode(prefix: string): TrieNode | null {
+  let node: TrieNode | undefined = root;
+  for (const ch of prefix) {
+    node = node.children.get(ch);
+    if (!node) return null;
+  }
+  return node;
+}
+
+function collect(node: TrieNode, into: Set<string>) {
+  node.ids.forEach((id) => into.add(id));
+  node.children.forEach((child) => collect(child, into));
+}
+
+function remove(id: string) {
+  const entry = patients.get(id);
+  if (!entry) return;
+  entry.words.forEach((word) => removeWord(word, id));
+  entry.grams.forEach((gram) => grams.get(gram)?.delete(id));
+  patients.delete(id);
+}
+
+function upsert(patient: Customer) {
+  remove(patient.id);
+  if (patient.tenant_id !== tenantId || patient.is_active === false) return;
+
+  const nameWords = new Set([
+    ...words(patient.name || ''),
+    ...words(patient.first_name || ''),
+    ...words(patient.last_name || ''),
+    ...words(patient.id_number || ''),
+  ]);
+  const cellGrams = new Set(cellDigits(patient.cell || '').flatMap(trigrams));
+
+  nameWords.forEach((word) => addWord(word, patient.id));
+  cellGrams.forEach((gram) => {
+    if (!grams.has(gram)) grams.set(gram, new Set());
+    grams.get(gram)!.add(patient.id);
+  });
+  patients.set(patient.id, { patient, words: [...nameWords], grams: [...cellGrams] });
+}
+
+// Patients whose digits contain `digits` (3+): candidates from the trigram
+// index, confirmed against the full number
+function cellMatches(digits: string): Set<string> {
+  const [first, ...rest] = trigrams(digits).map((gram) => grams.get(gram) ?? new Set<string>());
+  const out = new Set<string>();
+  first?.forEach((id) => {
+    if (rest.every((set) => set.has(id)) &&
+        cellDigits(patients.get(id)!.patient.cell || '').some((d) => d.includes(digits))) {
+      out.add(id);
+    }
+  });
+  return out;
+}
+
+function search(query: string, limit: number): Customer[] {
+  const terms = words(query);
+  if (terms.length === 0) return [];
+
+  const scores = new Map<string, number>();
+  terms.forEach((term, i) => {
+    const matched = new Map<string, number>();
+
+    const node = findNode(term);
+    if (node) {
+      const prefixed = new Set<string>();
+      collect(node, prefixed);
+      prefixed.forEach((id) => matched.set(id, node.ids.has(id) ? 2 : 1));
+    }
+    if (/^\d{3,}$/.test(term)) {
+      cellMatches(term).forEach((id) => matched.set(id, Math.max(matched.get(id) ?? 0, 2)));
+    }
+
+    // All terms must match: intersect with the previous terms
+    if (i === 0) {
+      matched.forEach((score, id) => scores.set(id, score));
+    } else {
+      scores.forEach((score, id) => {
+        if (matched.has(id)) scores.set(id, score + matched.get(id)!);
+        else scores.delete(id);
+      });
+    }
+  });
+
+  const idPrefix = normalize(query.trim());
+  return [...scores.entries()]
+    .map(([id, score]) => {
+      const { patient } = patients.get(id)!;
+      return { patient, score: score + ((patient.id_number || '').startsWith(idPrefix) ? 10 : 0) };
+    })
+    .sort((a, b) => b.score - a.score || a.patient.name.localeCompare(b.patient.name))
+    .slice(0, limit)
+    .map(({ patient }) => patient);
+}
+
+async function load(tenant: string) {
+  tenantId = tenant;
+  root = newNode();
+  grams.clear();
+  patients.clear();
+  const rows = await db.cachedCustomers.where('tenant_id').equals(tenant).toArray();
+  rows.forEach(upsert);
+}
+
+// The worker's own scope (the DOM lib types `self` as a Window)
+const worker = self as unknown as Worker;
+let loading: Promise<void> = Promise.resolve();
+
+worker.onmessage = async (event: MessageEvent<PatientSearchRequest>) => {
+  const message = event.data;
+  switch (message.type) {
+    case 'load':
+      loading = load(message.tenantId).catch((error) => console.error('[PATIENT_INDEX_LOAD_ERROR]', error));
+      break;
+    case 'upsert':
+      await loading;
+      message.patients.forEach(upsert);
+      break;
+    case 'remove':
+      await loading;
+      message.ids.forEach(remove);
+      break;
+    case 'search': {
+      await loading;
+      const started = performance.now();
+      const results = search(message.query, message.limit);
+      const response: PatientSearchResponse = {
+        id: message.id,
+        patients: results,
+        ms: performance.now() - started,
+      };
+      worker.postMessage(response);
+      break;
+    }
+  }
+};
@@ -1,77 +1,245 @@
-import { PostgrestFilterBuilder } from '@supabase/postgrest-js';
-
 export interface SafeQueryOptions {
-  timeoutMs?: number;
+  timeoutMs?: number; // per attempt; the request is aborted, not just abandoned
   retries?: number;
-  retryDelayMs?: number;
+  retryDelayMs?: number; // base of the exponential backoff
+  maxRetryDelayMs?: number;
+  key?: string | readonly unknown[]; // identical in-flight calls share one request
+  hedgeAfterMs?: number; // idempotent reads only: send a second request if the first is slower
+  signal?: AbortSignal; // the caller giving up; aborts the request once no one else waits on it
 }
 
-/**
- * Wraps a Supabase query with timeout and retry logic
- * Prevents hung queries from blocking UI indefinitely
- */
-export async function safeQuery<T>(
-  queryFn: () => Promise<{ data: T | null; error: any }>,
-  options: SafeQueryOptions = {}
-): Promise<{ data: T | null; error: any }> {
-  const { timeoutMs = 8000, retries = 2, retryDelayMs = 1000 } = options;
-
-  let lastError: any = null;
-
-  for (let attempt = 0; attempt <= retries; attempt++) {
-    try {
-      const result = await Promise.race([
-        queryFn(),
-        new Promise<{ data: null; error: any }>((_, reject) =>
-          setTimeout(() => reject(new Error('Query timeout')), timeoutMs)
-        ),
-      ]);
-
-      // If successful, return immediately
-      if (!result.error) {
-        return result;
-      }
+export interface QueryResult<T> {
+  data: T | null;
+  error: any;
+}
 
-      lastError = result.error;
+// The signal is aborted on timeout, hedge loss or cancellation; pass it to
+// the PostgREST builder with .abortSignal(signal)
+export type QueryFn<T> = (signal: AbortSignal) => PromiseLike<QueryResult<T>>;
 
-      // Don't retry on certain errors
-      if (
-        result.error.code === 'PGRST116' || // No rows returned
-        result.error.code === '42501' ||    // Insufficient privilege (RLS)
-        result.error.message?.includes('JWT')
-      ) {
-        return result;
-      }
+export interface SafeQueryStats {
+  calls: number; // safeQuery() calls
+  coalesced: number; // calls that joined an identical in-flight request
+  requests: number; // queryFn invocations, i.e. network requests
+  retries: number;
+  hedges: number;
+  timeouts: number;
+}
 
-      // Retry on network/timeout errors
-      if (attempt < retries) {
-        await new Promise((resolve) => setTimeout(resolve, retryDelayMs));
-        continue;
-      }
+interface SharedQuery {
+  promise: Promise<QueryResult<any>>;
+  controller: AbortController;
+  waiting: number;
+}
 
-      return result;
-    } catch (error: any) {
-      lastError = error;
+const inFlight = new Map<string, SharedQuery>();
+const stats: SafeQueryStats = { calls: 0, coalesced: 0, requests: 0, retries: 0, hedges: 0, timeouts: 0 };
 
-      if (attempt < retries) {
-        await new Promise((resolve) => setTimeout(resolve, retryDelayMs));
-        continue;
-      }
+const ABORTED = { data: null, error: { message: 'Query aborted', code: 'ABORTED' } };
+const TIMED_OUT = { data: null, error: { message: 'Query timeout', code: 'TIMEOUT' } };
+
+export function getSafeQueryStats(): SafeQueryStats {
+  return { ...stats };
+}
 
-      return {
-        data: null,
-        error: {
-          message: error.message || 'Query failed',
-          code: 'TIMEOUT',
-        },
-      };
+export function resetSafeQueryStats(): void {
+  (Object.keys(stats) as (keyof SafeQueryStats)[]).forEach((name) => (stats[name] = 0));
+}
+
+// Same key for the same query however its parts were written: object keys
+// are sorted, strings trimmed
+export function normalizeQueryKey(key: string | readonly unknown[]): string {
+  if (typeof key === 'string') return key.trim();
+  return JSON.stringify(key, (_name, value) =>
+    value && typeof value === 'object' && !Array.isArray(value)
+      ? Object.fromEntries(Object.entries(value).sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0)))
+      : typeof value === 'string' ? value.trim() : value
+  );
+}
+
+// Full jitter: a random delay up to the capped exponential, so clients
+// failing together don't retry together
+function backoffDelay(attempt: number, baseMs: number, maxMs: number): number {
+  return Math.random() * Math.min(maxMs, baseMs * 2 ** attempt);
+}
+
+function sleep(ms: number, signal: AbortSignal): Promise<void> {
+  return new Promise((resolve) => {
+    const timer = setTimeout(done, ms);
+    signal.addEventListener('abort', done, { once: true });
+    function done() {
+      clearTimeout(timer);
+      signal.removeEventListener('abort', done);
+      resolve();
     }
+  });
+}
+
+function isRetryable(error: any): boolean {
+  return !(
+    error.code === 'PGRST116' || // No rows returned
+    error.code === '42501' ||    // Insufficient privilege (RLS)
+    error.code === 'ABORTED' ||
+    error.message?.includes('JWT')
+  );
+}
+
+// One request, aborted after timeoutMs or when `signal` aborts
+async function attempt<T>(queryFn: QueryFn<T>, timeoutMs: number, signal: AbortSignal): Promise<QueryResult<T>> {
+  if (signal.aborted) return ABORTED;
+
+  const controller = new AbortController();
+  const abort = () => controller.abort();
+  signal.addEventListener('abort', abort, { once: true });
+
+  let timedOut = false;
+  const timer = setTimeout(() => {
+    timedOut = true;
+    stats.timeouts++;
+    controller.abort();
+  }, timeoutMs);
+
+  // Settles on abort even if queryFn ignores its signal
+  const aborted = new Promise<never>((_, reject) =>
+    controller.signal.addEventListener('abort', () => reject(new Error('Query aborted')), { once: true })
+  );
+
+  stats.requests++;
+  try {
+    const result = await Promise.race([Promise.resolve(queryFn(controller.signal)), aborted]);
+    if (timedOut) return TIMED_OUT;
+    if (signal.aborted) return ABORTED;
+    return result;
+  } catch (error: any) {
+    if (timedOut) return TIMED_OUT;
+    if (signal.aborted) return ABORTED;
+    return { data: null, error: { message: error.message || 'Query failed', code: 'NETWORK' } };
+  } finally {
+    clearTimeout(timer);
+    signal.removeEventListener('abort', abort);
+  }
+}
+
+// An attempt, plus a second identical one if the first has not answered
+// within hedgeAfterMs. The first success wins and the other is aborted.
+function hedgedAttempt<T>(queryFn: QueryFn<T>, timeoutMs: number, hedgeAfterMs: number | undefined, signal: AbortSignal) {
+  if (!hedgeAfterMs) return attempt(queryFn, timeoutMs, signal);
+
+  return new Promise<QueryResult<T>>((resolve) => {
+    const controllers: AbortController[] = [];
+    let outstanding = 0;
+    let settled = false;
+    let hedgeTimer: ReturnType<typeof setTimeout> | undefined;
+
+    const finish = (result: QueryResult<T>) => {
+      settled = true;
+      clearTimeout(hedgeTimer);
+      controllers.forEach((controller) => controller.abort());
+      resolve(result);
+    };
+
+    const launch = () => {
+      const controller = new AbortController();
+      const abort = () => controller.abort();
+      signal.addEventListener('abort', abort, { once: true });
+      controllers.push(controller);
+      outstanding++;
+
+      attempt(queryFn, timeoutMs, controller.signal).then((result) => {
+        signal.removeEventListener('abort', abort);
+        outstanding--;
+        if (settled) return;
+        // An error only counts once no other request can still succeed
+        if (!result.error || outstanding === 0) finish(result);
+      });
+    };
+
+    launch();
+    hedgeTimer = setTimeout(() => {
+      if (settled) return;
+      stats.hedges++;
+      launch();
+    }, hedgeAfterMs);
+  });
+}
+
+async function run<T>(queryFn: QueryFn<T>, options: SafeQueryOptions, signal: AbortSignal): Promise<QueryResult<T>> {
+  const {
+    timeoutMs = 8000,
+    retries = 2,
+    retryDelayMs = 1000,
+    maxRetryDelayMs = 8000,
+    hedgeAfterMs,
+  } = options;
+
+  let result: QueryResult<T> = ABORTED;
+  for (let i = 0; i <= retries; i++) {
+    result = await hedgedAttempt(queryFn, timeoutMs, hedgeAfterMs, signal);
+    if (!result.error || !isRetryable(result.error) || i === retries) return result;
+
+    stats.retries++;
+    await sleep(backoffDelay(i, retryDelayMs, maxRetryDelayMs), signal);
+  }
+  return result;
+}
+
+// Wait for a shared request; a caller whose signal aborts stops waiting, and
+// the request is aborted once nobody is waiting
+function follow<T>(shared: SharedQuery, key: string | null, signal?: AbortSignal): Promise<QueryResult<T>> {
+  shared.waiting++;
+
+  return new Promise((resolve) => {
+    let done = false;
+    const leave = (result: QueryResult<T>) => {
+      if (done) return;
+      done = true;
+      signal?.removeEventListener('abort', onAbort);
+      shared.waiting--;
+      resolve(result);
+    };
+    const onAbort = () => {
+      leave(ABORTED);
+      if (shared.waiting === 0) {
+        shared.controller.abort();
+        if (key !== null && inFlight.get(key) === shared) inFlight.delete(key);
+      }
+    };
+
+    if (signal?.aborted) return onAbort();
+    signal?.addEventListener('abort', onAbort, { once: true });
+    shared.promise.then(leave);
+  });
+}
+
+/**
+ * Wraps a Supabase query with timeout, retry and cancellation
+ * Prevents hung queries from blocking UI indefinitely; calls with the same
+ * `key` made while one is in flight share its request
+ */
+export function safeQuery<T>(
+  queryFn: QueryFn<T>,
+  options: SafeQueryOptions = {}
+): Promise<{ data: T | null; error: any }> {
+  stats.calls++;
+  const key = options.key === undefined ? null : normalizeQueryKey(options.key);
+
+  let shared = key === null ? undefined : inFlight.get(key);
+  if (shared) {
+    stats.coalesced++;
+  } else {
+    const controller = new AbortController();
+    const created: SharedQuery = {
+      controller,
+      waiting: 0,
+      promise: run(queryFn, options, controller.signal).finally(() => {
+        if (key !== null && inFlight.get(key) === created) inFlight.delete(key);
+      }),
+    };
+    if (key !== null) inFlight.set(key, created);
+    shared = created;
   }
 
-  return {
-    data: null,
-    error: lastError || { message: 'Query failed after retries', code: 'UNKNOWN' },
-  };
+  return follow<T>(shared, key, options.signal);
 }
 
 /**
@@ -86,17 +254,22 @@ export async function safeTenantQuery<T>(
 ) {
   const { supabase } = await import('./supabase');
 
-  return safeQuery(async () => {
+  return safeQuery<T>(async (signal) => {
     let query = supabase
       .from(table)
       .select(select)
       .eq('tenant_id', tenantId)
-      .eq('is_active', true);
+      .eq('is_active', true)
+      .abortSignal(signal);
 
     if (additionalFilters) {
       query = additionalFilters(query);
     }
 
-    return await query;
-  }, options);
+    return (await query) as QueryResult<T>;
+  }, {
+    // Filters are code, not data: only unfiltered queries have a key
+    key: additionalFilters ? undefined : ['tenant-query', table, tenantId, select],
+    ...options,
+  });
 }
@@ -1,4 +1,12 @@
 import { createClient } from '@supabase/supabase-js';
+import {
+  abandonProbe,
+  allowRequest,
+  isBackendAvailable,
+  recordFailure,
+  recordSuccess,
+  setHealthProbe,
+} from './backendHealth';
 
 const supabaseUrl = import.meta.env.VITE_SUPABASE_URL;
 const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY;
@@ -26,19 +34,56 @@ export const supabase = createClient(url, key, {
     detectSessionInUrl: true,
   },
   global: {
-    fetch: (input, init) => {
-      // Add 8s timeout to all fetch requests
+    fetch: async (input, init) => {
+      // Fail fast while the backend is known to be down (lib/backendHealth.ts)
+      const permit = allowRequest();
+      if (permit === 'reject') {
+        throw new TypeError('Supabase is not responding (circuit open)');
+      }
+
+      // Add 8s timeout to all fetch requests, keeping the caller's signal
+      // (safeQuery cancellation, hedging)
       const controller = new AbortController();
-      const timeoutId = setTimeout(() => controller.abort(), 8000);
+      let timedOut = false;
+      const timeoutId = setTimeout(() => {
+        timedOut = true;
+        controller.abort();
+      }, 8000);
+      const callerSignal = init?.signal;
+      const onCallerAbort = () => controller.abort();
+      if (callerSignal?.aborted) controller.abort();
+      callerSignal?.addEventListener('abort', onCallerAbort, { once: true });
 
-      return fetch(input, {
-        ...init,
-        signal: controller.signal,
-      }).finally(() => clearTimeout(timeoutId));
+      try {
+        const response = await fetch(input, {
+          ...init,
+          signal: controller.signal,
+        });
+        if (response.status >= 500) recordFailure(`HTTP ${response.status}`);
+        else recordSuccess();
+        return response;
+      } catch (error: any) {
+        if (timedOut) {
+          recordFailure('Timeout after 8s');
+        } else if (callerSignal?.aborted) {
+          if (permit === 'probe') abandonProbe();
+        } else if (navigator.onLine) {
+          recordFailure(error?.message || 'Network error');
+        }
+        throw error;
+      } finally {
+        clearTimeout(timeoutId);
+        callerSignal?.removeEventListener('abort', onCallerAbort);
+      }
     },
   },
 });
 
+// Lightweight request used to test the backend while the circuit is open
+setHealthProbe(async () => {
+  await supabase.from('tenants').select('id', { head: true }).limit(1);
+});
+
 // Database types (based on your schema)
 export type UserRole = 'owner' | 'admin' | 'staff';
 export type InvoiceStatus = 'Draft' | 'Quotation' | 'ProformaOffline' | 'Finalized' | 'Paid' | 'Void';
@@ -199,7 +244,8 @@ export const isSupabaseConfigured = () => {
 let isWarmedUp = false;
 
 export const warmupSupabase = async (): Promise<void> => {
-  if (isWarmedUp || !isSupabaseConfigured()) return;
+  // While the circuit is open there is nothing to wait for: requests fail fast
+  if (isWarmedUp || !isSupabaseConfigured() || !isBackendAvailable()) return;
 
   console.log('[AUTH_WARMUP] Waking Supabase database...');
   const start = Date.now();
@@ -5,6 +5,8 @@ import { useAuth } from '../contexts/AuthContext';
 import Layout from '../components/Layout';
 import { formatCurrency, formatDateDisplay } from '../lib/invoiceUtils';
 import { generateInvoicePDF } from '../lib/pdfGenerator';
+import { cacheInvoiceItems, getCachedInvoiceWithDetails, isOnline } from '../lib/db';
+import CachedDataNotice from '../components/CachedDataNotice';
 
 export default function InvoiceDetail() {
   const { id } = useParams();
@@ -13,6 +15,7 @@ export default function InvoiceDetail() {
   const [invoice, setInvoice] = useState<InvoiceWithDetails | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [cached, setCached] = useState(false); // read from the Dexie cache
 
   useEffect(() => {
     if (tenantId && id) {
@@ -20,10 +23,24 @@ export default function InvoiceDetail() {
     }
   }, [id, tenantId]);
 
+  // Offline, or with the backend circuit open: the invoice as last synced
+  const loadCachedInvoice = async () => {
+    const cachedInvoice = await getCachedInvoiceWithDetails(id!, tenantId!);
+    if (!cachedInvoice) {
+      setError('This invoice is not saved on this device. Reconnect to view it.');
+      return;
+    }
+    setInvoice(cachedInvoice);
+    setCached(true);
+    console.log('[INVOICE_DETAIL_CACHED]', cachedInvoice.invoice_number);
+  };
+
   const fetchInvoice = async () => {
     try {
       setLoading(true);
+      setError(null);
       console.log('[INVOICE_DETAIL_FETCH]', id);
+      if (!isOnline()) return await loadCachedInvoice();
 
       const { data, error } = await supabase
         .from('invoices')
@@ -36,7 +53,11 @@ export default function InvoiceDetail() {
         .eq('tenant_id', tenantId!)
         .single();
 
-      if (error) throw error;
+      if (error) {
+        // This failure opened the circuit: fall back to the cache
+        if (!isOnline()) return await loadCachedInvoice();
+        throw error;
+      }
 
       if (!data) {
         setError('Invoice not found');
@@ -47,6 +68,8 @@ export default function InvoiceDetail() {
       data.invoice_items.sort((a, b) => a.line_order - b.line_order);
 
       setInvoice(data as InvoiceWithDetails);
+      setCached(false);
+      void cacheInvoiceItems(data.id, data.invoice_items);
       console.log('[INVOICE_DETAIL_LOADED]', data.invoice_number);
     } catch (err: any) {
       console.error('[INVOICE_DETAIL_ERROR]', err);
@@ -100,6 +123,12 @@ export default function InvoiceDetail() {
 
   return (
     <Layout>
+      {cached && (
+        <div className="mb-6">
+          <CachedDataNotice tenantId={tenantId} source="invoices" />
+        </div>
+      )}
+
       {/* Header with Action Buttons */}
       <div className="card bg-gradient-to-r from-primary-50 to-secondary-50 mb-6">
         <div className="flex items-center justify-between">
@@ -231,6 +260,11 @@ export default function InvoiceDetail() {
       {/* Line Items */}
       <div className="card mb-6">
         <h2 className="text-lg font-semibold mb-4">Procedures & Services</h2>
+        {cached && invoice.invoice_items.length === 0 && (
+          <p className="text-sm text-gray-500 mb-4">
+            The line items of this invoice are not saved on this device. Reconnect to see them.
+          </p>
+        )}
         <div className="overflow-x-auto">
           <table className="min-w-full">
             <thead className="bg-gray-50">
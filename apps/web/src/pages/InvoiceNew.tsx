@@ -1,13 +1,15 @@
 import { useAuth } from '../contexts/AuthContext';
 import { useState, useEffect, FormEvent } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
-import { supabase, Customer, Service, VATRate } from '../lib/supabase';
-import { safeQuery } from '../lib/safeQuery';
+import { supabase } from '../lib/supabase';
+import { fetchPatientOption, PatientOption, rememberRecentPatient } from '../lib/patientOptions';
+import { useReferenceData } from '../lib/dataCache';
 import Layout from '../components/Layout';
-import { calculateLineTotals } from '../lib/db';
+import { calculateLineTotals, isOnline } from '../lib/db';
+import { queueInvoiceDraft } from '../lib/draftQueue';
 import PatientModal from '../components/PatientModal';
-import CreatablePatientSelect from '../components/CreatablePatientSelect';
-import { generateInvoiceNumber } from '../lib/invoiceUtils';
+import CachedDataNotice from '../components/CachedDataNotice';
+import AsyncPatientSelect from '../components/AsyncPatientSelect';
 
 interface LineItem {
   id: string;
@@ -23,10 +25,11 @@ export default function InvoiceNew() {
   const navigate = useNavigate();
   const { tenantId, loading: authLoading, error: authError } = useAuth();
   const [loading, setLoading] = useState(false);
-  const [patients, setPatients] = useState<Customer[]>([]);
-  const [services, setServices] = useState<Service[]>([]);
+  // Served from IndexedDB, revalidated in the background (lib/dataCache.ts)
+  const { data: services, stale: servicesStale } = useReferenceData('services', tenantId);
   // Form state
   const [patientId, setPatientId] = useState('');
+  const [selectedPatient, setSelectedPatient] = useState<PatientOption | null>(null);
   const [invoiceDate, setInvoiceDate] = useState(
     new Date().toISOString().split('T')[0]
   );
@@ -46,59 +49,10 @@ export default function InvoiceNew() {
   const isQuotationMode = searchParams.get('mode') === 'quotation';
 
 
-  const [vatRates, setVATRates] = useState<VATRate[]>([]);
+  const { data: vatRates, stale: vatRatesStale } = useReferenceData('vat_rates', tenantId);
   const [lineItems, setLineItems] = useState<LineItem[]>([]);
 
 
-  const fetchData = async () => {
-    try {
-      if (!tenantId) return; // wait until we know the user's tenant
-
-      // Use safeQuery with timeout and retry for all dropdown data
-      const [customersRes, servicesRes, vatRatesRes] = await Promise.all([
-        safeQuery(
-          () => supabase.from('customers').select('*')
-            .eq('tenant_id', tenantId).eq('is_active', true).order('name'),
-          { timeoutMs: 7000, retries: 2 }
-        ),
-        safeQuery(
-          () => supabase.from('services').select('*')
-            .eq('tenant_id', tenantId).eq('is_active', true).order('name'),
-          { timeoutMs: 7000, retries: 2 }
-        ),
-        safeQuery(
-          () => supabase.from('vat_rates').select('*')
-            .eq('tenant_id', tenantId).eq('is_active', true).order('rate'),
-          { timeoutMs: 7000, retries: 2 }
-        ),
-      ]);
-
-      if (customersRes.error) {
-        console.error('Error fetching patients:', customersRes.error);
-      } else if (customersRes.data) {
-        setPatients(customersRes.data);
-      }
-
-      if (servicesRes.error) {
-        console.error('Error fetching services:', servicesRes.error);
-      } else if (servicesRes.data) {
-        setServices(servicesRes.data);
-      }
-
-      if (vatRatesRes.error) {
-        console.error('Error fetching VAT rates:', vatRatesRes.error);
-      } else if (vatRatesRes.data) {
-        setVATRates(vatRatesRes.data);
-      }
-    } catch (error) {
-      console.error('Error fetching data:', error);
-    }
-  };
-
-  useEffect(() => {
-    fetchData();
-  }, [tenantId]);
-
   // Auto-calculate change due for Cash payments (Gate S5)
   useEffect(() => {
     const totals = calculateTotals();
@@ -202,19 +156,16 @@ export default function InvoiceNew() {
     };
   };
 
+  const handlePatientSelected = (patient: PatientOption | null) => {
+    setSelectedPatient(patient);
+    setPatientId(patient ? patient.id : '');
+    if (patient && tenantId) rememberRecentPatient(tenantId, patient);
+  };
+
   const handlePatientCreated = async (patientId: string) => {
-    // Refresh patient list after creation
-    const { data } = await supabase
-      .from('customers')
-      .select('*')
-      .eq('tenant_id', tenantId!)
-      .eq('is_active', true)
-      .order('name');
-
-    if (data) {
-      setPatients(data);
-      setPatientId(patientId);
-    }
+    // Select the new patient (no patient list to refresh)
+    const patient = await fetchPatientOption(patientId);
+    handlePatientSelected(patient ?? { id: patientId, name: 'New patient', cell: null });
 
     setIsPatientModalOpen(false);
   };
@@ -235,10 +186,7 @@ export default function InvoiceNew() {
     setLoading(true);
 
     try {
-      const { subtotal, totalVAT, total } = calculateTotals();
-
-      // Generate unique invoice number
-      const invoiceNumber = await generateInvoiceNumber(tenantId!);
+      const { total } = calculateTotals();
 
       // Auto-status logic (Gate S8): Determine status based on payment
       let invoiceStatus = isQuotationMode ? 'Quotation' : 'Draft';
@@ -249,58 +197,60 @@ export default function InvoiceNew() {
         paymentDate = new Date().toISOString();
       }
 
-      // Create invoice
-      const { data: invoice, error: invoiceError } = await supabase
-        .from('invoices')
-        .insert({
-          invoice_number: invoiceNumber,
-          customer_id: patientId,
-          invoice_date: invoiceDate,
-          due_date: dueDate || null,
-          status: invoiceStatus,
-          subtotal,
-          total_vat: totalVAT,
-          total_amount: total,
-          paid_amount: 0,
-          notes,
+      // Header, number and items in one round trip and one transaction
+      // (create_invoice, migration 013). The server allocates the invoice
+      // number and recalculates line and invoice totals.
+      const header = {
+        customer_id: patientId,
+        invoice_date: invoiceDate,
+        due_date: dueDate || null,
+        status: invoiceStatus,
+        notes,
         // Payment tracking fields (Gate S5)
         amount_paid: amountPaid,
         payment_method: paymentMethod,
         change_due: changeDue,
         payment_date: paymentDate,
-        })
-        .select()
-        .single();
-
-      if (invoiceError) throw invoiceError;
-      console.log('[INVOICE_CREATED]', invoiceNumber, invoice.id);
-
-      // Create line items
-      const items = lineItems.map((item, index) => {
-        const { line_total, vat_amount, line_total_incl_vat } = calculateLineTotals(
-          item.quantity,
-          item.unit_price,
-          item.vat_rate
+      };
+
+      const items = lineItems.map((item, index) => ({
+        line_order: index,
+        service_id: item.service_id || null,
+        description: item.description,
+        quantity: item.quantity,
+        unit_price: item.unit_price,
+        vat_rate_id: item.vat_rate_id,
+        vat_rate: item.vat_rate,
+      }));
+
+      // Offline, or the backend circuit is open (lib/backendHealth.ts): keep
+      // the invoice on this device; the draft queue uploads it on recovery.
+      // Only decided before sending: a create_invoice call that times out
+      // may still have committed.
+      if (!isOnline() && !isQuotationMode) {
+        const { invoiceNumber } = await queueInvoiceDraft({
+          customer_id: patientId,
+          customer_name: selectedPatient?.name,
+          invoice_date: invoiceDate,
+          due_date: dueDate || null,
+          notes: notes || null,
+          items: items.map(({ line_order, service_id, description, quantity, unit_price, vat_rate }) => ({
+            line_order, service_id, description, quantity, unit_price, vat_rate,
+          })),
+        });
+        alert(
+          `Saved offline as ${invoiceNumber ?? 'a draft'}. It will upload when the server is reachable.` +
+          (amountPaid > 0 ? ' Record the payment on the invoice once it has uploaded.' : '')
         );
+        navigate('/invoices');
+        return;
+      }
 
-        return {
-          invoice_id: invoice.id,
-          line_order: index,
-          service_id: item.service_id || null,
-          description: item.description,
-          quantity: item.quantity,
-          unit_price: item.unit_price,
-          vat_rate_id: item.vat_rate_id,
-          vat_rate: item.vat_rate,
-          vat_amount,
-          line_total,
-          line_total_incl_vat,
-        };
-      });
-
-      const { error: itemsError } = await supabase.from('invoice_items').insert(items);
-
-      if (itemsError) throw itemsError;
+      const { data: invoice, error: invoiceError } = await supabase
+        .rpc('create_invoice', { header, items });
+
+      if (invoiceError) throw invoiceError;
+      console.log('[INVOICE_CREATED]', invoice.invoice_number, invoice.id);
 
       alert('Invoice created successfully!');
       navigate('/invoices');
@@ -363,21 +313,13 @@ export default function InvoiceNew() {
                 Patient *
               </label>
               <div className="flex gap-2">
-                <select
-                  id="patient"
-                  value={patientId}
-                  onChange={(e) => setPatientId(e.target.value)}
-                  className="input flex-1"
-                  required
-                >
-                  <option value="">Select a patient...</option>
-                  {patients.map((patient) => (
-                    <option key={patient.id} value={patient.id}>
-                      {patient.name}
-                      {patient.cell ? ` - ${patient.cell}` : ''}
-                    </option>
-                  ))}
-                </select>
+                <div className="flex-1">
+                  <AsyncPatientSelect
+                    inputId="patient"
+                    value={selectedPatient}
+                    onChange={handlePatientSelected}
+                  />
+                </div>
                 <button
                   type="button"
                   onClick={() => setIsPatientModalOpen(true)}
@@ -432,6 +374,11 @@ export default function InvoiceNew() {
           </div>
         </div>
 
+        {/* Prices and VAT rates as last synced, while they cannot be refreshed */}
+        {(servicesStale || vatRatesStale) && !isOnline() && (
+          <CachedDataNotice tenantId={tenantId} source={servicesStale ? 'services' : 'vat_rates'} />
+        )}
+
         {/* Line Items */}
         <div className="card space-y-4">
           <div className="flex justify-between items-center">
@@ -1,40 +1,117 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { supabase, InvoiceWithCustomer } from '../lib/supabase';
+import { useAuth } from '../contexts/AuthContext';
+import { Customer, InvoiceStatus } from '../lib/supabase';
+import {
+  fetchInvoicePage,
+  InvoiceListCursor,
+  InvoiceListFilters,
+  InvoiceListRow,
+} from '../lib/invoiceList';
 import Layout from '../components/Layout';
+import PatientSearchModal from '../components/PatientSearchModal';
+import CachedDataNotice from '../components/CachedDataNotice';
+
+const STATUS_OPTIONS: InvoiceStatus[] = ['Draft', 'Quotation', 'ProformaOffline', 'Finalized', 'Paid', 'Void'];
+const PAYMENT_METHOD_OPTIONS = ['Cash', 'Card', 'EFT', 'Medical Aid', 'Split'];
 
 export default function InvoicesList() {
-  const [invoices, setInvoices] = useState<InvoiceWithCustomer[]>([]);
+  const { tenantId } = useAuth();
+  const [invoices, setInvoices] = useState<InvoiceListRow[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
+  const [filters, setFilters] = useState<InvoiceListFilters>({});
+  const [patientName, setPatientName] = useState('');
+  const [isPatientSearchOpen, setIsPatientSearchOpen] = useState(false);
+  const [nextCursor, setNextCursor] = useState<InvoiceListCursor | null>(null);
+  const [cached, setCached] = useState(false); // pages read from the Dexie cache
+
+  // Bumped on every filter change so pages from an older query are dropped
+  const queryVersion = useRef(0);
+  const sentinelRef = useRef<HTMLDivElement>(null);
 
+  // First page whenever the filters change
   useEffect(() => {
-    fetchInvoices();
-  }, []);
+    if (!tenantId) return;
+    const version = ++queryVersion.current;
+
+    const fetchFirstPage = async () => {
+      try {
+        setLoading(true);
+        setError('');
+        const page = await fetchInvoicePage(tenantId, filters, null);
+        if (version !== queryVersion.current) return;
+
+        setInvoices(page.rows);
+        setNextCursor(page.nextCursor);
+        setCached(page.cached);
+      } catch (err: any) {
+        if (version !== queryVersion.current) return;
+        console.error('Error fetching invoices:', err);
+        setError(err.message);
+      } finally {
+        if (version === queryVersion.current) setLoading(false);
+      }
+    };
+
+    fetchFirstPage();
+  }, [filters, tenantId]);
+
+  const loadMore = useCallback(async () => {
+    if (!tenantId || !nextCursor || loadingMore) return;
+    const version = queryVersion.current;
 
-  const fetchInvoices = async () => {
     try {
-      setLoading(true);
-      const { data, error } = await supabase
-        .from('invoices')
-        .select(`
-          *,
-          customer:customers(*)
-        `)
-        .order('created_at', { ascending: false })
-        .limit(50);
-
-      if (error) throw error;
-
-      setInvoices(data as InvoiceWithCustomer[]);
+      setLoadingMore(true);
+      const page = await fetchInvoicePage(tenantId, filters, nextCursor);
+      if (version !== queryVersion.current) return;
+
+      setInvoices((prev) => [...prev, ...page.rows]);
+      setNextCursor(page.nextCursor);
+      if (page.cached) setCached(true);
     } catch (err: any) {
-      console.error('Error fetching invoices:', err);
+      if (version !== queryVersion.current) return;
+      console.error('Error fetching more invoices:', err);
       setError(err.message);
     } finally {
-      setLoading(false);
+      setLoadingMore(false);
     }
+  }, [tenantId, filters, nextCursor, loadingMore]);
+
+  // Infinite scroll: load the next page when the sentinel below the table
+  // comes into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextCursor) return;
+
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadMore();
+      },
+      { rootMargin: '200px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [nextCursor, loadMore]);
+
+  const updateFilter = (changes: Partial<InvoiceListFilters>) => {
+    setFilters((prev) => ({ ...prev, ...changes }));
+  };
+
+  const handlePatientSelected = (patient: Customer) => {
+    setPatientName(patient.name);
+    updateFilter({ customerId: patient.id });
+    setIsPatientSearchOpen(false);
+  };
+
+  const clearFilters = () => {
+    setPatientName('');
+    setFilters({});
   };
 
+  const hasFilters = Object.values(filters).some(Boolean);
+
   const formatCurrency = (amount: number) => {
     return new Intl.NumberFormat('en-ZA', {
       style: 'currency',
@@ -50,7 +127,7 @@ export default function InvoicesList() {
     });
   };
 
-  if (loading) {
+  if (loading && invoices.length === 0 && !hasFilters) {
     return (
       <Layout>
         <div className="text-center py-12">
@@ -90,6 +167,75 @@ export default function InvoicesList() {
           </Link>
         </div>
 
+        {/* Filters */}
+        <div className="card">
+          <div className="grid grid-cols-1 md:grid-cols-5 gap-4">
+            <div>
+              <label className="label">Status</label>
+              <select
+                value={filters.status || ''}
+                onChange={(e) => updateFilter({ status: e.target.value as InvoiceStatus | '' })}
+                className="input"
+              >
+                <option value="">All statuses</option>
+                {STATUS_OPTIONS.map((status) => (
+                  <option key={status} value={status}>{status}</option>
+                ))}
+              </select>
+            </div>
+            <div>
+              <label className="label">From</label>
+              <input
+                type="date"
+                value={filters.dateFrom || ''}
+                onChange={(e) => updateFilter({ dateFrom: e.target.value })}
+                className="input"
+              />
+            </div>
+            <div>
+              <label className="label">To</label>
+              <input
+                type="date"
+                value={filters.dateTo || ''}
+                onChange={(e) => updateFilter({ dateTo: e.target.value })}
+                className="input"
+              />
+            </div>
+            <div>
+              <label className="label">Payment Method</label>
+              <select
+                value={filters.paymentMethod || ''}
+                onChange={(e) => updateFilter({ paymentMethod: e.target.value })}
+                className="input"
+              >
+                <option value="">All methods</option>
+                {PAYMENT_METHOD_OPTIONS.map((method) => (
+                  <option key={method} value={method}>{method}</option>
+                ))}
+              </select>
+            </div>
+            <div>
+              <label className="label">Patient</label>
+              <button
+                type="button"
+                onClick={() => setIsPatientSearchOpen(true)}
+                className="input text-left truncate"
+              >
+                {patientName || <span className="text-gray-400">All patients</span>}
+              </button>
+            </div>
+          </div>
+          {hasFilters && (
+            <div className="mt-4 text-right">
+              <button type="button" onClick={clearFilters} className="text-sm text-primary-600 hover:text-primary-900">
+                Clear filters
+              </button>
+            </div>
+          )}
+        </div>
+
+        {cached && <CachedDataNotice tenantId={tenantId} source="invoices" />}
+
         {/* Error */}
         {error && (
           <div className="bg-red-50 border border-red-200 rounded-md p-4">
@@ -113,9 +259,11 @@ export default function InvoicesList() {
                 d="M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z"
               />
             </svg>
-            <h3 className="mt-2 text-sm font-medium text-gray-900">No invoices</h3>
+            <h3 className="mt-2 text-sm font-medium text-gray-900">
+              {loading ? 'Loading invoices...' : 'No invoices'}
+            </h3>
             <p className="mt-1 text-sm text-gray-500">
-              Get started by creating a new invoice.
+              {hasFilters ? 'No invoices match these filters.' : 'Get started by creating a new invoice.'}
             </p>
             <div className="mt-6">
               <Link to="/invoices/new" className="btn btn-primary">
@@ -157,7 +305,7 @@ export default function InvoicesList() {
                       )}
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
-                      {invoice.customer.name}
+                      {invoice.customer_name}
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
                       {formatDate(invoice.invoice_date)}
@@ -189,9 +337,30 @@ export default function InvoicesList() {
                 ))}
               </tbody>
             </table>
+
+            {/* Infinite scroll sentinel */}
+            <div ref={sentinelRef} />
+            {nextCursor && (
+              <div className="px-6 py-4 text-center border-t border-gray-200">
+                <button
+                  type="button"
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="text-sm text-primary-600 hover:text-primary-900 disabled:text-gray-400"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
+
+      <PatientSearchModal
+        isOpen={isPatientSearchOpen}
+        onClose={() => setIsPatientSearchOpen(false)}
+        onPatientSelected={handlePatientSelected}
+      />
     </Layout>
   );
 }
@@ -1,10 +1,12 @@
 import { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import { supabase } from '../lib/supabase';
+import { db, isOnline } from '../lib/db';
 import Layout from '../components/Layout';
 import ReportSummaryCard from '../components/ReportSummaryCard';
 import ReportChart from '../components/ReportChart';
 import ReportExportBar from '../components/ReportExportBar';
+import CachedDataNotice from '../components/CachedDataNotice';
 
 interface InvoiceSummary {
   tenant_id: string;
@@ -16,11 +18,50 @@ interface InvoiceSummary {
   outstanding: number;
 }
 
+type StatusTotals = Omit<InvoiceSummary, 'month'>;
+
+// The invoice_monthly_summary rollup (migration 009) recomputed from the
+// delta-synced invoice cache, for use offline or with the circuit open
+async function summarizeCachedInvoices(tenantId: string) {
+  const invoices = await db.cachedInvoices.where('tenant_id').equals(tenantId).toArray();
+  const monthly = new Map<string, InvoiceSummary>();
+  const totals = new Map<string, StatusTotals>();
+
+  const add = (row: StatusTotals, amount: number, paid: number) => {
+    row.invoice_count += 1;
+    row.total_amount += amount;
+    row.total_paid += paid;
+    row.outstanding += amount - paid;
+  };
+
+  for (const invoice of invoices) {
+    if (!invoice.invoice_date || !invoice.status) continue;
+    const month = `${invoice.invoice_date.slice(0, 7)}-01`;
+    const amount = invoice.total_amount || 0;
+    const paid = invoice.amount_paid || 0;
+    const empty = { tenant_id: tenantId, status: invoice.status, invoice_count: 0, total_amount: 0, total_paid: 0, outstanding: 0 };
+
+    const monthKey = `${month}|${invoice.status}`;
+    if (!monthly.has(monthKey)) monthly.set(monthKey, { ...empty, month });
+    add(monthly.get(monthKey)!, amount, paid);
+
+    if (!totals.has(invoice.status)) totals.set(invoice.status, { ...empty });
+    add(totals.get(invoice.status)!, amount, paid);
+  }
+
+  return {
+    monthly: [...monthly.values()].sort((a, b) => (a.month < b.month ? 1 : a.month > b.month ? -1 : 0)),
+    totals: [...totals.values()],
+  };
+}
+
 export default function ReportsDashboard() {
   const { tenantId, loading: authLoading } = useAuth();
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [summaryData, setSummaryData] = useState<InvoiceSummary[]>([]);
+  const [statusTotals, setStatusTotals] = useState<StatusTotals[]>([]);
+  const [cached, setCached] = useState(false); // computed from the Dexie cache
 
   useEffect(() => {
     if (tenantId) {
@@ -28,22 +69,46 @@ export default function ReportsDashboard() {
     }
   }, [tenantId]);
 
+  const loadCachedReports = async () => {
+    const { monthly, totals } = await summarizeCachedInvoices(tenantId!);
+    setSummaryData(monthly);
+    setStatusTotals(totals);
+    setCached(true);
+    console.log('[REPORTS_FROM_CACHE]', monthly.length, 'monthly records,', totals.length, 'status totals');
+  };
+
   const fetchReportsData = async () => {
     try {
       setLoading(true);
       setError(null);
       console.log('[REPORTS_FETCH_START]', { tenantId });
+      if (!isOnline()) return await loadCachedReports();
+
+      // Both read the invoice_monthly_summary rollup, so the row count stays
+      // bounded by months x statuses however many invoices exist. The export
+      // needs every month, so the full history is fetched.
+      const [monthly, totals] = await Promise.all([
+        supabase
+          .from('vw_invoice_summary')
+          .select('*')
+          .eq('tenant_id', tenantId!)
+          .order('month', { ascending: false }),
+        supabase
+          .from('vw_invoice_status_totals')
+          .select('*')
+          .eq('tenant_id', tenantId!),
+      ]);
+
+      if (monthly.error || totals.error) {
+        // This failure opened the circuit: report from the cache
+        if (!isOnline()) return await loadCachedReports();
+        throw monthly.error || totals.error;
+      }
 
-      const { data, error: fetchError } = await supabase
-        .from('vw_invoice_summary')
-        .select('*')
-        .eq('tenant_id', tenantId!)
-        .order('month', { ascending: false });
-
-      if (fetchError) throw fetchError;
-
-      setSummaryData(data || []);
-      console.log('[REPORTS_FETCH_SUCCESS]', data?.length, 'records');
+      setSummaryData(monthly.data || []);
+      setStatusTotals(totals.data || []);
+      setCached(false);
+      console.log('[REPORTS_FETCH_SUCCESS]', monthly.data?.length, 'monthly records,', totals.data?.length, 'status totals');
     } catch (err: any) {
       console.error('[REPORTS_FETCH_ERROR]', err);
       setError(err.message || 'Failed to load reports data');
@@ -75,20 +140,21 @@ export default function ReportsDashboard() {
     );
   }
 
-  const totalInvoiced = summaryData.reduce((sum, item) => sum + (item.total_amount || 0), 0);
-  const totalPaid = summaryData.reduce((sum, item) => sum + (item.total_paid || 0), 0);
-  const totalOutstanding = summaryData.reduce((sum, item) => sum + (item.outstanding || 0), 0);
-  const quotationCount = summaryData.filter(item => item.status === 'Quotation').reduce((sum, item) => sum + item.invoice_count, 0);
+  const totalInvoiced = statusTotals.reduce((sum, item) => sum + (item.total_amount || 0), 0);
+  const totalPaid = statusTotals.reduce((sum, item) => sum + (item.total_paid || 0), 0);
+  const totalOutstanding = statusTotals.reduce((sum, item) => sum + (item.outstanding || 0), 0);
+  const quotationCount = statusTotals.filter(item => item.status === 'Quotation').reduce((sum, item) => sum + item.invoice_count, 0);
 
   const monthlyData = summaryData
     .reduce((acc: any[], item) => {
-      const existing = acc.find(x => x.month === item.month);
+      const month = new Date(item.month).toLocaleDateString('en-ZA', { year: 'numeric', month: 'short' });
+      const existing = acc.find(x => x.month === month);
       if (existing) {
         existing.total_amount += item.total_amount || 0;
         existing.total_paid += item.total_paid || 0;
       } else {
         acc.push({
-          month: new Date(item.month).toLocaleDateString('en-ZA', { year: 'numeric', month: 'short' }),
+          month,
           total_amount: item.total_amount || 0,
           total_paid: item.total_paid || 0,
         });
@@ -98,18 +164,10 @@ export default function ReportsDashboard() {
     .slice(0, 6)
     .reverse();
 
-  const statusData = summaryData.reduce((acc: any[], item) => {
-    const existing = acc.find(x => x.name === item.status);
-    if (existing) {
-      existing.value += item.invoice_count;
-    } else {
-      acc.push({
-        name: item.status,
-        value: item.invoice_count,
-      });
-    }
-    return acc;
-  }, []);
+  const statusData = statusTotals.map(item => ({
+    name: item.status,
+    value: item.invoice_count,
+  }));
 
   return (
     <Layout>
@@ -121,6 +179,8 @@ export default function ReportsDashboard() {
         />
 
         <div className="p-6 space-y-6">
+          {cached && <CachedDataNotice tenantId={tenantId} source="invoices" />}
+
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4">
             <ReportSummaryCard
               title="Total Invoiced"
@@ -161,7 +221,7 @@ export default function ReportsDashboard() {
             />
           </div>
 
-          {summaryData.length === 0 && (
+          {statusTotals.length === 0 && (
             <div className="card text-center py-12">
               <p className="text-gray-500 text-lg">No invoice data available yet.</p>
               <p className="text-gray-400 mt-2">Create your first invoice to see reports here.</p>
@@ -0,0 +1,138 @@
+-- Benchmark: Invoice list page latency, OFFSET paging vs keyset list_invoices()
+-- =================================================================================
+-- Loads two scratch tenants with 10,000 and 200,000 invoices and fetches 100
+-- pages of 50 at random depths in each, unfiltered and filtered by status:
+--   offset - ORDER BY created_at DESC LIMIT 50 OFFSET <depth>
+--   keyset - list_invoices() after the (created_at, id) of the row at <depth>
+-- Target: keyset p95 the same for both tenants and every depth.
+--
+-- Run AFTER migration 015 as the table owner (SQL Editor or psql), on a
+-- development database; the 200k-invoice load takes a while. Everything is
+-- rolled back.
+--
+--   psql "$DATABASE_URL" -f db/benchmarks/bench_invoice_list.sql
+
+BEGIN;
+
+-- ============================================================================
+-- SETUP: Two scratch tenants, one patient each, 10k / 200k invoices
+-- ============================================================================
+
+CREATE TEMP TABLE bench_results (
+    invoice_count INTEGER,
+    paging_mode TEXT,
+    filter TEXT,
+    depth INTEGER,
+    ms NUMERIC,
+    row_count INTEGER
+) ON COMMIT DROP;
+
+INSERT INTO tenants (name, slug, business_name)
+VALUES ('List Bench Small', 'bench-list-10k', 'List Bench Small'),
+       ('List Bench Large', 'bench-list-200k', 'List Bench Large');
+
+INSERT INTO customers (tenant_id, name)
+SELECT id, 'List Bench Patient' FROM tenants WHERE slug LIKE 'bench-list-%';
+
+INSERT INTO invoices (tenant_id, customer_id, invoice_number, invoice_date, status, payment_method, created_at)
+SELECT
+    t.id,
+    c.id,
+    CASE WHEN g % 5 = 0 THEN NULL ELSE 'BENCH-' || g END,
+    CURRENT_DATE - (g / 50),
+    CASE WHEN g % 5 = 0 THEN 'Draft' ELSE (ARRAY['Finalized', 'Paid', 'Paid', 'Void']::invoice_status[])[1 + g % 4] END,
+    (ARRAY['Cash', 'Card', 'EFT', 'Medical Aid'])[1 + g % 4],
+    NOW() - (g * INTERVAL '7 minutes')
+FROM tenants t
+JOIN customers c ON c.tenant_id = t.id
+CROSS JOIN LATERAL generate_series(1, CASE t.slug WHEN 'bench-list-10k' THEN 10000 ELSE 200000 END) AS g
+WHERE t.slug LIKE 'bench-list-%';
+
+ANALYZE invoices;
+
+CREATE FUNCTION pg_temp.bench_list(p_slug TEXT, p_mode TEXT, p_status invoice_status)
+RETURNS VOID AS $$
+DECLARE
+    v_tenant_id UUID;
+    v_count INTEGER;
+    v_depth INTEGER;
+    v_after_created_at TIMESTAMPTZ;
+    v_after_id UUID;
+    v_started TIMESTAMPTZ;
+    v_rows INTEGER;
+BEGIN
+    SELECT id INTO v_tenant_id FROM tenants WHERE slug = p_slug;
+    SELECT COUNT(*) INTO v_count FROM invoices
+    WHERE tenant_id = v_tenant_id AND (p_status IS NULL OR status = p_status);
+
+    -- list_invoices() takes the tenant from the JWT claims
+    PERFORM set_config('request.jwt.claims', json_build_object('tenant_id', v_tenant_id)::text, true);
+
+    FOR i IN 1..100 LOOP
+        v_depth := 1 + (random() * (v_count - 51))::INTEGER;
+
+        -- Cursor = the row just above the page (looked up outside the timing)
+        SELECT created_at, id INTO v_after_created_at, v_after_id
+        FROM invoices
+        WHERE tenant_id = v_tenant_id AND (p_status IS NULL OR status = p_status)
+        ORDER BY created_at DESC, id DESC
+        OFFSET v_depth - 1 LIMIT 1;
+
+        v_started := clock_timestamp();
+        IF p_mode = 'offset' THEN
+            SELECT COUNT(*) INTO v_rows FROM (
+                SELECT i.id, c.name
+                FROM invoices i
+                JOIN customers c ON c.id = i.customer_id
+                WHERE i.tenant_id = v_tenant_id AND (p_status IS NULL OR i.status = p_status)
+                ORDER BY i.created_at DESC, i.id DESC
+                LIMIT 50 OFFSET v_depth
+            ) r;
+        ELSE
+            SELECT COUNT(*) INTO v_rows
+            FROM list_invoices(p_status => p_status,
+                               p_after_created_at => v_after_created_at,
+                               p_after_id => v_after_id);
+        END IF;
+        INSERT INTO bench_results
+        VALUES (v_count, p_mode, COALESCE(p_status::TEXT, 'all'), v_depth,
+                EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, v_rows);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- RUN: 2 tenants x 2 paging modes x (all, Paid); one warm-up pass
+-- ============================================================================
+
+SELECT pg_temp.bench_list('bench-list-10k', 'keyset', NULL);
+SELECT pg_temp.bench_list('bench-list-200k', 'keyset', NULL);
+TRUNCATE bench_results;
+
+SELECT pg_temp.bench_list(slug, mode, status)
+FROM unnest(ARRAY['bench-list-10k', 'bench-list-200k']) AS slug
+CROSS JOIN unnest(ARRAY['offset', 'keyset']) AS mode
+CROSS JOIN unnest(ARRAY[NULL, 'Paid']::invoice_status[]) AS status;
+
+-- ============================================================================
+-- RESULTS
+-- ============================================================================
+
+SELECT
+    paging_mode,
+    filter,
+    invoice_count,
+    COUNT(*) AS pages,
+    ROUND(percentile_cont(0.5) WITHIN GROUP (ORDER BY ms)::NUMERIC, 2) AS p50_ms,
+    ROUND(percentile_cont(0.95) WITHIN GROUP (ORDER BY ms)::NUMERIC, 2) AS p95_ms,
+    ROUND(MAX(ms), 2) AS max_ms,
+    MIN(row_count) AS min_rows
+FROM bench_results
+GROUP BY paging_mode, filter, invoice_count
+ORDER BY paging_mode, filter, invoice_count;
+
+-- Expected: keyset p95_ms about equal for 10k and 200k invoices and
+-- min_rows = 50; offset p95 grows with invoice_count (it reads every
+-- skipped row)
+
+ROLLBACK;
@@ -0,0 +1,117 @@
+-- Benchmark: Invoice item insert latency, row-level vs statement-level totals trigger
+-- =================================================================================
+-- Measures the multi-row invoice_items insert that InvoiceNew.tsx issues when an
+-- invoice is saved, for 1, 10 and 100-line invoices:
+--   before - update_invoice_totals() FOR EACH ROW (schema.sql)
+--   after  - update_invoice_totals_stmt() FOR EACH STATEMENT (migration 008)
+--
+-- Run AFTER migration 008 as the table owner (SQL Editor or psql), on a
+-- development database: the trigger swap takes an exclusive lock on
+-- invoice_items until the final ROLLBACK. Nothing is kept.
+--
+--   psql "$DATABASE_URL" -f db/benchmarks/bench_invoice_totals.sql
+
+BEGIN;
+
+-- ============================================================================
+-- SETUP: Scratch tenant and patient
+-- ============================================================================
+
+CREATE TEMP TABLE bench_results (
+    trigger_mode TEXT,
+    lines INTEGER,
+    runs INTEGER,
+    avg_ms NUMERIC,
+    totals_ok BOOLEAN
+) ON COMMIT DROP;
+
+CREATE FUNCTION pg_temp.bench_invoice_insert(p_mode TEXT, p_lines INTEGER, p_runs INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_tenant_id UUID;
+    v_customer_id UUID;
+    v_invoice_id UUID;
+    v_started TIMESTAMPTZ;
+    v_elapsed INTERVAL := INTERVAL '0';
+    v_ok BOOLEAN := true;
+BEGIN
+    SELECT id INTO v_tenant_id FROM tenants WHERE slug = 'bench-totals';
+    SELECT id INTO v_customer_id FROM customers WHERE tenant_id = v_tenant_id LIMIT 1;
+
+    FOR i IN 1..p_runs LOOP
+        INSERT INTO invoices (tenant_id, customer_id)
+        VALUES (v_tenant_id, v_customer_id)
+        RETURNING id INTO v_invoice_id;
+
+        -- Same shape as the app: every line in one INSERT statement
+        v_started := clock_timestamp();
+        INSERT INTO invoice_items (
+            tenant_id, invoice_id, line_order, description,
+            quantity, unit_price, vat_rate, vat_amount, line_total, line_total_incl_vat
+        )
+        SELECT
+            v_tenant_id, v_invoice_id, g, 'Benchmark line ' || g,
+            1, 100.00, 15.00, 15.00, 100.00, 115.00
+        FROM generate_series(1, p_lines) AS g;
+        v_elapsed := v_elapsed + (clock_timestamp() - v_started);
+
+        v_ok := v_ok AND (
+            SELECT total_amount = p_lines * 115.00 FROM invoices WHERE id = v_invoice_id
+        );
+    END LOOP;
+
+    INSERT INTO bench_results
+    VALUES (p_mode, p_lines, p_runs, ROUND(EXTRACT(EPOCH FROM v_elapsed) * 1000 / p_runs, 3), v_ok);
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO tenants (name, slug, business_name)
+VALUES ('Benchmark Tenant', 'bench-totals', 'Benchmark Tenant');
+
+INSERT INTO customers (tenant_id, name)
+SELECT id, 'Benchmark Patient' FROM tenants WHERE slug = 'bench-totals';
+
+-- ============================================================================
+-- BEFORE: Row-level trigger (three SUM subqueries + UPDATE per item row)
+-- ============================================================================
+
+ALTER TABLE invoice_items DISABLE TRIGGER trg_invoice_totals_on_item_insert;
+
+CREATE TRIGGER update_invoice_totals_on_item_change
+AFTER INSERT OR UPDATE OR DELETE ON invoice_items
+FOR EACH ROW
+EXECUTE FUNCTION update_invoice_totals();
+
+SELECT pg_temp.bench_invoice_insert('row', 1, 200);
+SELECT pg_temp.bench_invoice_insert('row', 10, 100);
+SELECT pg_temp.bench_invoice_insert('row', 100, 20);
+
+-- ============================================================================
+-- AFTER: Statement-level trigger (one grouped pass + one UPDATE per invoice)
+-- ============================================================================
+
+DROP TRIGGER update_invoice_totals_on_item_change ON invoice_items;
+ALTER TABLE invoice_items ENABLE TRIGGER trg_invoice_totals_on_item_insert;
+
+SELECT pg_temp.bench_invoice_insert('statement', 1, 200);
+SELECT pg_temp.bench_invoice_insert('statement', 10, 100);
+SELECT pg_temp.bench_invoice_insert('statement', 100, 20);
+
+-- ============================================================================
+-- RESULTS
+-- ============================================================================
+
+SELECT
+    b.lines,
+    b.avg_ms AS row_level_ms,
+    a.avg_ms AS statement_level_ms,
+    ROUND(b.avg_ms / NULLIF(a.avg_ms, 0), 1) AS speedup,
+    b.totals_ok AND a.totals_ok AS totals_ok
+FROM bench_results b
+JOIN bench_results a ON a.lines = b.lines AND a.trigger_mode = 'statement'
+WHERE b.trigger_mode = 'row'
+ORDER BY b.lines;
+
+-- Expected: totals_ok = true on every row; the speedup grows with the line count
+
+ROLLBACK;
@@ -0,0 +1,155 @@
+-- Benchmark: Patient search latency, leading-wildcard ILIKE vs trigram RPC
+-- =================================================================================
+-- Loads 100,000 patients into a scratch tenant and times 300 searches
+-- (name fragments, misspelt surnames, cell digits, ID number prefixes):
+--   before - .or(first_name.ilike.%q%,last_name.ilike.%q%,cell.ilike.%q%)
+--   after  - search_tenant_patients() (migration 011)
+-- Target: after p95 under 10 ms.
+--
+-- Run AFTER migration 011 as the table owner (SQL Editor or psql), on a
+-- development database. Everything happens inside one transaction and is
+-- rolled back.
+--
+--   psql "$DATABASE_URL" -f db/benchmarks/bench_patient_search.sql
+
+BEGIN;
+
+-- ============================================================================
+-- SETUP: Scratch tenant with 100k patients
+-- ============================================================================
+
+CREATE TEMP TABLE bench_results (
+    search_mode TEXT,
+    query TEXT,
+    ms NUMERIC,
+    hits INTEGER
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE bench_queries (query TEXT) ON COMMIT DROP;
+
+INSERT INTO tenants (name, slug, business_name)
+VALUES ('Benchmark Tenant', 'bench-search', 'Benchmark Tenant');
+
+INSERT INTO customers (tenant_id, name, first_name, last_name, cell, id_number)
+SELECT
+    t.id,
+    f.name || ' ' || l.name,
+    f.name,
+    l.name,
+    '0' || (60 + g % 25)::TEXT || ' ' || LPAD((g * 7919 % 10000000)::TEXT, 7, '0'),
+    LPAD((g * 104729 % 1000000)::TEXT, 6, '0') || LPAD((g % 10000000)::TEXT, 7, '0')
+FROM tenants t
+CROSS JOIN generate_series(1, 100000) AS g
+CROSS JOIN LATERAL (
+    SELECT (ARRAY['Thabo', 'Lerato', 'Sipho', 'Nomsa', 'Kagiso', 'Palesa', 'Johan', 'Anika',
+                  'Tshepo', 'Zanele', 'Mpho', 'Karabo', 'Naledi', 'Pieter', 'Ayanda', 'Lindiwe'])
+           [1 + g % 16] || CASE WHEN g % 5 = 0 THEN (g % 97)::TEXT ELSE '' END AS name
+) f
+CROSS JOIN LATERAL (
+    SELECT (ARRAY['Mokoena', 'Tebeila', 'Nkosi', 'Dlamini', 'van der Merwe', 'Botha', 'Mahlangu',
+                  'Molefe', 'Khumalo', 'Ndlovu', 'Sithole', 'Pretorius', 'Maluleke', 'Mabena'])
+           [1 + (g / 16) % 14] || (g % 1013)::TEXT AS name
+) l
+WHERE t.slug = 'bench-search';
+
+ANALYZE customers;
+
+-- Mix of what reception types: fragments, typos, digits and ID prefixes
+INSERT INTO bench_queries
+SELECT unnest(ARRAY['mok', 'thabo', 'lerato dla', 'tebei', 'khumalo5', 'merwe', 'zanel',
+                    'mokoenna', 'dlamni', 'preto', 'nd', 'sipho nk']);
+
+INSERT INTO bench_queries
+SELECT SUBSTRING(search_cell FROM 4 FOR 5) FROM customers
+WHERE tenant_id = (SELECT id FROM tenants WHERE slug = 'bench-search')
+ORDER BY random() LIMIT 150;
+
+INSERT INTO bench_queries
+SELECT LEFT(id_number, 8) FROM customers
+WHERE tenant_id = (SELECT id FROM tenants WHERE slug = 'bench-search')
+ORDER BY random() LIMIT 138;
+
+CREATE FUNCTION pg_temp.bench_search(p_mode TEXT)
+RETURNS VOID AS $$
+DECLARE
+    v_tenant_id UUID;
+    v_query TEXT;
+    v_started TIMESTAMPTZ;
+    v_hits INTEGER;
+BEGIN
+    SELECT id INTO v_tenant_id FROM tenants WHERE slug = 'bench-search';
+
+    FOR v_query IN SELECT query FROM bench_queries LOOP
+        v_started := clock_timestamp();
+        IF p_mode = 'ilike' THEN
+            -- Same filter PostgREST builds from the old .or(...ilike...) call
+            SELECT COUNT(*) INTO v_hits FROM (
+                SELECT id FROM customers
+                WHERE tenant_id = v_tenant_id
+                  AND is_active = true
+                  AND (first_name ILIKE '%' || v_query || '%'
+                       OR last_name ILIKE '%' || v_query || '%'
+                       OR cell ILIKE '%' || v_query || '%')
+                LIMIT 10
+            ) r;
+        ELSE
+            SELECT COUNT(*) INTO v_hits FROM search_tenant_patients(v_tenant_id, v_query, 10);
+        END IF;
+        INSERT INTO bench_results
+        VALUES (p_mode, v_query, EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000, v_hits);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- BEFORE / AFTER (one warm-up pass each)
+-- ============================================================================
+
+SELECT pg_temp.bench_search('ilike');
+SELECT pg_temp.bench_search('trigram');
+TRUNCATE bench_results;
+
+SELECT pg_temp.bench_search('ilike');
+SELECT pg_temp.bench_search('trigram');
+
+-- ============================================================================
+-- RESULTS
+-- ============================================================================
+
+SELECT
+    search_mode,
+    COUNT(*) AS searches,
+    ROUND(percentile_cont(0.5) WITHIN GROUP (ORDER BY ms)::NUMERIC, 2) AS p50_ms,
+    ROUND(percentile_cont(0.95) WITHIN GROUP (ORDER BY ms)::NUMERIC, 2) AS p95_ms,
+    ROUND(MAX(ms), 2) AS max_ms,
+    ROUND(AVG(hits), 1) AS avg_hits
+FROM bench_results
+GROUP BY search_mode
+ORDER BY search_mode;
+
+-- Slowest trigram searches, to see which query shapes dominate the tail
+SELECT query, ROUND(ms, 2) AS ms, hits
+FROM bench_results
+WHERE search_mode = 'trigram'
+ORDER BY ms DESC
+LIMIT 10;
+
+-- Plan of the RPC's query for a typical fragment: expect a BitmapOr over
+-- idx_customers_search_name_trgm and
+-- idx_customers_id_number_prefix, no Seq Scan on customers
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT c.*
+FROM customers c
+WHERE c.tenant_id = (SELECT id FROM tenants WHERE slug = 'bench-search')
+  AND c.is_active
+  AND (
+    c.search_name LIKE '%mok%'
+    OR 'mok' <% c.search_name
+    OR c.id_number LIKE 'mok%'
+  )
+ORDER BY word_similarity('mok', c.search_name) DESC, c.search_name
+LIMIT 10;
+
+-- Expected: trigram p95_ms < 10; ilike p95 grows linearly with patient count
+
+ROLLBACK;
@@ -0,0 +1,168 @@
+-- Benchmark: Per-query RLS overhead, profile-lookup helpers vs JWT-claim initplans
+-- =================================================================================
+-- Builds on the tenant-isolation setup of db/test-rls.sql: two tenants, one
+-- signed-in owner, and an invoice-shaped table with half of its rows in each
+-- tenant. Each query runs as the authenticated role with the owner's JWT
+-- claims, on 10k, 100k and 1M rows, under three versions of the invoices
+-- SELECT policy:
+--   floor  - tenant_id = '<literal uuid>'          (cost of the filter alone)
+--   before - tenant_id = legacy_tenant_id()        (policies.sql before migration 012)
+--   after  - tenant_id = (SELECT get_user_tenant_id())   (migration 012)
+-- overhead_ms = mode - floor.
+--
+-- Run AFTER migration 012 as postgres (psql; the 1M-row load takes a while),
+-- on a development database. Everything is rolled back.
+--
+--   psql "$DATABASE_URL" -f db/benchmarks/bench_rls_overhead.sql
+
+BEGIN;
+
+-- ============================================================================
+-- SETUP: Tenants, signed-in owner, scratch schema
+-- ============================================================================
+
+CREATE SCHEMA bench;
+GRANT USAGE ON SCHEMA bench TO authenticated;
+
+CREATE TABLE bench.results (
+    table_rows INTEGER,
+    policy_mode TEXT,
+    query TEXT,
+    runs INTEGER,
+    avg_ms NUMERIC,
+    result BIGINT
+);
+GRANT INSERT ON bench.results TO authenticated;
+
+-- Same shape and filter columns as invoices, without the triggers
+CREATE TABLE bench.invoices (
+    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    tenant_id UUID NOT NULL,
+    status invoice_status NOT NULL,
+    total_amount NUMERIC(10,2) NOT NULL
+);
+ALTER TABLE bench.invoices ENABLE ROW LEVEL SECURITY;
+GRANT SELECT ON bench.invoices TO authenticated;
+
+INSERT INTO tenants (name, slug, business_name)
+VALUES ('RLS Bench A', 'bench-rls-a', 'RLS Bench A'),
+       ('RLS Bench B', 'bench-rls-b', 'RLS Bench B');
+
+INSERT INTO auth.users (id, aud, role, email)
+VALUES ('00000000-0000-4000-8000-00000000b0b0', 'authenticated', 'authenticated', 'bench-rls@example.com');
+
+INSERT INTO user_profiles (id, tenant_id, full_name, role, email)
+SELECT '00000000-0000-4000-8000-00000000b0b0', id, 'RLS Bench Owner', 'owner', 'bench-rls@example.com'
+FROM tenants WHERE slug = 'bench-rls-a';
+
+-- The pre-012 helper, verbatim: one user_profiles lookup per call
+CREATE FUNCTION bench.legacy_tenant_id()
+RETURNS UUID AS $$
+BEGIN
+    RETURN (
+        SELECT tenant_id
+        FROM public.user_profiles
+        WHERE id = auth.uid()
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER STABLE;
+GRANT EXECUTE ON FUNCTION bench.legacy_tenant_id() TO authenticated;
+
+-- Run each query p_runs times as the signed-in owner
+CREATE FUNCTION bench.time_queries(p_rows INTEGER, p_mode TEXT, p_runs INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_query TEXT;
+    v_started TIMESTAMPTZ;
+    v_elapsed INTERVAL;
+    v_result BIGINT;
+BEGIN
+    FOREACH v_query IN ARRAY ARRAY[
+        'SELECT COUNT(*) FROM bench.invoices',
+        'SELECT COUNT(*) FROM bench.invoices WHERE status = ''Paid''',
+        'SELECT SUM(total_amount)::BIGINT FROM bench.invoices WHERE total_amount > 500'
+    ] LOOP
+        v_elapsed := INTERVAL '0';
+        FOR i IN 1..p_runs LOOP
+            v_started := clock_timestamp();
+            EXECUTE v_query INTO v_result;
+            v_elapsed := v_elapsed + (clock_timestamp() - v_started);
+        END LOOP;
+        INSERT INTO bench.results
+        VALUES (p_rows, p_mode, v_query, p_runs,
+                ROUND(EXTRACT(EPOCH FROM v_elapsed) * 1000 / p_runs, 3), v_result);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+GRANT EXECUTE ON FUNCTION bench.time_queries(INTEGER, TEXT, INTEGER) TO authenticated;
+
+-- Claims as issued by auth.custom_access_token_hook
+SELECT set_config('request.jwt.claims', json_build_object(
+    'sub', '00000000-0000-4000-8000-00000000b0b0',
+    'role', 'authenticated',
+    'tenant_id', (SELECT id FROM tenants WHERE slug = 'bench-rls-a'),
+    'user_role', 'owner'
+)::text, true);
+
+-- ============================================================================
+-- RUN: 3 table sizes x 3 policy modes
+-- ============================================================================
+
+DO $$
+DECLARE
+    v_tenant_a UUID := (SELECT id FROM tenants WHERE slug = 'bench-rls-a');
+    v_tenant_b UUID := (SELECT id FROM tenants WHERE slug = 'bench-rls-b');
+    v_rows INTEGER;
+    v_mode TEXT;
+BEGIN
+    FOREACH v_rows IN ARRAY ARRAY[10000, 100000, 1000000] LOOP
+        TRUNCATE bench.invoices;
+        INSERT INTO bench.invoices (tenant_id, status, total_amount)
+        SELECT
+            CASE WHEN g % 2 = 0 THEN v_tenant_a ELSE v_tenant_b END,
+            (ARRAY['Draft', 'Finalized', 'Paid', 'Void']::invoice_status[])[1 + g % 4],
+            (g % 1000) + 0.50
+        FROM generate_series(1, v_rows) AS g;
+        ANALYZE bench.invoices;
+
+        FOREACH v_mode IN ARRAY ARRAY['floor', 'before', 'after'] LOOP
+            DROP POLICY IF EXISTS bench_read ON bench.invoices;
+            EXECUTE format('CREATE POLICY bench_read ON bench.invoices FOR SELECT USING (%s)',
+                CASE v_mode
+                    WHEN 'floor' THEN format('tenant_id = %L::uuid', v_tenant_a)
+                    WHEN 'before' THEN 'tenant_id = bench.legacy_tenant_id()'
+                    ELSE 'tenant_id = (SELECT get_user_tenant_id())'
+                END);
+
+            SET LOCAL ROLE authenticated;
+            -- warm-up, then measured runs (fewer on the big table)
+            PERFORM bench.time_queries(v_rows, 'warmup', 1);
+            PERFORM bench.time_queries(v_rows, v_mode, CASE WHEN v_rows >= 1000000 THEN 3 ELSE 10 END);
+            RESET ROLE;
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- ============================================================================
+-- RESULTS
+-- ============================================================================
+
+SELECT
+    r.table_rows,
+    r.query,
+    f.avg_ms AS floor_ms,
+    b.avg_ms AS before_ms,
+    r.avg_ms AS after_ms,
+    ROUND(b.avg_ms - f.avg_ms, 3) AS before_overhead_ms,
+    ROUND(r.avg_ms - f.avg_ms, 3) AS after_overhead_ms,
+    f.result = b.result AND b.result = r.result AS same_result
+FROM bench.results r
+JOIN bench.results f ON f.table_rows = r.table_rows AND f.query = r.query AND f.policy_mode = 'floor'
+JOIN bench.results b ON b.table_rows = r.table_rows AND b.query = r.query AND b.policy_mode = 'before'
+WHERE r.policy_mode = 'after'
+ORDER BY r.table_rows, r.query;
+
+-- Expected: same_result = true everywhere; before_overhead_ms grows with
+-- table_rows (one helper call per row), after_overhead_ms stays near 0
+
+ROLLBACK;
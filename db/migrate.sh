@@ -3,7 +3,12 @@
 # Database Migration Script - Dr.Tebeila Dental Studio
 # =====================================================
 # Applies schema, policies, and seed data to Supabase PostgreSQL
-# Usage: ./db/migrate.sh
+# Usage: ./db/migrate.sh [migrate.py options]
+#
+# With DATABASE_URL set (and psycopg installed) this hands over to
+# db/tools/migrate.py, which also applies db/migrations/ and db/views/ and
+# records what has been applied. Otherwise it falls back to the REST API /
+# Supabase CLI / manual steps below.
 
 set -e  # Exit on error
 
@@ -26,6 +31,14 @@ else
     exit 1
 fi
 
+# Prefer the versioned runner (schema_migrations ledger, all migrations and
+# views) when a direct database connection is configured
+if [ -n "$DATABASE_URL" ] && command -v python3 &> /dev/null \
+    && python3 -c "import psycopg" &> /dev/null; then
+    echo -e "${GREEN}✓${NC} DATABASE_URL set - using db/tools/migrate.py"
+    exec python3 "$SCRIPT_DIR/tools/migrate.py" "$@"
+fi
+
 # Check required environment variables
 if [ -z "$VITE_SUPABASE_URL" ] || [ -z "$SUPABASE_SERVICE_ROLE_KEY" ]; then
     echo -e "${RED}✗${NC} Missing required environment variables:"
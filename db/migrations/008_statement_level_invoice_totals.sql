@@ -0,0 +1,142 @@
+-- Migration: 008 - Statement-level invoice totals trigger
+-- Purpose: Recalculate invoice totals once per statement instead of once per item row
+-- Date: 2026-10-17
+--
+-- update_invoice_totals() fires FOR EACH ROW on invoice_items and runs three
+-- SUM subqueries plus an UPDATE invoices per item. Saving a 10-line invoice
+-- (one multi-row insert from InvoiceNew.tsx) cost 30 aggregate scans and 10
+-- updates of the same invoice row (10 dead tuples). The replacement reads the
+-- statement's transition tables, aggregates each affected invoice in a single
+-- grouped pass and updates each invoice at most once per statement.
+--
+-- Benchmark: db/benchmarks/bench_invoice_totals.sql
+
+-- ============================================================================
+-- Function: Recalculate totals for a set of invoices in one pass
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.refresh_invoice_totals(p_invoice_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+  UPDATE public.invoices AS i
+  SET
+    subtotal = t.subtotal,
+    total_vat = t.total_vat,
+    total_amount = t.total_amount
+  FROM (
+    SELECT
+      ids.invoice_id,
+      COALESCE(SUM(ii.line_total), 0.00) AS subtotal,
+      COALESCE(SUM(ii.vat_amount), 0.00) AS total_vat,
+      COALESCE(SUM(ii.line_total_incl_vat), 0.00) AS total_amount
+    FROM unnest(p_invoice_ids) AS ids(invoice_id)
+    LEFT JOIN public.invoice_items ii ON ii.invoice_id = ids.invoice_id
+    GROUP BY ids.invoice_id
+  ) AS t
+  WHERE i.id = t.invoice_id
+    -- Skip no-op updates (no dead tuple, no updated_at bump)
+    AND (i.subtotal, i.total_vat, i.total_amount)
+        IS DISTINCT FROM (t.subtotal, t.total_vat, t.total_amount);
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.refresh_invoice_totals(UUID[]) IS
+'Recalculates subtotal, total_vat and total_amount for the given invoices in one grouped pass';
+
+-- ============================================================================
+-- Function: Statement-level trigger body
+-- ============================================================================
+
+-- PostgreSQL only allows transition tables on single-event triggers, so one
+-- function serves three triggers and picks the tables it was given by TG_OP.
+CREATE OR REPLACE FUNCTION public.update_invoice_totals_stmt()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM public.refresh_invoice_totals(ARRAY(
+      SELECT DISTINCT invoice_id FROM new_items
+    ));
+  ELSIF TG_OP = 'UPDATE' THEN
+    -- An item moved to another invoice changes both invoices
+    PERFORM public.refresh_invoice_totals(ARRAY(
+      SELECT invoice_id FROM old_items
+      UNION
+      SELECT invoice_id FROM new_items
+    ));
+  ELSE
+    PERFORM public.refresh_invoice_totals(ARRAY(
+      SELECT DISTINCT invoice_id FROM old_items
+    ));
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.update_invoice_totals_stmt() IS
+'Statement-level replacement for update_invoice_totals(): one totals update per affected invoice per statement';
+
+-- ============================================================================
+-- Triggers: Replace the row-level totals trigger
+-- ============================================================================
+
+DROP TRIGGER IF EXISTS update_invoice_totals_on_item_change ON public.invoice_items;
+
+DROP TRIGGER IF EXISTS trg_invoice_totals_on_item_insert ON public.invoice_items;
+CREATE TRIGGER trg_invoice_totals_on_item_insert
+  AFTER INSERT ON public.invoice_items
+  REFERENCING NEW TABLE AS new_items
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.update_invoice_totals_stmt();
+
+DROP TRIGGER IF EXISTS trg_invoice_totals_on_item_update ON public.invoice_items;
+CREATE TRIGGER trg_invoice_totals_on_item_update
+  AFTER UPDATE ON public.invoice_items
+  REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.update_invoice_totals_stmt();
+
+DROP TRIGGER IF EXISTS trg_invoice_totals_on_item_delete ON public.invoice_items;
+CREATE TRIGGER trg_invoice_totals_on_item_delete
+  AFTER DELETE ON public.invoice_items
+  REFERENCING OLD TABLE AS old_items
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.update_invoice_totals_stmt();
+
+COMMENT ON TRIGGER trg_invoice_totals_on_item_insert ON public.invoice_items IS
+'Recalculates invoice totals once per INSERT statement';
+COMMENT ON TRIGGER trg_invoice_totals_on_item_update ON public.invoice_items IS
+'Recalculates invoice totals once per UPDATE statement';
+COMMENT ON TRIGGER trg_invoice_totals_on_item_delete ON public.invoice_items IS
+'Recalculates invoice totals once per DELETE statement';
+
+-- update_invoice_totals() is kept: the rollback below and the benchmark's
+-- "before" run use it.
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Verify statement-level triggers exist (tgtype bit 0 = 0 means FOR EACH STATEMENT)
+-- SELECT tgname, tgtype & 1 = 0 AS per_statement FROM pg_trigger
+-- WHERE tgrelid = 'public.invoice_items'::regclass AND tgname LIKE 'trg_invoice_totals%';
+
+-- Test 2: Verify stored totals match item sums (expect 0 rows)
+-- SELECT i.id, i.total_amount, SUM(ii.line_total_incl_vat)
+-- FROM invoices i LEFT JOIN invoice_items ii ON ii.invoice_id = i.id
+-- GROUP BY i.id, i.total_amount
+-- HAVING i.total_amount IS DISTINCT FROM COALESCE(SUM(ii.line_total_incl_vat), 0.00);
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP TRIGGER IF EXISTS trg_invoice_totals_on_item_insert ON public.invoice_items;
+-- DROP TRIGGER IF EXISTS trg_invoice_totals_on_item_update ON public.invoice_items;
+-- DROP TRIGGER IF EXISTS trg_invoice_totals_on_item_delete ON public.invoice_items;
+-- DROP FUNCTION IF EXISTS public.update_invoice_totals_stmt();
+-- DROP FUNCTION IF EXISTS public.refresh_invoice_totals(UUID[]);
+-- CREATE TRIGGER update_invoice_totals_on_item_change
+--   AFTER INSERT OR UPDATE OR DELETE ON public.invoice_items
+--   FOR EACH ROW
+--   EXECUTE FUNCTION update_invoice_totals();
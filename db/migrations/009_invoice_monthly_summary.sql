@@ -0,0 +1,239 @@
+-- Migration: 009 - Incrementally maintained monthly invoice summary
+-- Purpose: Replace the full-table GROUP BY behind vw_invoice_summary with a rollup table
+-- Date: 2026-10-17
+--
+-- vw_invoice_summary (migration 007) aggregates the whole invoices table on
+-- every dashboard load, so report latency grows with invoice history. This
+-- migration keeps a physical rollup keyed by (tenant_id, month, status) that
+-- triggers on invoices update by delta. Its size grows with months, not
+-- invoices.
+
+-- ============================================================================
+-- 1. ROLLUP TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.invoice_monthly_summary (
+  tenant_id UUID NOT NULL REFERENCES public.tenants(id) ON DELETE CASCADE,
+  month DATE NOT NULL, -- first day of the month
+  status invoice_status NOT NULL,
+  invoice_count INTEGER NOT NULL DEFAULT 0,
+  total_amount NUMERIC(14,2) NOT NULL DEFAULT 0.00,
+  total_paid NUMERIC(14,2) NOT NULL DEFAULT 0.00,
+  outstanding NUMERIC(14,2) NOT NULL DEFAULT 0.00,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (tenant_id, month, status)
+);
+
+COMMENT ON TABLE public.invoice_monthly_summary IS
+'Monthly invoice totals per tenant and status, maintained by trg_invoice_monthly_summary';
+
+ALTER TABLE public.invoice_monthly_summary ENABLE ROW LEVEL SECURITY;
+
+-- Read-only for users; rows are written by the SECURITY DEFINER functions below
+DROP POLICY IF EXISTS "Users can read tenant invoice summary" ON public.invoice_monthly_summary;
+CREATE POLICY "Users can read tenant invoice summary"
+ON public.invoice_monthly_summary FOR SELECT
+USING (tenant_id = get_user_tenant_id());
+
+GRANT SELECT ON public.invoice_monthly_summary TO authenticated;
+
+-- ============================================================================
+-- 2. DELTA MAINTENANCE
+-- ============================================================================
+
+-- Add (or with negative values, remove) one invoice's contribution.
+-- Invoices without an invoice_date or status are not reportable and skipped.
+CREATE OR REPLACE FUNCTION public.apply_invoice_summary_delta(
+  p_tenant_id UUID,
+  p_invoice_date DATE,
+  p_status invoice_status,
+  p_count INTEGER,
+  p_total NUMERIC,
+  p_paid NUMERIC
+)
+RETURNS VOID AS $$
+DECLARE
+  v_month DATE;
+BEGIN
+  IF p_tenant_id IS NULL OR p_invoice_date IS NULL OR p_status IS NULL THEN
+    RETURN;
+  END IF;
+
+  v_month := DATE_TRUNC('month', p_invoice_date)::DATE;
+
+  INSERT INTO public.invoice_monthly_summary AS s
+    (tenant_id, month, status, invoice_count, total_amount, total_paid, outstanding)
+  VALUES
+    (p_tenant_id, v_month, p_status, p_count, p_total, p_paid, p_total - p_paid)
+  ON CONFLICT (tenant_id, month, status) DO UPDATE SET
+    invoice_count = s.invoice_count + EXCLUDED.invoice_count,
+    total_amount = s.total_amount + EXCLUDED.total_amount,
+    total_paid = s.total_paid + EXCLUDED.total_paid,
+    outstanding = s.outstanding + EXCLUDED.outstanding,
+    updated_at = NOW();
+
+  -- Drop buckets that no longer hold any invoice
+  IF p_count < 0 THEN
+    DELETE FROM public.invoice_monthly_summary
+    WHERE tenant_id = p_tenant_id
+      AND month = v_month
+      AND status = p_status
+      AND invoice_count <= 0;
+  END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Writes any tenant's rollup: callable only from the trigger below, never
+-- through /rpc
+REVOKE EXECUTE ON FUNCTION public.apply_invoice_summary_delta(UUID, DATE, invoice_status, INTEGER, NUMERIC, NUMERIC)
+  FROM PUBLIC, anon, authenticated;
+
+CREATE OR REPLACE FUNCTION public.maintain_invoice_monthly_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.apply_invoice_summary_delta(
+      OLD.tenant_id, OLD.invoice_date, OLD.status,
+      -1, -COALESCE(OLD.total_amount, 0.00), -COALESCE(OLD.amount_paid, 0.00)
+    );
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.apply_invoice_summary_delta(
+      NEW.tenant_id, NEW.invoice_date, NEW.status,
+      1, COALESCE(NEW.total_amount, 0.00), COALESCE(NEW.amount_paid, 0.00)
+    );
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.maintain_invoice_monthly_summary() IS
+'Moves an invoice''s contribution between invoice_monthly_summary buckets as it changes';
+
+DROP TRIGGER IF EXISTS trg_invoice_monthly_summary_insert ON public.invoices;
+CREATE TRIGGER trg_invoice_monthly_summary_insert
+  AFTER INSERT OR DELETE ON public.invoices
+  FOR EACH ROW
+  EXECUTE FUNCTION public.maintain_invoice_monthly_summary();
+
+-- Only fire when a reported column actually changes (not on notes, updated_at, ...)
+DROP TRIGGER IF EXISTS trg_invoice_monthly_summary_update ON public.invoices;
+CREATE TRIGGER trg_invoice_monthly_summary_update
+  AFTER UPDATE ON public.invoices
+  FOR EACH ROW
+  WHEN (
+    OLD.tenant_id IS DISTINCT FROM NEW.tenant_id OR
+    OLD.invoice_date IS DISTINCT FROM NEW.invoice_date OR
+    OLD.status IS DISTINCT FROM NEW.status OR
+    OLD.total_amount IS DISTINCT FROM NEW.total_amount OR
+    OLD.amount_paid IS DISTINCT FROM NEW.amount_paid
+  )
+  EXECUTE FUNCTION public.maintain_invoice_monthly_summary();
+
+-- ============================================================================
+-- 3. REBUILD (repairs drift, e.g. after bulk loads with triggers disabled)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.rebuild_invoice_monthly_summary(p_tenant_id UUID DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  -- Hold off concurrent deltas so none land between the delete and the insert
+  LOCK TABLE public.invoice_monthly_summary IN EXCLUSIVE MODE;
+
+  DELETE FROM public.invoice_monthly_summary
+  WHERE p_tenant_id IS NULL OR tenant_id = p_tenant_id;
+
+  INSERT INTO public.invoice_monthly_summary
+    (tenant_id, month, status, invoice_count, total_amount, total_paid, outstanding)
+  SELECT
+    tenant_id,
+    DATE_TRUNC('month', invoice_date)::DATE,
+    status,
+    COUNT(*),
+    SUM(COALESCE(total_amount, 0.00)),
+    SUM(COALESCE(amount_paid, 0.00)),
+    SUM(COALESCE(total_amount, 0.00) - COALESCE(amount_paid, 0.00))
+  FROM public.invoices
+  WHERE (p_tenant_id IS NULL OR tenant_id = p_tenant_id)
+    AND invoice_date IS NOT NULL
+    AND status IS NOT NULL
+  GROUP BY 1, 2, 3;
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.rebuild_invoice_monthly_summary(UUID) IS
+'Recomputes invoice_monthly_summary from invoices (all tenants, or one); returns the number of buckets';
+
+REVOKE EXECUTE ON FUNCTION public.rebuild_invoice_monthly_summary(UUID) FROM PUBLIC, anon, authenticated;
+
+-- Backfill from existing invoices
+SELECT public.rebuild_invoice_monthly_summary();
+
+-- ============================================================================
+-- 4. REPORTING VIEWS (read the rollup, not invoices)
+-- ============================================================================
+
+-- Same columns as before, so existing readers keep working. security_invoker
+-- applies the caller's RLS (the 007 view ran with its owner's rights).
+DROP VIEW IF EXISTS public.vw_invoice_summary;
+CREATE VIEW public.vw_invoice_summary WITH (security_invoker = true) AS
+SELECT tenant_id, month, status, invoice_count, total_amount, total_paid, outstanding
+FROM public.invoice_monthly_summary;
+
+COMMENT ON VIEW public.vw_invoice_summary IS 'Monthly invoice summary per tenant for financial reporting (reads invoice_monthly_summary)';
+
+-- All-time totals per status: one row per status for the dashboard cards
+CREATE OR REPLACE VIEW public.vw_invoice_status_totals WITH (security_invoker = true) AS
+SELECT
+  tenant_id,
+  status,
+  SUM(invoice_count)::INTEGER AS invoice_count,
+  SUM(total_amount) AS total_amount,
+  SUM(total_paid) AS total_paid,
+  SUM(outstanding) AS outstanding
+FROM public.invoice_monthly_summary
+GROUP BY tenant_id, status;
+
+COMMENT ON VIEW public.vw_invoice_status_totals IS 'All-time invoice totals per tenant and status (reads invoice_monthly_summary)';
+
+GRANT SELECT ON public.vw_invoice_summary TO authenticated;
+GRANT SELECT ON public.vw_invoice_status_totals TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Rollup matches a full aggregation (expect 0 rows; if not, run the rebuild)
+-- SELECT * FROM (
+--   SELECT tenant_id, DATE_TRUNC('month', invoice_date)::DATE AS month, status,
+--          COUNT(*)::INTEGER AS invoice_count, SUM(COALESCE(total_amount, 0.00)) AS total_amount,
+--          SUM(COALESCE(amount_paid, 0.00)) AS total_paid
+--   FROM invoices WHERE invoice_date IS NOT NULL AND status IS NOT NULL GROUP BY 1, 2, 3
+-- ) f
+-- FULL JOIN invoice_monthly_summary s USING (tenant_id, month, status)
+-- WHERE (f.invoice_count, f.total_amount, f.total_paid)
+--       IS DISTINCT FROM (s.invoice_count, s.total_amount, s.total_paid);
+
+-- Test 2: Repair drift
+-- SELECT public.rebuild_invoice_monthly_summary();
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP VIEW IF EXISTS public.vw_invoice_status_totals;
+-- DROP VIEW IF EXISTS public.vw_invoice_summary;
+-- (then re-run the vw_invoice_summary definition from migration 007)
+-- DROP TRIGGER IF EXISTS trg_invoice_monthly_summary_insert ON public.invoices;
+-- DROP TRIGGER IF EXISTS trg_invoice_monthly_summary_update ON public.invoices;
+-- DROP FUNCTION IF EXISTS public.maintain_invoice_monthly_summary();
+-- DROP FUNCTION IF EXISTS public.apply_invoice_summary_delta(UUID, DATE, invoice_status, INTEGER, NUMERIC, NUMERIC);
+-- DROP FUNCTION IF EXISTS public.rebuild_invoice_monthly_summary(UUID);
+-- DROP TABLE IF EXISTS public.invoice_monthly_summary;
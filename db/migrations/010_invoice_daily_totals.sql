@@ -0,0 +1,292 @@
+-- Migration: 010 - Delta-maintained daily payment timeline
+-- Purpose: Serve vw_payment_timeline and date-range charts from a per-day rollup
+-- Date: 2026-10-17
+--
+-- vw_payment_timeline (db/views) grouped every invoice of every tenant and
+-- sorted the result on each read, so a "last 30 days" chart paid for the full
+-- history. invoice_daily_totals keeps one row per tenant and day, updated by
+-- delta from invoice triggers. get_payment_timeline() reads a date range of it
+-- with an index-only scan of the primary key.
+--
+-- Existing history is backfilled by this migration (section 4) before the
+-- view is repointed, as 009 does for the monthly summary.
+-- backfill_invoice_daily_totals() rebuilds it again later in short,
+-- separately committed chunks (psql, outside a transaction block, as the
+-- table owner):
+--   CALL public.backfill_invoice_daily_totals();
+
+-- ============================================================================
+-- 1. ROLLUP TABLE
+-- ============================================================================
+
+-- The INCLUDE columns let range reads be answered from the index alone.
+-- Aggressive autovacuum keeps the visibility map current for that.
+CREATE TABLE IF NOT EXISTS public.invoice_daily_totals (
+  tenant_id UUID NOT NULL REFERENCES public.tenants(id) ON DELETE CASCADE,
+  day DATE NOT NULL,
+  invoice_count INTEGER NOT NULL DEFAULT 0,
+  billed NUMERIC(14,2) NOT NULL DEFAULT 0.00,
+  paid NUMERIC(14,2) NOT NULL DEFAULT 0.00,
+  outstanding NUMERIC(14,2) NOT NULL DEFAULT 0.00,
+  CONSTRAINT invoice_daily_totals_pkey
+    PRIMARY KEY (tenant_id, day) INCLUDE (invoice_count, billed, paid, outstanding)
+) WITH (
+  autovacuum_vacuum_scale_factor = 0.01,
+  autovacuum_vacuum_insert_scale_factor = 0.01
+);
+
+COMMENT ON TABLE public.invoice_daily_totals IS
+'Billed, paid and outstanding per tenant and invoice day, maintained by trg_invoice_daily_totals';
+
+ALTER TABLE public.invoice_daily_totals ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can read tenant daily totals" ON public.invoice_daily_totals;
+CREATE POLICY "Users can read tenant daily totals"
+ON public.invoice_daily_totals FOR SELECT
+USING (tenant_id = get_user_tenant_id());
+
+GRANT SELECT ON public.invoice_daily_totals TO authenticated;
+
+-- ============================================================================
+-- 2. DELTA MAINTENANCE
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.apply_invoice_daily_delta(
+  p_tenant_id UUID,
+  p_day DATE,
+  p_count INTEGER,
+  p_billed NUMERIC,
+  p_paid NUMERIC
+)
+RETURNS VOID AS $$
+BEGIN
+  IF p_tenant_id IS NULL OR p_day IS NULL THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO public.invoice_daily_totals AS d
+    (tenant_id, day, invoice_count, billed, paid, outstanding)
+  VALUES
+    (p_tenant_id, p_day, p_count, p_billed, p_paid, p_billed - p_paid)
+  ON CONFLICT (tenant_id, day) DO UPDATE SET
+    invoice_count = d.invoice_count + EXCLUDED.invoice_count,
+    billed = d.billed + EXCLUDED.billed,
+    paid = d.paid + EXCLUDED.paid,
+    outstanding = d.outstanding + EXCLUDED.outstanding;
+
+  IF p_count < 0 THEN
+    DELETE FROM public.invoice_daily_totals
+    WHERE tenant_id = p_tenant_id
+      AND day = p_day
+      AND invoice_count <= 0;
+  END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Writes any tenant's rollup: callable only from the trigger below, never
+-- through /rpc
+REVOKE EXECUTE ON FUNCTION public.apply_invoice_daily_delta(UUID, DATE, INTEGER, NUMERIC, NUMERIC)
+  FROM PUBLIC, anon, authenticated;
+
+CREATE OR REPLACE FUNCTION public.maintain_invoice_daily_totals()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.apply_invoice_daily_delta(
+      OLD.tenant_id, OLD.invoice_date,
+      -1, -COALESCE(OLD.total_amount, 0.00), -COALESCE(OLD.amount_paid, 0.00)
+    );
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.apply_invoice_daily_delta(
+      NEW.tenant_id, NEW.invoice_date,
+      1, COALESCE(NEW.total_amount, 0.00), COALESCE(NEW.amount_paid, 0.00)
+    );
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.maintain_invoice_daily_totals() IS
+'Moves an invoice''s amounts between invoice_daily_totals days as it changes';
+
+DROP TRIGGER IF EXISTS trg_invoice_daily_totals ON public.invoices;
+CREATE TRIGGER trg_invoice_daily_totals
+  AFTER INSERT OR DELETE ON public.invoices
+  FOR EACH ROW
+  EXECUTE FUNCTION public.maintain_invoice_daily_totals();
+
+-- The timeline ignores status, so status-only changes do not fire this
+DROP TRIGGER IF EXISTS trg_invoice_daily_totals_update ON public.invoices;
+CREATE TRIGGER trg_invoice_daily_totals_update
+  AFTER UPDATE ON public.invoices
+  FOR EACH ROW
+  WHEN (
+    OLD.tenant_id IS DISTINCT FROM NEW.tenant_id OR
+    OLD.invoice_date IS DISTINCT FROM NEW.invoice_date OR
+    OLD.total_amount IS DISTINCT FROM NEW.total_amount OR
+    OLD.amount_paid IS DISTINCT FROM NEW.amount_paid
+  )
+  EXECUTE FUNCTION public.maintain_invoice_daily_totals();
+
+-- ============================================================================
+-- 3. RANGE QUERY RPC
+-- ============================================================================
+
+-- Runs with the caller's rights, so the tenant policy above still applies.
+-- Rows come back in primary key order: no sort step.
+CREATE OR REPLACE FUNCTION public.get_payment_timeline(
+  p_tenant_id UUID,
+  p_from_day DATE,
+  p_to_day DATE
+)
+RETURNS TABLE (
+  day DATE,
+  invoice_count INTEGER,
+  billed NUMERIC,
+  paid NUMERIC,
+  outstanding NUMERIC
+) AS $$
+  SELECT d.day, d.invoice_count, d.billed, d.paid, d.outstanding
+  FROM public.invoice_daily_totals d
+  WHERE d.tenant_id = p_tenant_id
+    AND d.day BETWEEN p_from_day AND p_to_day
+  ORDER BY d.tenant_id, d.day;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION public.get_payment_timeline(UUID, DATE, DATE) IS
+'Daily billed/paid/outstanding for one tenant between two days (inclusive), oldest first';
+
+GRANT EXECUTE ON FUNCTION public.get_payment_timeline(UUID, DATE, DATE) TO authenticated;
+
+-- ============================================================================
+-- 4. REBUILD AND CHUNKED BACKFILL
+-- ============================================================================
+
+-- Recompute one day range. The lock blocks invoice writes that would touch
+-- the rollup only for the length of this call, not the whole backfill.
+CREATE OR REPLACE FUNCTION public.rebuild_invoice_daily_totals(
+  p_tenant_id UUID,
+  p_from_day DATE,
+  p_to_day DATE
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  LOCK TABLE public.invoice_daily_totals IN SHARE ROW EXCLUSIVE MODE;
+
+  DELETE FROM public.invoice_daily_totals
+  WHERE (p_tenant_id IS NULL OR tenant_id = p_tenant_id)
+    AND day BETWEEN p_from_day AND p_to_day;
+
+  INSERT INTO public.invoice_daily_totals
+    (tenant_id, day, invoice_count, billed, paid, outstanding)
+  SELECT
+    tenant_id,
+    invoice_date,
+    COUNT(*),
+    SUM(COALESCE(total_amount, 0.00)),
+    SUM(COALESCE(amount_paid, 0.00)),
+    SUM(COALESCE(total_amount, 0.00) - COALESCE(amount_paid, 0.00))
+  FROM public.invoices
+  WHERE (p_tenant_id IS NULL OR tenant_id = p_tenant_id)
+    AND invoice_date BETWEEN p_from_day AND p_to_day
+  GROUP BY tenant_id, invoice_date;
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.rebuild_invoice_daily_totals(UUID, DATE, DATE) IS
+'Recomputes invoice_daily_totals for a day range (all tenants when p_tenant_id is NULL); returns rows written';
+
+-- Walk the whole history p_chunk_days at a time, committing after each chunk
+-- so locks are short and progress survives an interruption. Procedures with
+-- transaction control cannot be SECURITY DEFINER: run as the table owner.
+CREATE OR REPLACE PROCEDURE public.backfill_invoice_daily_totals(
+  p_tenant_id UUID DEFAULT NULL,
+  p_chunk_days INTEGER DEFAULT 31
+)
+LANGUAGE plpgsql AS $$
+DECLARE
+  v_from DATE;
+  v_last DATE;
+  v_rows INTEGER;
+BEGIN
+  SELECT LEAST(MIN(i.invoice_date), (SELECT MIN(day) FROM public.invoice_daily_totals
+                                      WHERE p_tenant_id IS NULL OR tenant_id = p_tenant_id)),
+         GREATEST(MAX(i.invoice_date), (SELECT MAX(day) FROM public.invoice_daily_totals
+                                         WHERE p_tenant_id IS NULL OR tenant_id = p_tenant_id))
+  INTO v_from, v_last
+  FROM public.invoices i
+  WHERE (p_tenant_id IS NULL OR i.tenant_id = p_tenant_id)
+    AND i.invoice_date IS NOT NULL;
+
+  WHILE v_from <= v_last LOOP
+    v_rows := public.rebuild_invoice_daily_totals(p_tenant_id, v_from, v_from + p_chunk_days - 1);
+    COMMIT;
+    RAISE NOTICE 'invoice_daily_totals: % to % (% rows)', v_from, v_from + p_chunk_days - 1, v_rows;
+    v_from := v_from + p_chunk_days;
+  END LOOP;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.rebuild_invoice_daily_totals(UUID, DATE, DATE) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON PROCEDURE public.backfill_invoice_daily_totals(UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- Backfill from existing invoices, in this migration's transaction, so the
+-- timeline is complete as soon as the view reads the rollup
+SELECT public.rebuild_invoice_daily_totals(NULL, MIN(invoice_date), MAX(invoice_date))
+FROM public.invoices
+WHERE invoice_date IS NOT NULL;
+
+-- ============================================================================
+-- 5. TIMELINE VIEW (reads the rollup; callers order and filter)
+-- ============================================================================
+
+DROP VIEW IF EXISTS public.vw_payment_timeline;
+CREATE VIEW public.vw_payment_timeline WITH (security_invoker = true) AS
+SELECT tenant_id, day, invoice_count, billed, paid, outstanding
+FROM public.invoice_daily_totals;
+
+COMMENT ON VIEW public.vw_payment_timeline IS 'Daily payment trends per tenant for reports dashboard (reads invoice_daily_totals)';
+
+GRANT SELECT ON public.vw_payment_timeline TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Range read uses the primary key without touching the heap
+-- EXPLAIN (ANALYZE, BUFFERS)
+-- SELECT * FROM get_payment_timeline('<tenant-id>', CURRENT_DATE - 30, CURRENT_DATE);
+-- (SQL functions inline; look for "Index Only Scan using invoice_daily_totals_pkey",
+--  "Heap Fetches: 0" once autovacuum has run)
+
+-- Test 2: Rollup matches a full aggregation (expect 0 rows)
+-- SELECT * FROM (
+--   SELECT tenant_id, invoice_date AS day, COUNT(*)::INTEGER AS invoice_count,
+--          SUM(COALESCE(total_amount, 0.00)) AS billed, SUM(COALESCE(amount_paid, 0.00)) AS paid
+--   FROM invoices WHERE invoice_date IS NOT NULL GROUP BY 1, 2
+-- ) f
+-- FULL JOIN invoice_daily_totals d USING (tenant_id, day)
+-- WHERE (f.invoice_count, f.billed, f.paid) IS DISTINCT FROM (d.invoice_count, d.billed, d.paid);
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP VIEW IF EXISTS public.vw_payment_timeline;
+-- (then re-run db/views/vw_payment_timeline.sql from before this migration)
+-- DROP TRIGGER IF EXISTS trg_invoice_daily_totals ON public.invoices;
+-- DROP TRIGGER IF EXISTS trg_invoice_daily_totals_update ON public.invoices;
+-- DROP FUNCTION IF EXISTS public.get_payment_timeline(UUID, DATE, DATE);
+-- DROP PROCEDURE IF EXISTS public.backfill_invoice_daily_totals(UUID, INTEGER);
+-- DROP FUNCTION IF EXISTS public.rebuild_invoice_daily_totals(UUID, DATE, DATE);
+-- DROP FUNCTION IF EXISTS public.maintain_invoice_daily_totals();
+-- DROP FUNCTION IF EXISTS public.apply_invoice_daily_delta(UUID, DATE, INTEGER, NUMERIC, NUMERIC);
+-- DROP TABLE IF EXISTS public.invoice_daily_totals;
@@ -0,0 +1,154 @@
+-- Migration: 011 - Trigram-indexed patient search
+-- Purpose: Ranked search_patients() RPC backed by pg_trgm GIN indexes
+-- Date: 2026-10-17
+--
+-- PatientSearchModal and PatientModal's search mode filtered with
+-- first_name/last_name/cell ILIKE '%q%'. A leading wildcard cannot use the
+-- B-tree indexes from migration 006, so every keystroke scanned all of the
+-- tenant's customers. This migration adds normalised search columns with
+-- (tenant_id, trigram) GIN indexes, prefix matching on id_number, and a
+-- search_patients() RPC that ranks matches by similarity.
+--
+-- Benchmark: db/benchmarks/bench_patient_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin; -- lets tenant_id share a GIN index with trigrams
+
+-- ============================================================================
+-- 1. NORMALISED SEARCH COLUMNS
+-- ============================================================================
+
+-- Set from PatientModal (Gate S5.1); declared here for fresh databases
+ALTER TABLE public.customers
+  ADD COLUMN IF NOT EXISTS id_number TEXT,
+  ADD COLUMN IF NOT EXISTS home_address TEXT;
+
+-- "Thabo Mokoena" -> 'thabo mokoena'; "+27 82 555-0101" -> '27825550101'
+ALTER TABLE public.customers
+  ADD COLUMN IF NOT EXISTS search_name TEXT
+    GENERATED ALWAYS AS (
+      LOWER(TRIM(COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')))
+    ) STORED,
+  ADD COLUMN IF NOT EXISTS search_cell TEXT
+    GENERATED ALWAYS AS (REGEXP_REPLACE(COALESCE(cell, ''), '[^0-9]', '', 'g')) STORED;
+
+COMMENT ON COLUMN public.customers.search_name IS 'Lower-cased "first last" for trigram search';
+COMMENT ON COLUMN public.customers.search_cell IS 'Cell number digits only, for trigram search';
+
+-- ============================================================================
+-- 2. INDEXES
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_customers_search_name_trgm
+  ON public.customers USING GIN (tenant_id, search_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_customers_search_cell_trgm
+  ON public.customers USING GIN (tenant_id, search_cell gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_customers_id_number_prefix
+  ON public.customers (tenant_id, id_number text_pattern_ops)
+  WHERE id_number IS NOT NULL;
+
+COMMENT ON INDEX idx_customers_search_name_trgm IS 'Substring and fuzzy patient name search per tenant';
+COMMENT ON INDEX idx_customers_search_cell_trgm IS 'Substring cell number search per tenant';
+COMMENT ON INDEX idx_customers_id_number_prefix IS 'Prefix search on SA ID number per tenant';
+
+-- ============================================================================
+-- 3. SEARCH FUNCTIONS
+-- ============================================================================
+
+-- Core search for an explicit tenant (used by the RPC and the benchmark).
+-- SECURITY INVOKER: the customers RLS policies still apply to the caller.
+-- Matches, each served by one of the indexes above:
+--   * name contains the query, or the query fuzzily matches a word of it
+--   * cell contains the query's digits (3+ digits)
+--   * id_number starts with the query
+-- Ranked by the best of those; exact id_number prefixes first.
+CREATE OR REPLACE FUNCTION public.search_tenant_patients(
+  p_tenant_id UUID,
+  p_query TEXT,
+  p_limit INTEGER DEFAULT 10,
+  p_active_only BOOLEAN DEFAULT true
+)
+RETURNS SETOF public.customers AS $$
+DECLARE
+  v_term TEXT := LOWER(TRIM(COALESCE(p_query, '')));
+  v_digits TEXT := REGEXP_REPLACE(COALESCE(p_query, ''), '[^0-9]', '', 'g');
+  v_like TEXT;
+BEGIN
+  IF LENGTH(v_term) < 2 THEN
+    RETURN;
+  END IF;
+
+  -- Escape LIKE wildcards typed by the user
+  v_like := REPLACE(REPLACE(REPLACE(v_term, '\', '\\'), '%', '\%'), '_', '\_');
+
+  -- EXECUTE plans with the actual values, so the LIKE patterns can use the
+  -- trigram and prefix indexes instead of a generic plan
+  RETURN QUERY EXECUTE $q$
+    SELECT c.*
+    FROM public.customers c
+    WHERE c.tenant_id = $1
+      AND (NOT $5 OR c.is_active)
+      AND (
+        c.search_name LIKE '%' || $3 || '%'
+        OR $2 <% c.search_name
+        OR (LENGTH($4) >= 3 AND c.search_cell LIKE '%' || $4 || '%')
+        OR c.id_number LIKE $3 || '%'
+      )
+    ORDER BY
+      (c.id_number LIKE $3 || '%') IS TRUE DESC,
+      GREATEST(
+        word_similarity($2, c.search_name),
+        CASE WHEN LENGTH($4) >= 3 THEN similarity($4, c.search_cell) ELSE 0 END
+      ) DESC,
+      c.search_name
+    LIMIT $6
+  $q$
+  USING p_tenant_id, v_term, v_like, v_digits, p_active_only,
+        LEAST(GREATEST(COALESCE(p_limit, 10), 1), 50);
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION public.search_tenant_patients(UUID, TEXT, INTEGER, BOOLEAN) IS
+'Ranked patient search within one tenant by name, cell or ID number prefix (max 50 rows)';
+
+-- RPC for the app: searches the signed-in user's tenant
+CREATE OR REPLACE FUNCTION public.search_patients(
+  q TEXT,
+  result_limit INTEGER DEFAULT 10,
+  active_only BOOLEAN DEFAULT true
+)
+RETURNS SETOF public.customers AS $$
+  SELECT * FROM public.search_tenant_patients(get_user_tenant_id(), q, result_limit, active_only);
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION public.search_patients(TEXT, INTEGER, BOOLEAN) IS
+'Ranked patient search for the current user''s tenant: supabase.rpc(''search_patients'', { q })';
+
+GRANT EXECUTE ON FUNCTION public.search_tenant_patients(UUID, TEXT, INTEGER, BOOLEAN) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.search_patients(TEXT, INTEGER, BOOLEAN) TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Verify indexes exist
+-- SELECT indexname FROM pg_indexes WHERE indexname LIKE 'idx_customers_%trgm' OR indexname = 'idx_customers_id_number_prefix';
+
+-- Test 2: Search returns ranked rows (the plan is shown by the benchmark)
+-- SELECT first_name, last_name, cell FROM search_tenant_patients('<tenant-id>', 'moko');
+
+-- Test 3: As a signed-in user
+-- SELECT first_name, last_name, cell FROM search_patients('thabo');
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP FUNCTION IF EXISTS public.search_patients(TEXT, INTEGER, BOOLEAN);
+-- DROP FUNCTION IF EXISTS public.search_tenant_patients(UUID, TEXT, INTEGER, BOOLEAN);
+-- DROP INDEX IF EXISTS idx_customers_search_name_trgm;
+-- DROP INDEX IF EXISTS idx_customers_search_cell_trgm;
+-- DROP INDEX IF EXISTS idx_customers_id_number_prefix;
+-- ALTER TABLE public.customers DROP COLUMN IF EXISTS search_name, DROP COLUMN IF EXISTS search_cell;
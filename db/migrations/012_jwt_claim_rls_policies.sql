@@ -0,0 +1,390 @@
+-- Migration: 012 - JWT-claim RLS fast path
+-- Purpose: Read tenant_id/user_role from the JWT once per statement in every policy
+-- Date: 2026-10-17
+--
+-- Every policy compared tenant_id with get_user_tenant_id() and most role
+-- checks went through is_admin_or_owner(). Both are plpgsql functions that
+-- query user_profiles by auth.uid(), and as bare expressions in a USING clause
+-- the planner may call them once per candidate row. This migration:
+--   1. Makes get_user_tenant_id()/get_user_role() read the tenant_id and
+--      user_role claims that auth.custom_access_token_hook (db/jwt-config.sql)
+--      puts in the token, falling back to user_profiles for older tokens.
+--   2. Recreates every policy with the helpers wrapped as (SELECT fn()), so
+--      each is evaluated once per statement as an initplan.
+-- db/policies.sql carries the same definitions for fresh installs.
+--
+-- Benchmark: db/benchmarks/bench_rls_overhead.sql
+
+-- ============================================================================
+-- 1. HELPER FUNCTIONS (claims first)
+-- ============================================================================
+
+-- Claims injected by auth.custom_access_token_hook (db/jwt-config.sql)
+-- are read first; user_profiles is only queried for tokens issued before
+-- the hook was enabled. Policies call these as (SELECT fn()) so they run
+-- once per statement as an initplan, not once per row.
+-- Note: a changed role or tenant takes effect at the next token refresh.
+
+-- Get current user's tenant_id from JWT
+CREATE OR REPLACE FUNCTION get_user_tenant_id()
+RETURNS UUID AS $$
+DECLARE
+    v_tenant_id UUID;
+BEGIN
+    v_tenant_id := NULLIF(NULLIF(current_setting('request.jwt.claims', true), '')::jsonb->>'tenant_id', '')::UUID;
+    IF v_tenant_id IS NOT NULL THEN
+        RETURN v_tenant_id;
+    END IF;
+
+    RETURN (
+        SELECT tenant_id
+        FROM user_profiles
+        WHERE id = auth.uid()
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER STABLE SET search_path = public;
+
+-- Get current user's role
+CREATE OR REPLACE FUNCTION get_user_role()
+RETURNS user_role AS $$
+DECLARE
+    v_role user_role;
+BEGIN
+    v_role := NULLIF(NULLIF(current_setting('request.jwt.claims', true), '')::jsonb->>'user_role', '')::user_role;
+    IF v_role IS NOT NULL THEN
+        RETURN v_role;
+    END IF;
+
+    RETURN (
+        SELECT role
+        FROM user_profiles
+        WHERE id = auth.uid()
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER STABLE SET search_path = public;
+
+-- ============================================================================
+-- TENANTS POLICIES
+-- ============================================================================
+
+-- Users can read their own tenant
+DROP POLICY IF EXISTS "Users can read own tenant" ON tenants;
+CREATE POLICY "Users can read own tenant"
+ON tenants FOR SELECT
+USING (id = (SELECT get_user_tenant_id()));
+
+-- Owners can update their tenant
+DROP POLICY IF EXISTS "Owners can update own tenant" ON tenants;
+CREATE POLICY "Owners can update own tenant"
+ON tenants FOR UPDATE
+USING (id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()))
+WITH CHECK (id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()));
+
+-- Note: Tenant creation handled via signup flow (no INSERT policy needed)
+
+-- ============================================================================
+-- USER PROFILES POLICIES
+-- ============================================================================
+
+-- Users can read profiles in their tenant
+DROP POLICY IF EXISTS "Users can read tenant profiles" ON user_profiles;
+CREATE POLICY "Users can read tenant profiles"
+ON user_profiles FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Users can update their own profile (except role and tenant_id)
+DROP POLICY IF EXISTS "Users can update own profile" ON user_profiles;
+CREATE POLICY "Users can update own profile"
+ON user_profiles FOR UPDATE
+USING (id = (SELECT auth.uid()))
+WITH CHECK (
+    id = (SELECT auth.uid()) AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    role = (SELECT role FROM user_profiles WHERE id = (SELECT auth.uid()))
+);
+
+-- Owners can insert new users in their tenant
+DROP POLICY IF EXISTS "Owners can create tenant users" ON user_profiles;
+CREATE POLICY "Owners can create tenant users"
+ON user_profiles FOR INSERT
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()));
+
+-- Owners can update tenant users (including role changes)
+DROP POLICY IF EXISTS "Owners can update tenant users" ON user_profiles;
+CREATE POLICY "Owners can update tenant users"
+ON user_profiles FOR UPDATE
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()));
+
+-- Owners can delete tenant users (except themselves)
+DROP POLICY IF EXISTS "Owners can delete tenant users" ON user_profiles;
+CREATE POLICY "Owners can delete tenant users"
+ON user_profiles FOR DELETE
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()) AND id != (SELECT auth.uid()));
+
+-- ============================================================================
+-- VAT RATES POLICIES
+-- ============================================================================
+
+-- Users can read VAT rates in their tenant
+DROP POLICY IF EXISTS "Users can read tenant vat rates" ON vat_rates;
+CREATE POLICY "Users can read tenant vat rates"
+ON vat_rates FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Admins can manage VAT rates
+DROP POLICY IF EXISTS "Admins can manage vat rates" ON vat_rates;
+CREATE POLICY "Admins can manage vat rates"
+ON vat_rates FOR ALL
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
+
+-- ============================================================================
+-- UNITS POLICIES
+-- ============================================================================
+
+-- Users can read units in their tenant
+DROP POLICY IF EXISTS "Users can read tenant units" ON units;
+CREATE POLICY "Users can read tenant units"
+ON units FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Admins can manage units
+DROP POLICY IF EXISTS "Admins can manage units" ON units;
+CREATE POLICY "Admins can manage units"
+ON units FOR ALL
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
+
+-- ============================================================================
+-- SERVICES POLICIES
+-- ============================================================================
+
+-- Users can read services in their tenant
+DROP POLICY IF EXISTS "Users can read tenant services" ON services;
+CREATE POLICY "Users can read tenant services"
+ON services FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can create services
+DROP POLICY IF EXISTS "Staff can create services" ON services;
+CREATE POLICY "Staff can create services"
+ON services FOR INSERT
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can update services
+DROP POLICY IF EXISTS "Staff can update services" ON services;
+CREATE POLICY "Staff can update services"
+ON services FOR UPDATE
+USING (tenant_id = (SELECT get_user_tenant_id()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Admins can delete services
+DROP POLICY IF EXISTS "Admins can delete services" ON services;
+CREATE POLICY "Admins can delete services"
+ON services FOR DELETE
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
+
+-- ============================================================================
+-- CUSTOMERS POLICIES
+-- ============================================================================
+
+-- Users can read customers in their tenant
+DROP POLICY IF EXISTS "Users can read tenant customers" ON customers;
+CREATE POLICY "Users can read tenant customers"
+ON customers FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can create customers
+DROP POLICY IF EXISTS "Staff can create customers" ON customers;
+CREATE POLICY "Staff can create customers"
+ON customers FOR INSERT
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can update customers
+DROP POLICY IF EXISTS "Staff can update customers" ON customers;
+CREATE POLICY "Staff can update customers"
+ON customers FOR UPDATE
+USING (tenant_id = (SELECT get_user_tenant_id()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Admins can delete customers
+DROP POLICY IF EXISTS "Admins can delete customers" ON customers;
+CREATE POLICY "Admins can delete customers"
+ON customers FOR DELETE
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
+
+-- ============================================================================
+-- INVOICE COUNTERS POLICIES
+-- ============================================================================
+
+-- Users can read counters in their tenant
+DROP POLICY IF EXISTS "Users can read tenant counters" ON invoice_counters;
+CREATE POLICY "Users can read tenant counters"
+ON invoice_counters FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- System can insert/update counters (via trigger/function)
+DROP POLICY IF EXISTS "System can manage counters" ON invoice_counters;
+CREATE POLICY "System can manage counters"
+ON invoice_counters FOR ALL
+USING (tenant_id = (SELECT get_user_tenant_id()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- ============================================================================
+-- INVOICES POLICIES
+-- ============================================================================
+
+-- Users can read invoices in their tenant
+DROP POLICY IF EXISTS "Users can read tenant invoices" ON invoices;
+CREATE POLICY "Users can read tenant invoices"
+ON invoices FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can create invoices
+DROP POLICY IF EXISTS "Staff can create invoices" ON invoices;
+CREATE POLICY "Staff can create invoices"
+ON invoices FOR INSERT
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can update Draft invoices
+-- Admins can update any invoice (for corrections)
+DROP POLICY IF EXISTS "Staff can update draft invoices" ON invoices;
+CREATE POLICY "Staff can update draft invoices"
+ON invoices FOR UPDATE
+USING (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    (status = 'Draft' OR (SELECT is_admin_or_owner()))
+)
+WITH CHECK (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    (status = 'Draft' OR (SELECT is_admin_or_owner()))
+);
+
+-- Admins can delete invoices (Draft only for safety)
+DROP POLICY IF EXISTS "Admins can delete draft invoices" ON invoices;
+CREATE POLICY "Admins can delete draft invoices"
+ON invoices FOR DELETE
+USING (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    (SELECT is_admin_or_owner()) AND
+    status = 'Draft'
+);
+
+-- ============================================================================
+-- INVOICE ITEMS POLICIES
+-- ============================================================================
+
+-- Users can read invoice items in their tenant
+DROP POLICY IF EXISTS "Users can read tenant invoice items" ON invoice_items;
+CREATE POLICY "Users can read tenant invoice items"
+ON invoice_items FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- Staff can create invoice items (for Draft invoices)
+DROP POLICY IF EXISTS "Staff can create invoice items" ON invoice_items;
+CREATE POLICY "Staff can create invoice items"
+ON invoice_items FOR INSERT
+WITH CHECK (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    EXISTS (
+        SELECT 1 FROM invoices
+        WHERE id = invoice_items.invoice_id
+        AND status = 'Draft'
+        AND tenant_id = (SELECT get_user_tenant_id())
+    )
+);
+
+-- Staff can update invoice items (for Draft invoices)
+DROP POLICY IF EXISTS "Staff can update invoice items" ON invoice_items;
+CREATE POLICY "Staff can update invoice items"
+ON invoice_items FOR UPDATE
+USING (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    EXISTS (
+        SELECT 1 FROM invoices
+        WHERE id = invoice_items.invoice_id
+        AND status = 'Draft'
+        AND tenant_id = (SELECT get_user_tenant_id())
+    )
+)
+WITH CHECK (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    EXISTS (
+        SELECT 1 FROM invoices
+        WHERE id = invoice_items.invoice_id
+        AND status = 'Draft'
+        AND tenant_id = (SELECT get_user_tenant_id())
+    )
+);
+
+-- Staff can delete invoice items (for Draft invoices)
+DROP POLICY IF EXISTS "Staff can delete invoice items" ON invoice_items;
+CREATE POLICY "Staff can delete invoice items"
+ON invoice_items FOR DELETE
+USING (
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    EXISTS (
+        SELECT 1 FROM invoices
+        WHERE id = invoice_items.invoice_id
+        AND status = 'Draft'
+        AND tenant_id = (SELECT get_user_tenant_id())
+    )
+);
+
+-- ============================================================================
+-- AUDIT LOG POLICIES
+-- ============================================================================
+
+-- Users can read audit logs in their tenant
+DROP POLICY IF EXISTS "Users can read tenant audit logs" ON audit_log;
+CREATE POLICY "Users can read tenant audit logs"
+ON audit_log FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- System can insert audit logs
+DROP POLICY IF EXISTS "System can create audit logs" ON audit_log;
+CREATE POLICY "System can create audit logs"
+ON audit_log FOR INSERT
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
+
+-- No UPDATE or DELETE on audit logs (immutable)
+
+-- ============================================================================
+-- ROLLUP TABLE POLICIES (migrations 009, 010)
+-- ============================================================================
+
+DROP POLICY IF EXISTS "Users can read tenant invoice summary" ON public.invoice_monthly_summary;
+CREATE POLICY "Users can read tenant invoice summary"
+ON public.invoice_monthly_summary FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+DROP POLICY IF EXISTS "Users can read tenant daily totals" ON public.invoice_daily_totals;
+CREATE POLICY "Users can read tenant daily totals"
+ON public.invoice_daily_totals FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: No policy calls a helper outside a sub-select (expect 0 rows)
+-- SELECT tablename, policyname FROM pg_policies
+-- WHERE schemaname = 'public'
+--   AND (regexp_replace(COALESCE(qual, '') || COALESCE(with_check, ''),
+--                       '\(\s*SELECT\s+(get_user_tenant_id|is_admin_or_owner|is_owner|auth\.uid)\(\)', '', 'g')
+--        ~ '(get_user_tenant_id|is_admin_or_owner|is_owner|auth\.uid)\(\)');
+
+-- Test 2: Plan shows the helper as an InitPlan (while signed in)
+-- EXPLAIN SELECT COUNT(*) FROM invoices;
+-- (expect "InitPlan 1 (returns $0)" and "Filter: (tenant_id = $0)")
+
+-- Test 3: Claims are used (while signed in)
+-- SELECT debug_jwt_claims()->>'tenant_id' = get_user_tenant_id()::text;
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- Re-run db/policies.sql from before this migration (git show HEAD~1:db/policies.sql)
+-- after dropping the policies above; the helper functions are replaced in place.
@@ -0,0 +1,239 @@
+-- Migration: 013 - Atomic invoice creation RPC
+-- Purpose: Create an invoice header and its items in one call and one transaction
+-- Date: 2026-10-17
+--
+-- InvoiceNew.tsx saved an invoice in three round trips: generateInvoiceNumber()
+-- (a LIKE 'INV-YYYYMMDD-%' scan for the day's highest number), an insert into
+-- invoices, then an insert into invoice_items. A failure after the header
+-- insert left an orphan invoice, and two terminals saving at the same moment
+-- read the same "highest" number. create_invoice() allocates the number from
+-- invoice_counters under a row lock and writes header and items atomically.
+-- Drafts stay unnumbered (chk_invoice_number_on_finalize): only Quotation and
+-- Paid invoices take a number.
+
+-- ============================================================================
+-- 1. DAILY INVOICE COUNTERS
+-- ============================================================================
+
+-- invoice_counters held one row per tenant per year (DEV-YYYY-NNNN). The app
+-- numbers per day (INV-YYYYMMDD-NNN), so daily rows carry counter_date; yearly
+-- rows keep counter_date NULL.
+ALTER TABLE public.invoice_counters
+  ADD COLUMN IF NOT EXISTS counter_date DATE;
+
+ALTER TABLE public.invoice_counters
+  DROP CONSTRAINT IF EXISTS invoice_counters_tenant_id_year_key;
+
+ALTER TABLE public.invoice_counters
+  DROP CONSTRAINT IF EXISTS invoice_counters_tenant_year_date_key;
+ALTER TABLE public.invoice_counters
+  ADD CONSTRAINT invoice_counters_tenant_year_date_key
+  UNIQUE NULLS NOT DISTINCT (tenant_id, year, counter_date);
+
+COMMENT ON COLUMN public.invoice_counters.counter_date IS 'Day for INV-YYYYMMDD-NNN counters; NULL for yearly counters';
+
+-- ============================================================================
+-- 2. FUNCTION: Next daily invoice number (overload of generate_invoice_number)
+-- ============================================================================
+
+-- Format: INV-20261017-001 (same as lib/invoiceUtils.ts generated client-side).
+-- The counter row lock serialises concurrent callers for the same day. The
+-- first call of a day starts after any number already used that day, so
+-- numbers issued by older clients are never reused.
+CREATE OR REPLACE FUNCTION public.generate_invoice_number(p_tenant_id UUID, p_date DATE)
+RETURNS TEXT AS $$
+DECLARE
+  v_prefix TEXT := 'INV-' || TO_CHAR(p_date, 'YYYYMMDD');
+  v_next_number INTEGER;
+BEGIN
+  UPDATE public.invoice_counters
+  SET last_number = last_number + 1
+  WHERE tenant_id = p_tenant_id
+    AND year = EXTRACT(YEAR FROM p_date)::INTEGER
+    AND counter_date = p_date
+  RETURNING last_number INTO v_next_number;
+
+  IF v_next_number IS NULL THEN
+    INSERT INTO public.invoice_counters (tenant_id, year, counter_date, last_number)
+    VALUES (
+      p_tenant_id,
+      EXTRACT(YEAR FROM p_date)::INTEGER,
+      p_date,
+      1 + COALESCE((
+        SELECT MAX(SPLIT_PART(invoice_number, '-', 3)::INTEGER)
+        FROM public.invoices
+        WHERE tenant_id = p_tenant_id
+          AND invoice_number >= v_prefix || '-'
+          AND invoice_number < v_prefix || '.'
+          AND SPLIT_PART(invoice_number, '-', 3) ~ '^[0-9]+$'
+      ), 0)
+    )
+    ON CONFLICT (tenant_id, year, counter_date)
+    DO UPDATE SET last_number = invoice_counters.last_number + 1
+    RETURNING last_number INTO v_next_number;
+  END IF;
+
+  RETURN v_prefix || '-' || LPAD(v_next_number::TEXT, 3, '0');
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.generate_invoice_number(UUID, DATE) IS
+'Allocates the next INV-YYYYMMDD-NNN number for a tenant and day from invoice_counters';
+
+-- The yearly generate_invoice_number(UUID) from schema.sql (DEV-YYYY-NNNN)
+-- conflicted on the (tenant_id, year) key dropped above. Its counters are the
+-- rows with counter_date NULL.
+CREATE OR REPLACE FUNCTION public.generate_invoice_number(p_tenant_id UUID)
+RETURNS TEXT AS $$
+DECLARE
+  v_year INTEGER := EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER;
+  v_next_number INTEGER;
+BEGIN
+  INSERT INTO public.invoice_counters (tenant_id, year, counter_date, last_number)
+  VALUES (p_tenant_id, v_year, NULL, 1)
+  ON CONFLICT (tenant_id, year, counter_date)
+  DO UPDATE SET last_number = invoice_counters.last_number + 1
+  RETURNING last_number INTO v_next_number;
+
+  RETURN 'DEV-' || v_year || '-' || LPAD(v_next_number::TEXT, 4, '0');
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 3. FUNCTION: create_invoice(header, items)
+-- ============================================================================
+
+-- header: customer_id, invoice_date, due_date, status, notes, amount_paid,
+--         payment_method, change_due, payment_date
+-- items:  [{ line_order, service_id, description, quantity, unit_price,
+--            vat_rate_id, vat_rate }, ...]
+-- Line amounts and invoice totals are recomputed by the invoice_items
+-- triggers (calculate_invoice_totals in db/schema.sql; invoice totals per
+-- statement since migration 008), not taken from the client.
+-- Drafts are created without a number; other statuses get the next daily one.
+-- Returns the invoice row as JSON with its items under "invoice_items".
+--
+-- SECURITY DEFINER: the tenant comes from the caller's JWT/profile, never
+-- from the payload, and the patient must belong to that tenant.
+CREATE OR REPLACE FUNCTION public.create_invoice(header JSONB, items JSONB)
+RETURNS JSONB AS $$
+DECLARE
+  v_tenant_id UUID := get_user_tenant_id();
+  v_customer_id UUID := NULLIF(header->>'customer_id', '')::UUID;
+  v_status invoice_status := COALESCE(NULLIF(header->>'status', ''), 'Draft')::invoice_status;
+  v_invoice public.invoices;
+BEGIN
+  IF v_tenant_id IS NULL THEN
+    RAISE EXCEPTION 'No tenant for the current user' USING ERRCODE = '42501';
+  END IF;
+
+  IF v_status NOT IN ('Draft', 'Quotation', 'Paid') THEN
+    RAISE EXCEPTION 'Invoices cannot be created with status %', v_status USING ERRCODE = '22023';
+  END IF;
+
+  IF jsonb_typeof(items) IS DISTINCT FROM 'array' OR jsonb_array_length(items) = 0 THEN
+    RAISE EXCEPTION 'An invoice needs at least one line item' USING ERRCODE = '22023';
+  END IF;
+
+  IF NOT EXISTS (
+    SELECT 1 FROM public.customers WHERE id = v_customer_id AND tenant_id = v_tenant_id
+  ) THEN
+    RAISE EXCEPTION 'Patient % not found', v_customer_id USING ERRCODE = '23503';
+  END IF;
+
+  INSERT INTO public.invoices (
+    tenant_id, invoice_number, customer_id, invoice_date, due_date, status,
+    notes, amount_paid, payment_method, change_due, payment_date,
+    created_by, updated_by
+  )
+  VALUES (
+    v_tenant_id,
+    -- Numbered on the practice's calendar day (SAST), as the client did;
+    -- a Draft has no number until it is finalized
+    CASE WHEN v_status <> 'Draft'
+      THEN public.generate_invoice_number(v_tenant_id, (NOW() AT TIME ZONE 'Africa/Johannesburg')::DATE)
+    END,
+    v_customer_id,
+    COALESCE(NULLIF(header->>'invoice_date', '')::DATE, CURRENT_DATE),
+    NULLIF(header->>'due_date', '')::DATE,
+    v_status,
+    header->>'notes',
+    COALESCE(NULLIF(header->>'amount_paid', '')::NUMERIC, 0.00),
+    COALESCE(NULLIF(header->>'payment_method', ''), 'Cash'),
+    COALESCE(NULLIF(header->>'change_due', '')::NUMERIC, 0.00),
+    NULLIF(header->>'payment_date', '')::TIMESTAMPTZ,
+    auth.uid(),
+    auth.uid()
+  )
+  RETURNING * INTO v_invoice;
+
+  -- One multi-row insert: the statement-level totals trigger fires once
+  INSERT INTO public.invoice_items (
+    tenant_id, invoice_id, line_order, service_id, description,
+    quantity, unit_price, vat_rate_id, vat_rate
+  )
+  SELECT
+    v_tenant_id,
+    v_invoice.id,
+    COALESCE((item->>'line_order')::INTEGER, (ord - 1)::INTEGER),
+    NULLIF(item->>'service_id', '')::UUID,
+    item->>'description',
+    (item->>'quantity')::NUMERIC,
+    (item->>'unit_price')::NUMERIC,
+    NULLIF(item->>'vat_rate_id', '')::UUID,
+    COALESCE((item->>'vat_rate')::NUMERIC, 0.00)
+  FROM jsonb_array_elements(items) WITH ORDINALITY AS t(item, ord);
+
+  -- Re-read: the items triggers have filled in the totals
+  RETURN (
+    SELECT to_jsonb(i) || jsonb_build_object(
+      'invoice_items',
+      COALESCE((
+        SELECT jsonb_agg(to_jsonb(ii) ORDER BY ii.line_order)
+        FROM public.invoice_items ii
+        WHERE ii.invoice_id = i.id
+      ), '[]'::jsonb)
+    )
+    FROM public.invoices i
+    WHERE i.id = v_invoice.id
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.create_invoice(JSONB, JSONB) IS
+'Creates an invoice (numbered from the daily counter unless Draft) and all its items in one transaction; returns the invoice with items';
+
+REVOKE EXECUTE ON FUNCTION public.create_invoice(JSONB, JSONB) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.create_invoice(JSONB, JSONB) TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Two numbers for the same day are consecutive (rolled back)
+-- BEGIN;
+-- SELECT generate_invoice_number('<tenant-id>', CURRENT_DATE), generate_invoice_number('<tenant-id>', CURRENT_DATE);
+-- ROLLBACK;
+
+-- Test 2: The yearly overload still allocates (rolled back)
+-- BEGIN;
+-- SELECT generate_invoice_number('<tenant-id>'), generate_invoice_number('<tenant-id>');
+-- ROLLBACK;
+
+-- Test 3: Create an invoice as a signed-in user
+-- SELECT create_invoice(
+--   '{"customer_id": "<customer-id>", "status": "Quotation"}',
+--   '[{"description": "Consultation", "quantity": 1, "unit_price": 500, "vat_rate": 15}]'
+-- );
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP FUNCTION IF EXISTS public.create_invoice(JSONB, JSONB);
+-- DROP FUNCTION IF EXISTS public.generate_invoice_number(UUID, DATE);
+-- DELETE FROM public.invoice_counters WHERE counter_date IS NOT NULL;
+-- ALTER TABLE public.invoice_counters DROP CONSTRAINT IF EXISTS invoice_counters_tenant_year_date_key;
+-- ALTER TABLE public.invoice_counters ADD CONSTRAINT invoice_counters_tenant_id_year_key UNIQUE (tenant_id, year);
+-- ALTER TABLE public.invoice_counters DROP COLUMN IF EXISTS counter_date;
+-- (then re-run generate_invoice_number(UUID) from db/schema.sql)
@@ -0,0 +1,357 @@
+-- Migration: 014 - Offline invoice-number block leases
+-- Purpose: Let a terminal reserve a block of ProformaOffline numbers and issue them without a connection
+-- Date: 2026-10-17
+--
+-- Numbers came from a live query (generateInvoiceNumber(), later
+-- create_invoice()), so a terminal that lost connectivity could not issue a
+-- numbered document. A terminal now leases a block of numbers from a
+-- dedicated 'PRO' series in invoice_counters in one call, keeps it in Dexie
+-- (lib/invoiceNumberLease.ts) and issues from it locally. On reconnect it
+-- settles the lease: used numbers are recorded as issued; unused numbers are
+-- handed back to the counter when nothing was leased after them, otherwise
+-- voided. Every number ever handed out has a row in invoice_number_ledger,
+-- so gaps in the series are explainable.
+--
+-- Format: PRO-2026-00001 (yearly series, unique per tenant across terminals)
+
+-- ============================================================================
+-- 1. NUMBER SERIES ON INVOICE COUNTERS
+-- ============================================================================
+
+-- '' = the daily INV series (migration 013); 'PRO' = offline leases
+ALTER TABLE public.invoice_counters
+  ADD COLUMN IF NOT EXISTS series TEXT NOT NULL DEFAULT '';
+
+ALTER TABLE public.invoice_counters
+  DROP CONSTRAINT IF EXISTS invoice_counters_tenant_year_date_key;
+ALTER TABLE public.invoice_counters
+  DROP CONSTRAINT IF EXISTS invoice_counters_tenant_series_key;
+ALTER TABLE public.invoice_counters
+  ADD CONSTRAINT invoice_counters_tenant_series_key
+  UNIQUE NULLS NOT DISTINCT (tenant_id, series, year, counter_date);
+
+COMMENT ON COLUMN public.invoice_counters.series IS 'Number series: '''' for INV daily/yearly counters, ''PRO'' for offline leases';
+
+-- Same as migration 013, with the series in the conflict target
+CREATE OR REPLACE FUNCTION public.generate_invoice_number(p_tenant_id UUID, p_date DATE)
+RETURNS TEXT AS $$
+DECLARE
+  v_prefix TEXT := 'INV-' || TO_CHAR(p_date, 'YYYYMMDD');
+  v_next_number INTEGER;
+BEGIN
+  UPDATE public.invoice_counters
+  SET last_number = last_number + 1
+  WHERE tenant_id = p_tenant_id
+    AND series = ''
+    AND year = EXTRACT(YEAR FROM p_date)::INTEGER
+    AND counter_date = p_date
+  RETURNING last_number INTO v_next_number;
+
+  IF v_next_number IS NULL THEN
+    INSERT INTO public.invoice_counters (tenant_id, series, year, counter_date, last_number)
+    VALUES (
+      p_tenant_id,
+      '',
+      EXTRACT(YEAR FROM p_date)::INTEGER,
+      p_date,
+      1 + COALESCE((
+        SELECT MAX(SPLIT_PART(invoice_number, '-', 3)::INTEGER)
+        FROM public.invoices
+        WHERE tenant_id = p_tenant_id
+          AND invoice_number >= v_prefix || '-'
+          AND invoice_number < v_prefix || '.'
+          AND SPLIT_PART(invoice_number, '-', 3) ~ '^[0-9]+$'
+      ), 0)
+    )
+    ON CONFLICT (tenant_id, series, year, counter_date)
+    DO UPDATE SET last_number = invoice_counters.last_number + 1
+    RETURNING last_number INTO v_next_number;
+  END IF;
+
+  RETURN v_prefix || '-' || LPAD(v_next_number::TEXT, 3, '0');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as migration 013's yearly overload, in the '' series
+CREATE OR REPLACE FUNCTION public.generate_invoice_number(p_tenant_id UUID)
+RETURNS TEXT AS $$
+DECLARE
+  v_year INTEGER := EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER;
+  v_next_number INTEGER;
+BEGIN
+  INSERT INTO public.invoice_counters (tenant_id, series, year, counter_date, last_number)
+  VALUES (p_tenant_id, '', v_year, NULL, 1)
+  ON CONFLICT (tenant_id, series, year, counter_date)
+  DO UPDATE SET last_number = invoice_counters.last_number + 1
+  RETURNING last_number INTO v_next_number;
+
+  RETURN 'DEV-' || v_year || '-' || LPAD(v_next_number::TEXT, 4, '0');
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 2. LEASES AND LEDGER
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.invoice_number_leases (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  tenant_id UUID NOT NULL REFERENCES public.tenants(id) ON DELETE CASCADE,
+  terminal_id TEXT NOT NULL,
+  year INTEGER NOT NULL,
+  first_number INTEGER NOT NULL,
+  last_number INTEGER NOT NULL,
+  leased_by UUID REFERENCES auth.users(id),
+  leased_at TIMESTAMPTZ DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL,
+  settled_at TIMESTAMPTZ,
+  returned_count INTEGER NOT NULL DEFAULT 0, -- unused tail handed back at settle
+  CHECK (last_number >= first_number)
+);
+
+CREATE INDEX IF NOT EXISTS idx_invoice_number_leases_open
+  ON public.invoice_number_leases (tenant_id, terminal_id)
+  WHERE settled_at IS NULL;
+
+COMMENT ON TABLE public.invoice_number_leases IS 'Blocks of PRO- numbers reserved by a terminal for offline issuing';
+
+-- One row per number handed out: leased -> issued | voided
+CREATE TABLE IF NOT EXISTS public.invoice_number_ledger (
+  tenant_id UUID NOT NULL REFERENCES public.tenants(id) ON DELETE CASCADE,
+  year INTEGER NOT NULL,
+  number INTEGER NOT NULL,
+  invoice_number TEXT NOT NULL,
+  lease_id UUID NOT NULL REFERENCES public.invoice_number_leases(id) ON DELETE CASCADE,
+  status TEXT NOT NULL DEFAULT 'leased' CHECK (status IN ('leased', 'issued', 'voided')),
+  issued_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (tenant_id, year, number)
+);
+
+CREATE INDEX IF NOT EXISTS idx_invoice_number_ledger_lease
+  ON public.invoice_number_ledger (lease_id);
+
+COMMENT ON TABLE public.invoice_number_ledger IS 'Audit trail of every offline number: leased, then issued or voided';
+
+ALTER TABLE public.invoice_number_leases ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.invoice_number_ledger ENABLE ROW LEVEL SECURITY;
+
+-- Read-only for users; written by the functions below
+DROP POLICY IF EXISTS "Users can read tenant number leases" ON public.invoice_number_leases;
+CREATE POLICY "Users can read tenant number leases"
+ON public.invoice_number_leases FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+DROP POLICY IF EXISTS "Users can read tenant number ledger" ON public.invoice_number_ledger;
+CREATE POLICY "Users can read tenant number ledger"
+ON public.invoice_number_ledger FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+GRANT SELECT ON public.invoice_number_leases, public.invoice_number_ledger TO authenticated;
+
+-- ============================================================================
+-- 3. FUNCTION: Lease a block
+-- ============================================================================
+
+-- Keep in sync with formatOfflineNumber() in lib/invoiceNumberLease.ts
+CREATE OR REPLACE FUNCTION public.format_offline_invoice_number(p_year INTEGER, p_number INTEGER)
+RETURNS TEXT AS $$
+  SELECT 'PRO-' || p_year || '-' || LPAD(p_number::TEXT, 5, '0');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.lease_invoice_numbers(
+  p_terminal_id TEXT,
+  p_count INTEGER DEFAULT 20,
+  p_valid_for INTERVAL DEFAULT INTERVAL '14 days'
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_tenant_id UUID := get_user_tenant_id();
+  v_year INTEGER := EXTRACT(YEAR FROM (NOW() AT TIME ZONE 'Africa/Johannesburg'))::INTEGER;
+  v_count INTEGER := LEAST(GREATEST(COALESCE(p_count, 20), 1), 200);
+  v_last INTEGER;
+  v_lease public.invoice_number_leases;
+BEGIN
+  IF v_tenant_id IS NULL THEN
+    RAISE EXCEPTION 'No tenant for the current user' USING ERRCODE = '42501';
+  END IF;
+
+  IF COALESCE(p_terminal_id, '') = '' THEN
+    RAISE EXCEPTION 'terminal_id is required' USING ERRCODE = '22023';
+  END IF;
+
+  -- Reserve the whole block with one counter update (row lock serialises terminals)
+  INSERT INTO public.invoice_counters (tenant_id, series, year, counter_date, last_number)
+  VALUES (v_tenant_id, 'PRO', v_year, NULL, v_count)
+  ON CONFLICT (tenant_id, series, year, counter_date)
+  DO UPDATE SET last_number = invoice_counters.last_number + v_count
+  RETURNING last_number INTO v_last;
+
+  INSERT INTO public.invoice_number_leases
+    (tenant_id, terminal_id, year, first_number, last_number, leased_by, expires_at)
+  VALUES
+    (v_tenant_id, p_terminal_id, v_year, v_last - v_count + 1, v_last, auth.uid(), NOW() + p_valid_for)
+  RETURNING * INTO v_lease;
+
+  INSERT INTO public.invoice_number_ledger (tenant_id, year, number, invoice_number, lease_id)
+  SELECT v_tenant_id, v_year, n, public.format_offline_invoice_number(v_year, n), v_lease.id
+  FROM generate_series(v_lease.first_number, v_lease.last_number) AS n;
+
+  RETURN jsonb_build_object(
+    'lease_id', v_lease.id,
+    'year', v_lease.year,
+    'first_number', v_lease.first_number,
+    'last_number', v_lease.last_number,
+    'expires_at', v_lease.expires_at
+  );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.lease_invoice_numbers(TEXT, INTEGER, INTERVAL) IS
+'Reserves a block of up to 200 PRO- numbers for a terminal; returns the lease';
+
+-- ============================================================================
+-- 4. FUNCTION: Settle a lease (on reconnect)
+-- ============================================================================
+
+-- p_used: numbers the terminal issued from this lease, e.g. [1, 2, 3].
+-- Unused numbers go back to the counter when they are its tail (nothing was
+-- leased after them); otherwise they are voided so the gap stays explained.
+CREATE OR REPLACE FUNCTION public.settle_invoice_number_lease(p_lease_id UUID, p_used JSONB)
+RETURNS JSONB AS $$
+DECLARE
+  v_tenant_id UUID := get_user_tenant_id();
+  v_lease public.invoice_number_leases;
+  v_used INTEGER[];
+  v_keep INTEGER;
+  v_returned INTEGER := 0;
+  v_voided INTEGER := 0;
+BEGIN
+  SELECT * INTO v_lease
+  FROM public.invoice_number_leases
+  WHERE id = p_lease_id AND tenant_id = v_tenant_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Lease % not found', p_lease_id USING ERRCODE = '23503';
+  END IF;
+
+  SELECT COALESCE(array_agg(n::INTEGER), '{}') INTO v_used
+  FROM jsonb_array_elements_text(COALESCE(p_used, '[]'::jsonb)) AS n;
+
+  -- Recording usage is idempotent; it is also allowed after settling, for
+  -- a terminal that retries after its first settle response was lost
+  UPDATE public.invoice_number_ledger
+  SET status = 'issued', issued_at = COALESCE(issued_at, NOW()), updated_at = NOW()
+  WHERE lease_id = v_lease.id
+    AND number = ANY (v_used)
+    AND status <> 'issued';
+
+  IF v_lease.settled_at IS NOT NULL THEN
+    RETURN jsonb_build_object('lease_id', v_lease.id, 'returned', 0, 'voided', 0);
+  END IF;
+
+  -- Hand the unused tail back if this lease is still the counter's tail
+  SELECT COALESCE(MAX(number), v_lease.first_number - 1) INTO v_keep
+  FROM public.invoice_number_ledger
+  WHERE lease_id = v_lease.id AND status = 'issued';
+
+  UPDATE public.invoice_counters
+  SET last_number = v_keep
+  WHERE tenant_id = v_tenant_id
+    AND series = 'PRO'
+    AND year = v_lease.year
+    AND counter_date IS NULL
+    AND last_number = v_lease.last_number;
+
+  IF FOUND THEN
+    DELETE FROM public.invoice_number_ledger
+    WHERE lease_id = v_lease.id AND number > v_keep AND status = 'leased';
+    GET DIAGNOSTICS v_returned = ROW_COUNT;
+  END IF;
+
+  UPDATE public.invoice_number_ledger
+  SET status = 'voided', updated_at = NOW()
+  WHERE lease_id = v_lease.id AND status = 'leased';
+  GET DIAGNOSTICS v_voided = ROW_COUNT;
+
+  UPDATE public.invoice_number_leases
+  SET settled_at = NOW(), returned_count = v_returned
+  WHERE id = v_lease.id;
+
+  RETURN jsonb_build_object('lease_id', v_lease.id, 'returned', v_returned, 'voided', v_voided);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.settle_invoice_number_lease(UUID, JSONB) IS
+'Records the numbers a terminal issued from a lease and returns or voids the rest';
+
+REVOKE EXECUTE ON FUNCTION public.lease_invoice_numbers(TEXT, INTEGER, INTERVAL) FROM PUBLIC, anon;
+REVOKE EXECUTE ON FUNCTION public.settle_invoice_number_lease(UUID, JSONB) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.lease_invoice_numbers(TEXT, INTEGER, INTERVAL) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.settle_invoice_number_lease(UUID, JSONB) TO authenticated;
+
+-- ============================================================================
+-- 5. GAP AUDIT
+-- ============================================================================
+
+-- Every PRO number up to the counter, with what happened to it.
+-- 'missing' should never appear; 'issued' without invoice_id means the
+-- terminal has not uploaded that invoice yet.
+CREATE OR REPLACE VIEW public.vw_invoice_number_audit WITH (security_invoker = true) AS
+SELECT
+  c.tenant_id,
+  c.year,
+  n AS number,
+  public.format_offline_invoice_number(c.year, n) AS invoice_number,
+  COALESCE(l.status, 'missing') AS status,
+  l.lease_id,
+  ls.terminal_id,
+  i.id AS invoice_id
+FROM public.invoice_counters c
+CROSS JOIN LATERAL generate_series(1, c.last_number) AS n
+LEFT JOIN public.invoice_number_ledger l
+  ON l.tenant_id = c.tenant_id AND l.year = c.year AND l.number = n
+LEFT JOIN public.invoice_number_leases ls ON ls.id = l.lease_id
+LEFT JOIN public.invoices i
+  ON i.tenant_id = c.tenant_id AND i.invoice_number = public.format_offline_invoice_number(c.year, n)
+WHERE c.series = 'PRO';
+
+COMMENT ON VIEW public.vw_invoice_number_audit IS 'Offline PRO- number audit: leased, issued (with uploaded invoice) or voided';
+
+GRANT SELECT ON public.vw_invoice_number_audit TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Lease, use two numbers, settle (as a signed-in user; rolled back)
+-- BEGIN;
+-- SELECT lease_invoice_numbers('test-terminal', 5);
+-- SELECT settle_invoice_number_lease('<lease_id>', '[1, 2]');
+-- SELECT number, status FROM vw_invoice_number_audit ORDER BY number;
+-- ROLLBACK;
+
+-- Test 2: No unexplained gaps (expect 0 rows)
+-- SELECT * FROM vw_invoice_number_audit WHERE status = 'missing';
+
+-- Test 3: Both INV counters still allocate with the series in the key (rolled back)
+-- BEGIN;
+-- SELECT generate_invoice_number('<tenant-id>'), generate_invoice_number('<tenant-id>', CURRENT_DATE);
+-- ROLLBACK;
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP VIEW IF EXISTS public.vw_invoice_number_audit;
+-- DROP FUNCTION IF EXISTS public.settle_invoice_number_lease(UUID, JSONB);
+-- DROP FUNCTION IF EXISTS public.lease_invoice_numbers(TEXT, INTEGER, INTERVAL);
+-- DROP FUNCTION IF EXISTS public.format_offline_invoice_number(INTEGER, INTEGER);
+-- DROP TABLE IF EXISTS public.invoice_number_ledger;
+-- DROP TABLE IF EXISTS public.invoice_number_leases;
+-- DELETE FROM public.invoice_counters WHERE series = 'PRO';
+-- ALTER TABLE public.invoice_counters DROP CONSTRAINT IF EXISTS invoice_counters_tenant_series_key;
+-- ALTER TABLE public.invoice_counters ADD CONSTRAINT invoice_counters_tenant_year_date_key
+--   UNIQUE NULLS NOT DISTINCT (tenant_id, year, counter_date);
+-- ALTER TABLE public.invoice_counters DROP COLUMN IF EXISTS series;
+-- (then re-run both generate_invoice_number() overloads from migration 013)
@@ -0,0 +1,159 @@
+-- Migration: 015 - Keyset-paginated invoice list
+-- Purpose: Page through invoices by (created_at, id) with filters, returning only listed columns
+-- Date: 2026-10-17
+--
+-- InvoicesList.tsx loaded the newest 50 invoices with every customer column
+-- and had no way to reach older ones. OFFSET paging would get slower with
+-- every page. list_invoices() seeks to a (created_at, id) cursor on the
+-- tenant's created_at index instead, so every page costs the same no matter
+-- how deep it is or how many invoices the tenant has.
+
+-- ============================================================================
+-- 1. INDEXES: (created_at, id) tail for keyset order
+-- ============================================================================
+
+-- id breaks ties between invoices created in the same transaction, so
+-- cursors are stable. Each index keeps its old columns as a prefix, so
+-- existing queries are unaffected.
+DROP INDEX IF EXISTS public.idx_invoices_created_at;
+CREATE INDEX idx_invoices_created_at
+  ON public.invoices (tenant_id, created_at, id);
+
+-- Filtered lists (one status, one payment method, one patient) seek
+-- straight into their own slice, already in keyset order
+DROP INDEX IF EXISTS public.idx_invoices_status;
+CREATE INDEX idx_invoices_status
+  ON public.invoices (tenant_id, status, created_at, id);
+
+DROP INDEX IF EXISTS public.idx_invoices_payment_method;
+CREATE INDEX idx_invoices_payment_method
+  ON public.invoices (tenant_id, payment_method, created_at, id);
+
+DROP INDEX IF EXISTS public.idx_invoices_customer_id;
+CREATE INDEX idx_invoices_customer_id
+  ON public.invoices (tenant_id, customer_id, created_at, id);
+
+COMMENT ON INDEX public.idx_invoices_created_at IS 'Keyset order for list_invoices(): newest first by (created_at, id)';
+
+-- ============================================================================
+-- 2. FUNCTION: list_invoices (one page, newest first)
+-- ============================================================================
+
+-- Filters are all optional. Pass the created_at and id of the last row of a
+-- page as p_after_created_at / p_after_id to get the next page; fewer than
+-- p_limit rows means the end of the list.
+--
+-- Only the active filters are added to the query, and it is planned with
+-- the actual values (EXECUTE ... USING), so each combination uses its index
+-- instead of one generic plan full of "$n IS NULL OR ..." branches.
+-- SECURITY INVOKER: the invoices and customers RLS policies still apply.
+CREATE OR REPLACE FUNCTION public.list_invoices(
+  p_status invoice_status DEFAULT NULL,
+  p_date_from DATE DEFAULT NULL,
+  p_date_to DATE DEFAULT NULL,
+  p_payment_method TEXT DEFAULT NULL,
+  p_customer_id UUID DEFAULT NULL,
+  p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+  p_after_id UUID DEFAULT NULL,
+  p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+  id UUID,
+  invoice_number TEXT,
+  invoice_date DATE,
+  status invoice_status,
+  total_amount NUMERIC,
+  payment_method TEXT,
+  created_at TIMESTAMPTZ,
+  customer_id UUID,
+  customer_name TEXT
+) AS $$
+DECLARE
+  v_tenant_id UUID := get_user_tenant_id();
+  v_where TEXT := 'i.tenant_id = $1';
+BEGIN
+  IF v_tenant_id IS NULL THEN
+    RAISE EXCEPTION 'No tenant for the current user' USING ERRCODE = '42501';
+  END IF;
+
+  IF (p_after_created_at IS NULL) <> (p_after_id IS NULL) THEN
+    RAISE EXCEPTION 'Cursor needs both p_after_created_at and p_after_id' USING ERRCODE = '22023';
+  END IF;
+
+  IF p_status IS NOT NULL THEN
+    v_where := v_where || ' AND i.status = $2';
+  END IF;
+  IF p_date_from IS NOT NULL THEN
+    v_where := v_where || ' AND i.invoice_date >= $3';
+  END IF;
+  IF p_date_to IS NOT NULL THEN
+    v_where := v_where || ' AND i.invoice_date <= $4';
+  END IF;
+  IF p_payment_method IS NOT NULL THEN
+    v_where := v_where || ' AND i.payment_method = $5';
+  END IF;
+  IF p_customer_id IS NOT NULL THEN
+    v_where := v_where || ' AND i.customer_id = $6';
+  END IF;
+  IF p_after_created_at IS NOT NULL THEN
+    v_where := v_where || ' AND (i.created_at, i.id) < ($7, $8)';
+  END IF;
+
+  RETURN QUERY EXECUTE format($q$
+    SELECT
+      i.id,
+      i.invoice_number,
+      i.invoice_date,
+      i.status,
+      i.total_amount,
+      i.payment_method,
+      i.created_at,
+      i.customer_id,
+      c.name
+    FROM public.invoices i
+    JOIN public.customers c ON c.id = i.customer_id
+    WHERE %s
+    ORDER BY i.created_at DESC, i.id DESC
+    LIMIT $9
+  $q$, v_where)
+  USING v_tenant_id, p_status, p_date_from, p_date_to, p_payment_method,
+        p_customer_id, p_after_created_at, p_after_id,
+        LEAST(GREATEST(COALESCE(p_limit, 50), 1), 200);
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION public.list_invoices(invoice_status, DATE, DATE, TEXT, UUID, TIMESTAMPTZ, UUID, INTEGER) IS
+'One page of the current tenant''s invoices, newest first, after a (created_at, id) cursor (max 200 rows)';
+
+REVOKE EXECUTE ON FUNCTION public.list_invoices(invoice_status, DATE, DATE, TEXT, UUID, TIMESTAMPTZ, UUID, INTEGER) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.list_invoices(invoice_status, DATE, DATE, TEXT, UUID, TIMESTAMPTZ, UUID, INTEGER) TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: First page, then the page after its last row (as a signed-in user)
+-- SELECT * FROM list_invoices(p_limit => 5);
+-- SELECT * FROM list_invoices(p_after_created_at => '<created_at>', p_after_id => '<id>', p_limit => 5);
+
+-- Test 2: Plan of a deep page: expect an Index Scan Backward on
+-- idx_invoices_created_at with the cursor as an Index Cond, no Sort
+-- EXPLAIN ANALYZE
+-- SELECT i.id FROM invoices i
+-- WHERE i.tenant_id = '<tenant-id>' AND (i.created_at, i.id) < ('<created_at>', '<id>')
+-- ORDER BY i.created_at DESC, i.id DESC
+-- LIMIT 50;
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP FUNCTION IF EXISTS public.list_invoices(invoice_status, DATE, DATE, TEXT, UUID, TIMESTAMPTZ, UUID, INTEGER);
+-- DROP INDEX IF EXISTS idx_invoices_created_at;
+-- DROP INDEX IF EXISTS idx_invoices_status;
+-- DROP INDEX IF EXISTS idx_invoices_payment_method;
+-- DROP INDEX IF EXISTS idx_invoices_customer_id;
+-- CREATE INDEX idx_invoices_created_at ON invoices(tenant_id, created_at);
+-- CREATE INDEX idx_invoices_status ON invoices(tenant_id, status);
+-- CREATE INDEX idx_invoices_payment_method ON invoices(tenant_id, payment_method);
+-- CREATE INDEX idx_invoices_customer_id ON invoices(tenant_id, customer_id);
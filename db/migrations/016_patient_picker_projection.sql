@@ -0,0 +1,67 @@
+-- Migration: 016 - Slim patient picker projection
+-- Purpose: Serve the invoice patient dropdown as compact [id, name, cell] arrays
+-- Date: 2026-10-17
+--
+-- InvoiceNew.tsx filled its patient dropdown with customers.select('*') for
+-- every active patient, and reloaded all of it after each new patient. That
+-- sent notes, addresses, ID numbers and medical aid details for the whole
+-- practice just to render a name and a cell number. patient_picker_options()
+-- returns only those display columns, as one JSON array of arrays (no
+-- repeated keys), read from a covering index.
+--
+-- The invoice list rows already come from list_invoices() (migration 015),
+-- which returns only the columns InvoicesList renders.
+
+-- ============================================================================
+-- 1. INDEX: Covering index for the picker
+-- ============================================================================
+
+-- Active patients in name order with everything the picker returns, so the
+-- query is an index-only scan with no sort
+CREATE INDEX IF NOT EXISTS idx_customers_picker
+  ON public.customers (tenant_id, name) INCLUDE (id, cell)
+  WHERE is_active;
+
+COMMENT ON INDEX public.idx_customers_picker IS 'Index-only scan for patient_picker_options()';
+
+-- ============================================================================
+-- 2. FUNCTION: patient_picker_options
+-- ============================================================================
+
+-- Returns [[id, name, cell], ...] for the current user's tenant, by name.
+-- Dropped by migration 019: the web app now searches patients as they type
+-- (search_patients, migration 011) and no longer loads the full list.
+-- SECURITY INVOKER: the customers RLS policies still apply.
+CREATE OR REPLACE FUNCTION public.patient_picker_options(active_only BOOLEAN DEFAULT true)
+RETURNS JSON AS $$
+  SELECT COALESCE(json_agg(json_build_array(c.id, c.name, c.cell) ORDER BY c.name), '[]'::json)
+  FROM public.customers c
+  WHERE c.tenant_id = (SELECT get_user_tenant_id())
+    AND (c.is_active OR NOT active_only);
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION public.patient_picker_options(BOOLEAN) IS
+'Patient dropdown options for the current user''s tenant as compact [id, name, cell] arrays';
+
+REVOKE EXECUTE ON FUNCTION public.patient_picker_options(BOOLEAN) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.patient_picker_options(BOOLEAN) TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Payload for a tenant (as a signed-in user)
+-- SELECT json_array_length(patient_picker_options()), octet_length(patient_picker_options()::text);
+
+-- Test 2: Expect an Index Only Scan on idx_customers_picker
+-- EXPLAIN ANALYZE
+-- SELECT c.id, c.name, c.cell FROM customers c
+-- WHERE c.tenant_id = '<tenant-id>' AND c.is_active
+-- ORDER BY c.name;
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP FUNCTION IF EXISTS public.patient_picker_options(BOOLEAN);
+-- DROP INDEX IF EXISTS idx_customers_picker;
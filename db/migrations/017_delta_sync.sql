@@ -0,0 +1,167 @@
+-- Migration: 017 - Delta sync support
+-- Purpose: Let devices pull only the rows changed since their last sync
+-- Date: 2026-10-17
+--
+-- The offline caches in the web app (lib/db.ts) could only refetch whole
+-- tables. Every synced table already keeps updated_at current through
+-- update_updated_at_column(), so a device can ask for "rows with
+-- updated_at after my watermark" in (updated_at, id) order, page by page.
+-- This migration adds the index that query needs on each synced table, and
+-- a tombstone log so devices also learn about hard deletes. Deactivations
+-- (is_active = false) arrive as ordinary updates.
+--
+-- Client: lib/deltaSync.ts. Keep SYNC_TABLES there in step with the
+-- triggers below, and TOMBSTONE_RETENTION_DAYS with purge_sync_tombstones().
+
+-- ============================================================================
+-- 1. INDEXES: Changed rows per tenant in watermark order
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_invoices_sync
+  ON public.invoices (tenant_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_customers_sync
+  ON public.customers (tenant_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_services_sync
+  ON public.services (tenant_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_vat_rates_sync
+  ON public.vat_rates (tenant_id, updated_at, id);
+
+COMMENT ON INDEX public.idx_invoices_sync IS 'Delta sync: rows changed since a watermark';
+COMMENT ON INDEX public.idx_customers_sync IS 'Delta sync: rows changed since a watermark';
+COMMENT ON INDEX public.idx_services_sync IS 'Delta sync: rows changed since a watermark';
+COMMENT ON INDEX public.idx_vat_rates_sync IS 'Delta sync: rows changed since a watermark';
+
+-- Rows without updated_at would never pass a watermark filter
+UPDATE public.invoices SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE public.customers SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE public.services SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE public.vat_rates SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+
+-- ============================================================================
+-- 2. TOMBSTONES: Hard deletes, for devices to replay
+-- ============================================================================
+
+-- No foreign key to tenants: deleting a tenant must not be blocked by, or
+-- write, tombstones for its own rows (the trigger skips those)
+CREATE TABLE IF NOT EXISTS public.sync_tombstones (
+  id BIGSERIAL PRIMARY KEY,
+  tenant_id UUID NOT NULL,
+  table_name TEXT NOT NULL,
+  row_id UUID NOT NULL,
+  deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_tenant
+  ON public.sync_tombstones (tenant_id, deleted_at, id);
+
+COMMENT ON TABLE public.sync_tombstones IS 'Deleted rows of synced tables, read by lib/deltaSync.ts';
+
+ALTER TABLE public.sync_tombstones ENABLE ROW LEVEL SECURITY;
+
+-- Read-only for users; written by record_sync_tombstones()
+DROP POLICY IF EXISTS "Users can read tenant tombstones" ON public.sync_tombstones;
+CREATE POLICY "Users can read tenant tombstones"
+ON public.sync_tombstones FOR SELECT
+USING (tenant_id = (SELECT get_user_tenant_id()));
+
+GRANT SELECT ON public.sync_tombstones TO authenticated;
+
+-- Statement-level: one INSERT per DELETE statement however many rows it removes
+CREATE OR REPLACE FUNCTION public.record_sync_tombstones()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.sync_tombstones (tenant_id, table_name, row_id)
+  SELECT o.tenant_id, TG_TABLE_NAME, o.id
+  FROM old_rows o
+  WHERE EXISTS (SELECT 1 FROM public.tenants t WHERE t.id = o.tenant_id);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.record_sync_tombstones() IS
+'Logs deleted rows of synced tables in sync_tombstones (skipped when the tenant itself is deleted)';
+
+DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.invoices;
+CREATE TRIGGER trg_sync_tombstones
+  AFTER DELETE ON public.invoices
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.record_sync_tombstones();
+
+DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.customers;
+CREATE TRIGGER trg_sync_tombstones
+  AFTER DELETE ON public.customers
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.record_sync_tombstones();
+
+DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.services;
+CREATE TRIGGER trg_sync_tombstones
+  AFTER DELETE ON public.services
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.record_sync_tombstones();
+
+DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.vat_rates;
+CREATE TRIGGER trg_sync_tombstones
+  AFTER DELETE ON public.vat_rates
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.record_sync_tombstones();
+
+-- ============================================================================
+-- 3. FUNCTION: purge_sync_tombstones
+-- ============================================================================
+
+-- Devices that have not synced within the retention window do a full
+-- resync instead of replaying tombstones, so older ones can go.
+-- Schedule daily, e.g. with pg_cron:
+--   SELECT cron.schedule('purge-sync-tombstones', '30 2 * * *',
+--                        'SELECT public.purge_sync_tombstones()');
+CREATE OR REPLACE FUNCTION public.purge_sync_tombstones(p_keep INTERVAL DEFAULT INTERVAL '90 days')
+RETURNS INTEGER AS $$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  DELETE FROM public.sync_tombstones WHERE deleted_at < NOW() - p_keep;
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.purge_sync_tombstones(INTERVAL) IS
+'Deletes tombstones older than the client retention window (default 90 days)';
+
+REVOKE EXECUTE ON FUNCTION public.purge_sync_tombstones(INTERVAL) FROM PUBLIC, anon, authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Expect an Index Scan on idx_invoices_sync
+-- EXPLAIN ANALYZE
+-- SELECT * FROM invoices
+-- WHERE tenant_id = '<tenant-id>' AND updated_at >= NOW() - INTERVAL '5 minutes'
+-- ORDER BY updated_at, id LIMIT 500;
+
+-- Test 2: A delete leaves a tombstone (inside a transaction you roll back)
+-- BEGIN;
+-- DELETE FROM invoices WHERE id = '<draft-invoice-id>';
+-- SELECT * FROM sync_tombstones ORDER BY id DESC LIMIT 1;
+-- ROLLBACK;
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.invoices;
+-- DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.customers;
+-- DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.services;
+-- DROP TRIGGER IF EXISTS trg_sync_tombstones ON public.vat_rates;
+-- DROP FUNCTION IF EXISTS public.record_sync_tombstones();
+-- DROP FUNCTION IF EXISTS public.purge_sync_tombstones(INTERVAL);
+-- DROP TABLE IF EXISTS public.sync_tombstones;
+-- DROP INDEX IF EXISTS idx_invoices_sync;
+-- DROP INDEX IF EXISTS idx_customers_sync;
+-- DROP INDEX IF EXISTS idx_services_sync;
+-- DROP INDEX IF EXISTS idx_vat_rates_sync;
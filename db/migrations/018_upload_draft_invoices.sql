@@ -0,0 +1,187 @@
+-- Migration: 018 - Batched, idempotent upload of offline drafts
+-- Purpose: Let a terminal upload several offline drafts (with items) per call, safely retried
+-- Date: 2026-10-17
+--
+-- Drafts written while offline live in Dexie (draftInvoices and
+-- draftInvoiceItems). lib/draftQueue.ts uploads them on reconnect in
+-- batches through upload_draft_invoices(). Each draft carries its Dexie
+-- UUID, stored as invoices.client_draft_id: uploading the same draft again
+-- (a retry after a timeout, a second tab) returns the invoice created the
+-- first time instead of a copy. Each draft is applied in its own
+-- subtransaction, so one bad draft is reported as a conflict without
+-- failing the rest of the batch.
+
+-- ============================================================================
+-- 1. IDEMPOTENCY KEY
+-- ============================================================================
+
+ALTER TABLE public.invoices
+  ADD COLUMN IF NOT EXISTS client_draft_id UUID;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_client_draft
+  ON public.invoices (tenant_id, client_draft_id)
+  WHERE client_draft_id IS NOT NULL;
+
+COMMENT ON COLUMN public.invoices.client_draft_id IS 'Dexie draft id the invoice was uploaded from (idempotency key)';
+
+-- ============================================================================
+-- 2. FUNCTION: upload_draft_invoices(drafts)
+-- ============================================================================
+
+-- drafts: [{ id, customer_id, invoice_date, due_date, notes, terms,
+--            invoice_number, items: [{ line_order, service_id, description,
+--            quantity, unit_price, vat_rate }, ...] }, ...]   (max 50)
+-- invoice_number is a PRO- number issued from a lease (migration 014), or
+-- null for an unnumbered Draft.
+-- Returns one result per draft, in order:
+--   { draft_id, status: 'created' | 'duplicate' | 'conflict',
+--     invoice_id, invoice_number, error }
+--
+-- SECURITY DEFINER: the tenant comes from the caller's JWT/profile, never
+-- from the payload, and patients and numbers must belong to that tenant.
+CREATE OR REPLACE FUNCTION public.upload_draft_invoices(drafts JSONB)
+RETURNS JSONB AS $$
+DECLARE
+  v_tenant_id UUID := get_user_tenant_id();
+  v_draft JSONB;
+  v_draft_id UUID;
+  v_number TEXT;
+  v_invoice public.invoices;
+  v_results JSONB := '[]'::jsonb;
+BEGIN
+  IF v_tenant_id IS NULL THEN
+    RAISE EXCEPTION 'No tenant for the current user' USING ERRCODE = '42501';
+  END IF;
+
+  IF jsonb_typeof(drafts) IS DISTINCT FROM 'array' OR jsonb_array_length(drafts) > 50 THEN
+    RAISE EXCEPTION 'drafts must be an array of at most 50 drafts' USING ERRCODE = '22023';
+  END IF;
+
+  FOR v_draft IN SELECT value FROM jsonb_array_elements(drafts) LOOP
+    v_draft_id := NULLIF(v_draft->>'id', '')::UUID;
+    v_number := NULLIF(v_draft->>'invoice_number', '');
+
+    -- Already uploaded: report what was created the first time
+    SELECT * INTO v_invoice
+    FROM public.invoices
+    WHERE tenant_id = v_tenant_id AND client_draft_id = v_draft_id;
+
+    IF FOUND THEN
+      v_results := v_results || jsonb_build_object(
+        'draft_id', v_draft_id, 'status', 'duplicate',
+        'invoice_id', v_invoice.id, 'invoice_number', v_invoice.invoice_number, 'error', NULL);
+      CONTINUE;
+    END IF;
+
+    BEGIN
+      IF v_draft_id IS NULL THEN
+        RAISE EXCEPTION 'Draft has no id' USING ERRCODE = '22023';
+      END IF;
+
+      IF jsonb_typeof(v_draft->'items') IS DISTINCT FROM 'array' OR jsonb_array_length(v_draft->'items') = 0 THEN
+        RAISE EXCEPTION 'A draft needs at least one line item' USING ERRCODE = '22023';
+      END IF;
+
+      IF NOT EXISTS (
+        SELECT 1 FROM public.customers
+        WHERE id = NULLIF(v_draft->>'customer_id', '')::UUID AND tenant_id = v_tenant_id
+      ) THEN
+        RAISE EXCEPTION 'Patient % not found', v_draft->>'customer_id' USING ERRCODE = '23503';
+      END IF;
+
+      -- Offline numbers must come from one of the tenant's leases
+      IF v_number IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM public.invoice_number_ledger
+        WHERE tenant_id = v_tenant_id AND invoice_number = v_number AND status IN ('leased', 'issued')
+      ) THEN
+        RAISE EXCEPTION 'Invoice number % was not leased to this practice', v_number USING ERRCODE = '22023';
+      END IF;
+
+      INSERT INTO public.invoices (
+        tenant_id, client_draft_id, invoice_number, customer_id, invoice_date, due_date,
+        status, notes, terms, created_by, updated_by
+      )
+      VALUES (
+        v_tenant_id,
+        v_draft_id,
+        v_number,
+        (v_draft->>'customer_id')::UUID,
+        COALESCE(NULLIF(v_draft->>'invoice_date', '')::DATE, CURRENT_DATE),
+        NULLIF(v_draft->>'due_date', '')::DATE,
+        CASE WHEN v_number IS NULL THEN 'Draft' ELSE 'ProformaOffline' END::invoice_status,
+        v_draft->>'notes',
+        v_draft->>'terms',
+        auth.uid(),
+        auth.uid()
+      )
+      RETURNING * INTO v_invoice;
+
+      -- One multi-row insert per draft: the statement-level totals trigger fires once
+      INSERT INTO public.invoice_items (
+        tenant_id, invoice_id, line_order, service_id, description,
+        quantity, unit_price, vat_rate
+      )
+      SELECT
+        v_tenant_id,
+        v_invoice.id,
+        COALESCE((item->>'line_order')::INTEGER, (ord - 1)::INTEGER),
+        NULLIF(item->>'service_id', '')::UUID,
+        item->>'description',
+        (item->>'quantity')::NUMERIC,
+        (item->>'unit_price')::NUMERIC,
+        COALESCE((item->>'vat_rate')::NUMERIC, 0.00)
+      FROM jsonb_array_elements(v_draft->'items') WITH ORDINALITY AS t(item, ord);
+
+      v_results := v_results || jsonb_build_object(
+        'draft_id', v_draft_id, 'status', 'created',
+        'invoice_id', v_invoice.id, 'invoice_number', v_invoice.invoice_number, 'error', NULL);
+    EXCEPTION
+      WHEN OTHERS THEN
+        -- The subtransaction is rolled back; a concurrent upload of the same
+        -- draft surfaces here as a unique violation on client_draft_id
+        SELECT * INTO v_invoice
+        FROM public.invoices
+        WHERE tenant_id = v_tenant_id AND client_draft_id = v_draft_id;
+
+        IF FOUND THEN
+          v_results := v_results || jsonb_build_object(
+            'draft_id', v_draft_id, 'status', 'duplicate',
+            'invoice_id', v_invoice.id, 'invoice_number', v_invoice.invoice_number, 'error', NULL);
+        ELSE
+          v_results := v_results || jsonb_build_object(
+            'draft_id', v_draft_id, 'status', 'conflict',
+            'invoice_id', NULL, 'invoice_number', v_number, 'error', SQLERRM);
+        END IF;
+    END;
+  END LOOP;
+
+  RETURN v_results;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.upload_draft_invoices(JSONB) IS
+'Uploads up to 50 offline drafts with their items; idempotent per draft id, per-draft conflicts reported';
+
+REVOKE EXECUTE ON FUNCTION public.upload_draft_invoices(JSONB) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.upload_draft_invoices(JSONB) TO authenticated;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Upload the same draft twice (as a signed-in user); the second
+-- result is 'duplicate' with the same invoice_id
+-- SELECT upload_draft_invoices('[{"id": "<uuid>", "customer_id": "<patient-id>",
+--   "items": [{"description": "Consultation", "quantity": 1, "unit_price": 350, "vat_rate": 15}]}]');
+
+-- Test 2: A bad draft is a conflict, the rest of the batch still uploads
+-- SELECT jsonb_array_elements(upload_draft_invoices('[{"id": "<uuid>", "customer_id": "<patient-id>", "items": []},
+--   {"id": "<uuid>", "customer_id": "<patient-id>", "items": [{"description": "X-Ray", "quantity": 1, "unit_price": 250}]}]'));
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- DROP FUNCTION IF EXISTS public.upload_draft_invoices(JSONB);
+-- DROP INDEX IF EXISTS idx_invoices_client_draft;
+-- ALTER TABLE public.invoices DROP COLUMN IF EXISTS client_draft_id;
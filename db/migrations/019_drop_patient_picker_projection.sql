@@ -0,0 +1,30 @@
+-- Migration: 019 - Drop the patient picker projection
+-- Purpose: Remove patient_picker_options() and its covering index, which nothing reads
+-- Date: 2026-10-17
+--
+-- Migration 016 served InvoiceNew's preloaded patient dropdown. The dropdown
+-- became a type-ahead search (AsyncPatientSelect over search_patients(),
+-- migration 011, or the in-browser index when offline), so no client calls
+-- patient_picker_options() any more. The function and idx_customers_picker
+-- cost an index update on every patient write for no reads.
+
+-- ============================================================================
+-- 1. FUNCTION AND INDEX
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS public.patient_picker_options(BOOLEAN);
+
+DROP INDEX IF EXISTS public.idx_customers_picker;
+
+-- ============================================================================
+-- Verification Query (run after migration)
+-- ============================================================================
+
+-- Test 1: Both gone (expect NULL, NULL)
+-- SELECT to_regprocedure('public.patient_picker_options(boolean)'), to_regclass('public.idx_customers_picker');
+
+-- ============================================================================
+-- Rollback (if needed)
+-- ============================================================================
+
+-- Re-run db/migrations/016_patient_picker_projection.sql
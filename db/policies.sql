@@ -22,29 +22,49 @@ ALTER TABLE audit_log ENABLE ROW LEVEL SECURITY;
 -- HELPER FUNCTIONS
 -- ============================================================================
 
+-- Claims injected by auth.custom_access_token_hook (db/jwt-config.sql)
+-- are read first; user_profiles is only queried for tokens issued before
+-- the hook was enabled. Policies call these as (SELECT fn()) so they run
+-- once per statement as an initplan, not once per row.
+-- Note: a changed role or tenant takes effect at the next token refresh.
+
 -- Get current user's tenant_id from JWT
 CREATE OR REPLACE FUNCTION get_user_tenant_id()
 RETURNS UUID AS $$
+DECLARE
+    v_tenant_id UUID;
 BEGIN
+    v_tenant_id := NULLIF(NULLIF(current_setting('request.jwt.claims', true), '')::jsonb->>'tenant_id', '')::UUID;
+    IF v_tenant_id IS NOT NULL THEN
+        RETURN v_tenant_id;
+    END IF;
+
     RETURN (
         SELECT tenant_id
         FROM user_profiles
         WHERE id = auth.uid()
     );
 END;
-$$ LANGUAGE plpgsql SECURITY DEFINER STABLE;
+$$ LANGUAGE plpgsql SECURITY DEFINER STABLE SET search_path = public;
 
 -- Get current user's role
 CREATE OR REPLACE FUNCTION get_user_role()
 RETURNS user_role AS $$
+DECLARE
+    v_role user_role;
 BEGIN
+    v_role := NULLIF(NULLIF(current_setting('request.jwt.claims', true), '')::jsonb->>'user_role', '')::user_role;
+    IF v_role IS NOT NULL THEN
+        RETURN v_role;
+    END IF;
+
     RETURN (
         SELECT role
         FROM user_profiles
         WHERE id = auth.uid()
     );
 END;
-$$ LANGUAGE plpgsql SECURITY DEFINER STABLE;
+$$ LANGUAGE plpgsql SECURITY DEFINER STABLE SET search_path = public;
 
 -- Check if user is owner
 CREATE OR REPLACE FUNCTION is_owner()
@@ -77,13 +97,13 @@ $$ LANGUAGE plpgsql SECURITY DEFINER STABLE;
 -- Users can read their own tenant
 CREATE POLICY "Users can read own tenant"
 ON tenants FOR SELECT
-USING (id = get_user_tenant_id());
+USING (id = (SELECT get_user_tenant_id()));
 
 -- Owners can update their tenant
 CREATE POLICY "Owners can update own tenant"
 ON tenants FOR UPDATE
-USING (id = get_user_tenant_id() AND is_owner())
-WITH CHECK (id = get_user_tenant_id() AND is_owner());
+USING (id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()))
+WITH CHECK (id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()));
 
 -- Note: Tenant creation handled via signup flow (no INSERT policy needed)
 
@@ -94,33 +114,33 @@ WITH CHECK (id = get_user_tenant_id() AND is_owner());
 -- Users can read profiles in their tenant
 CREATE POLICY "Users can read tenant profiles"
 ON user_profiles FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Users can update their own profile (except role and tenant_id)
 CREATE POLICY "Users can update own profile"
 ON user_profiles FOR UPDATE
-USING (id = auth.uid())
+USING (id = (SELECT auth.uid()))
 WITH CHECK (
-    id = auth.uid() AND
-    tenant_id = get_user_tenant_id() AND
-    role = (SELECT role FROM user_profiles WHERE id = auth.uid())
+    id = (SELECT auth.uid()) AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    role = (SELECT role FROM user_profiles WHERE id = (SELECT auth.uid()))
 );
 
 -- Owners can insert new users in their tenant
 CREATE POLICY "Owners can create tenant users"
 ON user_profiles FOR INSERT
-WITH CHECK (tenant_id = get_user_tenant_id() AND is_owner());
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()));
 
 -- Owners can update tenant users (including role changes)
 CREATE POLICY "Owners can update tenant users"
 ON user_profiles FOR UPDATE
-USING (tenant_id = get_user_tenant_id() AND is_owner())
-WITH CHECK (tenant_id = get_user_tenant_id() AND is_owner());
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()));
 
 -- Owners can delete tenant users (except themselves)
 CREATE POLICY "Owners can delete tenant users"
 ON user_profiles FOR DELETE
-USING (tenant_id = get_user_tenant_id() AND is_owner() AND id != auth.uid());
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_owner()) AND id != (SELECT auth.uid()));
 
 -- ============================================================================
 -- VAT RATES POLICIES
@@ -129,13 +149,13 @@ USING (tenant_id = get_user_tenant_id() AND is_owner() AND id != auth.uid());
 -- Users can read VAT rates in their tenant
 CREATE POLICY "Users can read tenant vat rates"
 ON vat_rates FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Admins can manage VAT rates
 CREATE POLICY "Admins can manage vat rates"
 ON vat_rates FOR ALL
-USING (tenant_id = get_user_tenant_id() AND is_admin_or_owner())
-WITH CHECK (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
 
 -- ============================================================================
 -- UNITS POLICIES
@@ -144,13 +164,13 @@ WITH CHECK (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
 -- Users can read units in their tenant
 CREATE POLICY "Users can read tenant units"
 ON units FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Admins can manage units
 CREATE POLICY "Admins can manage units"
 ON units FOR ALL
-USING (tenant_id = get_user_tenant_id() AND is_admin_or_owner())
-WITH CHECK (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
 
 -- ============================================================================
 -- SERVICES POLICIES
@@ -159,23 +179,23 @@ WITH CHECK (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
 -- Users can read services in their tenant
 CREATE POLICY "Users can read tenant services"
 ON services FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can create services
 CREATE POLICY "Staff can create services"
 ON services FOR INSERT
-WITH CHECK (tenant_id = get_user_tenant_id());
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can update services
 CREATE POLICY "Staff can update services"
 ON services FOR UPDATE
-USING (tenant_id = get_user_tenant_id())
-WITH CHECK (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Admins can delete services
 CREATE POLICY "Admins can delete services"
 ON services FOR DELETE
-USING (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
 
 -- ============================================================================
 -- CUSTOMERS POLICIES
@@ -184,23 +204,23 @@ USING (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
 -- Users can read customers in their tenant
 CREATE POLICY "Users can read tenant customers"
 ON customers FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can create customers
 CREATE POLICY "Staff can create customers"
 ON customers FOR INSERT
-WITH CHECK (tenant_id = get_user_tenant_id());
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can update customers
 CREATE POLICY "Staff can update customers"
 ON customers FOR UPDATE
-USING (tenant_id = get_user_tenant_id())
-WITH CHECK (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Admins can delete customers
 CREATE POLICY "Admins can delete customers"
 ON customers FOR DELETE
-USING (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
+USING (tenant_id = (SELECT get_user_tenant_id()) AND (SELECT is_admin_or_owner()));
 
 -- ============================================================================
 -- INVOICE COUNTERS POLICIES
@@ -209,13 +229,13 @@ USING (tenant_id = get_user_tenant_id() AND is_admin_or_owner());
 -- Users can read counters in their tenant
 CREATE POLICY "Users can read tenant counters"
 ON invoice_counters FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- System can insert/update counters (via trigger/function)
 CREATE POLICY "System can manage counters"
 ON invoice_counters FOR ALL
-USING (tenant_id = get_user_tenant_id())
-WITH CHECK (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()))
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- ============================================================================
 -- INVOICES POLICIES
@@ -224,32 +244,32 @@ WITH CHECK (tenant_id = get_user_tenant_id());
 -- Users can read invoices in their tenant
 CREATE POLICY "Users can read tenant invoices"
 ON invoices FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can create invoices
 CREATE POLICY "Staff can create invoices"
 ON invoices FOR INSERT
-WITH CHECK (tenant_id = get_user_tenant_id());
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can update Draft invoices
 -- Admins can update any invoice (for corrections)
 CREATE POLICY "Staff can update draft invoices"
 ON invoices FOR UPDATE
 USING (
-    tenant_id = get_user_tenant_id() AND
-    (status = 'Draft' OR is_admin_or_owner())
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    (status = 'Draft' OR (SELECT is_admin_or_owner()))
 )
 WITH CHECK (
-    tenant_id = get_user_tenant_id() AND
-    (status = 'Draft' OR is_admin_or_owner())
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    (status = 'Draft' OR (SELECT is_admin_or_owner()))
 );
 
 -- Admins can delete invoices (Draft only for safety)
 CREATE POLICY "Admins can delete draft invoices"
 ON invoices FOR DELETE
 USING (
-    tenant_id = get_user_tenant_id() AND
-    is_admin_or_owner() AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
+    (SELECT is_admin_or_owner()) AND
     status = 'Draft'
 );
 
@@ -260,18 +280,18 @@ USING (
 -- Users can read invoice items in their tenant
 CREATE POLICY "Users can read tenant invoice items"
 ON invoice_items FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- Staff can create invoice items (for Draft invoices)
 CREATE POLICY "Staff can create invoice items"
 ON invoice_items FOR INSERT
 WITH CHECK (
-    tenant_id = get_user_tenant_id() AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
     EXISTS (
         SELECT 1 FROM invoices
         WHERE id = invoice_items.invoice_id
         AND status = 'Draft'
-        AND tenant_id = get_user_tenant_id()
+        AND tenant_id = (SELECT get_user_tenant_id())
     )
 );
 
@@ -279,21 +299,21 @@ WITH CHECK (
 CREATE POLICY "Staff can update invoice items"
 ON invoice_items FOR UPDATE
 USING (
-    tenant_id = get_user_tenant_id() AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
     EXISTS (
         SELECT 1 FROM invoices
         WHERE id = invoice_items.invoice_id
         AND status = 'Draft'
-        AND tenant_id = get_user_tenant_id()
+        AND tenant_id = (SELECT get_user_tenant_id())
     )
 )
 WITH CHECK (
-    tenant_id = get_user_tenant_id() AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
     EXISTS (
         SELECT 1 FROM invoices
         WHERE id = invoice_items.invoice_id
         AND status = 'Draft'
-        AND tenant_id = get_user_tenant_id()
+        AND tenant_id = (SELECT get_user_tenant_id())
     )
 );
 
@@ -301,12 +321,12 @@ WITH CHECK (
 CREATE POLICY "Staff can delete invoice items"
 ON invoice_items FOR DELETE
 USING (
-    tenant_id = get_user_tenant_id() AND
+    tenant_id = (SELECT get_user_tenant_id()) AND
     EXISTS (
         SELECT 1 FROM invoices
         WHERE id = invoice_items.invoice_id
         AND status = 'Draft'
-        AND tenant_id = get_user_tenant_id()
+        AND tenant_id = (SELECT get_user_tenant_id())
     )
 );
 
@@ -317,12 +337,12 @@ USING (
 -- Users can read audit logs in their tenant
 CREATE POLICY "Users can read tenant audit logs"
 ON audit_log FOR SELECT
-USING (tenant_id = get_user_tenant_id());
+USING (tenant_id = (SELECT get_user_tenant_id()));
 
 -- System can insert audit logs
 CREATE POLICY "System can create audit logs"
 ON audit_log FOR INSERT
-WITH CHECK (tenant_id = get_user_tenant_id());
+WITH CHECK (tenant_id = (SELECT get_user_tenant_id()));
 
 -- No UPDATE or DELETE on audit logs (immutable)
 
@@ -332,13 +352,13 @@ WITH CHECK (tenant_id = get_user_tenant_id());
 
 -- Bucket: invoice-attachments
 -- Policy: Users can upload to their tenant folder
--- INSERT: bucket_id = 'invoice-attachments' AND (storage.foldername(name))[1] = get_user_tenant_id()::text
+-- INSERT: bucket_id = 'invoice-attachments' AND (storage.foldername(name))[1] = (SELECT get_user_tenant_id())::text
 
 -- Policy: Users can read from their tenant folder
--- SELECT: bucket_id = 'invoice-attachments' AND (storage.foldername(name))[1] = get_user_tenant_id()::text
+-- SELECT: bucket_id = 'invoice-attachments' AND (storage.foldername(name))[1] = (SELECT get_user_tenant_id())::text
 
 -- Policy: Admins can delete from their tenant folder
--- DELETE: bucket_id = 'invoice-attachments' AND (storage.foldername(name))[1] = get_user_tenant_id()::text AND is_admin_or_owner()
+-- DELETE: bucket_id = 'invoice-attachments' AND (storage.foldername(name))[1] = (SELECT get_user_tenant_id())::text AND (SELECT is_admin_or_owner())
 
 -- ============================================================================
 -- COMMENTS
@@ -357,7 +377,8 @@ COMMENT ON POLICY "System can create audit logs" ON audit_log IS 'Audit logs are
 
 -- RLS Enforcement Strategy:
 -- 1. EVERY table has tenant_id (except tenants itself)
--- 2. ALL policies filter by: tenant_id = get_user_tenant_id()
+-- 2. ALL policies filter by: tenant_id = (SELECT get_user_tenant_id())
+--    (the sub-select makes it an initplan: evaluated once per statement)
 -- 3. JWT must contain tenant_id claim (set during login)
 -- 4. Users cannot access data from other tenants
 -- 5. Role hierarchy: owner > admin > staff
@@ -0,0 +1,92 @@
+"""
+Shared database connection for the db/tools scripts
+
+The tools talk to Postgres directly (not through PostgREST), so they need
+a connection string with a role that can bypass RLS, e.g. the Supabase
+"postgres" user or a local development database:
+
+    DATABASE_URL=postgresql://postgres:<password>@db.<project-ref>.supabase.co:5432/postgres
+
+DATABASE_URL is read from the environment, then from .env.local in the
+repository root (the file db/migrate.sh loads).
+
+psycopg (v3) is only imported when a connection is opened, so --help and
+dry runs work without it.
+"""
+
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+ENV_FILE = REPO_ROOT / '.env.local'
+
+
+class ToolError(Exception):
+    """Raised for problems the user can fix (configuration, input, missing tenant)"""
+
+
+def _read_env_file(path):
+    values = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                values[key.strip()] = value.strip().strip('"').strip("'")
+    except FileNotFoundError:
+        pass
+    return values
+
+
+def database_url(explicit=None):
+    """Connection string from --database-url, $DATABASE_URL or .env.local"""
+    url = explicit or os.environ.get('DATABASE_URL') or _read_env_file(ENV_FILE).get('DATABASE_URL')
+    if not url:
+        raise ToolError(
+            "No database connection string. Set DATABASE_URL (environment or .env.local) "
+            "or pass --database-url."
+        )
+    return url
+
+
+def _psycopg():
+    try:
+        import psycopg
+    except ImportError as e:
+        raise ToolError(
+            "psycopg is required for this tool: pip install 'psycopg[binary]>=3.1'"
+        ) from e
+    return psycopg
+
+
+def connect(url=None, autocommit=False):
+    """Open a psycopg connection (raises ToolError if psycopg or the URL is missing)"""
+    psycopg = _psycopg()
+    try:
+        return psycopg.connect(database_url(url), autocommit=autocommit)
+    except psycopg.OperationalError as e:
+        raise ToolError(f"Cannot connect to the database: {e}") from e
+
+
+async def connect_async(url=None, autocommit=False):
+    """Open a psycopg AsyncConnection (raises ToolError like connect())"""
+    psycopg = _psycopg()
+    try:
+        return await psycopg.AsyncConnection.connect(database_url(url), autocommit=autocommit)
+    except psycopg.OperationalError as e:
+        raise ToolError(f"Cannot connect to the database: {e}") from e
+
+
+def resolve_tenant(conn, tenant):
+    """Tenant id for a UUID or slug; raises ToolError if there is no such tenant"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id FROM tenants WHERE id::text = %s OR slug = %s",
+            (tenant, tenant),
+        )
+        row = cur.fetchone()
+    if row is None:
+        raise ToolError(f"No tenant with id or slug {tenant!r}")
+    return row[0]
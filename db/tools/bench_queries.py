@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Query benchmark suite with EXPLAIN ANALYZE regression tracking
+
+Runs the query shapes the web app sends, as the signed-in owner of one
+tenant (SET ROLE authenticated + the JWT claims PostgREST would set), so
+every RLS policy is in effect:
+
+  invoice_detail         InvoiceDetail.fetchInvoice   invoices + customer(*) + invoice_items(*)
+  invoice_list_first     InvoicesList, first page     list_invoices()
+  invoice_list_deep      InvoicesList, deep page      list_invoices(cursor at 80%)
+  invoice_list_paid      InvoicesList, status filter  list_invoices(p_status => 'Paid')
+  patient_search         AsyncPatientSelect           search_patients(q) -> id, name, cell
+  reports_monthly        ReportsDashboard             vw_invoice_summary, full history
+  reports_status_totals  ReportsDashboard             vw_invoice_status_totals
+  payment_timeline       vw_payment_timeline, last 90 days
+  invoice_number_scan    generateInvoiceNumber()      LIKE 'INV-YYYYMMDD-%' (deprecated path)
+
+For each query it records client-side latency (p50 / p95 / max over --runs
+after --warmup), shared buffers hit / read and the plan shape from
+EXPLAIN (ANALYZE, BUFFERS). For RPCs the plan is taken from the statement
+the function runs, since EXPLAIN cannot see inside plpgsql.
+
+--save-baseline writes the results to --baseline; later runs are compared
+against it and flag slower p95, more buffers, or a different plan shape,
+exiting 1 if anything regressed. Everything runs in one transaction that is
+rolled back.
+
+Run against a local database with schema.sql, policies.sql and all
+migrations applied, loaded with generate_data.py:
+
+    python3 db/tools/bench_queries.py --tenant synthetic-001 --save-baseline
+    python3 db/tools/bench_queries.py --tenant synthetic-001
+"""
+
+import argparse
+import difflib
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from _connection import REPO_ROOT, ToolError, connect, resolve_tenant
+
+DEFAULT_BASELINE = REPO_ROOT / 'db' / 'benchmarks' / 'query_baseline.json'
+
+# Regression thresholds: relative growth AND an absolute floor, so noise on
+# sub-millisecond queries is not reported
+LATENCY_RATIO = 1.5
+LATENCY_FLOOR_MS = 1.0
+BUFFERS_RATIO = 2.0
+BUFFERS_FLOOR = 100
+
+
+@dataclass
+class BenchQuery:
+    name: str
+    sql: str  # what the app sends (named psycopg parameters)
+    plan_sql: str = None  # statement run inside an RPC, for the plan shape
+
+
+# list_invoices() body for the parameters used below (migration 015)
+_LIST_INVOICES_PLAN = """
+    SELECT i.id, i.invoice_number, i.invoice_date, i.status, i.total_amount,
+           i.payment_method, i.created_at, i.customer_id, c.name
+    FROM invoices i
+    JOIN customers c ON c.id = i.customer_id
+    WHERE i.tenant_id = %(tenant_id)s {extra}
+    ORDER BY i.created_at DESC, i.id DESC
+    LIMIT 50
+"""
+
+QUERIES = [
+    BenchQuery(
+        'invoice_detail',
+        # Same joins PostgREST builds for select('*, customer:customers(*), invoice_items(*)')
+        """
+        SELECT i.*, row_to_json(cust) AS customer, COALESCE(items.rows, '[]') AS invoice_items
+        FROM invoices i
+        LEFT JOIN LATERAL (SELECT c.* FROM customers c WHERE c.id = i.customer_id) cust ON true
+        LEFT JOIN LATERAL (
+            SELECT json_agg(ii) AS rows FROM invoice_items ii WHERE ii.invoice_id = i.id
+        ) items ON true
+        WHERE i.id = %(invoice_id)s AND i.tenant_id = %(tenant_id)s
+        """,
+    ),
+    BenchQuery(
+        'invoice_list_first',
+        "SELECT * FROM list_invoices(p_limit => 50)",
+        _LIST_INVOICES_PLAN.format(extra=''),
+    ),
+    BenchQuery(
+        'invoice_list_deep',
+        "SELECT * FROM list_invoices(p_after_created_at => %(after_created_at)s, "
+        "p_after_id => %(after_id)s, p_limit => 50)",
+        _LIST_INVOICES_PLAN.format(extra="AND (i.created_at, i.id) < (%(after_created_at)s, %(after_id)s)"),
+    ),
+    BenchQuery(
+        'invoice_list_paid',
+        "SELECT * FROM list_invoices(p_status => 'Paid', p_limit => 50)",
+        _LIST_INVOICES_PLAN.format(extra="AND i.status = 'Paid'"),
+    ),
+    BenchQuery(
+        'patient_search',
+        "SELECT id, name, cell FROM search_patients(%(search_term)s, 20)",
+        # search_tenant_patients() body (migration 011) for a name-only term
+        """
+        SELECT c.id, c.name, c.cell
+        FROM customers c
+        WHERE c.tenant_id = %(tenant_id)s
+          AND c.is_active
+          AND (c.search_name LIKE '%%' || %(search_term)s || '%%'
+               OR %(search_term)s <%% c.search_name
+               OR c.id_number LIKE %(search_term)s || '%%')
+        ORDER BY (c.id_number LIKE %(search_term)s || '%%') IS TRUE DESC,
+                 word_similarity(%(search_term)s, c.search_name) DESC,
+                 c.search_name
+        LIMIT 20
+        """,
+    ),
+    BenchQuery(
+        'reports_monthly',
+        "SELECT * FROM vw_invoice_summary WHERE tenant_id = %(tenant_id)s ORDER BY month DESC",
+    ),
+    BenchQuery(
+        'reports_status_totals',
+        "SELECT * FROM vw_invoice_status_totals WHERE tenant_id = %(tenant_id)s",
+    ),
+    BenchQuery(
+        'payment_timeline',
+        "SELECT * FROM vw_payment_timeline WHERE tenant_id = %(tenant_id)s "
+        "AND day >= %(since_day)s ORDER BY day",
+    ),
+    BenchQuery(
+        'invoice_number_scan',
+        "SELECT invoice_number FROM invoices WHERE tenant_id = %(tenant_id)s "
+        "AND invoice_number LIKE %(number_pattern)s ORDER BY invoice_number DESC LIMIT 1",
+    ),
+]
+
+
+# ============================================================================
+# Setup
+# ============================================================================
+
+def fixtures(cur, tenant_id):
+    """Parameter values taken from the tenant's own data (read as the table owner)"""
+    cur.execute(
+        """
+        SELECT COUNT(*), MAX(invoice_date),
+               (ARRAY_AGG(id ORDER BY created_at DESC, id DESC))[1]
+        FROM invoices WHERE tenant_id = %s
+        """,
+        (tenant_id,),
+    )
+    count, last_date, last_invoice = cur.fetchone()
+    if not count:
+        raise ToolError("The tenant has no invoices; load data first (db/tools/generate_data.py)")
+
+    cur.execute(
+        "SELECT created_at, id FROM invoices WHERE tenant_id = %s "
+        "ORDER BY created_at DESC, id DESC OFFSET %s LIMIT 1",
+        (tenant_id, int(count * 0.8)),
+    )
+    after_created_at, after_id = cur.fetchone()
+
+    cur.execute(
+        "SELECT LOWER(LEFT(COALESCE(last_name, name), 4)) FROM customers "
+        "WHERE tenant_id = %s AND is_active ORDER BY id LIMIT 1",
+        (tenant_id,),
+    )
+    row = cur.fetchone()
+
+    cur.execute("SELECT id FROM user_profiles WHERE tenant_id = %s ORDER BY created_at LIMIT 1", (tenant_id,))
+    profile = cur.fetchone()
+
+    return {
+        'tenant_id': tenant_id,
+        'invoice_id': last_invoice,
+        'after_created_at': after_created_at,
+        'after_id': after_id,
+        'search_term': row[0] if row else 'mok',
+        'since_day': last_date - timedelta(days=90),
+        'number_pattern': f"INV-{last_date:%Y%m%d}-%",
+        'user_id': profile[0] if profile else '00000000-0000-0000-0000-000000000000',
+        'invoices': count,
+    }
+
+
+def sign_in(cur, params):
+    """Become the tenant owner the way PostgREST does for a signed-in request"""
+    claims = {
+        'sub': str(params['user_id']),
+        'role': 'authenticated',
+        'tenant_id': str(params['tenant_id']),
+        'user_role': 'owner',
+    }
+    cur.execute("SELECT set_config('request.jwt.claims', %s, true)", (json.dumps(claims),))
+    cur.execute("SET LOCAL statement_timeout = '60s'")
+    cur.execute("SET LOCAL ROLE authenticated")
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def plan_shape(node, depth=0):
+    """Plan tree as indented node lines, without costs, rows or timings"""
+    label = node['Node Type']
+    for key in ('Index Name', 'Relation Name', 'Function Name'):
+        if key in node:
+            label += f" on {node[key]}"
+            break
+    lines = ['  ' * depth + label]
+    for child in node.get('Plans', []):
+        lines.extend(plan_shape(child, depth + 1))
+    return lines
+
+
+def _explain(cur, sql, params):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    return cur.fetchone()[0][0]['Plan']
+
+
+def measure(cur, query, params, runs, warmup):
+    for _ in range(warmup):
+        cur.execute(query.sql, params)
+        cur.fetchall()
+
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cur.execute(query.sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    # Buffers of the call itself (nested statements included)
+    plan = _explain(cur, query.sql, params)
+    shape_plan = _explain(cur, query.plan_sql, params) if query.plan_sql else plan
+
+    return {
+        'p50_ms': round(_percentile(samples, 0.5), 3),
+        'p95_ms': round(_percentile(samples, 0.95), 3),
+        'max_ms': round(max(samples), 3),
+        'shared_hit': plan.get('Shared Hit Blocks', 0),
+        'shared_read': plan.get('Shared Read Blocks', 0),
+        'plan': plan_shape(shape_plan),
+    }
+
+
+# ============================================================================
+# Baseline comparison
+# ============================================================================
+
+def compare(name, result, base):
+    """Regression messages for one query (empty when it is within thresholds)"""
+    problems = []
+    if result['p95_ms'] > base['p95_ms'] * LATENCY_RATIO and result['p95_ms'] - base['p95_ms'] > LATENCY_FLOOR_MS:
+        problems.append(f"p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+
+    buffers = result['shared_hit'] + result['shared_read']
+    base_buffers = base['shared_hit'] + base['shared_read']
+    if buffers > base_buffers * BUFFERS_RATIO and buffers - base_buffers > BUFFERS_FLOOR:
+        problems.append(f"buffers {base_buffers} -> {buffers}")
+
+    if result['plan'] != base['plan']:
+        diff = difflib.unified_diff(base['plan'], result['plan'], 'baseline', 'current', lineterm='', n=1)
+        problems.append("plan changed:\n      " + "\n      ".join(diff))
+    return problems
+
+
+def print_results(results, baseline):
+    print(f"{'query':<24}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'hit':>9}{'read':>8}  vs baseline")
+    regressions = 0
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            status, problems = 'new', []
+        else:
+            problems = compare(name, result, base)
+            status = 'REGRESSED' if problems else 'ok'
+        regressions += bool(problems)
+        print(f"{name:<24}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['max_ms']:>9.2f}"
+              f"{result['shared_hit']:>9}{result['shared_read']:>8}  {status}")
+        for problem in problems:
+            print(f"    - {problem}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's queries under RLS and compare with a baseline")
+    parser.add_argument('--tenant', required=True, help="Tenant id or slug to run as")
+    parser.add_argument('--runs', type=int, default=50, help="Timed runs per query (default 50)")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed runs per query (default 5)")
+    parser.add_argument('--only', nargs='+', metavar='QUERY', help="Run only these queries")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE,
+                        help=f"Baseline file (default {DEFAULT_BASELINE.relative_to(REPO_ROOT)})")
+    parser.add_argument('--save-baseline', action='store_true', help="Write this run as the new baseline")
+    parser.add_argument('--database-url', help="Overrides DATABASE_URL")
+    args = parser.parse_args()
+
+    queries = [q for q in QUERIES if not args.only or q.name in args.only]
+
+    try:
+        if not queries:
+            raise ToolError(f"No such queries: {args.only} (choose from {[q.name for q in QUERIES]})")
+        if args.runs < 1:
+            raise ToolError("--runs must be at least 1")
+
+        with connect(args.database_url) as conn:
+            with conn.cursor() as cur:
+                tenant_id = resolve_tenant(conn, args.tenant)
+                params = fixtures(cur, tenant_id)
+                print(f"Tenant {args.tenant}: {params['invoices']} invoices; "
+                      f"{args.runs} runs per query as role authenticated\n")
+
+                sign_in(cur, params)
+                results = {}
+                for query in queries:
+                    results[query.name] = measure(cur, query, params, args.runs, args.warmup)
+            conn.rollback()
+    except ToolError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = {}
+    if args.baseline.is_file() and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['queries']
+
+    regressions = print_results(results, baseline)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'tenant': args.tenant, 'invoices': params['invoices'], 'runs': args.runs,
+                       'queries': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+    elif regressions:
+        print(f"\n{regressions} query(ies) regressed against {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Synthetic multi-tenant data generator for load and scale testing
+
+Creates --tenants practices, each with the seed.sql service catalogue,
+VAT rates and units, --patients patients and --invoices invoices with on
+average --items line items. Counts are per tenant, so
+
+    --tenants 50 --patients 2000 --invoices 20000 --items 5
+
+loads 100k patients, 1M invoices and ~5M items.
+
+  - Deterministic: every tenant draws from its own random stream seeded by
+    (--seed, tenant number), so the same --seed and --end-date produce the
+    same rows (ids included) whatever --jobs is.
+  - Realistic shape: status mix (Paid > Finalized > Draft > Quotation >
+    Void), payment-method mix, a few popular services and a long tail,
+    returning patients, weekday-heavy dates over --months.
+  - Valid: Drafts have no invoice number, every other status has an
+    INV-YYYYMMDD-NNN number unique per tenant (chk_invoice_number_on_finalize
+    and idx_invoices_number_unique). Line and invoice totals match what the
+    invoice_items triggers compute.
+  - Fast: each tenant is loaded with COPY on its own connection, --jobs
+    tenants at a time, one transaction per tenant. --no-triggers skips the
+    row triggers (session_replication_role = replica; needs a role that may
+    set it) and rebuilds the reporting rollups once at the end.
+
+Generated tenants get slugs "<prefix>-001", "<prefix>-002", ...
+
+Usage:
+    python3 db/tools/generate_data.py --tenants 5 --patients 1000 --invoices 5000
+    python3 db/tools/generate_data.py --tenants 50 --patients 2000 --invoices 20000 --jobs 8 --no-triggers
+    python3 db/tools/generate_data.py --drop            # remove generated tenants
+
+Only for development and benchmark databases.
+"""
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+from _connection import ToolError, connect
+
+SAST = timezone(timedelta(hours=2))
+COPY_CHUNK = 10000  # invoices per COPY round (their items follow)
+
+# seed.sql catalogue: code, name, price (ZAR), unit, popularity weight
+SERVICES = [
+    ('CONS-01', 'Dental Consultation', 350.00, 'Service', 30),
+    ('CLEAN-01', 'Scale & Polish', 650.00, 'Service', 22),
+    ('XRAY-01', 'Dental X-Ray', 250.00, 'Unit', 20),
+    ('FIL-COMP', 'Composite Filling', 650.00, 'Unit', 14),
+    ('FIL-AMAL', 'Amalgam Filling', 550.00, 'Unit', 5),
+    ('RCT-01', 'Root Canal Treatment', 3500.00, 'Service', 3),
+    ('CROWN-PFM', 'Porcelain Crown', 5500.00, 'Unit', 2),
+    ('EXT-SIMP', 'Simple Extraction', 850.00, 'Unit', 6),
+    ('EXT-SURG', 'Surgical Extraction', 1800.00, 'Unit', 2),
+    ('WHITEN-01', 'Teeth Whitening', 4500.00, 'Service', 1),
+    ('VENEER-01', 'Porcelain Veneer', 8500.00, 'Unit', 1),
+    ('DENT-FULL', 'Complete Denture', 7500.00, 'Unit', 1),
+    ('DENT-PART', 'Partial Denture', 4500.00, 'Unit', 1),
+    ('IMPLANT-01', 'Dental Implant', 18000.00, 'Unit', 1),
+    ('EMERG-01', 'Emergency Treatment', 1200.00, 'Service', 4),
+    ('FLUOR-01', 'Fluoride Treatment', 250.00, 'Service', 6),
+]
+UNITS = [('Service', 'svc'), ('Unit', 'ea'), ('Hour', 'hr')]
+
+STATUS_WEIGHTS = {'Paid': 55, 'Finalized': 15, 'Draft': 12, 'Quotation': 10, 'Void': 8}
+PAYMENT_WEIGHTS = {'Cash': 35, 'Card': 30, 'EFT': 20, 'Medical Aid': 12, 'Split': 3}
+
+FIRST_NAMES = ['Thabo', 'Lerato', 'Sipho', 'Nomsa', 'Kagiso', 'Palesa', 'Johan', 'Anika',
+               'Tshepo', 'Zanele', 'Mpho', 'Karabo', 'Naledi', 'Pieter', 'Ayanda', 'Lindiwe',
+               'Bongani', 'Refilwe', 'Themba', 'Precious', 'Willem', 'Marike', 'Lesego', 'Dineo']
+LAST_NAMES = ['Mokoena', 'Tebeila', 'Nkosi', 'Dlamini', 'van der Merwe', 'Botha', 'Mahlangu',
+              'Molefe', 'Khumalo', 'Ndlovu', 'Sithole', 'Pretorius', 'Maluleke', 'Mabena',
+              'Ramaphosa', 'Mathebula', 'Venter', 'Nel', 'Shabalala', 'Zulu', 'Baloyi', 'Modise']
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _money(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def _weighted(rng, weights):
+    keys = list(weights)
+    return lambda: rng.choices(keys, weights=[weights[k] for k in keys])[0]
+
+
+def _luhn_digit(digits):
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch)
+        if i % 2 == 0:
+            d = d * 2 - 9 if d > 4 else d * 2
+        total += d
+    return str((10 - total % 10) % 10)
+
+
+def _id_number(rng, end_date):
+    born = end_date - timedelta(days=rng.randint(3 * 365, 85 * 365))
+    body = born.strftime('%y%m%d') + f"{rng.randint(0, 9999):04d}" + '08'
+    return body + _luhn_digit(body)
+
+
+# ============================================================================
+# One tenant (runs in a worker process)
+# ============================================================================
+
+def _reference_data(cur, rng, tenant_id):
+    """VAT rates, units and services; returns the service list for invoicing"""
+    vat_standard, vat_zero = _uuid(rng), _uuid(rng)
+    cur.execute(
+        "INSERT INTO vat_rates (id, tenant_id, name, rate, is_default) VALUES "
+        "(%s, %s, 'Standard VAT', 15.00, true), (%s, %s, 'Zero-rated', 0.00, false)",
+        (vat_standard, tenant_id, vat_zero, tenant_id),
+    )
+    cur.execute("UPDATE tenants SET default_vat_rate_id = %s WHERE id = %s", (vat_standard, tenant_id))
+
+    unit_ids = {}
+    for name, abbreviation in UNITS:
+        unit_ids[name] = _uuid(rng)
+        cur.execute(
+            "INSERT INTO units (id, tenant_id, name, abbreviation) VALUES (%s, %s, %s, %s)",
+            (unit_ids[name], tenant_id, name, abbreviation),
+        )
+
+    services = []
+    for code, name, price, unit, weight in SERVICES:
+        # Each practice prices within +/-15% of the seed catalogue
+        price_cents = int(round(price * rng.uniform(0.85, 1.15), -1) * 100)
+        vat = (vat_zero, 0) if code == 'FLUOR-01' else (vat_standard, 1500)  # rate in basis points
+        service = {'id': _uuid(rng), 'name': name, 'price': price_cents,
+                   'vat_id': vat[0], 'vat_bp': vat[1], 'weight': weight, 'code': code}
+        cur.execute(
+            "INSERT INTO services (id, tenant_id, code, name, unit_price, unit_id, vat_rate_id) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (service['id'], tenant_id, code, name, _money(price_cents), unit_ids[unit], vat[0]),
+        )
+        services.append(service)
+    return services
+
+
+def _copy_patients(cur, rng, tenant_id, count, end_date):
+    ids = []
+    with cur.copy(
+        "COPY customers (id, tenant_id, name, first_name, last_name, cell, id_number, email, is_active) "
+        "FROM STDIN"
+    ) as copy:
+        for n in range(count):
+            patient_id = _uuid(rng)
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            cell = '0' + rng.choice('678') + rng.choice('0123456789') + f"{rng.randint(0, 9999999):07d}"
+            email = f"{first}.{last.replace(' ', '')}{n}@example.com".lower() if rng.random() < 0.4 else None
+            id_number = _id_number(rng, end_date) if rng.random() < 0.8 else None
+            copy.write_row((patient_id, tenant_id, f"{first} {last}", first, last, cell,
+                            id_number, email, rng.random() < 0.95))
+            ids.append(patient_id)
+    return ids
+
+
+def _invoice_times(rng, count, end_date, months):
+    """Sorted (date, created_at) pairs over the window, mostly on weekdays in practice hours"""
+    days = months * 30
+    times = []
+    while len(times) < count:
+        day = end_date - timedelta(days=rng.randrange(days))
+        weekday = day.weekday()
+        if (weekday == 6 and rng.random() < 0.9) or (weekday == 5 and rng.random() < 0.5):
+            continue
+        created_at = datetime.combine(day, datetime.min.time(), SAST) + timedelta(
+            minutes=rng.randint(8 * 60, 17 * 60))
+        times.append((day, created_at))
+    times.sort()
+    return times
+
+
+def _items_for(rng, services, mean_items):
+    extra = max(mean_items - 1, 0)
+    count = 1 + (min(int(rng.expovariate(1 / extra)), 19) if extra else 0)
+    picks = rng.choices(services, weights=[s['weight'] for s in services], k=count)
+    items = []
+    for service in picks:
+        quantity = rng.randint(1, 4) if service['code'] in ('XRAY-01', 'FIL-COMP') else 1
+        line = quantity * service['price']
+        vat = (line * service['vat_bp'] + 5000) // 10000  # ROUND(..., 2), half up
+        items.append((service, quantity, line, vat))
+    return items
+
+
+def _copy_invoices(cur, rng, tenant_id, patient_ids, services, args, end_date):
+    pick_status = _weighted(rng, STATUS_WEIGHTS)
+    pick_method = _weighted(rng, PAYMENT_WEIGHTS)
+    counters = {}
+    n_invoices = n_items = 0
+    # Numbers are issued in creation order, as the app does
+    times = _invoice_times(rng, args.invoices, end_date, args.months)
+
+    for start in range(0, len(times), COPY_CHUNK):
+        invoices, items = [], []
+        for invoice_date, created_at in times[start:start + COPY_CHUNK]:
+            invoice_id = _uuid(rng)
+            status = pick_status()
+            # Returning patients: low indexes are drawn far more often
+            customer_id = patient_ids[int(len(patient_ids) * rng.random() ** 2)]
+
+            number = None
+            if status != 'Draft':
+                counters[invoice_date] = counters.get(invoice_date, 0) + 1
+                number = f"INV-{invoice_date:%Y%m%d}-{counters[invoice_date]:03d}"
+
+            lines = _items_for(rng, services, args.items)
+            subtotal = sum(line for _, _, line, _ in lines)
+            vat_total = sum(vat for _, _, _, vat in lines)
+            total = subtotal + vat_total
+
+            method = pick_method()
+            paid = change = 0
+            payment_date = None
+            if status == 'Paid':
+                paid = total
+                if method == 'Cash':
+                    paid = -(-total // 1000) * 1000  # rounded up to R10
+                    change = paid - total
+                payment_date = created_at + timedelta(days=rng.choice((0, 0, 0, 1, 7, 30)))
+            elif status == 'Finalized' and rng.random() < 0.2:
+                paid = total * rng.randint(2, 8) // 10  # part payment
+
+            invoices.append((
+                invoice_id, tenant_id, number, customer_id, invoice_date,
+                invoice_date + timedelta(days=30) if status == 'Finalized' else None,
+                status, _money(subtotal), _money(vat_total), _money(total),
+                _money(paid), method, _money(change), payment_date,
+                created_at, created_at, created_at if status in ('Finalized', 'Paid', 'Void') else None,
+            ))
+            for order, (service, quantity, line, vat) in enumerate(lines):
+                items.append((
+                    _uuid(rng), tenant_id, invoice_id, order, service['id'], service['name'],
+                    quantity, _money(service['price']), service['vat_id'],
+                    f"{service['vat_bp'] / 100:.2f}", _money(vat), _money(line), _money(line + vat),
+                    created_at,
+                ))
+
+        with cur.copy(
+            "COPY invoices (id, tenant_id, invoice_number, customer_id, invoice_date, due_date, "
+            "status, subtotal, total_vat, total_amount, amount_paid, payment_method, change_due, "
+            "payment_date, created_at, updated_at, finalized_at) FROM STDIN"
+        ) as copy:
+            for row in invoices:
+                copy.write_row(row)
+        with cur.copy(
+            "COPY invoice_items (id, tenant_id, invoice_id, line_order, service_id, description, "
+            "quantity, unit_price, vat_rate_id, vat_rate, vat_amount, line_total, "
+            "line_total_incl_vat, created_at) FROM STDIN"
+        ) as copy:
+            for row in items:
+                copy.write_row(row)
+        n_invoices += len(invoices)
+        n_items += len(items)
+
+    return n_invoices, n_items
+
+
+def generate_tenant(index, args, end_date):
+    """Create and fill tenant number `index`; returns (slug, counts, seconds)"""
+    rng = random.Random(f"{args.seed}:{index}")
+    slug = f"{args.prefix}-{index + 1:03d}"
+    tenant_id = _uuid(rng)
+    started = time.perf_counter()
+
+    with connect(args.database_url) as conn:
+        with conn.cursor() as cur:
+            if args.no_triggers:
+                cur.execute("SET LOCAL session_replication_role = replica")
+
+            cur.execute("SELECT 1 FROM tenants WHERE slug = %s", (slug,))
+            if cur.fetchone():
+                raise ToolError(f"Tenant {slug} already exists (use --drop or another --prefix)")
+            name = f"Synthetic Practice {index + 1}"
+            cur.execute(
+                "INSERT INTO tenants (id, name, slug, business_name, city) VALUES (%s, %s, %s, %s, %s)",
+                (tenant_id, name, slug, name, 'Polokwane'),
+            )
+
+            services = _reference_data(cur, rng, tenant_id)
+            patient_ids = _copy_patients(cur, rng, tenant_id, args.patients, end_date)
+            n_invoices, n_items = _copy_invoices(cur, rng, tenant_id, patient_ids, services, args, end_date)
+        conn.commit()
+
+    return slug, (len(patient_ids), n_invoices, n_items), time.perf_counter() - started
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def drop_generated(args):
+    with connect(args.database_url) as conn, conn.cursor() as cur:
+        pattern = f"{args.prefix}-%"
+        # invoices.customer_id is ON DELETE RESTRICT: remove invoices first
+        cur.execute("DELETE FROM invoices WHERE tenant_id IN (SELECT id FROM tenants WHERE slug LIKE %s)", (pattern,))
+        cur.execute("DELETE FROM tenants WHERE slug LIKE %s", (pattern,))
+        print(f"Dropped {cur.rowcount} generated tenant(s) ({pattern})")
+
+
+def rebuild_rollups(args, slugs):
+    with connect(args.database_url) as conn, conn.cursor() as cur:
+        for slug in slugs:
+            cur.execute("SELECT id FROM tenants WHERE slug = %s", (slug,))
+            tenant_id = cur.fetchone()[0]
+            cur.execute("SELECT rebuild_invoice_monthly_summary(%s)", (tenant_id,))
+            cur.execute("SELECT rebuild_invoice_daily_totals(%s, '-infinity', 'infinity')", (tenant_id,))
+            conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic tenants, patients and invoices")
+    parser.add_argument('--tenants', type=int, default=5, help="Tenants to create (default 5)")
+    parser.add_argument('--patients', type=int, default=1000, help="Patients per tenant (default 1000)")
+    parser.add_argument('--invoices', type=int, default=5000, help="Invoices per tenant (default 5000)")
+    parser.add_argument('--items', type=float, default=5, help="Mean line items per invoice (default 5)")
+    parser.add_argument('--months', type=int, default=24, help="History length in months (default 24)")
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help="Last invoice date, YYYY-MM-DD (default today)")
+    parser.add_argument('--seed', default='tebeila', help="Random seed (default 'tebeila')")
+    parser.add_argument('--prefix', default='synthetic', help="Tenant slug prefix (default 'synthetic')")
+    parser.add_argument('--jobs', '-j', type=int, default=4, help="Tenants loaded in parallel (default 4)")
+    parser.add_argument('--no-triggers', action='store_true',
+                        help="Load with row triggers off, then rebuild the rollups")
+    parser.add_argument('--drop', action='store_true', help="Delete tenants with --prefix and exit")
+    parser.add_argument('--database-url', help="Overrides DATABASE_URL")
+    args = parser.parse_args()
+
+    try:
+        if args.drop:
+            drop_generated(args)
+            return
+        if min(args.tenants, args.patients, args.invoices, args.jobs) < 1 or args.items < 1:
+            raise ToolError("--tenants, --patients, --invoices, --jobs and --items must be at least 1")
+
+        print(f"Generating {args.tenants} tenant(s) x {args.patients} patients x {args.invoices} invoices "
+              f"(seed {args.seed!r}, end date {args.end_date}, {args.jobs} job(s))")
+        connect(args.database_url).close()  # fail fast on configuration problems
+
+        started = time.perf_counter()
+        totals = [0, 0, 0]
+        slugs = []
+
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(generate_tenant, i, args, args.end_date) for i in range(args.tenants)]
+            for future in as_completed(futures):
+                slug, counts, seconds = future.result()
+                slugs.append(slug)
+                totals = [t + c for t, c in zip(totals, counts)]
+                print(f"  {slug}: {counts[0]} patients, {counts[1]} invoices, {counts[2]} items "
+                      f"in {seconds:.1f} s")
+
+        if args.no_triggers:
+            print("Rebuilding reporting rollups...")
+            rebuild_rollups(args, sorted(slugs))
+    except ToolError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals)
+    print()
+    print(f"Loaded {totals[0]} patients, {totals[1]} invoices, {totals[2]} items "
+          f"in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
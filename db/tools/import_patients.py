@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Bulk patient import from CSV / Excel exports
+
+Loads a patient list exported from another practice-management system
+into customers for one tenant:
+  - streams the file (CSV or .xlsx) and loads it in COPY batches, so memory
+    stays bounded by --batch-size, not by the size of the export
+  - splits "name" into first_name / last_name the same way migration 005
+    did (first word / the rest), or builds "name" from first and last name
+  - normalises cell numbers to 0XXXXXXXXX (+27 / 27 prefixes, spaces and
+    dashes removed, leading zero restored) and SA ID numbers to 13 digits;
+    values that still don't validate are left empty and counted
+  - skips duplicates of a patient already on file for the tenant (or earlier
+    in the file): the same ID number when the row has one, otherwise the
+    same cell number and name, so family members sharing a phone are kept.
+    Skipped rows are listed with the reason (all of them with --skipped-csv)
+
+The whole import is one transaction: it either loads completely or not at
+all, so it is safe to re-run after fixing the file. --dry-run does the full
+load and rolls it back.
+
+Usage:
+    python3 db/tools/import_patients.py patients.csv --tenant dr-tebeila
+    python3 db/tools/import_patients.py export.xlsx --tenant <tenant-uuid> --sheet Patients
+    python3 db/tools/import_patients.py patients.csv --tenant dr-tebeila --dry-run
+    python3 db/tools/import_patients.py patients.csv --tenant dr-tebeila --skipped-csv skipped.csv
+
+Recognised columns (case and spacing ignored): see COLUMN_ALIASES.
+"""
+
+import argparse
+import csv
+import re
+import sys
+import time
+from pathlib import Path
+
+from _connection import ToolError, connect, resolve_tenant
+
+# Header name (lowercase, non-alphanumerics as "_") -> customers field
+COLUMN_ALIASES = {
+    'name': 'name', 'full_name': 'name', 'patient': 'name', 'patient_name': 'name',
+    'first_name': 'first_name', 'firstname': 'first_name', 'first_names': 'first_name',
+    'given_name': 'first_name', 'forename': 'first_name',
+    'last_name': 'last_name', 'lastname': 'last_name', 'surname': 'last_name',
+    'family_name': 'last_name',
+    'cell': 'cell', 'cellphone': 'cell', 'cell_number': 'cell', 'cell_no': 'cell',
+    'mobile': 'cell', 'mobile_number': 'cell', 'contact_number': 'cell',
+    'id_number': 'id_number', 'id_no': 'id_number', 'idno': 'id_number',
+    'sa_id': 'id_number', 'identity_number': 'id_number',
+    'email': 'email', 'email_address': 'email', 'e_mail': 'email',
+    'address': 'home_address', 'home_address': 'home_address', 'physical_address': 'home_address',
+    'notes': 'notes', 'note': 'notes', 'comments': 'notes', 'medical_notes': 'notes',
+}
+
+COPY_COLUMNS = ('tenant_id', 'name', 'first_name', 'last_name', 'cell', 'id_number',
+                'email', 'home_address', 'notes')
+
+# Same rule as PatientModal.tsx
+CELL_PATTERN = re.compile(r'^0[6-8][0-9]{8}$')
+
+# Skipped rows listed in the report (--skipped-csv writes every one)
+SKIPPED_SHOWN = 20
+
+
+# ============================================================================
+# Normalisation
+# ============================================================================
+
+def _text(value):
+    """Cell value as trimmed text with inner whitespace collapsed; None if empty"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel stores numbers as floats (821234567.0)
+    text = ' '.join(str(value).split())
+    return text or None
+
+
+def split_name(name):
+    """(first_name, last_name) as in migration 005: first word, then the rest"""
+    first, _, rest = name.partition(' ')
+    return first or None, rest or None
+
+
+def normalise_cell(value):
+    """0XXXXXXXXX, or None if it isn't a South African cell number"""
+    digits = re.sub(r'\D', '', value or '')
+    if digits.startswith('27') and len(digits) == 11:
+        digits = '0' + digits[2:]
+    elif len(digits) == 9:
+        digits = '0' + digits  # leading zero dropped by a spreadsheet
+    return digits if CELL_PATTERN.match(digits) else None
+
+
+def name_key(name):
+    """Name for duplicate matching: case, punctuation and spacing ignored"""
+    return ' '.join(re.sub(r'[^\w\s]', '', name.lower()).split())
+
+
+def duplicate_key(patient):
+    """What identifies a patient: the ID number, else cell + name; None if neither"""
+    if patient['id_number']:
+        return ('id_number', patient['id_number'])
+    if patient['cell']:
+        return ('cell_name', patient['cell'], name_key(patient['name']))
+    return None
+
+
+def normalise_id_number(value):
+    """13-digit SA ID number, or None"""
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) == 12:
+        digits = '0' + digits  # born 2000-2009, leading zero dropped by a spreadsheet
+    return digits if len(digits) == 13 else None
+
+
+def normalise_row(raw, stats):
+    """customers values for one input row, or None if it has no usable name"""
+    first = _text(raw.get('first_name'))
+    last = _text(raw.get('last_name'))
+    name = _text(raw.get('name'))
+
+    if name and not (first or last):
+        first, last = split_name(name)
+    elif not name:
+        name = ' '.join(part for part in (first, last) if part) or None
+
+    if not name:
+        stats['invalid'] += 1
+        return None
+
+    raw_cell = _text(raw.get('cell'))
+    cell = normalise_cell(raw_cell)
+    if raw_cell and not cell:
+        stats['cells_cleared'] += 1
+
+    raw_id = _text(raw.get('id_number'))
+    id_number = normalise_id_number(raw_id)
+    if raw_id and not id_number:
+        stats['ids_cleared'] += 1
+
+    email = _text(raw.get('email'))
+    return {
+        'name': name,
+        'first_name': first,
+        'last_name': last,
+        'cell': cell,
+        'id_number': id_number,
+        'email': email.lower() if email else None,
+        'home_address': _text(raw.get('home_address')),
+        'notes': _text(raw.get('notes')),
+    }
+
+
+# ============================================================================
+# Readers (streaming)
+# ============================================================================
+
+def _field_map(headers):
+    """Column index -> customers field, plus the names of ignored columns"""
+    fields, ignored = {}, []
+    for i, header in enumerate(headers):
+        key = re.sub(r'[^a-z0-9]+', '_', str(header or '').strip().lower()).strip('_')
+        field = COLUMN_ALIASES.get(key)
+        if field and field not in fields.values():
+            fields[i] = field
+        elif header:
+            ignored.append(str(header))
+    if not set(fields.values()) & {'name', 'first_name', 'last_name'}:
+        raise ToolError(f"No name column found in headers: {list(headers)}")
+    return fields, ignored
+
+
+def _mapped_rows(rows):
+    headers = next(rows, None)
+    if headers is None:
+        raise ToolError("The file is empty")
+    fields, ignored = _field_map(headers)
+    if ignored:
+        print(f"Ignoring columns: {', '.join(ignored)}")
+    for row in rows:
+        if not any(value not in (None, '') for value in row):
+            continue  # blank line / empty spreadsheet row
+        yield {field: row[i] for i, field in fields.items() if i < len(row)}
+
+
+def read_csv(path, delimiter):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if delimiter is None:
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+            except csv.Error:
+                delimiter = ','
+        yield from _mapped_rows(csv.reader(f, delimiter=delimiter))
+
+
+def read_xlsx(path, sheet):
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ToolError("openpyxl is required for Excel files: pip install openpyxl") from e
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        yield from _mapped_rows(worksheet.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def read_rows(path, delimiter=None, sheet=None):
+    if path.suffix.lower() in ('.xlsx', '.xlsm'):
+        return read_xlsx(path, sheet)
+    return read_csv(path, delimiter)
+
+
+# ============================================================================
+# Load
+# ============================================================================
+
+def existing_keys(conn, tenant_id):
+    """Duplicate keys of the patients already on file for the tenant"""
+    keys = set()
+    with conn.cursor(name='existing_patient_keys') as cur:
+        cur.itersize = 10000
+        cur.execute(
+            "SELECT name, cell, id_number FROM customers WHERE tenant_id = %s "
+            "AND (cell IS NOT NULL OR id_number IS NOT NULL)",
+            (tenant_id,),
+        )
+        for name, cell, id_number in cur:
+            if id_number:
+                keys.add(('id_number', id_number))
+            # A row without an ID number still matches a filed patient's cell + name
+            if cell:
+                keys.add(('cell_name', re.sub(r'\s', '', cell), name_key(name or '')))
+    return keys
+
+
+def skip_reason(key, first_row):
+    """Why a row was skipped as a duplicate of `first_row` (None: on file)"""
+    what = 'ID number' if key[0] == 'id_number' else 'cell number and name'
+    where = 'a patient already on file' if first_row is None else f'row {first_row}'
+    return f"same {what} as {where}"
+
+
+def copy_batch(conn, tenant_id, batch):
+    columns = ', '.join(COPY_COLUMNS)
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY customers ({columns}) FROM STDIN") as copy:
+            for patient in batch:
+                copy.write_row((tenant_id, *(patient[c] for c in COPY_COLUMNS[1:])))
+
+
+def import_patients(conn, tenant_id, rows, batch_size, stats):
+    # Duplicate key -> data row it first appeared on (None: already on file)
+    seen = dict.fromkeys(existing_keys(conn, tenant_id))
+    print(f"Existing patient keys (ID number, cell + name): {len(seen)}")
+
+    batch = []
+    for raw in rows:
+        stats['read'] += 1
+        patient = normalise_row(raw, stats)
+        if patient is None:
+            stats['skipped'].append((stats['read'], None, 'no name'))
+            continue
+
+        key = duplicate_key(patient)
+        if key in seen:
+            stats['duplicates'] += 1
+            stats['skipped'].append((stats['read'], patient['name'], skip_reason(key, seen[key])))
+            continue
+        if key:
+            seen[key] = stats['read']
+
+        batch.append(patient)
+        if len(batch) >= batch_size:
+            copy_batch(conn, tenant_id, batch)
+            stats['imported'] += len(batch)
+            batch.clear()
+            print(f"  {stats['imported']} imported ({stats['read']} read)")
+
+    if batch:
+        copy_batch(conn, tenant_id, batch)
+        stats['imported'] += len(batch)
+
+
+def write_skipped(path, skipped):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('row', 'name', 'reason'))
+        writer.writerows(skipped)
+
+
+def print_report(stats, elapsed, dry_run):
+    rate = stats['imported'] / elapsed if elapsed > 0 else 0
+    print()
+    print("Import report" + (" (dry run, rolled back)" if dry_run else ""))
+    print(f"  Rows read:          {stats['read']}")
+    print(f"  Imported:           {stats['imported']}")
+    print(f"  Duplicates skipped: {stats['duplicates']}")
+    print(f"  Skipped (no name):  {stats['invalid']}")
+    print(f"  Cells cleared:      {stats['cells_cleared']} (not a SA cell number)")
+    print(f"  ID numbers cleared: {stats['ids_cleared']} (not 13 digits)")
+    print(f"  Elapsed:            {elapsed:.1f} s ({rate:,.0f} rows/s)")
+    if stats['imported']:
+        print(f"  100k patients at this rate: {100000 / rate:.1f} s (target < 60 s)")
+
+    skipped = stats['skipped']
+    if skipped:
+        print()
+        print("Skipped rows (numbered from the first row after the header)")
+        for row, name, reason in skipped[:SKIPPED_SHOWN]:
+            print(f"  row {row}: {name or '(no name)'} - {reason}")
+        if len(skipped) > SKIPPED_SHOWN:
+            print(f"  ... and {len(skipped) - SKIPPED_SHOWN} more (--skipped-csv lists them all)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import patients from a CSV or Excel export")
+    parser.add_argument('file', type=Path, help="CSV or .xlsx file with a header row")
+    parser.add_argument('--tenant', required=True, help="Tenant id or slug to import into")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows per COPY batch (default 5000)")
+    parser.add_argument('--delimiter', help="CSV delimiter (default: detected)")
+    parser.add_argument('--sheet', help="Excel worksheet (default: the active sheet)")
+    parser.add_argument('--dry-run', action='store_true', help="Load everything, then roll back")
+    parser.add_argument('--skipped-csv', type=Path, help="Write every skipped row and its reason to this CSV")
+    parser.add_argument('--database-url', help="Overrides DATABASE_URL")
+    args = parser.parse_args()
+
+    stats = dict.fromkeys(('read', 'imported', 'duplicates', 'invalid', 'cells_cleared', 'ids_cleared'), 0)
+    stats['skipped'] = []  # (row, name, reason)
+
+    try:
+        if not args.file.is_file():
+            raise ToolError(f"File not found: {args.file}")
+        if args.batch_size < 1:
+            raise ToolError("--batch-size must be at least 1")
+
+        with connect(args.database_url) as conn:
+            tenant_id = resolve_tenant(conn, args.tenant)
+            started = time.perf_counter()
+            import_patients(conn, tenant_id, read_rows(args.file, args.delimiter, args.sheet),
+                            args.batch_size, stats)
+            if args.dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+            elapsed = time.perf_counter() - started
+    except ToolError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.skipped_csv:
+        write_skipped(args.skipped_csv, stats['skipped'])
+    print_report(stats, elapsed, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
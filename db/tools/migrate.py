@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Versioned migration runner
+
+Applies the database files in order over one connection and records each
+one in a schema_migrations ledger, so a deploy only runs what is pending:
+
+  1. schema.sql, policies.sql
+  2. migrations/NNN_*.sql in number order
+  3. views/*.sql (they read tables the migrations create)
+  4. seed.sql, only with --seed
+
+Each file runs in its own transaction: a failing file is rolled back
+completely, the files before it stay applied, and the run stops. The
+ledger stores a SHA-256 of every applied file; a file that changed after
+it was applied is reported as drift and nothing is applied until it is
+resolved (restore the file, or write a new migration instead of editing
+an applied one). A session advisory lock keeps two deploys from running at
+the same time, and lock_timeout stops a file from queueing behind a long
+transaction instead of failing.
+
+After applying, the verification checks run in parallel, each on its own
+connection: core tables, RLS on every tenant table, the app's RPCs and
+views, and no invalid indexes.
+
+A database that was set up by hand (Supabase SQL Editor, migrate.sh) can
+be adopted with --baseline, which records the current files as applied
+without running them.
+
+Usage:
+    python3 db/tools/migrate.py                 # apply pending files, then verify
+    python3 db/tools/migrate.py --status        # applied / pending / drift per file
+    python3 db/tools/migrate.py --dry-run       # list what would be applied
+    python3 db/tools/migrate.py --seed          # also load seed.sql (new databases)
+    python3 db/tools/migrate.py --baseline      # adopt an existing database
+    python3 db/tools/migrate.py --verify        # run the checks only
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _connection import REPO_ROOT, ToolError, connect
+
+DB_DIR = REPO_ROOT / 'db'
+ADVISORY_LOCK_KEY = 730_250_001  # arbitrary; the same for every runner
+
+LEDGER_DDL = """
+CREATE TABLE IF NOT EXISTS public.schema_migrations (
+  version TEXT PRIMARY KEY,
+  checksum TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  execution_ms INTEGER,
+  baselined BOOLEAN NOT NULL DEFAULT false
+);
+COMMENT ON TABLE public.schema_migrations IS 'Database files applied by db/tools/migrate.py';
+REVOKE ALL ON public.schema_migrations FROM PUBLIC, anon, authenticated;
+"""
+
+CORE_TABLES = ['tenants', 'user_profiles', 'vat_rates', 'units', 'services', 'customers',
+               'invoice_counters', 'invoices', 'invoice_items', 'audit_log']
+APP_FUNCTIONS = ['get_user_tenant_id', 'set_tenant_id', 'create_invoice', 'search_patients',
+                 'list_invoices']
+APP_VIEWS = ['vw_invoice_summary', 'vw_invoice_status_totals', 'vw_payment_timeline']
+
+# (description, query returning one row per problem)
+VERIFICATIONS = [
+    ("Core tables exist",
+     "SELECT t FROM unnest(%(tables)s::text[]) t WHERE to_regclass('public.' || t) IS NULL"),
+    ("RLS enabled on tenant tables",
+     """
+     SELECT c.relname FROM pg_class c
+     JOIN pg_namespace n ON n.oid = c.relnamespace
+     WHERE n.nspname = 'public' AND c.relkind = 'r' AND NOT c.relrowsecurity
+       AND (c.relname = 'tenants' OR EXISTS (
+         SELECT 1 FROM pg_attribute a
+         WHERE a.attrelid = c.oid AND a.attname = 'tenant_id' AND NOT a.attisdropped))
+     """),
+    ("App functions exist",
+     """
+     SELECT f FROM unnest(%(functions)s::text[]) f
+     WHERE NOT EXISTS (
+       SELECT 1 FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace
+       WHERE n.nspname = 'public' AND p.proname = f)
+     """),
+    ("Report views exist",
+     "SELECT v FROM unnest(%(views)s::text[]) v WHERE to_regclass('public.' || v) IS NULL"),
+    ("No invalid indexes",
+     """
+     SELECT i.indexrelid::regclass::text FROM pg_index i
+     JOIN pg_class c ON c.oid = i.indexrelid
+     JOIN pg_namespace n ON n.oid = c.relnamespace
+     WHERE n.nspname = 'public' AND NOT i.indisvalid
+     """),
+]
+
+SEED_VERIFICATION = ("Seed data loaded",
+                     "SELECT 'no tenants' WHERE NOT EXISTS (SELECT 1 FROM public.tenants)")
+
+
+# ============================================================================
+# Plan
+# ============================================================================
+
+def migration_files(include_seed):
+    """(version, path) in apply order; version is the path relative to db/"""
+    files = [DB_DIR / 'schema.sql', DB_DIR / 'policies.sql']
+    files += sorted((DB_DIR / 'migrations').glob('[0-9][0-9][0-9]_*.sql'))
+    files += sorted((DB_DIR / 'views').glob('*.sql'))
+    if include_seed:
+        files.append(DB_DIR / 'seed.sql')
+    return [(path.relative_to(DB_DIR).as_posix(), path) for path in files]
+
+
+def checksum(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def applied_versions(cur):
+    cur.execute("SELECT version, checksum FROM public.schema_migrations")
+    return dict(cur.fetchall())
+
+
+def plan(files, applied):
+    """(pending, drifted) lists of (version, path, checksum)"""
+    pending, drifted = [], []
+    for version, path in files:
+        digest = checksum(path)
+        if version not in applied:
+            pending.append((version, path, digest))
+        elif applied[version] != digest:
+            drifted.append((version, path, digest))
+    return pending, drifted
+
+
+# ============================================================================
+# Apply
+# ============================================================================
+
+def apply_file(conn, version, path, digest):
+    """Run one file and record it, in a single transaction"""
+    sql = path.read_text(encoding='utf-8')
+    started = time.perf_counter()
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            cur.execute(
+                "INSERT INTO public.schema_migrations (version, checksum, execution_ms) VALUES (%s, %s, %s)",
+                (version, digest, elapsed_ms),
+            )
+    return elapsed_ms
+
+
+def record_baseline(conn, pending):
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO public.schema_migrations (version, checksum, baselined) VALUES (%s, %s, true)",
+                [(version, digest) for version, _, digest in pending],
+            )
+
+
+# ============================================================================
+# Verification
+# ============================================================================
+
+def _run_check(url, check):
+    description, sql = check
+    with connect(url, autocommit=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, {'tables': CORE_TABLES, 'functions': APP_FUNCTIONS, 'views': APP_VIEWS})
+            return description, [str(row[0]) for row in cur.fetchall()]
+
+
+def verify(url, include_seed):
+    """Run the checks in parallel; returns the number that failed"""
+    checks = VERIFICATIONS + ([SEED_VERIFICATION] if include_seed else [])
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        results = list(pool.map(lambda check: _run_check(url, check), checks))
+
+    failed = 0
+    print("\nVerification")
+    for description, problems in results:
+        if problems:
+            failed += 1
+            print(f"  FAIL  {description}: {', '.join(problems)}")
+        else:
+            print(f"  ok    {description}")
+    return failed
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def print_status(files, applied, drifted):
+    drifted_versions = {version for version, _, _ in drifted}
+    for version, _ in files:
+        if version in drifted_versions:
+            state = 'DRIFT'
+        elif version in applied:
+            state = 'applied'
+        else:
+            state = 'pending'
+        print(f"  {state:<8} {version}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending database files and record them in schema_migrations")
+    parser.add_argument('--status', action='store_true', help="Show applied / pending / drift per file and exit")
+    parser.add_argument('--dry-run', action='store_true', help="List pending files without applying them")
+    parser.add_argument('--seed', action='store_true', help="Include seed.sql (new databases only)")
+    parser.add_argument('--baseline', action='store_true',
+                        help="Record pending files as applied without running them (existing databases)")
+    parser.add_argument('--verify', action='store_true', help="Only run the verification checks")
+    parser.add_argument('--no-verify', action='store_true', help="Skip the verification checks")
+    parser.add_argument('--lock-timeout', default='10s', help="lock_timeout while applying (default 10s)")
+    parser.add_argument('--database-url', help="Overrides DATABASE_URL")
+    args = parser.parse_args()
+
+    files = migration_files(args.seed)
+    started = time.perf_counter()
+
+    try:
+        if args.verify:
+            sys.exit(1 if verify(args.database_url, args.seed) else 0)
+
+        with connect(args.database_url, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+                cur.execute(LEDGER_DDL)
+                cur.execute("SELECT set_config('lock_timeout', %s, false)", (args.lock_timeout,))
+                applied = applied_versions(cur)
+
+            pending, drifted = plan(files, applied)
+
+            if args.status:
+                print_status(files, applied, drifted)
+                return
+
+            if drifted:
+                for version, _, _ in drifted:
+                    print(f"  DRIFT    {version} changed after it was applied", file=sys.stderr)
+                raise ToolError("Applied files have changed; restore them or add a new migration instead")
+
+            if not pending:
+                print("Database is up to date")
+            elif args.dry_run:
+                print("Would apply:")
+                for version, _, _ in pending:
+                    print(f"  {version}")
+                return
+            elif args.baseline:
+                record_baseline(conn, pending)
+                print(f"Recorded {len(pending)} file(s) as applied without running them")
+            else:
+                for version, path, digest in pending:
+                    print(f"  applying {version} ...", end='', flush=True)
+                    try:
+                        elapsed_ms = apply_file(conn, version, path, digest)
+                    except Exception as e:
+                        print(" failed")
+                        if getattr(e, 'sqlstate', None) is None:
+                            raise
+                        raise ToolError(f"{version}: {e}") from e
+                    print(f" {elapsed_ms} ms")
+                print(f"Applied {len(pending)} file(s) in {time.perf_counter() - started:.1f} s")
+
+        if not args.no_verify and verify(args.database_url, args.seed):
+            sys.exit(1)
+    except ToolError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Concurrent front-desk load simulator
+
+Runs N virtual reception terminals against one tenant, each on its own
+connection, replaying what the web app sends:
+
+  invoice   InvoiceNew.handleSubmit: one create_invoice() call with 1-6
+            line items (header, number and items in one transaction).
+            With --legacy-numbering, the flow the app used before
+            migration 013: generateInvoiceNumber()'s LIKE scan for the
+            highest number, INSERT the invoice, INSERT its items - three
+            requests, so two terminals can pick the same number.
+  search    PatientSearchModal: a patient name typed key by key with the
+            modal's 300 ms debounce; search_patients() is called whenever
+            typing pauses for longer than that.
+  reports   ReportsDashboard refresh: vw_invoice_summary (full history) and
+            vw_invoice_status_totals.
+
+Every request runs the way PostgREST runs it: its own transaction with the
+signed-in user's JWT claims and role authenticated, so RLS, the
+set_tenant_id triggers and the invoice_items total triggers all fire.
+
+The run steps through --users levels (e.g. 1,2,4,8,16), --duration seconds
+each, and prints one row per level: throughput, latency percentiles per
+flow, unique violations (duplicate invoice numbers), deadlocks, other
+errors, and lock waits sampled from pg_stat_activity.
+
+Invoices created during the run are deleted at the end unless --keep is
+given (invoice_counters keep the numbers they handed out).
+
+Usage:
+    python3 db/tools/simulate_load.py --tenant synthetic-001
+    python3 db/tools/simulate_load.py --tenant synthetic-001 --users 1,4,16,32 --duration 60
+    python3 db/tools/simulate_load.py --tenant synthetic-001 --legacy-numbering --mix invoice=1
+
+Only for development and benchmark databases.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from _connection import ToolError, connect, connect_async, resolve_tenant
+
+SAST = timezone(timedelta(hours=2))
+SEARCH_DEBOUNCE_S = 0.3  # PatientSearchModal
+LOCK_SAMPLE_S = 0.1
+
+UNIQUE_VIOLATION = '23505'
+DEADLOCK = '40P01'
+
+
+# ============================================================================
+# Tenant context
+# ============================================================================
+
+def load_context(conn, tenant_id):
+    """Claims, patients and priced services for the virtual users (read as the table owner)"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id FROM user_profiles WHERE tenant_id = %s AND is_active "
+            "ORDER BY (role = 'owner') DESC, created_at LIMIT 1",
+            (tenant_id,),
+        )
+        profile = cur.fetchone()
+
+        cur.execute(
+            "SELECT id, name FROM customers WHERE tenant_id = %s AND is_active "
+            "ORDER BY random() LIMIT 1000",
+            (tenant_id,),
+        )
+        patients = cur.fetchall()
+
+        cur.execute(
+            """
+            SELECT s.id, s.name, s.unit_price, v.id, v.rate
+            FROM services s
+            JOIN vat_rates v ON v.id = COALESCE(s.vat_rate_id, (SELECT default_vat_rate_id FROM tenants WHERE id = s.tenant_id))
+            WHERE s.tenant_id = %s AND s.is_active
+            """,
+            (tenant_id,),
+        )
+        services = cur.fetchall()
+
+    if not patients:
+        raise ToolError("The tenant has no active patients; load data first (db/tools/generate_data.py)")
+    if not services:
+        raise ToolError("The tenant has no active services with a VAT rate")
+
+    claims = {'role': 'authenticated', 'tenant_id': str(tenant_id), 'user_role': 'owner'}
+    if profile:
+        claims['sub'] = str(profile[0])
+
+    return {
+        'tenant_id': tenant_id,
+        'claims': json.dumps(claims),
+        'has_profile': profile is not None,
+        'patients': patients,
+        'services': services,
+        'created': [],
+    }
+
+
+# ============================================================================
+# Requests
+# ============================================================================
+
+class Stats:
+    """Latencies and error counts for one concurrency level"""
+
+    def __init__(self):
+        self.latencies = {'invoice': [], 'search': [], 'reports': []}
+        self.unique_violations = 0
+        self.deadlocks = 0
+        self.errors = 0
+        self.last_error = None
+        self.lock_samples = []
+
+    def record_error(self, sqlstate, message):
+        if sqlstate == UNIQUE_VIOLATION:
+            self.unique_violations += 1
+        elif sqlstate == DEADLOCK:
+            self.deadlocks += 1
+        else:
+            self.errors += 1
+            self.last_error = f"{sqlstate}: {message}"
+
+
+async def request(conn, ctx, sql, params=None):
+    """One PostgREST-style request: own transaction, JWT claims, role authenticated"""
+    async with conn.transaction():
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT set_config('request.jwt.claims', %s, true), set_config('role', 'authenticated', true)",
+                (ctx['claims'],),
+            )
+            await cur.execute(sql, params)
+            return await cur.fetchall() if cur.description else None
+
+
+async def timed(stats, flow, coroutine):
+    """Run one flow, recording its latency or the database error that ended it"""
+    started = time.perf_counter()
+    try:
+        await coroutine
+    except Exception as e:
+        sqlstate = getattr(e, 'sqlstate', None)
+        if sqlstate is None:
+            raise
+        stats.record_error(sqlstate, str(e).splitlines()[0])
+        return
+    stats.latencies[flow].append((time.perf_counter() - started) * 1000)
+
+
+# ============================================================================
+# Flows
+# ============================================================================
+
+def _line_items(rng, services):
+    picks = rng.sample(services, rng.randint(1, min(6, len(services))))
+    items = []
+    for index, (service_id, name, price, vat_id, vat_rate) in enumerate(picks):
+        items.append({
+            'line_order': index,
+            'service_id': str(service_id),
+            'description': name,
+            'quantity': rng.choice((1, 1, 1, 2)),
+            'unit_price': float(price),
+            'vat_rate_id': str(vat_id),
+            'vat_rate': float(vat_rate),
+        })
+    return items
+
+
+async def submit_invoice(conn, ctx, rng):
+    """InvoiceNew.handleSubmit after migration 013"""
+    patient_id, _ = rng.choice(ctx['patients'])
+    header = {
+        'customer_id': str(patient_id),
+        'invoice_date': datetime.now(SAST).date().isoformat(),
+        # Numbered, so each submit allocates from invoice_counters as a real
+        # save does; a Draft would be created without a number
+        'status': 'Quotation',
+        'notes': 'load test',
+        'amount_paid': 0,
+        'payment_method': 'Cash',
+    }
+    rows = await request(conn, ctx, "SELECT create_invoice(%s::jsonb, %s::jsonb)",
+                         (json.dumps(header), json.dumps(_line_items(rng, ctx['services']))))
+    ctx['created'].append(rows[0][0]['id'])
+
+
+async def submit_invoice_legacy(conn, ctx, rng):
+    """InvoiceNew.handleSubmit before migration 013: generateInvoiceNumber(), then two inserts"""
+    patient_id, _ = rng.choice(ctx['patients'])
+    prefix = f"INV-{datetime.now(SAST):%Y%m%d}"
+
+    rows = await request(
+        conn, ctx,
+        "SELECT invoice_number FROM invoices WHERE tenant_id = %s AND invoice_number LIKE %s "
+        "ORDER BY invoice_number DESC LIMIT 1",
+        (ctx['tenant_id'], f"{prefix}-%"),
+    )
+    sequence = int(rows[0][0].split('-')[2]) + 1 if rows else 1
+
+    # With a profile, tenant_id is left to the set_tenant_id trigger as the app did
+    tenant_id = None if ctx['has_profile'] else ctx['tenant_id']
+    rows = await request(
+        conn, ctx,
+        "INSERT INTO invoices (tenant_id, invoice_number, customer_id, invoice_date, status, notes) "
+        "VALUES (%s, %s, %s, %s, 'Quotation', 'load test') RETURNING id",
+        (tenant_id, f"{prefix}-{sequence:03d}", patient_id, datetime.now(SAST).date()),
+    )
+    invoice_id = rows[0][0]
+    ctx['created'].append(invoice_id)
+
+    # PostgREST bulk insert: one statement, row triggers fire per item
+    items = [dict(item, invoice_id=str(invoice_id), tenant_id=str(tenant_id) if tenant_id else None)
+             for item in _line_items(rng, ctx['services'])]
+    await request(
+        conn, ctx,
+        """
+        INSERT INTO invoice_items (invoice_id, tenant_id, line_order, service_id, description,
+                                   quantity, unit_price, vat_rate_id, vat_rate)
+        SELECT invoice_id, tenant_id, line_order, service_id, description,
+               quantity, unit_price, vat_rate_id, vat_rate
+        FROM jsonb_populate_recordset(NULL::invoice_items, %s::jsonb)
+        """,
+        (json.dumps(items),),
+    )
+
+
+async def search_patient(conn, ctx, rng, stats):
+    """PatientSearchModal: type part of a name, searching whenever typing pauses"""
+    _, name = rng.choice(ctx['patients'])
+    term = name.lower()[:rng.randint(3, 8)]
+    gaps = [rng.uniform(0.06, 0.45) for _ in term]
+
+    for length in range(1, len(term) + 1):
+        await asyncio.sleep(gaps[length - 1])
+        paused = length == len(term) or gaps[length] >= SEARCH_DEBOUNCE_S
+        if length >= 2 and paused:
+            await asyncio.sleep(SEARCH_DEBOUNCE_S)
+            await timed(stats, 'search', request(
+                conn, ctx, "SELECT * FROM search_patients(%s, 10)", (term[:length],)))
+
+
+async def refresh_reports(conn, ctx):
+    """ReportsDashboard.fetchReportsData"""
+    await request(conn, ctx,
+                  "SELECT * FROM vw_invoice_summary WHERE tenant_id = %s ORDER BY month DESC",
+                  (ctx['tenant_id'],))
+    await request(conn, ctx, "SELECT * FROM vw_invoice_status_totals WHERE tenant_id = %s",
+                  (ctx['tenant_id'],))
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+async def virtual_user(number, args, ctx, stats, deadline):
+    rng = random.Random(f"{args.seed}:{number}")
+    flows, weights = zip(*args.mix.items())
+    submit = submit_invoice_legacy if args.legacy_numbering else submit_invoice
+
+    conn = await connect_async(args.database_url, autocommit=True)
+    try:
+        while time.monotonic() < deadline:
+            flow = rng.choices(flows, weights)[0]
+            if flow == 'invoice':
+                await timed(stats, 'invoice', submit(conn, ctx, rng))
+            elif flow == 'search':
+                await search_patient(conn, ctx, rng, stats)
+            else:
+                await timed(stats, 'reports', refresh_reports(conn, ctx))
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1000 / args.think))
+    finally:
+        await conn.close()
+
+
+async def sample_lock_waits(args, stats, deadline):
+    """Backends of this database waiting on a heavyweight lock, every LOCK_SAMPLE_S"""
+    conn = await connect_async(args.database_url, autocommit=True)
+    try:
+        async with conn.cursor() as cur:
+            while time.monotonic() < deadline:
+                await cur.execute(
+                    "SELECT COUNT(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                )
+                stats.lock_samples.append((await cur.fetchone())[0])
+                await asyncio.sleep(LOCK_SAMPLE_S)
+    finally:
+        await conn.close()
+
+
+async def run_level(users, args, ctx):
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        sample_lock_waits(args, stats, deadline),
+        *(virtual_user(n, args, ctx, stats, deadline) for n in range(users)),
+    )
+    return stats, time.perf_counter() - started
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def print_header():
+    print(f"{'users':>5} {'ops/s':>7} {'inv/s':>6} {'inv p50':>8} {'inv p95':>8} {'inv p99':>8} "
+          f"{'srch p95':>9} {'rpt p95':>8} {'dup#':>5} {'dlk':>4} {'err':>4} {'lockw':>6} {'lock%':>6}")
+
+
+def print_level(users, stats, elapsed):
+    invoices = stats.latencies['invoice']
+    ops = sum(len(v) for v in stats.latencies.values())
+    samples = stats.lock_samples or [0]
+    waiting = sum(1 for s in samples if s) / len(samples) * 100
+    print(f"{users:>5} {ops / elapsed:>7.1f} {len(invoices) / elapsed:>6.1f} "
+          f"{_percentile(invoices, 0.5):>8.1f} {_percentile(invoices, 0.95):>8.1f} {_percentile(invoices, 0.99):>8.1f} "
+          f"{_percentile(stats.latencies['search'], 0.95):>9.1f} {_percentile(stats.latencies['reports'], 0.95):>8.1f} "
+          f"{stats.unique_violations:>5} {stats.deadlocks:>4} {stats.errors:>4} {max(samples):>6} {waiting:>5.0f}%")
+    if stats.last_error:
+        print(f"      last error: {stats.last_error}")
+
+
+def delete_created(args, ctx):
+    with connect(args.database_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM invoices WHERE id = ANY(%s::uuid[])", ([str(i) for i in ctx['created']],))
+            deleted = cur.rowcount
+        conn.commit()
+    print(f"\nDeleted {deleted} invoices created by the run")
+
+
+def _levels(value):
+    try:
+        levels = [int(n) for n in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated numbers, got {value!r}")
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError("user counts must be at least 1")
+    return levels
+
+
+def _mix(value):
+    mix = {}
+    for part in value.split(','):
+        flow, _, weight = part.partition('=')
+        if flow not in ('invoice', 'search', 'reports') or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"expected e.g. invoice=6,search=3,reports=1, got {value!r}")
+        mix[flow] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("at least one flow needs a weight above 0")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent reception terminals against one tenant")
+    parser.add_argument('--tenant', required=True, help="Tenant id or slug to run as")
+    parser.add_argument('--users', type=_levels, default=[1, 2, 4, 8, 16],
+                        help="Concurrency levels to step through (default 1,2,4,8,16)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds per level (default 30)")
+    parser.add_argument('--mix', type=_mix, default={'invoice': 6, 'search': 3, 'reports': 1},
+                        help="Flow weights (default invoice=6,search=3,reports=1)")
+    parser.add_argument('--think', type=float, default=200,
+                        help="Mean pause between flows per user in ms (default 200, 0 = none)")
+    parser.add_argument('--legacy-numbering', action='store_true',
+                        help="Submit invoices the pre-013 way (client-side numbering, three requests)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed (default 1)")
+    parser.add_argument('--keep', action='store_true', help="Keep the invoices created by the run")
+    parser.add_argument('--database-url', help="Overrides DATABASE_URL")
+    args = parser.parse_args()
+
+    try:
+        if args.duration <= 0:
+            raise ToolError("--duration must be positive")
+
+        with connect(args.database_url) as conn:
+            ctx = load_context(conn, resolve_tenant(conn, args.tenant))
+
+        mode = 'legacy client-side numbering' if args.legacy_numbering else 'create_invoice()'
+        print(f"Tenant {args.tenant}: {len(ctx['patients'])} patients sampled, invoices via {mode}")
+        if args.legacy_numbering and not ctx['has_profile']:
+            print("No user profile for this tenant: tenant_id is sent explicitly, "
+                  "so the set_tenant_id lookup is not exercised")
+        print(f"{args.duration:g} s per level, mix {args.mix}, think {args.think:g} ms\n")
+
+        print_header()
+        try:
+            for users in args.users:
+                stats, elapsed = asyncio.run(run_level(users, args, ctx))
+                print_level(users, stats, elapsed)
+        finally:
+            if ctx['created'] and not args.keep:
+                delete_created(args, ctx)
+    except ToolError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    print("\ndup# = unique violations (duplicate invoice numbers), dlk = deadlocks, "
+          "lockw = most backends waiting on a lock at once, lock% = share of samples with any waiter")
+
+
+if __name__ == '__main__':
+    main()
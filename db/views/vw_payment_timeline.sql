@@ -4,20 +4,14 @@
 -- Date: 2025-11-11
 
 -- Create daily payment timeline view
-CREATE OR REPLACE VIEW public.vw_payment_timeline AS
-SELECT
-  tenant_id,
-  invoice_date::date AS day,
-  COUNT(*) AS invoice_count,
-  SUM(total_amount) AS billed,
-  SUM(COALESCE(amount_paid, 0)) AS paid,
-  SUM(total_amount - COALESCE(amount_paid, 0)) AS outstanding
-FROM public.invoices
-WHERE invoice_date IS NOT NULL
-GROUP BY tenant_id, invoice_date::date
-ORDER BY tenant_id, day DESC;
+-- Reads the invoice_daily_totals rollup (requires migration 010). For a date
+-- range prefer get_payment_timeline(tenant, from_day, to_day).
+DROP VIEW IF EXISTS public.vw_payment_timeline;
+CREATE VIEW public.vw_payment_timeline WITH (security_invoker = true) AS
+SELECT tenant_id, day, invoice_count, billed, paid, outstanding
+FROM public.invoice_daily_totals;
 
-COMMENT ON VIEW public.vw_payment_timeline IS 'Daily payment trends per tenant for reports dashboard';
+COMMENT ON VIEW public.vw_payment_timeline IS 'Daily payment trends per tenant for reports dashboard (reads invoice_daily_totals)';
 
 -- Grant access to authenticated users
 GRANT SELECT ON public.vw_payment_timeline TO authenticated;
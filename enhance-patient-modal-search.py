@@ -4,49 +4,19 @@ Enhance PatientModal with Search Existing Patient functionality
 Gate S6.2 - Functional Refinement
 """
 
-import re
-
-file_path = r"apps\web\src\components\PatientModal.tsx"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# 1. Update imports to include useEffect
-content = re.sub(
-    r"import \{ useState, FormEvent \} from 'react';",
-    r"import { useState, useEffect, FormEvent } from 'react';",
-    content
-)
-
-# 2. Add search mode state and search results after formData state
-state_addition = r"""  const [formData, setFormData] = useState<PatientFormData>({
-    first_name: '',
-    last_name: '',
-    cell: '',
-    email: '',
-    id_number: '',
-    home_address: '',
-    notes: '',
-  });
-  const [errors, setErrors] = useState<Partial<PatientFormData>>({});
-  const [saving, setSaving] = useState(false);
+from patchlib import InsertAfterAnchor, InsertBeforeAnchor, Patch, Replace, ReplaceAnchor, run
 
+# 2. Add search mode state and search results after the saving state
+search_state = """
   // Search functionality (Gate S6.2)
   const [isSearchMode, setIsSearchMode] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
   const [searchResults, setSearchResults] = useState<any[]>([]);
-  const [isSearching, setIsSearching] = useState(false);"""
-
-content = re.sub(
-    r"(const \[formData, setFormData\] = useState<PatientFormData>\(\{[^}]+\}\);)\s+(const \[errors, setErrors\] = useState<Partial<PatientFormData>>\(\{\}\);)\s+(const \[saving, setSaving\] = useState\(false\);)",
-    state_addition,
-    content,
-    flags=re.DOTALL
-)
+  const [isSearching, setIsSearching] = useState(false);
+"""
 
 # 3. Add debounced search useEffect before validateForm function
-search_effect = r"""
-  // Debounced patient search (Gate S6.2)
+search_effect = """  // Debounced patient search (Gate S6.2)
   useEffect(() => {
     if (!isSearchMode || searchQuery.length < 2) {
       setSearchResults([]);
@@ -56,12 +26,9 @@ search_effect = r"""
     const delayDebounce = setTimeout(async () => {
       setIsSearching(true);
       try {
+        // Trigram-indexed, ranked search scoped to the user's tenant (migration 011)
         const { data, error } = await supabase
-          .from('customers')
-          .select('id, first_name, last_name, cell, email, id_number, home_address, notes')
-          .eq('tenant_id', tenantId!)
-          .or(`first_name.ilike.%${searchQuery}%,last_name.ilike.%${searchQuery}%,cell.ilike.%${searchQuery}%`)
-          .limit(10);
+          .rpc('search_patients', { q: searchQuery, result_limit: 10, active_only: false });
 
         if (error) throw error;
         setSearchResults(data || []);
@@ -94,20 +61,8 @@ search_effect = r"""
 
 """
 
-content = re.sub(
-    r"(\s+const validateForm = \(\): boolean => \{)",
-    search_effect + r"\1",
-    content
-)
-
 # 4. Update header to include search toggle
-old_header = r"""        {/\* Header \*/}
-        <div className="bg-gradient-to-r from-primary to-secondary p-6">
-          <h2 className="text-2xl font-bold text-white">Add New Patient</h2>
-          <p className="text-white text-sm mt-1">Complete patient information</p>
-        </div>"""
-
-new_header = r"""        {/* Header */}
+new_header = """{/* Header */}
         <div className="bg-gradient-to-r from-primary to-secondary p-6">
           <h2 className="text-2xl font-bold text-white">
             {isSearchMode ? 'Search Existing Patient' : 'Add New Patient'}
@@ -117,13 +72,8 @@ new_header = r"""        {/* Header */}
           </p>
         </div>"""
 
-content = re.sub(old_header, new_header, content, flags=re.DOTALL)
-
 # 5. Add search/create toggle button at the start of the form
-toggle_button = r"""
-        {/* Form */}
-        <form onSubmit={handleSubmit} className="p-6 space-y-4">
-          {/* Search/Create Toggle */}
+toggle_button = """          {/* Search/Create Toggle */}
           <div className="flex justify-center pb-2 border-b border-gray-200">
             <button
               type="button"
@@ -196,30 +146,18 @@ toggle_button = r"""
           {!isSearchMode && (
             <>"""
 
-content = re.sub(
-    r"(        {/\* Form \*/}\n        <form onSubmit=\{handleSubmit\} className=\"p-6 space-y-4\">\n)",
-    toggle_button,
-    content
-)
-
 # 6. Close the conditional render before action buttons
-old_buttons = r"""          {/\* Action Buttons \*/}
-          <div className="flex gap-3 pt-4">"""
-
-new_buttons = r"""            </>
+close_create_form = """            </>
           )}
 
-          {/* Action Buttons */}
-          <div className="flex gap-3 pt-4">"""
-
-content = re.sub(old_buttons, new_buttons, content, flags=re.DOTALL)
+"""
 
 # 7. Update button logic to handle search mode
-old_button_code = r"""            <button type="submit" className="btn btn-primary flex-1" disabled={saving}>
-              {saving \? 'Saving\.\.\.' : 'Create Patient'}
+old_button_code = """            <button type="submit" className="btn btn-primary flex-1" disabled={saving}>
+              {saving ? 'Saving...' : 'Create Patient'}
             </button>"""
 
-new_button_code = r"""            <button
+new_button_code = """            <button
               type="submit"
               className="btn btn-primary flex-1"
               disabled={saving || isSearchMode}
@@ -227,9 +165,23 @@ new_button_code = r"""            <button
               {saving ? 'Saving...' : 'Create Patient'}
             </button>"""
 
-content = re.sub(old_button_code, new_button_code, content)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("PatientModal enhanced with search functionality")
+PATCHES = [
+    Patch(
+        name='enhance-patient-modal-search',
+        target='apps/web/src/components/PatientModal.tsx',
+        edits=[
+            # 1. Update imports to include useEffect
+            ReplaceAnchor('import:react', "import { useState, useEffect, FormEvent } from 'react';"),
+            InsertAfterAnchor('useState:saving', search_state),
+            InsertBeforeAnchor('const:validateForm', search_effect),
+            ReplaceAnchor('jsx:Header', new_header),
+            InsertAfterAnchor('jsx:Form', toggle_button, part='head'),
+            InsertBeforeAnchor('jsx:Action Buttons', close_create_form),
+            Replace(old_button_code, new_button_code),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("PatientModal enhanced with search functionality")
@@ -6,10 +6,7 @@ Gate S6 - Final Polish
 
 import re
 
-file_path = r"apps\web\src\lib\pdfGenerator.ts"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Sub, run
 
 # Replace the header section with logo-enabled version
 old_header = r"""  // Brand Colors
@@ -53,8 +50,6 @@ new_header = r"""  // Brand Colors
 
   yPos = 55;"""
 
-content = re.sub(old_header, new_header, content, flags=re.DOTALL)
-
 # Update footer section
 old_footer = r"""  // Footer
   const footerY = doc\.internal\.pageSize\.getHeight\(\) - 20;
@@ -91,9 +86,19 @@ new_footer = r"""  // Footer
     { align: 'center' }
   );"""
 
-content = re.sub(old_footer, new_footer, content, flags=re.DOTALL)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("PDF generator enhanced with professional branding")
+PATCHES = [
+    Patch(
+        name='enhance-pdf-branding',
+        target='apps/web/src/lib/pdfGenerator.ts',
+        edits=[
+            Sub(old_header, new_header, flags=re.DOTALL,
+                done="  // Header: Practice Name with Professional Layout\n"),
+            Sub(old_footer, new_footer, flags=re.DOTALL,
+                done="Thank you for your visit — Smile with Confidence"),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("PDF generator enhanced with professional branding")
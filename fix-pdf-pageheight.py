@@ -3,21 +3,23 @@
 Fix pageHeight undefined error in pdfGenerator.ts
 """
 
-import re
+from patchlib import Patch, Sub, run
 
-file_path = r"apps\web\src\lib\pdfGenerator.ts"
+PATCHES = [
+    Patch(
+        name='fix-pdf-pageheight',
+        target='apps/web/src/lib/pdfGenerator.ts',
+        edits=[
+            # Add pageHeight constant after pageWidth
+            Sub(
+                r"(  const pageWidth = doc\.internal\.pageSize\.getWidth\(\);)",
+                r"\1\n  const pageHeight = doc.internal.pageSize.getHeight();",
+                done="const pageHeight = doc.internal.pageSize.getHeight();",
+            ),
+        ],
+    ),
+]
 
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# Add pageHeight constant after pageWidth
-content = re.sub(
-    r"(  const pageWidth = doc\.internal\.pageSize\.getWidth\(\);)",
-    r"\1\n  const pageHeight = doc.internal.pageSize.getHeight();",
-    content
-)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Fixed pageHeight undefined error in pdfGenerator.ts")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("Fixed pageHeight undefined error in pdfGenerator.ts")
@@ -1,36 +1,12 @@
 #!/usr/bin/env python3
 """
 Integrate PatientModal into InvoiceNew.tsx
-Replace CreatablePatientSelect with hybrid dropdown + modal button
+Replace CreatablePatientSelect with type-ahead search + modal button
 """
 
 import re
 
-file_path = r"apps\web\src\pages\InvoiceNew.tsx"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# 1. Add PatientModal import
-content = re.sub(
-    r"(import CreatablePatientSelect from '\.\./components/CreatablePatientSelect';)",
-    r"import PatientModal from '../components/PatientModal';\n\1",
-    content
-)
-
-# 2. Add modal state after line 38 (after changeDue state)
-content = re.sub(
-    r"(const \[changeDue, setChangeDue\] = useState<number>\(0\);\n)",
-    r"\1\n  // Patient modal state\n  const [isPatientModalOpen, setIsPatientModalOpen] = useState(false);\n",
-    content
-)
-
-# 3. Update handlePatientCreated to work with modal
-content = re.sub(
-    r"(const handlePatientCreated = \(newPatient: Customer\) => \{\n    setPatients\(\[\.\.\.patients, newPatient\]\);\n  \};)",
-    r"const handlePatientCreated = async (patientId: string) => {\n    // Refresh patient list after creation\n    const { data } = await supabase\n      .from('customers')\n      .select('*')\n      .eq('tenant_id', tenantId!)\n      .eq('is_active', true)\n      .order('name');\n\n    if (data) {\n      setPatients(data);\n      setPatientId(patientId);\n    }\n\n    setIsPatientModalOpen(false);\n  };",
-    content
-)
+from patchlib import Patch, Sub, run
 
 # 4. Replace patient selection UI
 old_ui = r"""            <div>
@@ -50,21 +26,13 @@ new_ui = r"""            <div>
                 Patient *
               </label>
               <div className="flex gap-2">
-                <select
-                  id="patient"
-                  value={patientId}
-                  onChange={(e) => setPatientId(e.target.value)}
-                  className="input flex-1"
-                  required
-                >
-                  <option value="">Select a patient...</option>
-                  {patients.map((patient) => (
-                    <option key={patient.id} value={patient.id}>
-                      {patient.name}
-                      {patient.cell ? ` - ${patient.cell}` : ''}
-                    </option>
-                  ))}
-                </select>
+                <div className="flex-1">
+                  <AsyncPatientSelect
+                    inputId="patient"
+                    value={selectedPatient}
+                    onChange={handlePatientSelected}
+                  />
+                </div>
                 <button
                   type="button"
                   onClick={() => setIsPatientModalOpen(true)}
@@ -76,8 +44,6 @@ new_ui = r"""            <div>
               </div>
             </div>"""
 
-content = re.sub(old_ui, new_ui, content, flags=re.DOTALL)
-
 # 5. Add PatientModal component before closing Layout tag
 modal_component = r"""
       {/* Patient Modal */}
@@ -87,13 +53,40 @@ modal_component = r"""
         onPatientCreated={handlePatientCreated}
       />"""
 
-content = re.sub(
-    r"(    </Layout>\n  \);\n\})",
-    modal_component + r"\n\1",
-    content
-)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    Patch(
+        name='integrate-patient-modal',
+        target='apps/web/src/pages/InvoiceNew.tsx',
+        edits=[
+            # 1. Add PatientModal import
+            Sub(
+                r"(import CreatablePatientSelect from '\.\./components/CreatablePatientSelect';)",
+                r"import PatientModal from '../components/PatientModal';\n\1",
+                done="import PatientModal from '../components/PatientModal';",
+            ),
+            # 2. Add modal state after line 38 (after changeDue state)
+            Sub(
+                r"(const \[changeDue, setChangeDue\] = useState<number>\(0\);\n)",
+                r"\1\n  // Patient modal state\n  const [isPatientModalOpen, setIsPatientModalOpen] = useState(false);\n",
+                done="  // Patient modal state\n  const [isPatientModalOpen, setIsPatientModalOpen] = useState(false);\n",
+            ),
+            # 3. Update handlePatientCreated to work with modal
+            Sub(
+                r"(const handlePatientCreated = \(newPatient: Customer\) => \{\n    setPatients\(\[\.\.\.patients, newPatient\]\);\n  \};)",
+                r"const handlePatientSelected = (patient: PatientOption | null) => {\n    setSelectedPatient(patient);\n    setPatientId(patient ? patient.id : '');\n    if (patient && tenantId) rememberRecentPatient(tenantId, patient);\n  };\n\n  const handlePatientCreated = async (patientId: string) => {\n    // Select the new patient (no patient list to refresh)\n    const patient = await fetchPatientOption(patientId);\n    handlePatientSelected(patient ?? { id: patientId, name: 'New patient', cell: null });\n\n    setIsPatientModalOpen(false);\n  };",
+                done="const handlePatientSelected = (patient: PatientOption | null) => {",
+            ),
+            Sub(old_ui, new_ui, flags=re.DOTALL,
+                done="onClick={() => setIsPatientModalOpen(true)}"),
+            Sub(
+                r"(    </Layout>\n  \);\n\})",
+                modal_component + r"\n\1",
+                done="      {/* Patient Modal */}\n",
+            ),
+        ],
+    ),
+]
 
-print("PatientModal integrated into InvoiceNew.tsx successfully")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("PatientModal integrated into InvoiceNew.tsx successfully")
@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+"""
+Patch engine for the source-rewrite scripts
+Each script declares its edits as Patch units; the engine groups them by
+target file, reads every target once, applies all edits in memory and
+writes each target back once.
+
+Applied patches are recorded in .patch-manifest.json (pre/post image hash
+per patch, plus the stat of each target), so re-running a script is a
+no-op that does not even open the target file.
+
+Patches on different files are independent; only patches on the same file
+are ordered. apply_patches(workers=N) patches the file groups in parallel
+worker processes.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tsxindex import AnchorError, index_for
+
+# Repository root (patch targets are declared relative to this)
+REPO_ROOT = Path(__file__).resolve().parent
+
+# Local record of applied patches (not committed)
+MANIFEST_NAME = '.patch-manifest.json'
+
+
+class PatchError(Exception):
+    """Raised when a patch set cannot be applied"""
+
+
+# ============================================================================
+# EDITS
+# ============================================================================
+# Every edit exposes apply(text) -> (new_text, hits) and applied(text), which
+# says whether the edit's result is already present so it is never inserted
+# twice. Patterns are compiled once when the edit is declared, not on every
+# application.
+
+class Edit:
+    """Base edit: cannot tell whether it already ran unless a subclass says so"""
+
+    def applied(self, text):
+        return False
+
+
+class Sub(Edit):
+    """
+    re.sub with a precompiled pattern (repl follows re.sub escape rules).
+
+    `done` is a literal marker that is only present once the edit ran. Without
+    one the edit cannot tell, so a pattern that no longer matches is drift.
+    """
+
+    def __init__(self, pattern, repl, flags=0, count=0, done=None):
+        self.regex = re.compile(pattern, flags)
+        self.repl = repl
+        self.count = count
+        self.done = done
+
+    def apply(self, text):
+        return self.regex.subn(self.repl, text, count=self.count)
+
+    def applied(self, text):
+        return self.done is not None and self.done in text
+
+
+class InsertBefore(Edit):
+    """
+    Insert literal text before every match of a precompiled anchor.
+
+    The edit counts as applied once its text is present, or `done` when given
+    (for a block an equivalent one may already stand in for).
+    """
+
+    def __init__(self, pattern, text, flags=0, count=0, done=None):
+        self.regex = re.compile(pattern, flags)
+        self.text = text
+        self.count = count
+        self.done = done
+
+    def applied(self, text):
+        return (self.done if self.done is not None else self.text) in text
+
+    def apply(self, text):
+        return self.regex.subn(lambda m: self.text + m.group(0), text, count=self.count)
+
+
+class InsertAfter(InsertBefore):
+    """Insert literal text after every match of a precompiled anchor"""
+
+    def apply(self, text):
+        return self.regex.subn(lambda m: m.group(0) + self.text, text, count=self.count)
+
+
+class Replace(Edit):
+    """Literal str.replace (no regex involved)"""
+
+    def __init__(self, old, new, count=-1):
+        self.old = old
+        self.new = new
+        self.count = count
+
+    def applied(self, text):
+        return self.new in text
+
+    def apply(self, text):
+        hits = text.count(self.old)
+        if self.count >= 0:
+            hits = min(hits, self.count)
+        return text.replace(self.old, self.new, self.count), hits
+
+
+class Write(Edit):
+    """Overwrite the whole target with new content"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def applied(self, text):
+        return text == self.content
+
+    def apply(self, text):
+        return self.content, 1
+
+
+class MoveLines(Edit):
+    """
+    Cut lines[start:stop] and re-insert them at index `to` of the remaining lines.
+
+    Line numbers drift silently, so `expect` (a literal the cut block must
+    contain) guards the range: without it in place the edit reports no match.
+    """
+
+    def __init__(self, start, stop, to, expect=None):
+        self.start = start
+        self.stop = stop
+        self.to = to
+        self.expect = expect
+
+    def apply(self, text):
+        lines = text.splitlines(keepends=True)
+        if not _range_matches(lines, self.start, self.stop, self.expect):
+            return text, 0
+        block = lines[self.start:self.stop]
+        del lines[self.start:self.stop]
+        lines[self.to:self.to] = block
+        return ''.join(lines), 1
+
+
+class ReplaceLines(Edit):
+    """Replace lines[start:stop] with literal text (`expect` guards the range as in MoveLines)"""
+
+    def __init__(self, start, stop, text, expect=None):
+        self.start = start
+        self.stop = stop
+        self.text = text
+        self.expect = expect
+
+    def applied(self, text):
+        return self.text in text
+
+    def apply(self, text):
+        lines = text.splitlines(keepends=True)
+        if not _range_matches(lines, self.start, self.stop, self.expect):
+            return text, 0
+        lines[self.start:self.stop] = [self.text]
+        return ''.join(lines), 1
+
+
+def _range_matches(lines, start, stop, expect):
+    if stop > len(lines):
+        return False
+    return expect is None or expect in ''.join(lines[start:stop])
+
+
+class Transform(Edit):
+    """
+    Escape hatch for search-driven line edits: fn(lines) -> lines, or None if
+    not found. `applied(text)` optionally tells whether the result is in place.
+    """
+
+    def __init__(self, fn, applied=None):
+        self.fn = fn
+        self.is_applied = applied
+
+    def applied(self, text):
+        return self.is_applied is not None and self.is_applied(text)
+
+    def apply(self, text):
+        lines = self.fn(text.splitlines(keepends=True))
+        if lines is None:
+            return text, 0
+        return ''.join(lines), 1
+
+
+# Anchor edits resolve a key from the TSX/TS structural index (see tsxindex.py)
+# instead of scanning for a pattern. The index is built once per file and
+# kept in step as anchor edits splice the text.
+
+class InsertBeforeAnchor(Edit):
+    """Insert literal text at the start of the line where an anchor begins"""
+
+    def __init__(self, key, text, part='node'):
+        self.key = key
+        self.text = text
+        self.part = part
+
+    def applied(self, text):
+        return self.text in text
+
+    def _span(self, index):
+        node = index.get(self.key)
+        if self.part == 'head' and node.head:
+            return index.line_span(*node.head)
+        return index.line_span(node.start, node.end)
+
+    def apply(self, text):
+        index = index_for(text)
+        try:
+            start, _ = self._span(index)
+        except AnchorError:
+            return text, 0
+        return index.splice(start, start, self.text), 1
+
+
+class InsertAfterAnchor(InsertBeforeAnchor):
+    """Insert literal text after the last line of an anchor (part='head': of a JSX opening tag)"""
+
+    def apply(self, text):
+        index = index_for(text)
+        try:
+            _, end = self._span(index)
+        except AnchorError:
+            return text, 0
+        return index.splice(end, end, self.text), 1
+
+
+class ReplaceAnchor(Edit):
+    """Replace an anchor's exact span (statement, or JSX marker plus its element) with literal text"""
+
+    def __init__(self, key, text):
+        self.key = key
+        self.text = text
+
+    def applied(self, text):
+        return self.text in text
+
+    def apply(self, text):
+        index = index_for(text)
+        try:
+            node = index.get(self.key)
+        except AnchorError:
+            return text, 0
+        return index.splice(node.start, node.end, self.text), 1
+
+
+class MoveAnchor(Edit):
+    """
+    Move an anchor's lines before or after another anchor, taking one blank
+    line along as the separator.
+    """
+
+    def __init__(self, key, before=None, after=None):
+        if (before is None) == (after is None):
+            raise ValueError("MoveAnchor needs exactly one of before= or after=")
+        self.key = key
+        self.before = before
+        self.after = after
+
+    def applied(self, text):
+        index = index_for(text)
+        try:
+            node = index.get(self.key)
+            if self.before:
+                return node.end <= index.get(self.before).start
+            return node.start >= index.get(self.after).end
+        except AnchorError:
+            return False
+
+    def apply(self, text):
+        index = index_for(text)
+        try:
+            start, end = index.lines(self.key)
+            index.get(self.before or self.after)
+        except AnchorError:
+            return text, 0
+        block = index.text[start:end]
+        blank = index.text.rfind('\n', 0, start - 1) + 1
+        if start and not index.text[blank:start].strip():
+            start = blank
+        index.splice(start, end, '')
+
+        if self.before:
+            at, _ = index.lines(self.before)
+            block = block + '\n'
+        else:
+            _, at = index.lines(self.after)
+            block = '\n' + block
+        return index.splice(at, at, block), 1
+
+
+# ============================================================================
+# PATCH UNITS
+# ============================================================================
+
+@dataclass
+class Patch:
+    """One script's edits against one target file, applied in declaration order"""
+    name: str
+    target: str  # repo-relative, forward slashes
+    edits: list = field(default_factory=list)
+    source: str = None  # script that declared it (set by load_patches)
+
+
+@dataclass
+class PatchResult:
+    name: str
+    target: str
+    hits: list  # substitutions made by each edit, in order (None = already present)
+    status: str = 'applied'  # applied | present | recorded | drift
+    seconds: float = 0.0  # wall-clock time spent on this patch
+
+
+def load_patches(script_path):
+    """Import a patch script by path (names contain hyphens) and return its PATCHES"""
+    script_path = Path(script_path)
+    module_name = 'patch_' + script_path.stem.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    patches = getattr(module, 'PATCHES', None)
+    if patches is None:
+        raise PatchError(f"{script_path} does not declare PATCHES")
+    for patch in patches:
+        patch.source = str(script_path)
+    return list(patches)
+
+
+_loaded = {}
+
+
+def _load_cached(script_path):
+    # Worker processes load each script at most once
+    if script_path not in _loaded:
+        _loaded[script_path] = load_patches(script_path)
+    return _loaded[script_path]
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+class Manifest:
+    """
+    Record of applied patches, keyed by target.
+
+    Each target entry holds the stat and hash of the file as last written or
+    verified, plus the pre- and post-image hash of every patch recorded
+    against it, in application order.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.targets = json.load(f)
+        except FileNotFoundError:
+            self.targets = {}
+        except (OSError, ValueError) as e:
+            raise PatchError(f"Cannot read manifest {self.path}: {e}") from e
+
+    def has(self, target, name):
+        return name in self.targets.get(target, {}).get('patches', {})
+
+    def is_current(self, target, path, names):
+        """True when every named patch is recorded and the file is untouched since (stat only)"""
+        entry = self.targets.get(target)
+        if not entry or not all(name in entry['patches'] for name in names):
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return entry.get('stat') == [st.st_size, st.st_mtime_ns]
+
+    def reconcile(self, target, content_hash):
+        """
+        Check a target whose stat changed against its recorded hashes.
+
+        If the file is back at the pre-image of a recorded patch (e.g. after
+        git checkout), that patch and every later one are forgotten so they
+        are applied again. Any other change is a hand edit and leaves the
+        record alone.
+        """
+        entry = self.targets.get(target)
+        if not entry or entry.get('sha256') == content_hash:
+            return
+        names = list(entry['patches'])
+        for i, name in enumerate(names):
+            record = entry['patches'][name]
+            if record['pre'] == content_hash and record['pre'] != record['post']:
+                for forgotten in names[i:]:
+                    del entry['patches'][forgotten]
+                return
+
+    def view(self, target):
+        """Manifest holding only target's entry (what a worker process needs)"""
+        view = Manifest.__new__(Manifest)
+        view.path = None
+        view.targets = {target: self.targets[target]} if target in self.targets else {}
+        return view
+
+    def record(self, target, name, pre, post):
+        entry = self.targets.setdefault(target, {'patches': {}})
+        entry['patches'][name] = {'pre': pre, 'post': post}
+
+    def sync(self, target, path, content_hash):
+        """Store the current stat and hash of a target after writing or verifying it"""
+        entry = self.targets.setdefault(target, {'patches': {}})
+        st = os.stat(path)
+        entry['stat'] = [st.st_size, st.st_mtime_ns]
+        entry['sha256'] = content_hash
+
+    def save(self):
+        _write_atomic(self.path, json.dumps(self.targets, indent=2, sort_keys=True) + '\n')
+
+
+def group_by_target(patches):
+    """Group patches by target file, preserving declaration order within each file"""
+    groups = {}
+    for patch in patches:
+        groups.setdefault(patch.target, []).append(patch)
+    return groups
+
+
+def _write_atomic(path, content, newline=None):
+    # Write to a sibling temp file, then swap it in so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _apply_patch(patch, content):
+    """
+    Apply one patch to in-memory content, all or nothing.
+
+    Edits whose result is already present are skipped. If any other edit
+    finds no anchor, the patch has drifted and the content is returned
+    unchanged.
+    """
+    original = content
+    hits = []
+    for edit in patch.edits:
+        if edit.applied(content):
+            hits.append(None)
+            continue
+        try:
+            content, n = edit.apply(content)
+        except re.error as e:
+            raise PatchError(f"{patch.name}: bad replacement for {patch.target}: {e}") from e
+        hits.append(n)
+
+    if any(n == 0 for n in hits):
+        return original, PatchResult(patch.name, patch.target, hits, 'drift')
+    if all(n is None for n in hits):
+        return original, PatchResult(patch.name, patch.target, hits, 'present')
+    return content, PatchResult(patch.name, patch.target, hits)
+
+
+def _patch_target(root, target, group, manifest):
+    """
+    Read one target and apply its patches in order.
+
+    Returns (results, pending, records): pending is the write to perform
+    (path, content, newline, changed, content_hash) and records are the
+    manifest entries to add once it is written.
+    """
+    path = root / target
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            original = f.read()
+            # Edits see '\n' only; write back with the file's own line endings
+            newline = f.newlines if isinstance(f.newlines, str) else None
+    except OSError as e:
+        raise PatchError(f"Cannot read {target}: {e}") from e
+    content = original
+    content_hash = _sha256(original)
+    manifest.reconcile(target, content_hash)
+
+    results = []
+    records = []
+    for patch in group:
+        if manifest.has(target, patch.name):
+            results.append(PatchResult(patch.name, target, [], 'recorded'))
+            continue
+        started = time.perf_counter()
+        content, result = _apply_patch(patch, content)
+        if result.status != 'drift':
+            pre_hash, content_hash = content_hash, _sha256(content)
+            records.append((target, patch.name, pre_hash, content_hash))
+        result.seconds = time.perf_counter() - started
+        results.append(result)
+
+    pending = (path, content, newline, content != original, content_hash)
+    return results, pending, records
+
+
+def _patch_target_worker(root, target, refs, manifest):
+    # Runs in a worker process: patches are reloaded from their scripts
+    # (Transform functions cannot be pickled across processes)
+    by_name = {}
+    for source in dict.fromkeys(source for source, _ in refs):
+        by_name.update((p.name, p) for p in _load_cached(source) if p.target == target)
+    group = [by_name[name] for _, name in refs]
+    results, pending, records = _patch_target(root, target, group, manifest)
+    return results, pending, records, manifest.targets.get(target)
+
+
+def apply_patches(patches, root=REPO_ROOT, dry_run=False, manifest=None, workers=1):
+    """
+    Apply a patch set with one read and one write per target file.
+
+    Every target is patched in memory first; nothing is written unless all
+    targets were read and patched without error. Patches already recorded in
+    the manifest are skipped, and a target whose patches are all recorded is
+    not read at all while its stat is unchanged. Drifted patches are left
+    out and reported, never partially applied.
+
+    With workers > 1, each target's patches run as one ordered chain in a
+    worker process, and chains for different targets run in parallel. This
+    needs patches loaded with load_patches (so workers can reload them);
+    otherwise the targets are patched in this process.
+    """
+    root = Path(root)
+    if manifest is None:
+        manifest = Manifest(root / MANIFEST_NAME)
+    results = {}
+    todo = []
+
+    for target, group in group_by_target(patches).items():
+        if manifest.is_current(target, root / target, [p.name for p in group]):
+            results[target] = [PatchResult(p.name, target, [], 'recorded') for p in group]
+        else:
+            todo.append((target, group))
+
+    parallel = workers > 1 and len(todo) > 1 and all(p.source for _, group in todo for p in group)
+    outcomes = []
+    if parallel:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            futures = [
+                pool.submit(_patch_target_worker, root, target,
+                            [(p.source, p.name) for p in group], manifest.view(target))
+                for target, group in todo
+            ]
+            for (target, _), future in zip(todo, futures):
+                target_results, pending, records, entry = future.result()
+                if entry is not None:
+                    manifest.targets[target] = entry
+                outcomes.append((target, target_results, pending, records))
+    else:
+        for target, group in todo:
+            outcomes.append((target, *_patch_target(root, target, group, manifest)))
+
+    for target, target_results, _, _ in outcomes:
+        results[target] = target_results
+    ordered = [r for target in group_by_target(patches) for r in results[target]]
+    if dry_run:
+        return ordered
+
+    for target, _, (path, content, newline, changed, content_hash), _ in outcomes:
+        if changed:
+            _write_atomic(path, content, newline)
+        manifest.sync(target, path, content_hash)
+    for _, _, _, records in outcomes:
+        for record in records:
+            manifest.record(*record)
+    manifest.save()
+
+    return ordered
+
+
+def record_baseline(patches, root=REPO_ROOT):
+    """
+    Record every patch as applied to its target as it stands, without editing
+    anything. Used to adopt a tree that was patched before the manifest existed.
+    """
+    root = Path(root)
+    manifest = Manifest(root / MANIFEST_NAME)
+    for target, group in group_by_target(patches).items():
+        path = root / target
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content_hash = _sha256(f.read())
+        except OSError as e:
+            raise PatchError(f"Cannot read {target}: {e}") from e
+        for patch in group:
+            manifest.record(target, patch.name, content_hash, content_hash)
+        manifest.sync(target, path, content_hash)
+    manifest.save()
+
+
+def print_report(results):
+    for result in results:
+        if result.status == 'recorded':
+            status = 'already applied (manifest)'
+        elif result.status == 'present':
+            status = 'already present, recorded'
+        elif result.status == 'drift':
+            missed = [i + 1 for i, n in enumerate(result.hits) if n == 0]
+            status = f"DRIFT: anchor not found for edit(s) {missed}, patch not applied"
+        else:
+            changes = sum(n for n in result.hits if n)
+            status = f"{changes} change(s) OK"
+        timing = f" ({result.seconds * 1000:.1f} ms)" if result.seconds else ''
+        print(f"  {result.name} -> {result.target}: {status}{timing}")
+
+
+def has_drift(results):
+    return any(r.status == 'drift' for r in results)
+
+
+def run(patches, root=REPO_ROOT):
+    """Entry point for a single script: apply its PATCHES and print a report"""
+    results = apply_patches(patches, root=root)
+    print_report(results)
+    if has_drift(results):
+        sys.exit(1)
+    return results
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Structural anchor index for the TSX/TS patch targets
+One linear scan of a file (skipping strings, template literals, comments and
+regex literals) maps named anchors to character spans, so patches resolve
+their anchors by key lookup instead of re-scanning the file with regexes.
+
+Keys:
+  import:react              import ... from 'react';
+  function:PatientModal     top-level function declaration
+  interface:LineItem        top-level interface (also type:, const:, let:)
+  const:fetchData           declaration inside a top-level function body
+  useState:formData         const [formData, ...] = useState(...)
+  useEffect#1               bare hook call statements, numbered in file order
+  jsx:Action Buttons        {/* Action Buttons */} plus the element after it
+
+Repeated keys get a #2, #3... suffix. Offsets are str indices into the
+file text (what the engine splices), not encoded byte offsets.
+"""
+
+import re
+from dataclasses import dataclass
+
+OPENERS = {'(': ')', '[': ']', '{': '}'}
+CLOSERS = {')', ']', '}'}
+
+# A '/' after one of these starts a regex literal rather than a division
+REGEX_PREFIX = set('(,=:[!&|?{};+-*%~^') | {''}
+
+# Statements that end at their closing brace rather than at a semicolon
+BLOCK_STATEMENT = re.compile(
+    r'(?:export\s+)?(?:default\s+)?(?:async\s+)?'
+    r'(?:function\b|interface\b|class\b|enum\b|if\b|for\b|while\b|try\b|switch\b|do\b|else\b)'
+)
+BLOCK_CONTINUATION = re.compile(r'\s*(?:else\b|catch\b|finally\b)')
+TRAILING_SEMICOLON = re.compile(r'[ \t]*;')
+
+IMPORT = re.compile(r"import\b[^;]*?from\s+['\"]([^'\"]+)['\"]|import\s+['\"]([^'\"]+)['\"]")
+DECLARATION = re.compile(
+    r'(?:export\s+)?(?:default\s+)?(?:declare\s+)?'
+    r'(?:(async\s+)?(function)\s*\*?\s*(\w+)|(interface|type|enum|class)\s+(\w+)|(const|let|var)\s+(\w+))'
+)
+HOOK_BINDING = re.compile(r'(?:const|let|var)\s+(?:\[\s*(\w+)[^\]]*\]|\{\s*(\w+)[^}]*\}|(\w+))\s*=\s*(use[A-Z]\w*)\s*[(<]')
+HOOK_CALL = re.compile(r'(use[A-Z]\w*)\s*\(')
+JSX_MARKER = re.compile(r'\{\s*/\*\s*(.*?)\s*\*/\s*\}')
+JSX_TAG = re.compile(r'<([A-Za-z][\w.]*)?')
+
+
+class AnchorError(Exception):
+    """Raised when an anchor key cannot be resolved"""
+
+
+@dataclass
+class Node:
+    key: str
+    start: int  # first character of the statement / marker
+    end: int    # one past its last character
+    body: tuple = None  # (start, end) inside the braces of a function or block, or the JSX element span
+    head: tuple = None  # (start, end) of a JSX element's opening tag
+
+    def shift(self, delta):
+        self.start += delta
+        self.end += delta
+        if self.body:
+            self.body = (self.body[0] + delta, self.body[1] + delta)
+        if self.head:
+            self.head = (self.head[0] + delta, self.head[1] + delta)
+
+
+# ============================================================================
+# LEXER
+# ============================================================================
+
+def scan(text):
+    """
+    Single pass over text. Returns (events, pairs, markers):
+      events  - [(pos, char)] for brackets, ';' and newlines in code only
+      pairs   - {opener_pos: closer_pos} for matched code brackets
+      markers - [(label, start, end)] for {/* label */} JSX comments
+    """
+    events = []
+    pairs = {}
+    markers = []
+    stack = []      # open bracket positions (template ${ pushes '{' too)
+    templates = []  # stack depths at which a ${...} returns to template text
+    n = len(text)
+    i = 0
+    prev = ''       # last significant code character
+
+    def skip_template(i):
+        # i is just past a backtick or a closing '}' of ${...}
+        while i < n:
+            c = text[i]
+            if c == '\\':
+                i += 2
+            elif c == '`':
+                return i + 1, False
+            elif c == '$' and text.startswith('${', i):
+                return i + 2, True
+            else:
+                i += 1
+        return n, False
+
+    while i < n:
+        c = text[i]
+
+        if c in ' \t\r':
+            i += 1
+            continue
+
+        if c == '\n':
+            events.append((i, c))
+            i += 1
+            continue
+
+        if c == '/' and i + 1 < n and text[i + 1] == '/':
+            end = text.find('\n', i)
+            i = n if end == -1 else end
+            continue
+
+        if c == '/' and i + 1 < n and text[i + 1] == '*':
+            end = text.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+
+        if c == '/' and prev in REGEX_PREFIX:
+            j = i + 1
+            in_class = False
+            while j < n and text[j] != '\n':
+                d = text[j]
+                if d == '\\':
+                    j += 2
+                    continue
+                if d == '[':
+                    in_class = True
+                elif d == ']':
+                    in_class = False
+                elif d == '/' and not in_class:
+                    break
+                j += 1
+            if j < n and text[j] == '/':
+                i = j + 1
+                while i < n and text[i].isalpha():
+                    i += 1
+                prev = '/'
+                continue
+            # Not a regex literal after all: treat as an operator
+            prev = '/'
+            i += 1
+            continue
+
+        if c in '\'"':
+            j = i + 1
+            while j < n and text[j] != c and text[j] != '\n':
+                j += 2 if text[j] == '\\' else 1
+            if j < n and text[j] == c:
+                i = j + 1
+                prev = c
+                continue
+            # Unterminated on this line: an apostrophe in JSX text, not a string
+            i += 1
+            continue
+
+        if c == '`':
+            i, interpolation = skip_template(i + 1)
+            if interpolation:
+                stack.append(i - 1)
+                templates.append(len(stack))
+                events.append((i - 1, '{'))
+                prev = '{'
+            else:
+                prev = '`'
+            continue
+
+        if c in OPENERS:
+            if c == '{':
+                m = JSX_MARKER.match(text, i)
+                if m:
+                    markers.append((m.group(1), i, m.end()))
+                    i = m.end()
+                    prev = '}'
+                    continue
+            stack.append(i)
+            events.append((i, c))
+            prev = c
+            i += 1
+            continue
+
+        if c in CLOSERS:
+            if stack:
+                pairs[stack.pop()] = i
+            events.append((i, c))
+            if templates and templates[-1] == len(stack) + 1 and c == '}':
+                templates.pop()
+                i, interpolation = skip_template(i + 1)
+                if interpolation:
+                    stack.append(i - 1)
+                    templates.append(len(stack))
+                    events.append((i - 1, '{'))
+                    prev = '{'
+                else:
+                    prev = '`'
+                continue
+            prev = c
+            i += 1
+            continue
+
+        if c == ';':
+            events.append((i, c))
+
+        if c.isalnum() or c in '_$':
+            j = i + 1
+            while j < n and (text[j].isalnum() or text[j] in '_$'):
+                j += 1
+            word = text[i:j]
+            # Keywords that can precede a regex literal
+            prev = '' if word in ('return', 'typeof', 'case', 'in', 'of') else 'a'
+            i = j
+            continue
+
+        prev = c
+        i += 1
+
+    return events, pairs, markers
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class TsxIndex:
+    """
+    Anchor index over one file's text.
+
+    Built once; splice() keeps it in step with edits by shifting the spans
+    after the edit. Spans the edit cut through are dropped, and a lookup that
+    misses rebuilds the index from the current text.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.build()
+
+    def build(self):
+        events, self.pairs, markers = scan(self.text)
+        self._events = events
+        self._event_at = {pos: k for k, (pos, _) in enumerate(events)}
+        self.nodes = {}
+        self._counts = {}
+        self._statements(0, len(self.text), top=True)
+        for label, start, end in markers:
+            self._add_marker(label, start, end)
+
+    # ------------------------------------------------------------------ build
+
+    def _add(self, key, node, numbered=False):
+        n = self._counts.get(key, 0) + 1
+        self._counts[key] = n
+        if numbered:
+            node.key = f"{key}#{n}"
+        elif n > 1:
+            node.key = f"{key}#{n}"
+        else:
+            node.key = key
+        self.nodes[node.key] = node
+
+    def _next_code(self, pos, stop):
+        # Skip whitespace and comments
+        text = self.text
+        while pos < stop:
+            c = text[pos]
+            if c in ' \t\r\n':
+                pos += 1
+            elif text.startswith('//', pos):
+                end = text.find('\n', pos)
+                pos = stop if end == -1 else end + 1
+            elif text.startswith('/*', pos):
+                end = text.find('*/', pos + 2)
+                pos = stop if end == -1 else end + 2
+            else:
+                break
+        return pos
+
+    def _statement_end(self, start, stop):
+        """End of the statement beginning at start, and its first brace pair if any"""
+        text = self.text
+        block = BLOCK_STATEMENT.match(text, start) is not None
+        first_brace = None
+        k = self._first_event(start)
+        events = self._events
+        while k < len(events) and events[k][0] < stop:
+            pos, c = events[k]
+            if c == ';':
+                return pos + 1, first_brace
+            if c in OPENERS:
+                close = self.pairs.get(pos, stop)
+                if c == '{' and first_brace is None:
+                    first_brace = (pos, close)
+                if c == '{' and block:
+                    after = close + 1
+                    if BLOCK_CONTINUATION.match(text, after):
+                        k = self._first_event(after)
+                        continue
+                    m = TRAILING_SEMICOLON.match(text, after)
+                    return (m.end() if m else after), first_brace
+                k = self._first_event(close + 1)
+                continue
+            if c in CLOSERS:
+                return pos, first_brace
+            k += 1
+        return stop, first_brace
+
+    def _first_event(self, pos):
+        # Index of the first event at or after pos
+        k = self._event_at.get(pos)
+        if k is not None:
+            return k
+        lo, hi = 0, len(self._events)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._events[mid][0] < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _statements(self, start, stop, top):
+        pos = self._next_code(start, stop)
+        while pos < stop:
+            end, brace = self._statement_end(pos, stop)
+            if end <= pos:
+                end = pos + 1
+            self._classify(pos, end, brace, top)
+            pos = self._next_code(end, stop)
+
+    def _classify(self, start, end, brace, top):
+        text = self.text
+        body = (brace[0] + 1, brace[1]) if brace else None
+
+        if top:
+            m = IMPORT.match(text, start)
+            if m:
+                self._add(f"import:{m.group(1) or m.group(2)}", Node('', start, end))
+                return
+            m = DECLARATION.match(text, start)
+            if not m:
+                return
+            if m.group(2):
+                self._add(f"function:{m.group(3)}", Node('', start, end, body))
+                self._statements(body[0], body[1], top=False)
+            elif m.group(4):
+                self._add(f"{m.group(4)}:{m.group(5)}", Node('', start, end, body))
+            else:
+                self._add(f"{m.group(6)}:{m.group(7)}", Node('', start, end, body))
+                # Arrow-function components: index their body like a function's
+                if body and '=>' in text[start:brace[0]]:
+                    self._statements(body[0], body[1], top=False)
+            return
+
+        m = HOOK_BINDING.match(text, start)
+        if m:
+            name = m.group(1) or m.group(2) or m.group(3)
+            self._add(f"{m.group(4)}:{name}", Node('', start, end, body))
+            return
+        m = DECLARATION.match(text, start)
+        if m and m.group(7):
+            self._add(f"{m.group(6)}:{m.group(7)}", Node('', start, end, body))
+            return
+        m = HOOK_CALL.match(text, start)
+        if m:
+            self._add(m.group(1), Node('', start, end, body), numbered=True)
+
+    def _add_marker(self, label, start, end):
+        # The marker anchors the JSX element or {expression} that follows it
+        text = self.text
+        node = Node('', start, end)
+        pos = self._next_code(end, len(text))
+        m = JSX_TAG.match(text, pos)
+        if pos in self.pairs and text[pos] == '{':
+            node.body = (pos, self.pairs[pos] + 1)
+            node.end = node.body[1]
+        elif m:
+            head_end = self._tag_end(m.end())
+            if head_end:
+                node.head = (pos, head_end)
+                if text[head_end - 2] == '/':
+                    node.body = (pos, head_end)
+                else:
+                    close = self._closing_tag(m.group(1) or '', head_end)
+                    if close:
+                        node.body = (pos, close)
+                        node.end = close
+        self._add(f"jsx:{label}", node)
+
+    def _skip_braces(self, pos):
+        # Past a {...} expression or a {/* marker */}
+        close = self.pairs.get(pos)
+        if close is not None:
+            return close + 1
+        m = JSX_MARKER.match(self.text, pos)
+        return m.end() if m else pos + 1
+
+    def _tag_end(self, pos):
+        # One past the '>' closing the tag whose name ends at pos, skipping {...} and strings
+        text = self.text
+        n = len(text)
+        while pos < n:
+            c = text[pos]
+            if c == '{':
+                pos = self._skip_braces(pos)
+            elif c in '\'"':
+                end = text.find(c, pos + 1)
+                pos = n if end == -1 else end + 1
+            elif c == '>':
+                return pos + 1
+            else:
+                pos += 1
+        return None
+
+    def _closing_tag(self, name, pos):
+        # One past the </name> matching an element opened just before pos
+        text = self.text
+        n = len(text)
+        depth = 1
+        tag = re.compile(r'<(/?)' + re.escape(name) + r'(?=[\s>/])' if name else r'<(/?)>')
+        while pos < n:
+            c = text[pos]
+            if c == '{':
+                pos = self._skip_braces(pos)
+                continue
+            if c == '<':
+                m = tag.match(text, pos)
+                if m:
+                    end = self._tag_end(m.end()) if name else m.end()
+                    if end is None:
+                        return None
+                    if m.group(1):
+                        depth -= 1
+                        if depth == 0:
+                            return end
+                    elif text[end - 2] != '/':
+                        depth += 1
+                    pos = end
+                    continue
+            pos += 1
+        return None
+
+    # ----------------------------------------------------------------- lookup
+
+    def get(self, key):
+        """Node for key; rebuilds once on a miss (e.g. after an edit cut through it)"""
+        node = self.nodes.get(key)
+        if node is None:
+            self.build()
+            node = self.nodes.get(key)
+        if node is None:
+            raise AnchorError(f"No anchor '{key}'")
+        return node
+
+    def lines(self, key):
+        """Span of the whole lines covering key's node, trailing newline included"""
+        node = self.get(key)
+        return self.line_span(node.start, node.end)
+
+    def line_span(self, start, end):
+        text = self.text
+        line_start = text.rfind('\n', 0, start) + 1
+        if text[line_start:start].strip():
+            line_start = start
+        nl = text.find('\n', end)
+        line_end = len(text) if nl == -1 else nl + 1
+        if text[end:line_end].strip():
+            line_end = end
+        return line_start, line_end
+
+    # ----------------------------------------------------------------- splice
+
+    def splice(self, start, end, new):
+        """Replace text[start:end] with new and shift the index to match"""
+        self.text = self.text[:start] + new + self.text[end:]
+        delta = len(new) - (end - start)
+        stale = []
+        for key, node in self.nodes.items():
+            if node.end <= start and not (node.end == start and end > start):
+                continue
+            if node.start >= end:
+                node.shift(delta)
+            elif (node.start <= start and node.end >= end and _inside(node.body, start, end)
+                  and not (node.head and start < node.head[1])):
+                node.end += delta
+                node.body = (node.body[0], node.body[1] + delta)
+            else:
+                stale.append(key)
+        for key in stale:
+            del self.nodes[key]
+        return self.text
+
+
+def _inside(span, start, end):
+    return span is not None and span[0] <= start and end <= span[1]
+
+
+_cache = None
+
+
+def index_for(text):
+    """Index for text, reusing the last one when text is what it last produced"""
+    global _cache
+    if _cache is None or not (_cache.text is text or _cache.text == text):
+        _cache = TsxIndex(text)
+    return _cache
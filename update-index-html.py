@@ -4,6 +4,8 @@ Update index.html with proper branding and SPA redirect handler
 Gate S7 - Deployment & Mobile Validation
 """
 
+from patchlib import Patch, Write, run
+
 content = """<!doctype html>
 <html lang="en">
   <head>
@@ -38,8 +40,14 @@ content = """<!doctype html>
 </html>
 """
 
-file_path = r"apps\web\index.html"
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    Patch(
+        name='update-index-html',
+        target='apps/web/index.html',
+        edits=[Write(content)],
+    ),
+]
 
-print("index.html updated with branding and SPA redirect handler")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("index.html updated with branding and SPA redirect handler")
@@ -6,10 +6,7 @@ Schema v4.1
 
 import re
 
-file_path = r"apps\web\src\pages\InvoiceDetail.tsx"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Sub, run
 
 # Find and replace the Patient Information section
 old_section = r"""      {/\* Patient Information \*/}
@@ -76,9 +73,17 @@ new_section = r"""      {/* Patient Information */}
         </div>
       </div>"""
 
-content = re.sub(old_section, new_section, content, flags=re.DOTALL)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    Patch(
+        name='update-invoice-detail',
+        target='apps/web/src/pages/InvoiceDetail.tsx',
+        edits=[
+            Sub(old_section, new_section, flags=re.DOTALL,
+                done='<p className="text-sm text-gray-600">Home Address</p>'),
+        ],
+    ),
+]
 
-print("InvoiceDetail updated with id_number and home_address display")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("InvoiceDetail updated with id_number and home_address display")
@@ -4,49 +4,7 @@ Add id_number and home_address to PatientModal
 Schema v4.1 - Patient Information Enhancement
 """
 
-import re
-
-file_path = r"apps\web\src\components\PatientModal.tsx"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# 1. Update PatientFormData interface
-content = re.sub(
-    r"(interface PatientFormData \{\n  first_name: string;\n  last_name: string;\n  cell: string;\n  email: string;\n  notes: string;\n\})",
-    r"interface PatientFormData {\n  first_name: string;\n  last_name: string;\n  cell: string;\n  email: string;\n  id_number: string;\n  home_address: string;\n  notes: string;\n}",
-    content
-)
-
-# 2. Update useState initial state
-content = re.sub(
-    r"(const \[formData, setFormData\] = useState<PatientFormData>\(\{\n    first_name: '',\n    last_name: '',\n    cell: '',\n    email: '',\n    notes: '',\n  \}\);)",
-    r"const [formData, setFormData] = useState<PatientFormData>({\n    first_name: '',\n    last_name: '',\n    cell: '',\n    email: '',\n    id_number: '',\n    home_address: '',\n    notes: '',\n  });",
-    content
-)
-
-# 3. Update database insert
-content = re.sub(
-    r"(cell: formData\.cell\.replace\(/\\s/g, ''\), // Remove spaces\n          email: formData\.email\.trim\(\) \|\| null,\n          notes: formData\.notes\.trim\(\) \|\| null,)",
-    r"cell: formData.cell.replace(/\\s/g, ''), // Remove spaces\n          email: formData.email.trim() || null,\n          id_number: formData.id_number.trim() || null,\n          home_address: formData.home_address.trim() || null,\n          notes: formData.notes.trim() || null,",
-    content
-)
-
-# 4. Update form reset (first occurrence)
-content = re.sub(
-    r"(setFormData\(\{\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        notes: '',\n      \}\);)",
-    r"setFormData({\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        id_number: '',\n        home_address: '',\n        notes: '',\n      });",
-    content,
-    count=1
-)
-
-# 5. Update form reset (second occurrence in handleClose)
-content = re.sub(
-    r"(setFormData\(\{\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        notes: '',\n      \}\);)",
-    r"setFormData({\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        id_number: '',\n        home_address: '',\n        notes: '',\n      });",
-    content,
-    count=1
-)
+from patchlib import Patch, Sub, run
 
 # 6. Add form fields in JSX before Notes section
 form_fields = """
@@ -85,13 +43,50 @@ form_fields = """
           </div>
 """
 
-content = re.sub(
-    r"(          {/\* Notes \*/}\n)",
-    form_fields + r"\1",
-    content
-)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
+PATCHES = [
+    Patch(
+        name='update-patient-modal',
+        target='apps/web/src/components/PatientModal.tsx',
+        edits=[
+            # 1. Update PatientFormData interface
+            Sub(
+                r"(interface PatientFormData \{\n  first_name: string;\n  last_name: string;\n  cell: string;\n  email: string;\n  notes: string;\n\})",
+                r"interface PatientFormData {\n  first_name: string;\n  last_name: string;\n  cell: string;\n  email: string;\n  id_number: string;\n  home_address: string;\n  notes: string;\n}",
+                done="  id_number: string;\n  home_address: string;\n",
+            ),
+            # 2. Update useState initial state
+            Sub(
+                r"(const \[formData, setFormData\] = useState<PatientFormData>\(\{\n    first_name: '',\n    last_name: '',\n    cell: '',\n    email: '',\n    notes: '',\n  \}\);)",
+                r"const [formData, setFormData] = useState<PatientFormData>({\n    first_name: '',\n    last_name: '',\n    cell: '',\n    email: '',\n    id_number: '',\n    home_address: '',\n    notes: '',\n  });",
+                done="useState<PatientFormData>({\n    first_name: '',\n    last_name: '',\n    cell: '',\n    email: '',\n    id_number: '',",
+            ),
+            # 3. Update database insert
+            Sub(
+                r"(cell: formData\.cell\.replace\(/\\s/g, ''\), // Remove spaces\n          email: formData\.email\.trim\(\) \|\| null,\n          notes: formData\.notes\.trim\(\) \|\| null,)",
+                r"cell: formData.cell.replace(/\\s/g, ''), // Remove spaces\n          email: formData.email.trim() || null,\n          id_number: formData.id_number.trim() || null,\n          home_address: formData.home_address.trim() || null,\n          notes: formData.notes.trim() || null,",
+                done="id_number: formData.id_number.trim() || null,",
+            ),
+            # 4. Update form reset after saving
+            Sub(
+                r"(// Reset form and close\n      )setFormData\(\{\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        notes: '',\n      \}\);",
+                r"\1setFormData({\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        id_number: '',\n        home_address: '',\n        notes: '',\n      });",
+                done="// Reset form and close\n      setFormData({\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        id_number: '',",
+            ),
+            # 5. Update form reset in handleClose
+            Sub(
+                r"(if \(!saving\) \{\n      )setFormData\(\{\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        notes: '',\n      \}\);",
+                r"\1setFormData({\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        id_number: '',\n        home_address: '',\n        notes: '',\n      });",
+                done="if (!saving) {\n      setFormData({\n        first_name: '',\n        last_name: '',\n        cell: '',\n        email: '',\n        id_number: '',",
+            ),
+            Sub(
+                r"(          {/\* Notes \*/}\n)",
+                form_fields + r"\1",
+                done="          {/* ID Number */}\n",
+            ),
+        ],
+    ),
+]
 
-print("PatientModal updated with id_number and home_address fields")
+if __name__ == '__main__':
+    run(PATCHES)
+    print("PatientModal updated with id_number and home_address fields")
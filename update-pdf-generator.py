@@ -6,10 +6,7 @@ Schema v4.1
 
 import re
 
-file_path = r"apps\web\src\lib\pdfGenerator.ts"
-
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
+from patchlib import Patch, Sub, run
 
 # Find and replace the Patient Information section in PDF
 old_section = r"""  // Patient Information
@@ -75,9 +72,17 @@ new_section = r"""  // Patient Information
 
   yPos += 10;"""
 
-content = re.sub(old_section, new_section, content, flags=re.DOTALL)
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("PDF generator updated with id_number and home_address fields")
+PATCHES = [
+    Patch(
+        name='update-pdf-generator',
+        target='apps/web/src/lib/pdfGenerator.ts',
+        edits=[
+            Sub(old_section, new_section, flags=re.DOTALL,
+                done="doc.text(`Cell: ${invoice.customer.cell}`, margin, yPos);"),
+        ],
+    ),
+]
+
+if __name__ == '__main__':
+    run(PATCHES)
+    print("PDF generator updated with id_number and home_address fields")